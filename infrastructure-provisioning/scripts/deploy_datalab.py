@@ -65,6 +65,9 @@ import os
 import subprocess
 import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'ssn', 'scripts'))
+import docker_build
+
 BOOL_CHOICES_LIST = ['true', 'false']
 OS_DISTRO_LIST = ['debian', 'redhat']
 NETWORK_TYPE_LIST = ['public', 'private']
@@ -321,16 +324,18 @@ def build_docker_images(args):
         subprocess.run('sudo docker image tag {}:{}/docker.datalab-ssn-{} docker.datalab-ssn'.format(args.conf_repository_address, args.conf_repository_port, args.conf_cloud_provider), shell=True, check=True)
         subprocess.run('sudo docker image rm {}:{}/docker.datalab-ssn-{}'.format(args.conf_repository_address, args.conf_repository_port, args.conf_cloud_provider), shell=True, check=True)
     else:
-        # Building base and ssn docker images
-        subprocess.run(
-            'cd {2}; sudo docker build --build-arg OS={0} --build-arg SRC_PATH="infrastructure-provisioning/src/" --file '
-            'infrastructure-provisioning/src/general/files/{1}/'
-            'base_Dockerfile -t docker.datalab-base .'.format(args.conf_os_family, args.conf_cloud_provider,
-                                                              args.workspace_path), shell=True, check=True)
-        subprocess.run(
-            'cd {2}; sudo docker build --build-arg OS={0} --file infrastructure-provisioning/src/general/files/{1}/'
-            'ssn_Dockerfile -t docker.datalab-ssn .'.format(args.conf_os_family, args.conf_cloud_provider,
-                                                            args.workspace_path), shell=True, check=True)
+        # Building base and ssn docker images, the images are skipped when their inputs are unchanged
+        base = {'name': 'base', 'tag': 'docker.datalab-base',
+                'dockerfile': 'infrastructure-provisioning/src/general/files/{}/base_Dockerfile'.format(
+                    args.conf_cloud_provider),
+                'build_args': {'OS': args.conf_os_family, 'SRC_PATH': 'infrastructure-provisioning/src/'}}
+        ssn = {'name': 'ssn', 'tag': 'docker.datalab-ssn',
+               'dockerfile': 'infrastructure-provisioning/src/general/files/{}/ssn_Dockerfile'.format(
+                   args.conf_cloud_provider),
+               'build_args': {'OS': args.conf_os_family}}
+        report, succeeded = docker_build.build_images(base, [ssn], args.workspace_path, docker='sudo docker')
+        if not succeeded:
+            sys.exit('Failed to build docker images, see the logs in /tmp/docker_build')
 
 
 def deploy_datalab(args):
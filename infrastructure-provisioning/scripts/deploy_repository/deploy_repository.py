@@ -65,6 +65,7 @@ parser.add_argument('--datalab_conf_file_path', type=str, default='', help="Full
 parser.add_argument('--nexus_admin_password', type=str, default='', help="Password for Nexus admin user")
 parser.add_argument('--nexus_service_user_name', type=str, default='datalab-nexus', help="Nexus service user name")
 parser.add_argument('--nexus_service_user_password', type=str, default='', help="Nexus service user password")
+parser.add_argument('--packages_max_workers', type=int, default=4, help="Packages mirrored to Nexus at the same time")
 parser.add_argument('--action', required=True, type=str, default='', help='Action: create or terminate')
 args = parser.parse_args()
 
@@ -1228,18 +1229,20 @@ def download_packages():
                 'https://cran.r-project.org/src/contrib/Archive/keras/keras_{}.tar.gz'.format(
                     configuration['notebook_keras_version'])
             ]
+            # Artifacts are mirrored in parallel on the Nexus instance; interrupted downloads are resumed and
+            # artifacts which are already in the repository are skipped, so a failed run is simply repeated
             packages_list = list()
             for package in packages_urls:
-                package_name = package.split('/')[-1]
-                packages_list.append({'url': package, 'name': package_name})
-            conn.run('mkdir packages')
-            for package in packages_list:
-                conn.run('cd packages && wget {0}'.format(package['url']))
-                conn.run('curl -v -u admin:{2} -F "raw.directory=/" -F '
-                        '"raw.asset1=@/home/{0}/packages/{1}" '
-                        '-F "raw.asset1.filename={1}"  '
-                        '"http://localhost:8081/service/rest/v1/components?repository=packages"'.format(
-                         configuration['conf_os_user'], package['name'], args.nexus_admin_password))
+                insecure = package.startswith('--no-check-certificate ')
+                package_url = package.replace('--no-check-certificate ', '')
+                packages_list.append({'url': package_url, 'name': package_url.split('/')[-1], 'insecure': insecure})
+            with open('/tmp/packages.json', 'w') as f:
+                json.dump(packages_list, f)
+            conn.put('/tmp/packages.json', '/tmp/packages.json')
+            conn.put('scripts/mirror_packages.py', '/tmp/mirror_packages.py')
+            conn.run('NEXUS_PASSWORD="{}" python3 /tmp/mirror_packages.py --packages /tmp/packages.json '
+                     '--work_dir /home/{}/packages --max_workers {}'.format(
+                      args.nexus_admin_password, configuration['conf_os_user'], args.packages_max_workers))
             conn.sudo('touch /home/{}/.ensure_dir/packages_downloaded'.format(configuration['conf_os_user']))
     except Exception as err:
         traceback.print_exc()
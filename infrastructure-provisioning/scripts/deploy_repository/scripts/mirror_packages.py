@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Mirrors artifacts into the raw "packages" repository of Nexus. Every artifact is downloaded once into
+# <work_dir>/<name>.part while the same bytes are streamed to Nexus, a retry resumes the download with a range
+# request, and artifacts which are already in Nexus are skipped. Completed artifacts are recorded with their
+# size and checksums in <work_dir>/manifest.json. Only the standard library is used, as the script runs on
+# the Nexus instance.
+
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import os
+import ssl
+import sys
+import threading
+import time
+import traceback
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--packages', required=True, type=str, help='JSON file with a list of {"url", "name", "insecure"}')
+parser.add_argument('--nexus_url', type=str, default='http://localhost:8081', help='Nexus base URL')
+parser.add_argument('--repository', type=str, default='packages', help='Raw hosted repository')
+parser.add_argument('--nexus_user', type=str, default='admin', help='Nexus user, the password is read from '
+                                                                     'NEXUS_PASSWORD')
+parser.add_argument('--work_dir', type=str, default='packages', help='Directory of partial downloads and manifest')
+parser.add_argument('--max_workers', type=int, default=4, help='Artifacts mirrored at the same time')
+parser.add_argument('--retries', type=int, default=3, help='Attempts per artifact')
+args = parser.parse_args()
+
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = 60
+REDIRECT_CODES = (301, 302, 303, 307, 308)
+manifest_lock = threading.Lock()
+
+
+def log(message):
+    print('[{}] {}'.format(time.strftime('%H:%M:%S'), message), flush=True)
+
+
+def request(method, url, headers=None, body=None, insecure=False):
+    # Returns the connection and the response with an unread body; redirects of download sites are followed
+    for _ in range(10):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme == 'https':
+            context = ssl._create_unverified_context() if insecure else ssl.create_default_context()
+            conn = http.client.HTTPSConnection(parts.netloc, timeout=TIMEOUT, context=context)
+        else:
+            conn = http.client.HTTPConnection(parts.netloc, timeout=TIMEOUT)
+        conn.request(method, parts.path + ('?' + parts.query if parts.query else ''), body=body,
+                     headers=headers or {})
+        response = conn.getresponse()
+        if response.status not in REDIRECT_CODES or not response.getheader('Location'):
+            return conn, response
+        response.read()
+        conn.close()
+        url = urllib.parse.urljoin(url, response.getheader('Location'))
+    raise Exception('Too many redirects for {}'.format(url))
+
+
+def get_asset_url(name):
+    return '{}/repository/{}/{}'.format(args.nexus_url.rstrip('/'), args.repository, urllib.parse.quote(name))
+
+
+def get_auth_headers():
+    credentials = '{}:{}'.format(args.nexus_user, os.environ.get('NEXUS_PASSWORD', ''))
+    return {'Authorization': 'Basic ' + base64.b64encode(credentials.encode()).decode()}
+
+
+def get_size(method, url, headers=None, insecure=False):
+    try:
+        conn, response = request(method, url, headers, insecure=insecure)
+        response.read()
+        conn.close()
+        if response.status == 200 and response.getheader('Content-Length') is not None:
+            return int(response.getheader('Content-Length'))
+    except (OSError, http.client.HTTPException) as err:
+        log('Unable to get size of {}: {}'.format(url, err))
+    return None
+
+
+def get_nexus_sha1(name):
+    conn, response = request('GET', get_asset_url(name) + '.sha1', get_auth_headers())
+    data = response.read().decode().strip()
+    conn.close()
+    return data if response.status == 200 else None
+
+
+def load_manifest():
+    path = os.path.join(args.work_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return dict()
+    with open(path) as f:
+        return json.load(f)
+
+
+def record(manifest, name, entry):
+    with manifest_lock:
+        manifest[name] = entry
+        path = os.path.join(args.work_dir, 'manifest.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(path + '.tmp', path)
+
+
+def transfer(package):
+    # The upload replays what is already in the .part file and continues with the rest of the download,
+    # which is appended to the file on the way, so every byte is written to disk once
+    name = package['name']
+    part_path = os.path.join(args.work_dir, name + '.part')
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    conn, response = request('GET', package['url'], {'Range': 'bytes={}-'.format(offset)} if offset else {},
+                             insecure=package.get('insecure', False))
+    expected_size = None
+    if response.status == 206:
+        if not (response.getheader('Content-Range') or '').startswith('bytes {}-'.format(offset)):
+            raise Exception('Unexpected Content-Range {} for {}'.format(response.getheader('Content-Range'), name))
+        expected_size = int(response.getheader('Content-Range').split('/')[-1]) \
+            if not response.getheader('Content-Range').endswith('/*') else None
+    elif response.status == 416 and offset:
+        # The previous attempt downloaded everything and failed while uploading
+        response.read()
+        conn.close()
+        conn = response = None
+        expected_size = offset
+    elif response.status == 200:
+        offset = 0
+        if response.getheader('Content-Length') is not None:
+            expected_size = int(response.getheader('Content-Length'))
+    else:
+        raise Exception('Download of {} failed with HTTP {}'.format(package['url'], response.status))
+    if offset:
+        log('Resuming {} at {} bytes'.format(name, offset))
+    sha1 = hashlib.sha1()
+    sha256 = hashlib.sha256()
+    size = 0
+
+    def body():
+        nonlocal size
+        if offset:
+            with open(part_path, 'rb') as part:
+                for chunk in iter(lambda: part.read(CHUNK_SIZE), b''):
+                    sha1.update(chunk)
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    yield chunk
+        if response is None:
+            return
+        with open(part_path, 'ab' if offset else 'wb') as part:
+            for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                part.write(chunk)
+                sha1.update(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+                yield chunk
+
+    try:
+        upload_conn, upload_response = request('PUT', get_asset_url(name), get_auth_headers(), body=body())
+        upload_body = upload_response.read()
+        upload_conn.close()
+    finally:
+        if conn is not None:
+            conn.close()
+    if upload_response.status not in (200, 201, 204):
+        raise Exception('Upload of {} failed with HTTP {}: {}'.format(name, upload_response.status,
+                                                                        upload_body[:200]))
+    if expected_size is not None and size != expected_size:
+        raise Exception('Download of {} is incomplete, {} of {} bytes'.format(name, size, expected_size))
+    nexus_sha1 = get_nexus_sha1(name)
+    if nexus_sha1 and nexus_sha1 != sha1.hexdigest():
+        os.remove(part_path)
+        raise Exception('Checksum of {} in Nexus is {} instead of {}'.format(name, nexus_sha1, sha1.hexdigest()))
+    os.remove(part_path)
+    return {'url': package['url'], 'size': size, 'sha1': sha1.hexdigest(), 'sha256': sha256.hexdigest(),
+            'mirrored': int(time.time())}
+
+
+def mirror(package, manifest):
+    name = package['name']
+    entry = manifest.get(name)
+    nexus_size = get_size('HEAD', get_asset_url(name), get_auth_headers())
+    if nexus_size is not None:
+        if entry and entry['url'] == package['url'] and entry['size'] == nexus_size:
+            return 'present', 0
+        # Mirrored before there was a manifest: the size of the source has to match
+        if not entry and get_size('HEAD', package['url'], insecure=package.get('insecure', False)) == nexus_size:
+            record(manifest, name, {'url': package['url'], 'size': nexus_size, 'sha1': get_nexus_sha1(name),
+                                    'sha256': None, 'mirrored': int(time.time())})
+            return 'present', 0
+    for attempt in range(1, args.retries + 1):
+        start = time.time()
+        try:
+            entry = transfer(package)
+            record(manifest, name, entry)
+            log('Mirrored {} ({} bytes) in {:.1f} sec'.format(name, entry['size'], time.time() - start))
+            return 'mirrored', entry['size']
+        except Exception as err:
+            log('Attempt {} of {} to mirror {} failed: {}'.format(attempt, args.retries, name, err))
+            if attempt == args.retries:
+                raise
+            time.sleep(5 * attempt)
+
+
+def run(packages):
+    os.makedirs(args.work_dir, exist_ok=True)
+    manifest = load_manifest()
+    results = dict()
+
+    def mirror_package(package):
+        try:
+            results[package['name']] = mirror(package, manifest)
+        except Exception:
+            traceback.print_exc()
+            results[package['name']] = ('failed', 0)
+
+    start = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.max_workers)) as pool:
+        list(pool.map(mirror_package, packages))
+    statuses = [status for status, _ in results.values()]
+    log('{} artifacts: {} mirrored ({} bytes), {} already present, {} failed in {:.1f} sec'.format(
+        len(packages), statuses.count('mirrored'), sum(size for _, size in results.values()),
+        statuses.count('present'), statuses.count('failed'), time.time() - start))
+    return [name for name, (status, _) in results.items() if status == 'failed']
+
+
+if __name__ == "__main__":
+    with open(args.packages) as f:
+        failed = run(json.load(f))
+    if failed:
+        print('Failed to mirror: {}'.format(', '.join(sorted(failed))))
+        sys.exit(1)
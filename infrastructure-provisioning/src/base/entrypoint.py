@@ -25,15 +25,40 @@ import os
 from configparser import ConfigParser
 import argparse
 import fabric
+import fcntl
 import json
+import socketserver
 import sys
 import select
+import socket
 import subprocess
+import time
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--action', type=str, default='')
+parser.add_argument('--worker_socket', type=str, default='')
 args = parser.parse_args()
 
+WORKER_LOCK_PATH = '/root/.worker.lock'
+
+actions = {
+    'create': '/bin/create.py',
+    'status': '/bin/status.py',
+    'stop': '/bin/stop.py',
+    'start': '/bin/start.py',
+    'terminate': '/bin/terminate.py',
+    'configure': '/bin/configure.py',
+    'recreate': '/bin/recreate.py',
+    'reupload_key': '/bin/reupload_key.py',
+    'lib_install': '/bin/install_libs.py',
+    'lib_list': '/bin/list_libs.py',
+    'git_creds': '/bin/git_creds.py',
+    'create_image': '/bin/create_image.py',
+    'terminate_image': '/bin/terminate_image.py',
+    'reconfigure_spark': '/bin/reconfigure_spark.py',
+    'check_inactivity': '/bin/check_inactivity.py'
+}
+
 
 def get_from_stdin():
     lines = []
@@ -49,29 +74,7 @@ def get_from_stdin():
         return "{}"
 
 
-if __name__ == "__main__":
-    # Get request ID as if it will need everywhere
-    request_id = 'ssn'
-    try:
-        request_id = os.environ['request_id']
-    except:
-        os.environ['request_id'] = 'ssn'
-
-    # Get config from STDIN
-    stdin_contents = get_from_stdin()
-    try:
-        passed_as_json = json.loads(stdin_contents)
-    except:
-        with open("/response/{}.json".format(request_id), 'w') as response_file:
-            reply = dict()
-            reply['request_id'] = os.environ['request_id']
-            reply['status'] = 'err'
-            reply['response'] = dict()
-            reply['response']['result'] = "Malformed config passed in stdin"
-            reply['response']['stdin_contents'] = stdin_contents
-            response_file.write(json.dumps(reply))
-        sys.exit(1)
-
+def load_config(passed_as_json):
     # Get config (defaults) from files. Will not overwrite any env
     for filename in os.listdir('/root/conf'):
         if filename.endswith('.ini'):
@@ -99,71 +102,146 @@ if __name__ == "__main__":
         except:
             os.environ[option] = str(passed_as_json[option])
 
-    # Pre-execution steps: checking for dry running
-    dry_run = False
-    try:
-        if os.environ['dry_run'] == 'true':
-            dry_run = True
-    except:
-        pass
 
-    if args.action != 'terminate':
+def run_action(action):
+    import datalab.result_journal
+    import datalab.runner
+    if action != 'terminate':
         subprocess.run('chmod 600 /root/keys/*.pem', shell=True, check=True)
 
-    if dry_run:
-        with open("/response/{}.json".format(request_id), 'w') as response_file:
-            response = {"request_id": request_id, "action": args.action, "dry_run": "true"}
-            response_file.write(json.dumps(response))
-
-    # Run execution routines
-    elif args.action == 'create':
-        subprocess.run("/bin/create.py", shell=True, check=True)
-
-    elif args.action == 'status':
-        subprocess.run("/bin/status.py", shell=True, check=True)
-
-    elif args.action == 'describe':
+    if action == 'describe':
         with open('/root/description.json') as json_file:
             description = json.load(json_file)
-            description['request_id'] = request_id
-            with open("/response/{}.json".format(request_id), 'w') as response_file:
+            description['request_id'] = os.environ['request_id']
+            with open("/response/{}.json".format(os.environ['request_id']), 'w') as response_file:
                 response_file.write(json.dumps(description))
+    elif action in actions:
+        datalab.result_journal.reset()
+        datalab.runner.run_path(actions[action])
 
-    elif args.action == 'stop':
-        subprocess.run("/bin/stop.py", shell=True, check=True)
 
-    elif args.action == 'start':
-        subprocess.run("/bin/start.py", shell=True, check=True)
+def is_dry_run():
+    return os.environ.get('dry_run') == 'true'
 
-    elif args.action == 'terminate':
-        subprocess.run("/bin/terminate.py", shell=True, check=True)
 
-    elif args.action == 'configure':
-        subprocess.run("/bin/configure.py", shell=True, check=True)
-
-    elif args.action == 'recreate':
-        subprocess.run("/bin/recreate.py", shell=True, check=True)
+def run_dry(action, request_id):
+    if action != 'terminate':
+        subprocess.run('chmod 600 /root/keys/*.pem', shell=True, check=True)
+    with open("/response/{}.json".format(request_id), 'w') as response_file:
+        response = {"request_id": request_id, "action": action, "dry_run": "true"}
+        response_file.write(json.dumps(response))
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    # Every request is handled in a child forked from the preloaded worker, so the
+    # environment and module globals of one request never leak into the next one.
+    # Scripts share /root/result.json and the result journal, so requests run one at a time.
+    def handle(self):
+        request = json.loads(self.rfile.readline().decode())
+        with open(WORKER_LOCK_PATH, 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            reply = self.run_request(request)
+        self.wfile.write((json.dumps(reply) + '\n').encode())
+
+    def run_request(self, request):
+        import datalab.runner
+        start = time.time()
+        os.environ['request_id'] = request.get('request_id', 'ssn')
+        status = 'ok'
+        try:
+            load_config(request.get('config', {}))
+            reset_logging()
+            if is_dry_run():
+                run_dry(request['action'], os.environ['request_id'])
+            else:
+                run_action(request['action'])
+        except Exception as err:
+            print('Action {} failed: {}'.format(request.get('action'), str(err)))
+            status = 'err'
+        finally:
+            # The worker container outlives the request, its lookups must not be served to the next one
+            import datalab.lookup_cache
+            datalab.lookup_cache.remove_store()
+        return {"request_id": os.environ['request_id'], "action": request.get('action'), "status": status,
+                "duration": round(time.time() - start, 3), "steps": datalab.runner.step_timings}
+
+
+class WorkerServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    pass
+
+
+def reset_logging():
+    import importlib
+    import logging
+    import datalab.logger
+    for handler in logging.getLogger('').handlers[:]:
+        logging.getLogger('').removeHandler(handler)
+    importlib.reload(datalab.logger)
+
+
+def run_worker(socket_path):
+    os.environ['request_id'] = 'worker'
+    os.environ['conf_inprocess_steps'] = 'true'
+    load_config({})
+    # Heavy imports (cloud SDKs, fabric, datalab libs) are paid once here instead of once per hop
+    import importlib
+    for module in ('datalab.fab', 'datalab.actions_lib', 'datalab.meta_lib', 'datalab.runner'):
+        importlib.import_module(module)
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = WorkerServer(socket_path, WorkerHandler)
+    print('Provisioning worker is listening on {}'.format(socket_path))
+    server.serve_forever()
+
+
+def submit_to_worker(socket_path, action, request_id, passed_as_json):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall((json.dumps({"action": action, "request_id": request_id,
+                                    "config": passed_as_json}) + '\n').encode())
+        reply = json.loads(client.makefile().readline())
+    print(json.dumps(reply))
+    if reply['status'] != 'ok':
+        sys.exit(1)
 
-    elif args.action == 'reupload_key':
-        subprocess.run("/bin/reupload_key.py", shell=True, check=True)
 
-    elif args.action == 'lib_install':
-        subprocess.run("/bin/install_libs.py", shell=True, check=True)
+if __name__ == "__main__":
+    if args.action == 'worker':
+        run_worker(args.worker_socket or '/response/.worker.sock')
+        sys.exit(0)
 
-    elif args.action == 'lib_list':
-        subprocess.run("/bin/list_libs.py", shell=True, check=True)
+    # Get request ID as if it will need everywhere
+    request_id = 'ssn'
+    try:
+        request_id = os.environ['request_id']
+    except:
+        os.environ['request_id'] = 'ssn'
 
-    elif args.action == 'git_creds':
-        subprocess.run("/bin/git_creds.py", shell=True, check=True)
+    # Get config from STDIN
+    stdin_contents = get_from_stdin()
+    try:
+        passed_as_json = json.loads(stdin_contents)
+    except:
+        with open("/response/{}.json".format(request_id), 'w') as response_file:
+            reply = dict()
+            reply['request_id'] = os.environ['request_id']
+            reply['status'] = 'err'
+            reply['response'] = dict()
+            reply['response']['result'] = "Malformed config passed in stdin"
+            reply['response']['stdin_contents'] = stdin_contents
+            response_file.write(json.dumps(reply))
+        sys.exit(1)
 
-    elif args.action == 'create_image':
-        subprocess.run("/bin/create_image.py", shell=True, check=True)
+    if args.worker_socket:
+        submit_to_worker(args.worker_socket, args.action, request_id, passed_as_json)
+        sys.exit(0)
 
-    elif args.action == 'terminate_image':
-        subprocess.run("/bin/terminate_image.py", shell=True, check=True)
+    load_config(passed_as_json)
 
-    elif args.action == 'reconfigure_spark':
-        subprocess.run("/bin/reconfigure_spark.py", shell=True, check=True)
+    # Pre-execution steps: checking for dry running
+    if is_dry_run():
+        run_dry(args.action, request_id)
 
-    elif args.action == 'check_inactivity':
-        subprocess.run("/bin/check_inactivity.py", shell=True, check=True)
\ No newline at end of file
+    # Run execution routines
+    else:
+        run_action(args.action)
@@ -26,13 +26,13 @@ import os
 import sys
 import uuid
 import secrets
-import subprocess
 import random
 import string
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from fabric import *
+import datalab.runner
 
 @task
 def run(ctx):
@@ -46,18 +46,16 @@ def run(ctx):
     dataengine_service_config['uuid'] = '{}{}'.format(random.choice(string.ascii_lowercase), str(uuid.uuid4())[:5])
     dataengine_service_config['access_password'] = secrets.token_urlsafe(32)
     try:
-        subprocess.run("~/scripts/{}.py --uuid {} --access_password {}"
-                       .format('dataengine-service_prepare', dataengine_service_config['uuid'],
-                               dataengine_service_config['access_password']), shell=True, check=True)
+        datalab.runner.run_script('dataengine-service_prepare', '--uuid {} --access_password {}'.format(
+            dataengine_service_config['uuid'], dataengine_service_config['access_password']))
     except Exception as err:
         traceback.print_exc()
         append_result("Failed preparing Data Engine service.", str(err))
         sys.exit(1)
 
     try:
-        subprocess.run("~/scripts/{}.py --uuid {} --access_password {}"
-                       .format('dataengine-service_configure', dataengine_service_config['uuid'],
-                               dataengine_service_config['access_password']), shell=True, check=True)
+        datalab.runner.run_script('dataengine-service_configure', '--uuid {} --access_password {}'.format(
+            dataengine_service_config['uuid'], dataengine_service_config['access_password']))
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring Data Engine service.", str(err))
@@ -75,7 +73,7 @@ def install_libs(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine-service_install_libs'), shell=True, check=True)
+        datalab.runner.run_script('dataengine-service_install_libs')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed installing additional libs for DataEngine service.", str(err))
@@ -93,7 +91,7 @@ def list_libs(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine-service_list_libs'), shell=True, check=True)
+        datalab.runner.run_script('dataengine-service_list_libs')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed get available libraries for Data Engine service.", str(err))
@@ -109,7 +107,7 @@ def terminate(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine-service_terminate'), shell=True, check=True)
+        datalab.runner.run_script('dataengine-service_terminate')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring Notebook node.", str(err))
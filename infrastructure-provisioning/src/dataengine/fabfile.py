@@ -24,11 +24,11 @@
 import logging
 import os
 import sys
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from fabric import *
+import datalab.runner
 
 
 @task
@@ -40,14 +40,14 @@ def run(ctx):
                         level=logging.INFO,
                         filename=local_log_filepath)
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_prepare'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_prepare')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed preparing Data Engine.", str(err))
         sys.exit(1)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_configure'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_configure')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring Data Engine.", str(err))
@@ -63,7 +63,7 @@ def start(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_start'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_start')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed starting Data Engine.", str(err))
@@ -81,7 +81,7 @@ def install_libs(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_install_libs'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_install_libs')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed installing additional libs for DataEngine.", str(err))
@@ -99,7 +99,7 @@ def list_libs(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_list_libs'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_list_libs')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed get available libraries for Data Engine.", str(err))
@@ -115,7 +115,7 @@ def stop(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_stop'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_stop')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed stopping Data Engine.", str(err))
@@ -131,7 +131,7 @@ def terminate(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_terminate'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_terminate')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed terminating Data Engine.", str(err))
@@ -149,7 +149,7 @@ def reconfigure_spark(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('dataengine_reconfigure_spark'), shell=True, check=True)
+        datalab.runner.run_script('dataengine_reconfigure_spark')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed to reconfigure Spark for Data Engine.", str(err))
@@ -25,10 +25,10 @@ import logging
 import os
 import sys
 import uuid
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
+import datalab.runner
 
 
 # Main function for provisioning notebook server
@@ -46,7 +46,7 @@ def run(ctx):
 
     try:
         params = "--uuid {}".format(notebook_config['uuid'])
-        subprocess.run("~/scripts/{}.py {}".format('common_prepare_notebook', params), shell=True, check=True)
+        datalab.runner.run_script('common_prepare_notebook', params)
     except Exception as err:
         traceback.print_exc()
         append_result("Failed preparing Notebook node.", str(err))
@@ -54,7 +54,7 @@ def run(ctx):
 
     try:
         params = "--uuid {}".format(notebook_config['uuid'])
-        subprocess.run("~/scripts/{}.py {}".format('deeplearning_configure', params), shell=True, check=True)
+        datalab.runner.run_script('deeplearning_configure', params)
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring Notebook node.", str(err))
@@ -70,7 +70,7 @@ def terminate(ctx):
                         level=logging.DEBUG,
                         filename=local_log_filepath)
     try:
-        subprocess.run("~/scripts/{}.py".format('common_terminate_notebook'), shell=True, check=True)
+        datalab.runner.run_script('common_terminate_notebook')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed terminating Notebook node.", str(err))
@@ -86,7 +86,7 @@ def stop(ctx):
                         level=logging.DEBUG,
                         filename=local_log_filepath)
     try:
-        subprocess.run("~/scripts/{}.py".format('common_stop_notebook'), shell=True, check=True)
+        datalab.runner.run_script('common_stop_notebook')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed stopping Notebook node.", str(err))
@@ -103,7 +103,7 @@ def start(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('common_start_notebook'), shell=True, check=True)
+        datalab.runner.run_script('common_start_notebook')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed starting Notebook node.", str(err))
@@ -122,7 +122,7 @@ def configure(ctx):
 
     try:
         if os.environ['conf_resource'] == 'dataengine':
-            subprocess.run("~/scripts/{}.py".format('common_notebook_configure_dataengine'), shell=True, check=True)
+            datalab.runner.run_script('common_notebook_configure_dataengine')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring dataengine on Notebook node.", str(err))
@@ -140,7 +140,7 @@ def install_libs(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('notebook_install_libs'), shell=True, check=True)
+        datalab.runner.run_script('notebook_install_libs')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed installing additional libs for Notebook node.", str(err))
@@ -158,7 +158,7 @@ def list_libs(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('notebook_list_libs'), shell=True, check=True)
+        datalab.runner.run_script('notebook_list_libs')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed get available libraries for notebook node.", str(err))
@@ -176,7 +176,7 @@ def git_creds(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('notebook_git_creds'), shell=True, check=True)
+        datalab.runner.run_script('notebook_git_creds')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed to manage git credentials for notebook node.", str(err))
@@ -194,7 +194,7 @@ def create_image(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('common_create_notebook_image'), shell=True, check=True)
+        datalab.runner.run_script('common_create_notebook_image')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed to create image from notebook node.", str(err))
@@ -212,7 +212,7 @@ def terminate_image(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('common_terminate_notebook_image'), shell=True, check=True)
+        datalab.runner.run_script('common_terminate_notebook_image')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed to create image from notebook node.", str(err))
@@ -230,7 +230,7 @@ def reconfigure_spark(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('notebook_reconfigure_spark'), shell=True, check=True)
+        datalab.runner.run_script('notebook_reconfigure_spark')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed to reconfigure Spark for Notebook node.", str(err))
@@ -247,7 +247,7 @@ def check_inactivity(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('notebook_inactivity_check'), shell=True, check=True)
+        datalab.runner.run_script('notebook_inactivity_check')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed to check inactivity status.", str(err))
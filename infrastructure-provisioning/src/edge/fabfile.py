@@ -25,9 +25,9 @@ import logging
 import os
 import sys
 import traceback
-import subprocess
 from datalab.fab import *
 from fabric import *
+import datalab.runner
 
 @task
 def status(ctx):
@@ -39,7 +39,7 @@ def status(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('edge_status'), shell=True, check=True)
+        datalab.runner.run_script('edge_status')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed obtaining EDGE status.", str(err))
@@ -55,7 +55,7 @@ def stop(ctx):
                         level=logging.DEBUG,
                         filename=local_log_filepath)
     try:
-        subprocess.run("~/scripts/{}.py".format('edge_stop'), shell=True, check=True)
+        datalab.runner.run_script('edge_stop')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed stopping Edge node.", str(err))
@@ -71,7 +71,7 @@ def start(ctx):
                         level=logging.DEBUG,
                         filename=local_log_filepath)
     try:
-        subprocess.run("~/scripts/{}.py".format('edge_start'), shell=True, check=True)
+        datalab.runner.run_script('edge_start')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed starting Edge node.", str(err))
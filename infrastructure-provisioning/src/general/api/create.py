@@ -21,6 +21,8 @@
 #
 # ******************************************************************************
 
+import datalab.result_journal
+import datalab.runner
 import json
 import os
 import sys
@@ -29,7 +31,7 @@ import subprocess
 if __name__ == "__main__":
     success = True
     try:
-        subprocess.run('cd /root; fab run', shell=True, check=True)
+        datalab.runner.run_fab_task('run')
     except:
         success = False
 
@@ -42,11 +44,7 @@ if __name__ == "__main__":
 
     reply['response'] = dict()
 
-    try:
-        with open("/root/result.json") as f:
-            reply['response']['result'] = json.loads(f.read())
-    except:
-        reply['response']['result'] = {"error": "Failed to open result.json"}
+    reply['response']['result'] = datalab.result_journal.compact()
 
     if os.environ['conf_resource'] == 'ssn':
         reply['response']['log'] = "/response/{}.log".format(os.environ['request_id'])
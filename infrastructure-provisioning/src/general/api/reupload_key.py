@@ -21,6 +21,8 @@
 #
 # ******************************************************************************
 
+import datalab.result_journal
+import datalab.runner
 import json
 import os
 import sys
@@ -29,7 +31,7 @@ import subprocess
 if __name__ == "__main__":
     success = True
     try:
-        subprocess.run('cd /root; fab reupload_key', shell=True, check=True)
+        datalab.runner.run_fab_task('reupload_key')
     except:
         success = False
 
@@ -40,13 +42,8 @@ if __name__ == "__main__":
         reply['error_message'] = ''
     else:
         reply['status'] = 'failed'
-        try:
-            with open("/root/result.json") as f:
-                result = json.loads(f.read())
-                reply['error_message'] = result['error']
-        except:
-            result = {"error": "Failed to open result.json"}
-            reply['error_message'] = 'Failed to open result.json'
+        result = datalab.result_journal.compact()
+        reply['error_message'] = result.get('error', 'Failed to open result.json')
 
     log = "/var/log/datalab/edge/{0}_{1}_{2}.log".format(os.environ['conf_resource'],
                                                          os.environ['project_name'],
@@ -21,7 +21,6 @@
 
 import ast
 import backoff
-import boto3
 import botocore
 import json
 import logging
@@ -30,10 +29,15 @@ import sys
 import time
 import traceback
 import urllib3
-import urllib.request
 import uuid
 import subprocess
+import datalab.artifact_store
+import datalab.clients_lib
+import datalab.executor
 import datalab.fab
+import datalab.lookup_cache
+import datalab.s3_transfer
+import datalab.spark_conf
 from datalab.meta_lib import *
 from botocore.client import Config as botoConfig
 from patchwork.files import exists
@@ -52,9 +56,9 @@ def backoff_log(err):
 
 def put_to_bucket(bucket_name, local_file, destination_file):
     try:
-        s3 = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=os.environ['aws_region'])
-        with open(local_file, 'rb') as data:
-            s3.upload_fileobj(data, bucket_name, destination_file, ExtraArgs={'ServerSideEncryption': 'AES256'})
+        s3 = datalab.s3_transfer.get_client(os.environ['aws_region'])
+        datalab.s3_transfer.upload_file(s3, local_file, bucket_name, destination_file,
+                                        extra_args={'ServerSideEncryption': 'AES256'})
         return True
     except Exception as err:
         logging.info("Unable to upload files to S3 bucket: " + str(err) + "\n Traceback: " + traceback.print_exc(
@@ -67,7 +71,7 @@ def put_to_bucket(bucket_name, local_file, destination_file):
 
 def create_s3_bucket(bucket_name, bucket_tags, region, bucket_name_tag, bucket_versioning_enabled):
     try:
-        s3 = boto3.resource('s3', config=botoConfig(signature_version='s3v4'))
+        s3 = datalab.clients_lib.resource('s3', config=botoConfig(signature_version='s3v4'))
         if region == "us-east-1":
             bucket = s3.create_bucket(Bucket=bucket_name)
         else:
@@ -77,7 +81,7 @@ def create_s3_bucket(bucket_name, bucket_tags, region, bucket_name_tag, bucket_v
             bucket_versioning = s3.BucketVersioning(bucket_name)
             bucket_versioning.enable()
 
-        boto3.client('s3', config=botoConfig(signature_version='s3v4')).put_bucket_encryption(
+        datalab.clients_lib.client('s3', config=botoConfig(signature_version='s3v4')).put_bucket_encryption(
             Bucket=bucket_name, ServerSideEncryptionConfiguration={
                 'Rules': [
                     {
@@ -89,7 +93,7 @@ def create_s3_bucket(bucket_name, bucket_tags, region, bucket_name_tag, bucket_v
             })
 
         # Config for Public Access Block in s3
-        boto3.client('s3', config=botoConfig(signature_version='s3v4')).put_public_access_block(
+        datalab.clients_lib.client('s3', config=botoConfig(signature_version='s3v4')).put_public_access_block(
             Bucket=bucket_name,
             PublicAccessBlockConfiguration={
                 'BlockPublicAcls': True,
@@ -119,7 +123,7 @@ def create_s3_bucket(bucket_name, bucket_tags, region, bucket_name_tag, bucket_v
         # Convert the policy from Json dict to string
         bucket_policy = json.dumps(bucket_policy)
 
-        boto3.client('s3', config=botoConfig(signature_version='s3v4')).put_bucket_policy(
+        datalab.clients_lib.client('s3', config=botoConfig(signature_version='s3v4')).put_bucket_policy(
             Bucket=bucket_name,
             Policy=bucket_policy
         )
@@ -146,9 +150,10 @@ def create_s3_bucket(bucket_name, bucket_tags, region, bucket_name_tag, bucket_v
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def create_vpc(vpc_cidr, tag):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         vpc = ec2.create_vpc(CidrBlock=vpc_cidr)
         create_tag(vpc.id, tag)
         return vpc.id
@@ -161,7 +166,7 @@ def create_vpc(vpc_cidr, tag):
 
 def enable_vpc_dns(vpc_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.modify_vpc_attribute(VpcId=vpc_id,
                                     EnableDnsHostnames={'Value': True})
     except Exception as err:
@@ -172,9 +177,10 @@ def enable_vpc_dns(vpc_id):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def remove_vpc(vpc_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.delete_vpc(VpcId=vpc_id)
         print("VPC {} has been removed".format(vpc_id))
     except Exception as err:
@@ -184,22 +190,14 @@ def remove_vpc(vpc_id):
         traceback.print_exc(file=sys.stdout)
 
 
-@backoff.on_exception(backoff.expo,
-                      botocore.exceptions.ClientError,
-                      max_tries=40,
-                      on_giveup=backoff_log)
-def create_tag(resource, tag, with_tag_res_id=True):
-    print('Tags for the resource {} will be created'.format(resource))
+def get_tags_list(tag, with_tag_res_id=True):
     tags_list = list()
-    ec2 = boto3.client('ec2')
     if type(tag) == dict:
         resource_name = tag.get('Value')
         resource_tag = tag
     else:
         resource_name = json.loads(tag).get('Value')
         resource_tag = json.loads(tag)
-    if type(resource) != list:
-        resource = [resource]
     tags_list.append(resource_tag)
     if with_tag_res_id:
         tags_list.append(
@@ -222,15 +220,36 @@ def create_tag(resource, tag, with_tag_res_id=True):
                     'Value': tag.split(':')[1]
                 }
             )
+    return tags_list
+
+
+def merge_tags_lists(*tags_lists):
+    # Same result as calling create_tag() once per list: a later value wins for a repeated key
+    tags = dict()
+    for tags_list in tags_lists:
+        for tag in tags_list:
+            tags[tag['Key']] = tag['Value']
+    return [{'Key': key, 'Value': value} for key, value in tags.items()]
+
+
+@backoff.on_exception(backoff.expo,
+                      botocore.exceptions.ClientError,
+                      max_tries=40,
+                      on_giveup=backoff_log)
+def create_tag(resource, tag, with_tag_res_id=True):
+    print('Tags for the resource {} will be created'.format(resource))
+    ec2 = datalab.clients_lib.client('ec2')
+    if type(resource) != list:
+        resource = [resource]
     ec2.create_tags(
         Resources=resource,
-        Tags=tags_list
+        Tags=get_tags_list(tag, with_tag_res_id)
     )
 
 
 def remove_emr_tag(emr_id, tag):
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         emr.remove_tags(ResourceId=emr_id, TagKeys=tag)
     except Exception as err:
         logging.info("Unable to remove Tag: " + str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout))
@@ -243,7 +262,7 @@ def create_rt(vpc_id, infra_tag_name, infra_tag_value, secondary):
     try:
         tag = {"Key": infra_tag_name, "Value": infra_tag_value}
         route_table = []
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         rt = ec2.create_route_table(VpcId=vpc_id)
         rt_id = rt.get('RouteTable').get('RouteTableId')
         route_table.append(rt_id)
@@ -268,13 +287,13 @@ def create_rt(vpc_id, infra_tag_name, infra_tag_value, secondary):
 
 def create_nat_rt(vpc_id, infra_tag_value, edge_instance_id, private_subnet_id, sbn):
     try:
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         nat_rt = ec2.create_route_table(VpcId=vpc_id)
         nat_rt_id = nat_rt.get('RouteTable').get('RouteTableId')
         tag = {"Key": 'Name', "Value": infra_tag_value}
         create_tag(nat_rt_id, json.dumps(tag))
         create_tag(nat_rt_id, json.dumps({"Key": "{}-tag".format(sbn), "Value": sbn}))
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         route_table = ec2.RouteTable(nat_rt_id)
         route_table.create_route(DestinationCidrBlock='0.0.0.0/0', InstanceId=edge_instance_id)
         route_table.associate_with_subnet(SubnetId=private_subnet_id)
@@ -286,9 +305,10 @@ def create_nat_rt(vpc_id, infra_tag_value, edge_instance_id, private_subnet_id,
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def create_subnet(vpc_id, subnet, tag, zone):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         if zone != "":
             subnet = ec2.create_subnet(VpcId=vpc_id, CidrBlock=subnet, AvailabilityZone=zone)
         else:
@@ -303,9 +323,10 @@ def create_subnet(vpc_id, subnet, tag, zone):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def create_security_group(security_group_name, vpc_id, security_group_rules, egress, tag):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         tag_name = {"Key": "Name", "Value": security_group_name}
         group = ec2.create_security_group(GroupName=security_group_name, Description='security_group_name',
                                           VpcId=vpc_id)
@@ -334,7 +355,7 @@ def create_security_group(security_group_name, vpc_id, security_group_rules, egr
 
 
 def create_route_by_id(subnet_id, vpc_id, peering_id, another_cidr):
-    client = boto3.client('ec2')
+    client = datalab.clients_lib.client('ec2')
     try:
         table_id = client.describe_route_tables(Filters=[{'Name': 'association.subnet-id', 'Values': [subnet_id]}]).get(
             'RouteTables')
@@ -364,7 +385,7 @@ def create_route_by_id(subnet_id, vpc_id, peering_id, another_cidr):
 
 
 def create_peer_routes(peering_id, service_base_name):
-    client = boto3.client('ec2')
+    client = datalab.clients_lib.client('ec2')
     try:
         route_tables = client.describe_route_tables(
             Filters=[{'Name': 'tag:{}-tag'.format(service_base_name), 'Values': ['{}'.format(
@@ -403,8 +424,8 @@ def create_peer_routes(peering_id, service_base_name):
 
 def create_peering_connection(vpc_id, vpc2_id, service_base_name):
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
+        client = datalab.clients_lib.client('ec2')
         tag = {"Key": service_base_name + '-tag', "Value": service_base_name}
         tag_name = {"Key": 'Name', "Value": "{0}-peering-connection".format(service_base_name)}
         peering = ec2.create_vpc_peering_connection(PeerVpcId=vpc_id, VpcId=vpc2_id)
@@ -431,7 +452,7 @@ def create_peering_connection(vpc_id, vpc2_id, service_base_name):
 
 def enable_auto_assign_ip(subnet_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.modify_subnet_attribute(MapPublicIpOnLaunch={'Value': True}, SubnetId=subnet_id)
     except Exception as err:
         logging.info("Unable to create Subnet: " + str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout))
@@ -440,9 +461,10 @@ def enable_auto_assign_ip(subnet_id):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def create_instance(definitions, instance_tag, primary_disk_size=12):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         security_groups_ids = []
         for chunk in definitions.security_group_ids.split(','):
             security_groups_ids.append(chunk.strip())
@@ -538,9 +560,68 @@ def create_instance(definitions, instance_tag, primary_disk_size=12):
                            "error_message": str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout)}))
         traceback.print_exc(file=sys.stdout)
 
+
+@datalab.lookup_cache.invalidates
+def create_instances_fleet(nodes, ami_id, key_name, subnet_id, iam_profile, infra_tag_name, primary_disk_size=12,
+                           nodes_tags=None):
+    # nodes is a list of dicts with node_name, instance_type and security_group_ids. Every node is launched
+    # by its own RunInstances call in parallel with all tags set through TagSpecifications, then a single
+    # waiter covers the whole fleet. Nodes that already exist are left untouched.
+    try:
+        client = datalab.clients_lib.client('ec2')
+        region = os.environ['aws_region']
+        instance_ids = dict()
+        paginator = client.get_paginator('describe_instances')
+        for page in paginator.paginate(
+                Filters=[{'Name': 'tag:{}'.format(infra_tag_name), 'Values': [node['node_name'] for node in nodes]},
+                         {'Name': 'instance-state-name', 'Values': ['running', 'pending', 'stopping', 'stopped']}]):
+            for reservation in page['Reservations']:
+                for instance in reservation['Instances']:
+                    for tag in instance.get('Tags', []):
+                        if tag['Key'] == infra_tag_name:
+                            instance_ids[tag['Value']] = instance['InstanceId']
+        for name in instance_ids:
+            logging.info("REQUESTED INSTANCE {} ALREADY EXISTS AND RUNNING".format(name))
+
+        def launch(node):
+            node_name = node['node_name']
+            instance_tags = merge_tags_lists(get_tags_list({'Key': 'Name', 'Value': node_name}),
+                                             get_tags_list({'Key': infra_tag_name, 'Value': node_name}),
+                                             *[get_tags_list(tag, False) for tag in node.get('tags', nodes_tags or [])])
+            volume_name = node_name + '-volume-primary'
+            volume_tags = merge_tags_lists(get_tags_list({'Key': 'Name', 'Value': volume_name}),
+                                           get_tags_list({'Key': infra_tag_name, 'Value': volume_name}))
+            logging.info("Creating instance {0} of type {1} in subnet {2}".format(
+                node_name, node['instance_type'], subnet_id))
+            response = client.run_instances(
+                ImageId=ami_id, MinCount=1, MaxCount=1,
+                BlockDeviceMappings=[{"DeviceName": "/dev/sda1", "Ebs": {"VolumeSize": int(primary_disk_size)}}],
+                KeyName=key_name,
+                SecurityGroupIds=[i.strip() for i in node['security_group_ids'].split(',')],
+                InstanceType=node['instance_type'],
+                SubnetId=subnet_id,
+                IamInstanceProfile={'Name': iam_profile},
+                TagSpecifications=[{'ResourceType': 'instance', 'Tags': instance_tags},
+                                   {'ResourceType': 'volume', 'Tags': volume_tags}])
+            return response['Instances'][0]['InstanceId']
+
+        new_nodes = [node for node in nodes if node['node_name'] not in instance_ids]
+        new_ids = datalab.executor.map_concurrently(launch, new_nodes, service='ec2', region=region)
+        instance_ids.update({node['node_name']: instance_id for node, instance_id in zip(new_nodes, new_ids)})
+        if new_ids:
+            print("Waiting for instances {} become running.".format(', '.join(new_ids)))
+            client.get_waiter('instance_running').wait(InstanceIds=new_ids)
+        return instance_ids
+    except Exception as err:
+        logging.error("Unable to create EC2 fleet: " + str(err))
+        append_result(str({"error": "Unable to create EC2 fleet", "error_message": str(err)}))
+        traceback.print_exc(file=sys.stdout)
+        raise
+
+
 def modify_instance_sourcedescheck(instance_id):
     try:
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         ec2.modify_instance_attribute(InstanceId=instance_id, SourceDestCheck={'Value': False})
     except Exception as err:
         logging.info("Unable to modify EC2: " + str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout))
@@ -579,7 +660,7 @@ def tag_intance_volume(instance_id, node_name, instance_tag):
 
 def tag_emr_volume(cluster_id, node_name, billing_tag):
     try:
-        client = boto3.client('emr')
+        client = datalab.clients_lib.client('emr')
         cluster = client.list_instances(ClusterId=cluster_id)
         instances = cluster['Instances']
         for instance in instances:
@@ -597,7 +678,7 @@ def tag_emr_volume(cluster_id, node_name, billing_tag):
 
 
 def create_iam_role(role_name, role_profile, region, permissions_boundary='', service='ec2', tag=None, user_tag=None):
-    conn = boto3.client('iam')
+    conn = datalab.clients_lib.client('iam')
     try:
         if region == 'cn-north-1':
             conn.create_role(
@@ -670,7 +751,7 @@ def create_iam_role(role_name, role_profile, region, permissions_boundary='', se
 
 def attach_policy(role_name, policy_arn):
     try:
-        conn = boto3.client('iam')
+        conn = datalab.clients_lib.client('iam')
         conn.attach_role_policy(PolicyArn=policy_arn, RoleName=role_name)
         time.sleep(30)
     except botocore.exceptions.ClientError as err:
@@ -684,7 +765,7 @@ def attach_policy(role_name, policy_arn):
 
 def create_attach_policy(policy_name, role_name, file_path):
     try:
-        conn = boto3.client('iam')
+        conn = datalab.clients_lib.client('iam')
         with open(file_path, 'r') as myfile:
             json_file = myfile.read()
         conn.put_role_policy(RoleName=role_name, PolicyName=policy_name, PolicyDocument=json_file)
@@ -699,18 +780,18 @@ def create_route_53_record(hosted_zone_id, hosted_zone_name, subdomain, ip_addre
     try:
         if 'ssn_assume_role_arn' in os.environ:
             role_session_name = str(uuid.uuid4()).split('-')[0]
-            sts_client = boto3.client('sts')
+            sts_client = datalab.clients_lib.client('sts')
             credentials = sts_client.assume_role(
                 RoleArn=os.environ['ssn_assume_role_arn'],
                 RoleSessionName=role_session_name
             ).get('Credentials')
-            route53_client = boto3.client('route53',
-                                          aws_access_key_id=credentials.get('AccessKeyId'),
-                                          aws_secret_access_key=credentials.get('SecretAccessKey'),
-                                          aws_session_token=credentials.get('SessionToken')
-                                          )
+            route53_client = datalab.clients_lib.client('route53',
+                                                        aws_access_key_id=credentials.get('AccessKeyId'),
+                                                        aws_secret_access_key=credentials.get('SecretAccessKey'),
+                                                        aws_session_token=credentials.get('SessionToken')
+                                                        )
         else:
-            route53_client = boto3.client('route53')
+            route53_client = datalab.clients_lib.client('route53')
         route53_client.change_resource_record_sets(
             HostedZoneId=hosted_zone_id,
             ChangeBatch={
@@ -743,18 +824,18 @@ def remove_route_53_record(hosted_zone_id, hosted_zone_name, subdomain):
     try:
         if 'ssn_assume_role_arn' in os.environ:
             role_session_name = str(uuid.uuid4()).split('-')[0]
-            sts_client = boto3.client('sts')
+            sts_client = datalab.clients_lib.client('sts')
             credentials = sts_client.assume_role(
                 RoleArn=os.environ['ssn_assume_role_arn'],
                 RoleSessionName=role_session_name
             ).get('Credentials')
-            route53_client = boto3.client('route53',
-                                          aws_access_key_id=credentials.get('AccessKeyId'),
-                                          aws_secret_access_key=credentials.get('SecretAccessKey'),
-                                          aws_session_token=credentials.get('SessionToken')
-                                          )
+            route53_client = datalab.clients_lib.client('route53',
+                                                        aws_access_key_id=credentials.get('AccessKeyId'),
+                                                        aws_secret_access_key=credentials.get('SecretAccessKey'),
+                                                        aws_session_token=credentials.get('SessionToken')
+                                                        )
         else:
-            route53_client = boto3.client('route53')
+            route53_client = datalab.clients_lib.client('route53')
         for record_set in route53_client.list_resource_record_sets(
                 HostedZoneId=hosted_zone_id).get('ResourceRecordSets'):
             if record_set['Name'] == "{}.{}.".format(subdomain, hosted_zone_name):
@@ -789,7 +870,7 @@ def remove_route_53_record(hosted_zone_id, hosted_zone_name, subdomain):
 
 def allocate_elastic_ip():
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         response = client.allocate_address(Domain='vpc')
         return response.get('AllocationId')
     except Exception as err:
@@ -802,7 +883,7 @@ def allocate_elastic_ip():
 
 def release_elastic_ip(allocation_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.release_address(AllocationId=allocation_id)
     except Exception as err:
         logging.info("Unable to release Elastic IP: " + str(err) + "\n Traceback: " + traceback.print_exc(
@@ -814,7 +895,7 @@ def release_elastic_ip(allocation_id):
 
 def associate_elastic_ip(instance_id, allocation_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         response = client.associate_address(InstanceId=instance_id, AllocationId=allocation_id)
         return response.get('AssociationId')
     except Exception as err:
@@ -827,7 +908,7 @@ def associate_elastic_ip(instance_id, allocation_id):
 
 def disassociate_elastic_ip(association_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.disassociate_address(AssociationId=association_id)
     except Exception as err:
         logging.info("Unable to disassociate Elastic IP: " + str(err) + "\n Traceback: " + traceback.print_exc(
@@ -838,7 +919,7 @@ def disassociate_elastic_ip(association_id):
 
 def create_nat_gateway(allocation_id, subnet_id, project_name):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.create_nat_gateway(AllocationId=allocation_id, SubnetId=subnet_id, TagSpecifications=[
                                         {
                                             'ResourceType': 'natgateway',
@@ -852,40 +933,40 @@ def create_nat_gateway(allocation_id, subnet_id, project_name):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def remove_ec2(tag_name, tag_value):
+    # tag_value may be a list, so all nodes of a cluster are found by one describe, their Elastic IPs
+    # are released together and they are terminated by one call covered by a single waiter
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
-        association_id = ''
-        allocation_id = ''
-        inst = ec2.instances.filter(
-            Filters=[{'Name': 'instance-state-name', 'Values': ['running', 'stopped', 'pending', 'stopping']},
-                     {'Name': 'tag:{}'.format(tag_name), 'Values': ['{}'.format(tag_value)]}])
-        instances = list(inst)
-        if instances:
-            for instance in instances:
-                try:
-                    response = client.describe_instances(InstanceIds=[instance.id])
-                    for i in response.get('Reservations'):
-                        for h in i.get('Instances'):
-                            elastic_ip = h.get('PublicIpAddress')
-                            try:
-                                response = client.describe_addresses(PublicIps=[elastic_ip]).get('Addresses')
-                                for el_ip in response:
-                                    allocation_id = el_ip.get('AllocationId')
-                                    association_id = el_ip.get('AssociationId')
-                                    disassociate_elastic_ip(association_id)
-                                    release_elastic_ip(allocation_id)
-                                    print("Releasing Elastic IP: {}".format(elastic_ip))
-                            except:
-                                print("There is no such Elastic IP: {}".format(elastic_ip))
-                except Exception as err:
-                    print(err)
-                    print("There is no Elastic IP to disassociate from instance: {}".format(instance.id))
-                client.terminate_instances(InstanceIds=[instance.id])
-                waiter = client.get_waiter('instance_terminated')
-                waiter.wait(InstanceIds=[instance.id])
-                print("The instance {} has been terminated successfully".format(instance.id))
+        client = datalab.clients_lib.client('ec2')
+        region = os.environ.get('aws_region', '')
+        tag_values = tag_value if isinstance(tag_value, list) else [tag_value]
+        instance_ids = list()
+        paginator = client.get_paginator('describe_instances')
+        for page in paginator.paginate(
+                Filters=[{'Name': 'instance-state-name', 'Values': ['running', 'stopped', 'pending', 'stopping']},
+                         {'Name': 'tag:{}'.format(tag_name), 'Values': ['{}'.format(i) for i in tag_values]}]):
+            for reservation in page['Reservations']:
+                instance_ids.extend(instance['InstanceId'] for instance in reservation['Instances'])
+        if instance_ids:
+            try:
+                addresses = client.describe_addresses(
+                    Filters=[{'Name': 'instance-id', 'Values': instance_ids}]).get('Addresses')
+            except Exception as err:
+                print(err)
+                print("There is no Elastic IP to disassociate from instances: {}".format(instance_ids))
+                addresses = list()
+
+            def release(address):
+                disassociate_elastic_ip(address.get('AssociationId'))
+                release_elastic_ip(address.get('AllocationId'))
+                print("Releasing Elastic IP: {}".format(address.get('PublicIp')))
+
+            datalab.executor.map_concurrently(release, addresses, service='ec2', region=region)
+            client.terminate_instances(InstanceIds=instance_ids)
+            waiter = client.get_waiter('instance_terminated')
+            waiter.wait(InstanceIds=instance_ids)
+            print("The instances {} have been terminated successfully".format(instance_ids))
         else:
             print("There are no instances with '{}' tag to terminate".format(tag_name))
     except Exception as err:
@@ -895,10 +976,11 @@ def remove_ec2(tag_name, tag_value):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def stop_ec2(tag_name, tag_value):
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
+        client = datalab.clients_lib.client('ec2')
         inst = ec2.instances.filter(
             Filters=[{'Name': 'instance-state-name', 'Values': ['running', 'pending']},
                      {'Name': 'tag:{}'.format(tag_name), 'Values': ['{}'.format(tag_value)]}])
@@ -920,10 +1002,11 @@ def stop_ec2(tag_name, tag_value):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def start_ec2(tag_name, tag_value):
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
+        client = datalab.clients_lib.client('ec2')
         inst = ec2.instances.filter(
             Filters=[{'Name': 'instance-state-name', 'Values': ['stopped']},
                      {'Name': 'tag:{}'.format(tag_name), 'Values': ['{}'.format(tag_value)]}])
@@ -946,7 +1029,7 @@ def start_ec2(tag_name, tag_value):
 
 
 def remove_detach_iam_policies(role_name, action=''):
-    client = boto3.client('iam')
+    client = datalab.clients_lib.client('iam')
     service_base_name = os.environ['conf_service_base_name']
     try:
         policy_list = client.list_attached_role_policies(RoleName=role_name).get('AttachedPolicies')
@@ -966,7 +1049,7 @@ def remove_detach_iam_policies(role_name, action=''):
 
 
 def remove_roles_and_profiles(role_name, role_profile_name):
-    client = boto3.client('iam')
+    client = datalab.clients_lib.client('iam')
     try:
         client.remove_role_from_instance_profile(InstanceProfileName=role_profile_name, RoleName=role_name)
         client.delete_instance_profile(InstanceProfileName=role_profile_name)
@@ -983,7 +1066,7 @@ def remove_roles_and_profiles(role_name, role_profile_name):
 
 def remove_all_iam_resources(instance_type, project_name='', endpoint_name=''):
     try:
-        client = boto3.client('iam')
+        client = datalab.clients_lib.client('iam')
         service_base_name = os.environ['conf_service_base_name']
         roles_list = []
         if project_name:
@@ -1101,18 +1184,15 @@ def remove_all_iam_resources(instance_type, project_name='', endpoint_name=''):
 
 
 def s3_cleanup(bucket, cluster_name, user_name):
-    s3_res = boto3.resource('s3', config=botoConfig(signature_version='s3v4'))
-    client = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=os.environ['aws_region'])
+    client = datalab.s3_transfer.get_client(os.environ['aws_region'])
     try:
         client.head_bucket(Bucket=bucket)
     except:
         print("There is no bucket {} or you do not permission to access it".format(bucket))
         sys.exit(0)
     try:
-        resource = s3_res.Bucket(bucket)
         prefix = user_name + '/' + cluster_name + "/"
-        for i in resource.objects.filter(Prefix=prefix):
-            s3_res.Object(resource.name, i.key).delete()
+        datalab.s3_transfer.delete_prefix(client, bucket, prefix)
     except Exception as err:
         logging.info("Unable to clean S3 bucket: " + str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout))
         append_result(str({"error": "Unable to clean S3 bucket",
@@ -1122,8 +1202,9 @@ def s3_cleanup(bucket, cluster_name, user_name):
 
 def remove_s3(bucket_type='all', scientist=''):
     try:
-        client = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=os.environ['aws_region'])
-        s3 = boto3.resource('s3')
+        client = datalab.clients_lib.client('s3', config=botoConfig(signature_version='s3v4'),
+                                            region_name=os.environ['aws_region'])
+        s3 = datalab.clients_lib.resource('s3')
         bucket_list = []
         if bucket_type == 'ssn':
             bucket_name = (os.environ['conf_service_base_name'] + '-ssn-bucket').lower().replace('_', '-')
@@ -1157,25 +1238,26 @@ def remove_s3(bucket_type='all', scientist=''):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def remove_subnets(tag_value):
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         tag_name = os.environ['conf_service_base_name'].lower() + '-tag'
         tag2_name = os.environ['conf_service_base_name'].lower() + '-secondary-tag'
-        subnets = ec2.subnets.filter(
-            Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': [tag_value]}])
-        subnets2 = ec2.subnets.filter(
-            Filters=[{'Name': 'tag:{}'.format(tag2_name), 'Values': [tag_value]}])
-        if subnets or subnets2:
-            if subnets:
-                for subnet in subnets:
-                    client.delete_subnet(SubnetId=subnet.id)
-                    print("The subnet {} has been deleted successfully".format(subnet.id))
-            if subnets2:
-                for subnet in subnets2:
-                    client.delete_subnet(SubnetId=subnet.id)
-                    print("The subnet {} has been deleted successfully".format(subnet.id))
+        tag_values = tag_value if isinstance(tag_value, list) else [tag_value]
+        subnet_ids = list()
+        for key in (tag_name, tag2_name):
+            for page in client.get_paginator('describe_subnets').paginate(
+                    Filters=[{'Name': 'tag:{}'.format(key), 'Values': tag_values}]):
+                subnet_ids.extend(subnet['SubnetId'] for subnet in page['Subnets']
+                                  if subnet['SubnetId'] not in subnet_ids)
+        if subnet_ids:
+            def delete(subnet_id):
+                retry_on_dependency_violation(client.delete_subnet)(SubnetId=subnet_id)
+                print("The subnet {} has been deleted successfully".format(subnet_id))
+
+            datalab.executor.map_concurrently(delete, subnet_ids, service='ec2',
+                                              region=os.environ.get('aws_region', ''))
         else:
             print("There are no private subnets to delete")
     except Exception as err:
@@ -1187,7 +1269,7 @@ def remove_subnets(tag_value):
 
 def remove_peering(tag_value):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         tag_name = os.environ['conf_service_base_name'].lower() + '-tag'
         if os.environ['conf_duo_vpc_enable'] == 'true':
             peering_id = client.describe_vpc_peering_connections(Filters=[
@@ -1210,18 +1292,57 @@ def remove_peering(tag_value):
         traceback.print_exc(file=sys.stdout)
 
 
+def retry_on_dependency_violation(func):
+    # Network interfaces of just terminated instances are released asynchronously
+    return backoff.on_exception(backoff.expo, botocore.exceptions.ClientError, max_tries=6, max_value=30,
+                                giveup=lambda err: err.response['Error']['Code'] != 'DependencyViolation')(func)
+
+
+def get_group_references(permissions, group_ids):
+    references = list()
+    for permission in permissions:
+        pairs = [{'GroupId': pair['GroupId']} for pair in permission.get('UserIdGroupPairs', [])
+                 if pair.get('GroupId') in group_ids]
+        if pairs:
+            reference = {'IpProtocol': permission['IpProtocol'], 'UserIdGroupPairs': pairs}
+            for port in ('FromPort', 'ToPort'):
+                if port in permission:
+                    reference[port] = permission[port]
+            references.append(reference)
+    return references
+
+
+@datalab.lookup_cache.invalidates
 def remove_sgroups(tag_value):
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
+        region = os.environ.get('aws_region', '')
         tag_name = os.environ['conf_service_base_name']
-        print('Removing SG with tag key: {} and tag value: {}'.format(tag_name, tag_value))
-        sgs = ec2.security_groups.filter(
-            Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': [tag_value]}])
+        tag_values = tag_value if isinstance(tag_value, list) else [tag_value]
+        print('Removing SG with tag key: {} and tag value: {}'.format(tag_name, ', '.join(tag_values)))
+        sgs = list()
+        for page in client.get_paginator('describe_security_groups').paginate(
+                Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': tag_values}]):
+            sgs.extend(page['SecurityGroups'])
         if sgs:
-            for sg in sgs:
-                client.delete_security_group(GroupId=sg.id)
-                print("The security group {} has been deleted successfully".format(sg.id))
+            # Rules pointing to other groups of the batch are revoked first, after that the groups
+            # no longer depend on each other and can be deleted in any order
+            group_ids = [sg['GroupId'] for sg in sgs]
+
+            def revoke_references(sg):
+                ingress = get_group_references(sg.get('IpPermissions', []), group_ids)
+                egress = get_group_references(sg.get('IpPermissionsEgress', []), group_ids)
+                if ingress:
+                    client.revoke_security_group_ingress(GroupId=sg['GroupId'], IpPermissions=ingress)
+                if egress:
+                    client.revoke_security_group_egress(GroupId=sg['GroupId'], IpPermissions=egress)
+
+            def delete(group_id):
+                retry_on_dependency_violation(client.delete_security_group)(GroupId=group_id)
+                print("The security group {} has been deleted successfully".format(group_id))
+
+            datalab.executor.map_concurrently(revoke_references, sgs, service='ec2', region=region)
+            datalab.executor.map_concurrently(delete, group_ids, service='ec2', region=region)
         else:
             print("There are no security groups to delete")
     except Exception as err:
@@ -1233,7 +1354,7 @@ def remove_sgroups(tag_value):
 
 def add_inbound_sg_rule(sg_id, rule):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.authorize_security_group_ingress(
             GroupId=sg_id,
             IpPermissions=[rule]
@@ -1252,7 +1373,7 @@ def add_inbound_sg_rule(sg_id, rule):
 
 def add_outbound_sg_rule(sg_id, rule):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         client.authorize_security_group_egress(
             GroupId=sg_id,
             IpPermissions=[rule]
@@ -1269,10 +1390,11 @@ def add_outbound_sg_rule(sg_id, rule):
             traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def deregister_image(image_name='*'):
     try:
-        resource = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        resource = datalab.clients_lib.resource('ec2')
+        client = datalab.clients_lib.client('ec2')
         for image in resource.images.filter(
                 Filters=[{'Name': 'tag-value', 'Values': [os.environ['conf_service_base_name']]},
                          {'Name': 'tag-value', 'Values': [image_name]}]):
@@ -1291,7 +1413,7 @@ def deregister_image(image_name='*'):
 
 def terminate_emr(id):
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         emr.terminate_job_flows(
             JobFlowIds=[id]
         )
@@ -1306,65 +1428,19 @@ def terminate_emr(id):
 
 def remove_kernels(emr_name, tag_name, nb_tag_value, ssh_user, key_path, emr_version, computational_name=''):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         inst = ec2.instances.filter(
             Filters=[{'Name': 'instance-state-name', 'Values': ['running']},
                      {'Name': 'tag:{}'.format(tag_name), 'Values': ['{}'.format(nb_tag_value)]}])
         instances = list(inst)
         if instances:
-            for instance in instances:
-                private = getattr(instance, 'private_dns_name')
-                global con
-                con = datalab.fab.init_datalab_connection(private, ssh_user, key_path)
-                con.sudo('rm -rf /home/{}/.local/share/jupyter/kernels/*_{}'.format(ssh_user, emr_name))
-                if exists(con, '/home/{}/.ensure_dir/dataengine-service_{}_interpreter_ensured'.format(ssh_user, emr_name)):
-                    if os.environ['notebook_multiple_clusters'] == 'true':
-                        try:
-                            livy_port = con.sudo("cat /opt/" + emr_version + "/" + emr_name +
-                                             "/livy/conf/livy.conf | grep livy.server.port | tail -n 1 | "
-                                             "awk '{printf $3}'").stdout.replace('\n','')
-                            process_number = con.sudo("netstat -natp 2>/dev/null | grep ':" + livy_port +
-                                                  "' | awk '{print $7}' | sed 's|/.*||g'").stdout.replace('\n','')
-                            con.sudo('kill -9 ' + process_number)
-                            con.sudo('systemctl disable livy-server-' + livy_port)
-                        except:
-                            print("Wasn't able to find Livy server for this EMR!")
-                    con.sudo('sed -i \"s/^export SPARK_HOME.*/export SPARK_HOME=\/opt\/spark/\" '
-                         '/opt/zeppelin/conf/zeppelin-env.sh')
-                    con.sudo("rm -rf /home/{}/.ensure_dir/dataengine-service_interpreter_ensure".format(ssh_user))
-                    zeppelin_url = 'http://' + private + ':8080/api/interpreter/setting/'
-                    opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
-                    req = opener.open(urllib.request.Request(zeppelin_url))
-                    r_text = req.read()
-                    interpreter_json = json.loads(r_text)
-                    interpreter_prefix = emr_name
-                    for interpreter in interpreter_json['body']:
-                        if interpreter_prefix in interpreter['name']:
-                            print("Interpreter with ID: {0} and name: {1} will be removed from zeppelin!".
-                                  format(interpreter['id'], interpreter['name']))
-                            request = urllib.request.Request(zeppelin_url + interpreter['id'], data=''.encode())
-                            request.get_method = lambda: 'DELETE'
-                            url = opener.open(request)
-                            print(url.read())
-                    con.sudo('chown ' + ssh_user + ':' + ssh_user + ' -R /opt/zeppelin/')
-                    con.sudo('systemctl daemon-reload')
-                    con.sudo("service zeppelin-notebook stop")
-                    con.sudo("service zeppelin-notebook start")
-                    zeppelin_restarted = False
-                    while not zeppelin_restarted:
-                        con.sudo('sleep 5')
-                        result = con.sudo('nmap -p 8080 localhost | grep "closed" > /dev/null; echo $?').stdout
-                        result = result[:1]
-                        if result == '1':
-                            zeppelin_restarted = True
-                    con.sudo('sleep 5')
-                    con.sudo('rm -rf /home/{}/.ensure_dir/dataengine-service_{}_interpreter_ensured'.format(ssh_user,
-                                                                                                        emr_name))
-                if exists(con, '/home/{}/.ensure_dir/rstudio_dataengine-service_ensured'.format(ssh_user)):
-                    datalab.fab.remove_rstudio_dataengines_kernel(computational_name, ssh_user)
-                con.sudo('rm -rf  /opt/' + emr_version + '/' + emr_name + '/')
-                print("Notebook's {} kernels were removed".format(private))
-                con.close()
+            # Every notebook is cleaned up over its own pooled connection, a bounded number at the same time
+            cluster = {'name': emr_name, 'dir': '/opt/{}/{}/'.format(emr_version, emr_name),
+                       'type': 'dataengine-service'}
+            datalab.executor.map_concurrently(
+                lambda instance: datalab.fab.remove_cluster_kernels(getattr(instance, 'private_dns_name'), ssh_user,
+                                                                    key_path, [cluster], computational_name),
+                instances, max_workers=datalab.fab.get_kernel_cleanup_max_workers())
         else:
             print("There are no notebooks to clean kernels.")
     except Exception as err:
@@ -1377,7 +1453,7 @@ def remove_kernels(emr_name, tag_name, nb_tag_value, ssh_user, key_path, emr_ver
 
 def remove_route_tables(tag_name, ssn=False, tag_value=''):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         if tag_value == '':
             rtables = client.describe_route_tables(Filters=[{'Name': 'tag-key', 'Values': [tag_name]}]).get('RouteTables')
         else:
@@ -1406,7 +1482,7 @@ def remove_route_tables(tag_name, ssn=False, tag_value=''):
 def remove_internet_gateways(vpc_id, tag_name, tag_value):
     try:
         ig_id = ''
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         response = client.describe_internet_gateways(
             Filters=[
                 {'Name': 'tag-key', 'Values': [tag_name]},
@@ -1427,7 +1503,7 @@ def remove_internet_gateways(vpc_id, tag_name, tag_value):
 
 def remove_vpc_endpoints(vpc_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         response = client.describe_vpc_endpoints(Filters=[{'Name': 'vpc-id', 'Values': [vpc_id]}]).get('VpcEndpoints')
         for i in response:
             client.delete_vpc_endpoints(VpcEndpointIds=[i.get('VpcEndpointId')])
@@ -1440,10 +1516,11 @@ def remove_vpc_endpoints(vpc_id):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.invalidates
 def create_image_from_instance(tag_name='', instance_name='', image_name='', tags=''):
     try:
-        ec2 = boto3.resource('ec2')
-        client = boto3.client('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
+        client = datalab.clients_lib.client('ec2')
         instances = ec2.instances.filter(
             Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': [instance_name]},
                      {'Name': 'instance-state-name', 'Values': ['running']}])
@@ -1483,73 +1560,75 @@ def create_image_from_instance(tag_name='', instance_name='', image_name='', tag
             traceback.print_exc(file=sys.stdout)
 
 
-def install_emr_spark(args):
-    s3_client = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=args.region)
-    s3_client.download_file(args.bucket, args.project_name + '/' + args.cluster_name + '/spark.tar.gz',
-                            '/tmp/spark.tar.gz')
-    s3_client.download_file(args.bucket, args.project_name + '/' + args.cluster_name + '/spark-checksum.chk',
-                            '/tmp/spark-checksum.chk')
-    if 'WARNING' in subprocess.run('md5sum -c /tmp/spark-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-        subprocess.run('rm -f /tmp/spark.tar.gz', shell=True, check=True)
-        s3_client.download_file(args.bucket, args.project_name + '/' + args.cluster_name + '/spark.tar.gz',
-                                '/tmp/spark.tar.gz')
-        if 'WARNING' in subprocess.run('md5sum -c /tmp/spark-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-            print("The checksum of spark.tar.gz is mismatched. It could be caused by aws network issue.")
+def get_artifact_fetcher(s3_client, bucket):
+    return lambda key, local_file: datalab.s3_transfer.download_file(s3_client, bucket, key, local_file,
+                                                                     skip_unchanged=False)
+
+
+def get_legacy_archive(s3_client, bucket, prefix, name, target_dir, sudo=True):
+    # Clusters created before the artifact store only published <name>.tar.gz and its md5 checksum
+    archive = '/tmp/{}.tar.gz'.format(name)
+    checksum = '/tmp/{}-checksum.chk'.format(name)
+    s3_client.download_file(bucket, prefix + name + '.tar.gz', archive)
+    s3_client.download_file(bucket, prefix + name + '-checksum.chk', checksum)
+    if subprocess.run('md5sum -c ' + checksum, shell=True).returncode != 0:
+        subprocess.run('rm -f ' + archive, shell=True, check=True)
+        s3_client.download_file(bucket, prefix + name + '.tar.gz', archive)
+        if subprocess.run('md5sum -c ' + checksum, shell=True).returncode != 0:
+            print("The checksum of {}.tar.gz is mismatched. It could be caused by aws network issue.".format(name))
             sys.exit(1)
-    subprocess.run('sudo tar -zhxvf /tmp/spark.tar.gz -C /opt/' + args.emr_version + '/' + args.cluster_name + '/', shell=True, check=True)
+    subprocess.run(('sudo ' if sudo else '') + 'tar -zhxvf ' + archive + ' -C ' + target_dir, shell=True, check=True)
+
+
+def install_emr_spark(args):
+    s3_client = datalab.s3_transfer.get_client(args.region)
+    prefix = args.project_name + '/' + args.cluster_name + '/'
+    target_dir = '/opt/' + args.emr_version + '/' + args.cluster_name + '/'
+    if datalab.s3_transfer.head_object(s3_client, args.bucket, prefix + 'spark-manifest.json') is None:
+        get_legacy_archive(s3_client, args.bucket, prefix, 'spark', target_dir)
+    else:
+        datalab.s3_transfer.download_file(s3_client, args.bucket, prefix + 'spark-manifest.json',
+                                          '/tmp/spark-manifest.json', skip_unchanged=False)
+        datalab.artifact_store.sync('/tmp/spark-manifest.json', get_artifact_fetcher(s3_client, args.bucket),
+                                    target_dir)
     subprocess.run('sudo cp -R /opt/spark/R/lib/SparkR /opt/' + args.emr_version + '/' + args.cluster_name + '/spark/R/lib/', shell=True, check=True)
 
 
 def jars(args, emr_dir):
     print("Downloading jars...")
-    s3_client = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=args.region)
-    s3_client.download_file(args.bucket, 'jars/' + args.emr_version + '/jars.tar.gz', '/tmp/jars.tar.gz')
-    s3_client.download_file(args.bucket, 'jars/' + args.emr_version + '/jars-checksum.chk', '/tmp/jars-checksum.chk')
-    if 'WARNING' in subprocess.run('md5sum -c /tmp/jars-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-        subprocess.run('rm -f /tmp/jars.tar.gz', shell=True, check=True)
-        s3_client.download_file(args.bucket, 'jars/' + args.emr_version + '/jars.tar.gz', '/tmp/jars.tar.gz')
-        if 'WARNING' in subprocess.run('md5sum -c /tmp/jars-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-            print("The checksum of jars.tar.gz is mismatched. It could be caused by aws network issue.")
-            sys.exit(1)
-    subprocess.run('tar -zhxvf /tmp/jars.tar.gz -C ' + emr_dir, shell=True, check=True)
+    s3_client = datalab.s3_transfer.get_client(args.region)
+    prefix = 'jars/' + args.emr_version + '/'
+    if datalab.s3_transfer.head_object(s3_client, args.bucket, prefix + 'jars-manifest.json') is None:
+        get_legacy_archive(s3_client, args.bucket, prefix, 'jars', emr_dir, sudo=False)
+    else:
+        datalab.s3_transfer.download_file(s3_client, args.bucket, prefix + 'jars-manifest.json',
+                                          '/tmp/jars-manifest.json', skip_unchanged=False)
+        datalab.artifact_store.sync('/tmp/jars-manifest.json', get_artifact_fetcher(s3_client, args.bucket), emr_dir)
 
 
 def yarn(args, yarn_dir):
     print("Downloading yarn configuration...")
     if args.region == 'cn-north-1':
-        s3client = boto3.client('s3', config=botoConfig(signature_version='s3v4'),
-                                endpoint_url='https://s3.cn-north-1.amazonaws.com.cn', region_name=args.region)
-        s3resource = boto3.resource('s3', config=botoConfig(signature_version='s3v4'),
-                                    endpoint_url='https://s3.cn-north-1.amazonaws.com.cn', region_name=args.region)
+        s3client = datalab.s3_transfer.get_client(args.region, 'https://s3.cn-north-1.amazonaws.com.cn')
     else:
-        s3client = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=args.region)
-        s3resource = boto3.resource('s3', config=botoConfig(signature_version='s3v4'))
-    get_files(s3client, s3resource, args.project_name + '/' + args.cluster_name + '/config/', args.bucket, yarn_dir)
+        s3client = datalab.s3_transfer.get_client(args.region)
+    get_files(s3client, args.project_name + '/' + args.cluster_name + '/config/', args.bucket, yarn_dir)
     subprocess.run('sudo mv ' + yarn_dir + args.project_name + '/' + args.cluster_name + '/config/* ' + yarn_dir, shell=True, check=True)
     subprocess.run('sudo rm -rf ' + yarn_dir + args.project_name + '/', shell=True, check=True)
 
 
-def get_files(s3client, s3resource, dist, bucket, local):
-    s3list = s3client.get_paginator('list_objects')
-    for result in s3list.paginate(Bucket=bucket, Delimiter='/', Prefix=dist):
-        if result.get('CommonPrefixes') is not None:
-            for subdir in result.get('CommonPrefixes'):
-                get_files(s3client, s3resource, subdir.get('Prefix'), bucket, local)
-        if result.get('Contents') is not None:
-            for file in result.get('Contents'):
-                if not os.path.exists(os.path.dirname(local + os.sep + file.get('Key'))):
-                    os.makedirs(os.path.dirname(local + os.sep + file.get('Key')))
-                s3resource.meta.client.download_file(bucket, file.get('Key'), local + os.sep + file.get('Key'))
+def get_files(s3client, dist, bucket, local):
+    datalab.s3_transfer.download_prefix(s3client, bucket, dist, local, skip_unchanged=False)
 
 
 def get_cluster_python_version(region, bucket, user_name, cluster_name):
-    s3_client = boto3.client('s3', config=botoConfig(signature_version='s3v4'), region_name=region)
+    s3_client = datalab.clients_lib.client('s3', config=botoConfig(signature_version='s3v4'), region_name=region)
     s3_client.download_file(bucket, user_name + '/' + cluster_name + '/python_version', '/tmp/python_version')
 
 
 def get_gitlab_cert(bucket, certfile):
     try:
-        s3 = boto3.resource('s3')
+        s3 = datalab.clients_lib.resource('s3')
         s3.Bucket(bucket).download_file(certfile, certfile)
         return True
     except botocore.exceptions.ClientError as err:
@@ -1707,7 +1786,7 @@ def configure_local_spark(jars_dir, templates_dir, memory_type='driver'):
         spark_jars_paths = None
         if exists(datalab.fab.conn, '/opt/spark/conf/spark-defaults.conf'):
             try:
-                spark_jars_paths = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf | grep -e "^spark.jars " ').stdout
+                spark_jars_paths = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf | grep -e "^spark.jars " | tail -n 1').stdout
             except:
                 spark_jars_paths = None
         region = datalab.fab.conn.sudo('curl http://169.254.169.254/latest/meta-data/placement/availability-zone').stdout[:-1]
@@ -1734,29 +1813,12 @@ def configure_local_spark(jars_dir, templates_dir, memory_type='driver'):
             datalab.fab.conn.sudo('''bash -c 'echo "spark.{0}.memory {1}m" >> /opt/spark/conf/spark-defaults.conf' '''.format(memory_type,
                                                                                               spark_memory))
         if 'spark_configurations' in os.environ:
-            datalab_header = datalab.fab.conn.sudo('cat /tmp/notebook_spark-defaults_local.conf | grep "^#"').stdout
             spark_configurations = ast.literal_eval(os.environ['spark_configurations'])
-            new_spark_defaults = list()
-            spark_defaults = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf').stdout
-            current_spark_properties = spark_defaults.split('\n')
-            for param in current_spark_properties:
-                if param.split(' ')[0] != '#':
-                    for config in spark_configurations:
-                        if config['Classification'] == 'spark-defaults':
-                            for property in config['Properties']:
-                                if property == param.split(' ')[0]:
-                                    param = property + ' ' + config['Properties'][property]
-                                else:
-                                    new_spark_defaults.append(property + ' ' + config['Properties'][property])
-                    new_spark_defaults.append(param)
-            new_spark_defaults = set(new_spark_defaults)
-            datalab.fab.conn.sudo('''bash -c 'echo "{}" > /opt/spark/conf/spark-defaults.conf' '''.format(datalab_header))
-            for prop in new_spark_defaults:
-                prop = prop.rstrip()
-                datalab.fab.conn.sudo('''bash -c 'echo "{}" >> /opt/spark/conf/spark-defaults.conf' '''.format(prop))
-            datalab.fab.conn.sudo('sed -i "/^\s*$/d" /opt/spark/conf/spark-defaults.conf')
-            if spark_jars_paths:
-                datalab.fab.conn.sudo('''bash -c 'echo "{}" >> /opt/spark/conf/spark-defaults.conf' '''.format(spark_jars_paths))
+            extra_properties = dict()
+            if spark_jars_paths and spark_jars_paths.strip():
+                extra_properties['spark.jars'] = spark_jars_paths.strip().split(None, 1)[-1]
+            datalab.spark_conf.merge_remote(datalab.fab.conn, '/opt/spark/conf/spark-defaults.conf',
+                                            spark_configurations, extra_properties)
     except Exception as err:
         print('Error:', str(err))
         sys.exit(1)
@@ -1931,55 +1993,9 @@ def configure_dataengine_spark(cluster_name, jars_dir, cluster_dir, datalake_ena
 def remove_dataengine_kernels(tag_name, notebook_name, os_user, key_path, cluster_name):
     try:
         private = datalab.meta_lib.get_instance_private_ip_address(tag_name, notebook_name)
-        global con
-        con = datalab.fab.init_datalab_connection(private, os_user, key_path)
-        con.sudo('rm -rf /home/{}/.local/share/jupyter/kernels/*_{}'.format(os_user, cluster_name))
-        if exists(con, '/home/{}/.ensure_dir/dataengine_{}_interpreter_ensured'.format(os_user, cluster_name)):
-            if os.environ['notebook_multiple_clusters'] == 'true':
-                try:
-                    livy_port = con.sudo("cat /opt/" + cluster_name +
-                                     "/livy/conf/livy.conf | grep livy.server.port | tail -n 1 | awk '{printf $3}'").stdout.replace('\n','')
-                    process_number = con.sudo("netstat -natp 2>/dev/null | grep ':" + livy_port +
-                                          "' | awk '{print $7}' | sed 's|/.*||g'").stdout.replace('\n','')
-                    con.sudo('kill -9 ' + process_number)
-                    con.sudo('systemctl disable livy-server-' + livy_port)
-                except:
-                    print("Wasn't able to find Livy server for this EMR!")
-            con.sudo(
-                'sed -i \"s/^export SPARK_HOME.*/export SPARK_HOME=\/opt\/spark/\" /opt/zeppelin/conf/zeppelin-env.sh')
-            con.sudo("rm -rf /home/{}/.ensure_dir/dataengine_interpreter_ensure".format(os_user))
-            zeppelin_url = 'http://' + private + ':8080/api/interpreter/setting/'
-            opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
-            req = opener.open(urllib.request.Request(zeppelin_url))
-            r_text = req.read()
-            interpreter_json = json.loads(r_text)
-            interpreter_prefix = cluster_name
-            for interpreter in interpreter_json['body']:
-                if interpreter_prefix in interpreter['name']:
-                    print("Interpreter with ID: {} and name: {} will be removed from zeppelin!".format(
-                        interpreter['id'], interpreter['name']))
-                    request = urllib.request.Request(zeppelin_url + interpreter['id'], data=''.encode())
-                    request.get_method = lambda: 'DELETE'
-                    url = opener.open(request)
-                    print(url.read())
-            con.sudo('chown ' + os_user + ':' + os_user + ' -R /opt/zeppelin/')
-            con.sudo('systemctl daemon-reload')
-            con.sudo("service zeppelin-notebook stop")
-            con.sudo("service zeppelin-notebook start")
-            zeppelin_restarted = False
-            while not zeppelin_restarted:
-                con.sudo('sleep 5')
-                result = con.sudo('nmap -p 8080 localhost | grep "closed" > /dev/null; echo $?').stdout
-                result = result[:1]
-                if result == '1':
-                    zeppelin_restarted = True
-            con.sudo('sleep 5')
-            con.sudo('rm -rf /home/{}/.ensure_dir/dataengine_{}_interpreter_ensured'.format(os_user, cluster_name))
-        if exists(con, '/home/{}/.ensure_dir/rstudio_dataengine_ensured'.format(os_user)):
-            datalab.fab.remove_rstudio_dataengines_kernel(os.environ['computational_name'], os_user)
-        con.sudo('rm -rf  /opt/' + cluster_name + '/')
-        print("Notebook's {} kernels were removed".format(private))
-        con.close()
+        datalab.fab.remove_cluster_kernels(private, os_user, key_path, [
+            {'name': cluster_name, 'dir': '/opt/{}/'.format(cluster_name), 'type': 'dataengine'}],
+                                           os.environ.get('computational_name', ''))
     except Exception as err:
         logging.info("Unable to remove kernels on Notebook: " + str(err) + "\n Traceback: " + traceback.print_exc(
             file=sys.stdout))
@@ -19,13 +19,25 @@
 #
 # ******************************************************************************
 
-[Unit]
-Description=inactive service
+import boto3
+import threading
 
-[Timer]
-OnUnitActiveSec=3s
-OnBootSec=120s
-AccuracySec=5s
+# Creating clients from boto3's shared default session is not thread safe, so every thread
+# builds its clients from a session of its own; the clients themselves may then be shared
+_sessions = threading.local()
 
-[Install]
-WantedBy=timers.target
\ No newline at end of file
+
+def get_session():
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = boto3.session.Session()
+        _sessions.session = session
+    return session
+
+
+def client(*args, **kwargs):
+    return get_session().client(*args, **kwargs)
+
+
+def resource(*args, **kwargs):
+    return get_session().resource(*args, **kwargs)
@@ -20,14 +20,16 @@
 # ******************************************************************************
 
 import datalab.actions_lib
+import datalab.clients_lib
+import datalab.executor
+import datalab.lookup_cache
+import datalab.waiter
 import backoff
-import boto3
 import json
 import logging
 import sys
 import time
 import traceback
-import subprocess
 from botocore.client import Config as botoConfig
 from datalab.fab import *
 
@@ -35,7 +37,7 @@ def get_instance_hostname(tag_name, instance_name):
     try:
         public = ''
         private = ''
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         instances = ec2.instances.filter(
             Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': [instance_name]},
                      {'Name': 'instance-state-name', 'Values': ['running']}])
@@ -53,9 +55,10 @@ def get_instance_hostname(tag_name, instance_name):
         append_result(str({"error": "Error with finding instance hostname", "error_message": str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout)}))
         traceback.print_exc(file=sys.stdout)
 
+@datalab.lookup_cache.cached
 def get_instance_ip_address(tag_name, instance_name):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         instances = ec2.instances.filter(
             Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': [instance_name]},
                      {'Name': 'instance-state-name', 'Values': ['running']}])
@@ -77,7 +80,7 @@ def get_instance_ip_address(tag_name, instance_name):
 def get_vpc_endpoints(vpc_id):
     try:
         # Returns LIST of Endpoint DICTIONARIES
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         endpoints = ec2.describe_vpc_endpoints(
             Filters=[{
                 'Name': 'vpc-id',
@@ -93,7 +96,7 @@ def get_vpc_endpoints(vpc_id):
 
 def get_route_tables(vpc, tags):
     try:
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         tag_name = json.loads(tags).get('Key')
         tag_value = json.loads(tags).get('Value')
         rts = []
@@ -115,7 +118,7 @@ def get_route_tables(vpc, tags):
 
 def get_bucket_by_name(bucket_name):
     try:
-        s3 = boto3.resource('s3', config=botoConfig(signature_version='s3v4'))
+        s3 = datalab.clients_lib.resource('s3', config=botoConfig(signature_version='s3v4'))
         for bucket in s3.buckets.all():
             if bucket.name == bucket_name:
                 return bucket.name
@@ -128,7 +131,7 @@ def get_bucket_by_name(bucket_name):
 
 def get_instance_ip_address_by_id(instance_id):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         instances = ec2.instances.filter(
             Filters = [{'Name': 'instance-id', 'Values': [instance_id]},
                        {'Name': 'instance-state-name', 'Values': ['running']}])
@@ -146,6 +149,7 @@ def get_instance_ip_address_by_id(instance_id):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.cached
 def get_instance_private_ip_address(tag_name, instance_name):
     try:
         datalab.actions_lib.create_aws_config_files()
@@ -158,7 +162,7 @@ def get_instance_private_ip_address(tag_name, instance_name):
 
 @backoff.on_predicate(backoff.fibo, max_tries=5)
 def get_ami_id_by_name(ami_name, state="*"):
-    ec2 = boto3.resource('ec2')
+    ec2 = datalab.clients_lib.resource('ec2')
     try:
         for image in ec2.images.filter(Filters=[{'Name': 'name', 'Values': [ami_name]}, {'Name': 'state', 'Values': [state]}]):
             return image.id
@@ -170,8 +174,32 @@ def get_ami_id_by_name(ami_name, state="*"):
         return ''
     return ''
 
+
+def get_instance_private_ip_addresses(tag_name, instance_names):
+    # Private IPs of running instances by name, with one filtered describe instead of a lookup per instance
+    try:
+        datalab.actions_lib.create_aws_config_files()
+        client = datalab.clients_lib.client('ec2')
+        ips = dict()
+        for chunk in [instance_names[i:i + 200] for i in range(0, len(instance_names), 200)]:
+            paginator = client.get_paginator('describe_instances')
+            for page in paginator.paginate(Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': chunk},
+                                                    {'Name': 'instance-state-name', 'Values': ['running']}]):
+                for reservation in page.get('Reservations'):
+                    for instance in reservation.get('Instances'):
+                        for tag in instance.get('Tags', []):
+                            if tag.get('Key') == tag_name:
+                                ips[tag.get('Value')] = instance.get('PrivateIpAddress')
+        return ips
+    except Exception as err:
+        logging.error("Error with getting private ip addresses by names: " + str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout))
+        append_result(str({"error": "Error with getting private ip addresses by names", "error_message": str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout)}))
+        traceback.print_exc(file=sys.stdout)
+        return {}
+
+
 def get_ami_id_by_instance_name(instance_name):
-    ec2 = boto3.resource('ec2')
+    ec2 = datalab.clients_lib.resource('ec2')
     try:
         for instance in ec2.instances.filter(Filters=[{'Name': 'tag:{}'.format('Name'), 'Values': [instance_name]}]):
             return instance.image_id
@@ -186,9 +214,10 @@ def get_ami_id_by_instance_name(instance_name):
         return ''
     return ''
 
+@datalab.lookup_cache.cached
 def get_security_group_by_name(security_group_name):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         for security_group in ec2.security_groups.filter(Filters=[{'Name': 'group-name', 'Values': [security_group_name]}]):
             return security_group.id
     except Exception as err:
@@ -203,7 +232,7 @@ def get_security_group_by_name(security_group_name):
 
 def get_instance_attr(instance_id, attribute_name):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         instances = ec2.instances.filter(
             Filters=[{'Name': 'instance-id', 'Values': [instance_id]},
                      {'Name': 'instance-state-name', 'Values': ['running']}])
@@ -218,9 +247,10 @@ def get_instance_attr(instance_id, attribute_name):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.cached
 def get_instance_by_name(tag_name, instance_name):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         instances = ec2.instances.filter(
             Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': [instance_name]},
                      {'Name': 'instance-state-name', 'Values': ['running','pending','stopping','stopped']}])
@@ -237,7 +267,7 @@ def get_instance_by_name(tag_name, instance_name):
 
 def get_role_by_name(role_name):
     try:
-        iam = boto3.resource('iam')
+        iam = datalab.clients_lib.resource('iam')
         for role in iam.roles.all():
             if role.name == role_name:
                 return role.name
@@ -250,9 +280,10 @@ def get_role_by_name(role_name):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.cached
 def get_subnet_by_cidr(cidr, vpc_id=''):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         if vpc_id:
             for subnet in ec2.subnets.filter(Filters=[
                 {'Name': 'cidrBlock', 'Values': [cidr]},
@@ -275,7 +306,7 @@ def get_subnet_by_cidr(cidr, vpc_id=''):
 
 def get_subnet_by_tag(tag, subnet_id=False, vpc_id=''):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         if vpc_id:
             for subnet in ec2.subnets.filter(Filters=[
                 {'Name': 'tag-key', 'Values': [tag.get('Key')]},
@@ -306,7 +337,7 @@ def get_subnet_by_tag(tag, subnet_id=False, vpc_id=''):
 
 def get_vpc_by_cidr(cidr):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         for vpc in ec2.vpcs.filter(Filters=[{'Name': 'cidr', 'Values': [cidr]}]):
             return vpc.id
         return ''
@@ -319,7 +350,7 @@ def get_vpc_by_cidr(cidr):
 
 def get_cidr_by_vpc(vpc_id):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         cidr = client.describe_vpcs(VpcIds=[vpc_id]).get('Vpcs')[0].get('CidrBlock')
         return cidr
     except Exception as err:
@@ -329,9 +360,10 @@ def get_cidr_by_vpc(vpc_id):
                    "error_message": str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout)}))
         traceback.print_exc(file=sys.stdout)
 
+@datalab.lookup_cache.cached
 def get_vpc_by_tag(tag_name, tag_value):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         for vpc in ec2.vpcs.filter(Filters=[{'Name': 'tag-key', 'Values': [tag_name]}, {'Name': 'tag-value', 'Values': [tag_value]}]):
             return vpc.id
         return ''
@@ -344,7 +376,7 @@ def get_vpc_by_tag(tag_name, tag_value):
 
 def get_peering_by_tag(tag_name, tag_value):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         peering_id = client.describe_vpc_peering_connections(Filters=[{'Name': 'tag-key', 'Values': [tag_name]}, {'Name': 'tag-value', 'Values': [tag_value]},
                                                                    {'Name': 'status-code', 'Values': ['active']}]).get('VpcPeeringConnections')[0].get('VpcPeeringConnectionId')
         return peering_id
@@ -358,7 +390,7 @@ def get_peering_by_tag(tag_name, tag_value):
 def get_vpc_cidr_by_id(vpc_id):
     try:
         cidr_list = list()
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         for vpc in ec2.describe_vpcs(VpcIds=[vpc_id]).get('Vpcs'):
             for cidr_set in vpc.get('CidrBlockAssociationSet'):
                 cidr_list.append(cidr_set.get('CidrBlock'))
@@ -374,7 +406,7 @@ def get_vpc_cidr_by_id(vpc_id):
 
 def get_emr_info(id, key=''):
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         info = emr.describe_cluster(ClusterId=id)['Cluster']
         if key:
             try:
@@ -395,7 +427,7 @@ def get_emr_info(id, key=''):
 
 def get_emr_list(tag_name, type='Key', emr_count=False, emr_active=False):
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         if emr_count:
             clusters = emr.list_clusters(
                 ClusterStates=['RUNNING', 'WAITING', 'STARTING', 'BOOTSTRAPPING', 'TERMINATING']
@@ -428,7 +460,7 @@ def get_emr_list(tag_name, type='Key', emr_count=False, emr_active=False):
 
 def get_not_configured_emr_list(tag_name, instance_name):
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         clusters = emr.list_clusters(ClusterStates=['WAITING'])
         clusters = clusters.get('Clusters')
         clusters_list = []
@@ -455,7 +487,7 @@ def get_not_configured_emr_list(tag_name, instance_name):
 
 def get_not_configured_emr(tag_name, instance_name, return_name=False):
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         clusters_list = get_not_configured_emr_list(tag_name, instance_name)
         if clusters_list:
             for cluster_id in clusters_list:
@@ -482,7 +514,7 @@ def get_not_configured_emr(tag_name, instance_name, return_name=False):
 def get_emr_id_by_name(name):
     try:
         cluster_id = ''
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         clusters = emr.list_clusters(
             ClusterStates=['RUNNING', 'WAITING', 'STARTING', 'BOOTSTRAPPING']
         )
@@ -506,7 +538,7 @@ def get_emr_id_by_name(name):
 def get_emr_instances_list(cluster_id, instance_type=''):
     #instance_type 'MASTER' or 'CORE'
     try:
-        emr = boto3.client('emr')
+        emr = datalab.clients_lib.client('emr')
         if instance_type != '':
             instances = emr.list_instances(ClusterId=cluster_id, InstanceGroupTypes=[instance_type])
         else:
@@ -522,7 +554,7 @@ def get_emr_instances_list(cluster_id, instance_type=''):
 
 def get_ec2_list(tag_name, value=''):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         if value:
             notebook_instances = ec2.instances.filter(
                 Filters=[{'Name': 'instance-state-name', 'Values': ['running', 'stopped']},
@@ -548,7 +580,7 @@ def provide_index(resource_type, tag_name, tag_value=''):
                 list = get_emr_list(tag_value, 'Value', True)
             else:
                 list = get_emr_list(tag_name, 'Key', True)
-            emr = boto3.client('emr')
+            emr = datalab.clients_lib.client('emr')
             for i in list:
                 response = emr.describe_cluster(ClusterId=i)
                 time.sleep(5)
@@ -583,7 +615,7 @@ def provide_index(resource_type, tag_name, tag_value=''):
 
 def get_route_table_by_tag(tag_name, tag_value):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         route_tables = client.describe_route_tables(
             Filters=[{'Name': 'tag:{}'.format(tag_name), 'Values': ['{}'.format(tag_value)]}])
         rt_id = route_tables.get('RouteTables')[0].get('RouteTableId')
@@ -596,10 +628,11 @@ def get_route_table_by_tag(tag_name, tag_value):
         traceback.print_exc(file=sys.stdout)
 
 
+@datalab.lookup_cache.cached
 @backoff.on_predicate(backoff.fibo, max_tries=4)
 def get_ami_id(ami_name):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         image_id = ''
         response = client.describe_images(
             Filters=[
@@ -635,7 +668,7 @@ def get_ami_id(ami_name):
         traceback.print_exc(file=sys.stdout)
 
 def get_iam_profile(profile_name, count=0):
-    client = boto3.client('iam')
+    client = datalab.clients_lib.client('iam')
     iam_profile = ''
     try:
         if count < 10:
@@ -657,7 +690,7 @@ def get_iam_profile(profile_name, count=0):
 
 def check_security_group(security_group_name, count=0):
     try:
-        ec2 = boto3.resource('ec2')
+        ec2 = datalab.clients_lib.resource('ec2')
         if count < 20:
             for security_group in ec2.security_groups.filter(Filters=[{'Name': 'group-name', 'Values': [security_group_name]}]):
                 while security_group.id == '':
@@ -675,17 +708,18 @@ def check_security_group(security_group_name, count=0):
 
 
 def emr_waiter(tag_name, tag_value):
-    if len(get_emr_list(tag_value, 'Value', False, True)) > 0 or os.path.exists('/response/.emr_creating_' + os.environ['exploratory_name']) or get_not_configured_emr(tag_name, tag_value):
-        subprocess.run("echo 'Some EMR cluster is still being created/terminated, waiting..'", shell=True, check=True)
-        time.sleep(60)
-        emr_waiter(tag_name, tag_value)
-    else:
+    def check():
+        if len(get_emr_list(tag_value, 'Value', False, True)) > 0 or os.path.exists('/response/.emr_creating_' + os.environ['exploratory_name']) or get_not_configured_emr(tag_name, tag_value):
+            print('Some EMR cluster is still being created/terminated, waiting..')
+            return False
         return True
 
+    return datalab.waiter.wait_until(check, 'emr_creation', initial_interval=10, max_interval=60)
+
 
 def get_spark_version(cluster_name):
     spark_version = ''
-    emr = boto3.client('emr')
+    emr = datalab.clients_lib.client('emr')
     clusters = emr.list_clusters(ClusterStates=['WAITING'])
     clusters = clusters.get('Clusters')
     for i in clusters:
@@ -701,7 +735,7 @@ def get_spark_version(cluster_name):
 
 def get_hadoop_version(cluster_name):
     hadoop_version = ''
-    emr = boto3.client('emr')
+    emr = datalab.clients_lib.client('emr')
     clusters = emr.list_clusters(ClusterStates=['WAITING'])
     clusters = clusters.get('Clusters')
     for i in clusters:
@@ -716,7 +750,7 @@ def get_hadoop_version(cluster_name):
 
 
 def get_instance_status(tag_name, instance_name):
-    client = boto3.client('ec2')
+    client = datalab.clients_lib.client('ec2')
     response = client.describe_instances(Filters=[
         {'Name': 'tag:{}'.format(tag_name), 'Values': [instance_name]}]).get('Reservations')
     for i in response:
@@ -734,74 +768,99 @@ def get_instance_status(tag_name, instance_name):
 
 def get_list_instance_statuses(instance_ids):
     data = []
-    client = boto3.client('ec2')
-    for h in instance_ids:
-        host = {}
-        try:
-            if 'id' in h:
-                response = client.describe_instances(InstanceIds=[h.get('id')]).get('Reservations')
-                for i in response:
-                    inst = i.get('Instances')
-                    for j in inst:
-                        host['id'] = j.get('InstanceId')
-                        host['status'] = j.get('State').get('Name')
-                        data.append(host)
-        except Exception as err:
-            host['id'] = h.get('id')
-            host['status'] = 'terminated'
-            #host['error_response'] = err
-            data.append(host)
+    client = datalab.clients_lib.client('ec2')
+    ids = [h.get('id') for h in instance_ids if 'id' in h]
+    found = {}
+
+    def describe_chunk(chunk):
+        # instance-id filter (unlike InstanceIds) doesn't fail the whole call on unknown ids
+        states = {}
+        paginator = client.get_paginator('describe_instances')
+        for page in paginator.paginate(Filters=[{'Name': 'instance-id', 'Values': chunk}]):
+            for reservation in page.get('Reservations'):
+                for instance in reservation.get('Instances'):
+                    states[instance.get('InstanceId')] = instance.get('State').get('Name')
+        return states
+
+    for states in datalab.executor.map_concurrently(describe_chunk, [ids[i:i + 200] for i in range(0, len(ids), 200)],
+                                                    service='ec2', region=os.environ.get('aws_region', '')):
+        found.update(states)
+    for instance_id in ids:
+        data.append({'id': instance_id, 'status': found.get(instance_id, 'terminated')})
     return data
 
 
-def get_list_image_statuses(image_ids, data=[]):
-    client = boto3.client('ec2')
-    for k in image_ids:
-        host = {}
-        try:
-            response = client.describe_images(ImageIds=[k.get('id')]).get('Images')
-            for i in response:
-                host['id'] = i.get('ImageId')
-                if i.get('State') == 'pending':
-                    host['status'] = 'CREATING'
-                elif i.get('State') == 'available':
-                    host['status'] = 'ACTIVE'
-                elif i.get('State') == 'invalid' or i.get('State') == 'error' or i.get('State') == 'failed':
-                    host['status'] = 'FAILED'
-                elif i.get('State') == 'deregistered':
-                    host['status'] = 'TERMINATED'
-                data.append(host)
-        except Exception as err:
-            host['id'] = k.get('id')
+def get_list_image_statuses(image_ids, data=None):
+    if data is None:
+        data = []
+    client = datalab.clients_lib.client('ec2')
+    ids = [k.get('id') for k in image_ids]
+    found = {}
+
+    def describe_chunk(chunk):
+        return client.describe_images(Filters=[{'Name': 'image-id', 'Values': chunk}]).get('Images')
+
+    for images in datalab.executor.map_concurrently(describe_chunk, [ids[i:i + 200] for i in range(0, len(ids), 200)],
+                                                    service='ec2', region=os.environ.get('aws_region', '')):
+        for image in images:
+            found[image.get('ImageId')] = image.get('State')
+    for image_id in ids:
+        state = found.get(image_id, 'deregistered')
+        host = {'id': image_id}
+        if state == 'pending':
+            host['status'] = 'CREATING'
+        elif state == 'available':
+            host['status'] = 'ACTIVE'
+        elif state == 'invalid' or state == 'error' or state == 'failed':
+            host['status'] = 'FAILED'
+        elif state == 'deregistered':
             host['status'] = 'TERMINATED'
-            data.append(host)
+        data.append(host)
     return data
 
 
-def get_list_cluster_statuses(cluster_ids, data=[]):
-    client = boto3.client('emr')
-    for i in cluster_ids:
-        host = {}
+def get_list_cluster_statuses(cluster_ids, data=None):
+    if data is None:
+        data = []
+    client = datalab.clients_lib.client('emr')
+    ids = [i.get('id') for i in cluster_ids]
+    found = {}
+    try:
+        # EMR has no multi-id describe, but all live clusters come back from a few list pages
+        paginator = client.get_paginator('list_clusters')
+        for page in paginator.paginate(ClusterStates=['STARTING', 'BOOTSTRAPPING', 'RUNNING', 'WAITING',
+                                                      'TERMINATING']):
+            for cluster in page.get('Clusters'):
+                found[cluster.get('Id')] = cluster.get('Status').get('State')
+    except Exception as err:
+        logging.error("Error with listing EMR clusters: " + str(err))
+
+    def describe_cluster(cluster_id):
         try:
-            response = client.describe_cluster(ClusterId=i.get('id')).get('Cluster')
-            host['id'] = i.get('id')
-            if response.get('Status').get('State').lower() == 'waiting':
-                host['status'] = 'running'
-            elif response.get('Status').get('State').lower() == 'running':
-                host['status'] = 'configuring'
-            else:
-                host['status'] = response.get('Status').get('State').lower()
-            data.append(host)
-        except:
-            host['id'] = i.get('id')
-            host['status'] = 'terminated'
-            data.append(host)
+            return client.describe_cluster(ClusterId=cluster_id).get('Cluster').get('Status').get('State')
+        except Exception as err:
+            if datalab.executor.is_throttling_error(err):
+                raise err
+            return 'terminated'
+
+    missing = [cluster_id for cluster_id in ids if cluster_id not in found]
+    found.update(zip(missing, datalab.executor.map_concurrently(describe_cluster, missing, service='emr',
+                                                                region=os.environ.get('aws_region', ''))))
+    for cluster_id in ids:
+        host = {'id': cluster_id}
+        if found[cluster_id].lower() == 'waiting':
+            host['status'] = 'running'
+        elif found[cluster_id].lower() == 'running':
+            host['status'] = 'configuring'
+        else:
+            host['status'] = found[cluster_id].lower()
+        data.append(host)
     return data
 
 
 def get_allocation_id_by_elastic_ip(elastic_ip):
     try:
-        client = boto3.client('ec2')
+        client = datalab.clients_lib.client('ec2')
         response = client.describe_addresses(PublicIps=[elastic_ip]).get('Addresses')
         for i in response:
             return i.get('AllocationId')
@@ -815,7 +874,7 @@ def get_ec2_price(instance_shape, region):
     try:
         price = '0.001'
         # Price API endpoints: us-east-1, ap-south-1
-        client = boto3.client('pricing', 'us-east-1')
+        client = datalab.clients_lib.client('pricing', 'us-east-1')
         # Price API require full name of region, for example: eu-west-1 -> 'EU (Ireland)'
         # endpoints will be loaded from: botocore/botocore/data/endpoints.json
         data = client._loader._cache.get(('load_data', 'endpoints'))
@@ -879,8 +938,8 @@ def get_ec2_price(instance_shape, region):
 
 def get_spot_instances_status(cluster_id):
     try:
-        ec2 = boto3.client('ec2')
-        emr = boto3.client('emr')
+        ec2 = datalab.clients_lib.client('ec2')
+        emr = datalab.clients_lib.client('emr')
         ec2_ids = emr.list_instances(ClusterId=cluster_id).get('Instances')
         ids_list = []
         for ins in ec2_ids:
@@ -903,7 +962,7 @@ def get_spot_instances_status(cluster_id):
 
 def node_count(cluster_name):
     try:
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         node_list = ec2.describe_instances(Filters=[
             {'Name': 'instance-state-name', 'Values': ['running']},
             {'Name': 'tag:Name', 'Values': [cluster_name + '-*']}]).get('Reservations')
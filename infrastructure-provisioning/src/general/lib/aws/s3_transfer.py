@@ -0,0 +1,159 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import botocore
+import datalab.clients_lib
+import datalab.executor
+import hashlib
+import os
+from boto3.s3.transfer import TransferConfig
+from botocore.client import Config as botoConfig
+from datalab.logger import logging
+
+MB = 1024 * 1024
+DELETE_BATCH_SIZE = 1000
+MULTIPART_CHUNKSIZE = 16 * MB
+
+
+def get_max_concurrency():
+    return int(os.environ.get('conf_s3_max_concurrency', 10))
+
+
+def get_client(region=None, endpoint_url=None):
+    # The pool has to fit every thread of a transfer, otherwise urllib3 drops and reopens connections
+    return datalab.clients_lib.client('s3', config=botoConfig(signature_version='s3v4',
+                                                              max_pool_connections=get_max_concurrency() * 2),
+                                      region_name=region, endpoint_url=endpoint_url)
+
+
+def get_transfer_config():
+    return TransferConfig(multipart_threshold=MULTIPART_CHUNKSIZE, multipart_chunksize=MULTIPART_CHUNKSIZE,
+                          max_concurrency=get_max_concurrency(), use_threads=True)
+
+
+def list_objects(client, bucket, prefix):
+    # Flat listing: every key under the prefix is returned by the same paginator, without a request per "directory"
+    for page in client.get_paginator('list_objects_v2').paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get('Contents', []):
+            yield obj
+
+
+def delete_prefix(client, bucket, prefix):
+    deleted = 0
+    batch = list()
+    for obj in list_objects(client, bucket, prefix):
+        batch.append({'Key': obj['Key']})
+        if len(batch) == DELETE_BATCH_SIZE:
+            deleted += delete_objects(client, bucket, batch)
+            batch = list()
+    if batch:
+        deleted += delete_objects(client, bucket, batch)
+    logging.info('Deleted {} objects from s3://{}/{}'.format(deleted, bucket, prefix))
+    return deleted
+
+
+def delete_objects(client, bucket, keys):
+    response = client.delete_objects(Bucket=bucket, Delete={'Objects': keys, 'Quiet': True})
+    errors = response.get('Errors', [])
+    if errors:
+        raise Exception('Unable to delete {} objects from {}, first error: {} {}'.format(
+            len(errors), bucket, errors[0].get('Key'), errors[0].get('Message')))
+    return len(keys)
+
+
+def get_md5(local_file):
+    md5 = hashlib.md5()
+    with open(local_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(MULTIPART_CHUNKSIZE), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def get_multipart_etag(local_file, chunksize):
+    # Multipart ETags are the MD5 of the concatenated part digests followed by the number of parts
+    digests = list()
+    with open(local_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunksize), b''):
+            digests.append(hashlib.md5(chunk).digest())
+    return '{}-{}'.format(hashlib.md5(b''.join(digests)).hexdigest(), len(digests))
+
+
+def is_unchanged(local_file, obj):
+    # obj is a listing entry or a head_object response. The size is compared first, then the ETag unless
+    # the object is encrypted with a KMS key, whose ETags are not derived from the content
+    size = obj.get('Size', obj.get('ContentLength'))
+    if not os.path.isfile(local_file) or os.path.getsize(local_file) != size:
+        return False
+    etag = obj.get('ETag', '').strip('"')
+    if not etag or obj.get('ServerSideEncryption') == 'aws:kms':
+        return True
+    if '-' not in etag:
+        return get_md5(local_file) == etag
+    # The part size is not stored, so the ones used by this module, boto3 and the aws cli are tried
+    parts = int(etag.split('-')[1])
+    for chunksize in sorted({MULTIPART_CHUNKSIZE, 8 * MB, -(-size // parts // MB) * MB}):
+        if chunksize and (parts - 1) * chunksize < size <= parts * chunksize:
+            if get_multipart_etag(local_file, chunksize) == etag:
+                return True
+    return False
+
+
+def head_object(client, bucket, key):
+    try:
+        return client.head_object(Bucket=bucket, Key=key)
+    except botocore.exceptions.ClientError as err:
+        if err.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+            return None
+        raise
+
+
+def download_file(client, bucket, key, local_file, obj=None, skip_unchanged=True):
+    if skip_unchanged:
+        if obj is None:
+            obj = head_object(client, bucket, key)
+        if obj is not None and is_unchanged(local_file, obj):
+            logging.info('s3://{}/{} is up to date in {}'.format(bucket, key, local_file))
+            return False
+    if os.path.dirname(local_file) and not os.path.exists(os.path.dirname(local_file)):
+        os.makedirs(os.path.dirname(local_file), exist_ok=True)
+    client.download_file(bucket, key, local_file, Config=get_transfer_config())
+    return True
+
+
+def download_prefix(client, bucket, prefix, local_dir, skip_unchanged=True):
+    # Keys keep their full path under local_dir; returns the keys which were actually downloaded
+    objects = [obj for obj in list_objects(client, bucket, prefix) if not obj['Key'].endswith('/')]
+    downloaded = datalab.executor.map_concurrently(
+        lambda obj: download_file(client, bucket, obj['Key'], local_dir + os.sep + obj['Key'], obj, skip_unchanged),
+        objects, max_workers=get_max_concurrency())
+    keys = [obj['Key'] for obj, done in zip(objects, downloaded) if done]
+    logging.info('Downloaded {} of {} objects from s3://{}/{}'.format(len(keys), len(objects), bucket, prefix))
+    return keys
+
+
+def upload_file(client, local_file, bucket, key, extra_args=None, skip_unchanged=True):
+    if skip_unchanged:
+        obj = head_object(client, bucket, key)
+        if obj is not None and is_unchanged(local_file, obj):
+            logging.info('{} is up to date in s3://{}/{}'.format(local_file, bucket, key))
+            return False
+    client.upload_file(local_file, bucket, key, ExtraArgs=extra_args, Config=get_transfer_config())
+    return True
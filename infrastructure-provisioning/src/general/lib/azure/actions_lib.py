@@ -22,9 +22,13 @@
 import ast
 import azure.common
 import backoff
+import datalab.clients_lib
 import datalab.common_lib
 import datalab.fab
+import datalab.lookup_cache
 import datalab.meta_lib
+import datalab.spark_conf
+import datalab.waiter
 import json
 import logging
 import os
@@ -32,76 +36,17 @@ import sys
 import time
 import traceback
 import urllib3
-import urllib.request
 import subprocess
-from azure.datalake.store import core, lib
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.storage import StorageManagementClient
+from azure.datalake.store import core
 from azure.storage.blob import BlobServiceClient
-from azure.identity import ClientSecretCredential
-from azure.mgmt.datalake.store import DataLakeStoreAccountManagementClient
-from azure.mgmt.hdinsight import HDInsightManagementClient
 from fabric import *
 from patchwork.files import exists
 from patchwork import files
 
 
-class AzureActions:
+class AzureActions(datalab.clients_lib.AzureClients):
     def __init__(self):
-        os.environ['AZURE_AUTH_LOCATION'] = '/root/azure_auth.json'
-        with open('/root/azure_auth.json') as json_file:
-            json_dict = json.load(json_file)
-
-        self.credential = ClientSecretCredential(
-            tenant_id=json_dict["tenantId"],
-            client_id=json_dict["clientId"],
-            client_secret=json_dict["clientSecret"],
-            authority=json_dict["activeDirectoryEndpointUrl"]
-        )
-
-        self.compute_client = ComputeManagementClient(
-            self.credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.resource_client = ResourceManagementClient(
-            self.credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.network_client = NetworkManagementClient(
-            self.credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.storage_client = StorageManagementClient(
-            self.credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.datalake_client = DataLakeStoreAccountManagementClient(
-            self.credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"]
-        )
-        self.hdinsight_client = HDInsightManagementClient(
-            self.credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"]
-        )
-        self.sp_creds = json.loads(open(os.environ['AZURE_AUTH_LOCATION']).read())
-        self.dl_filesystem_creds = lib.auth(tenant_id=json.dumps(self.sp_creds['tenantId']).replace('"', ''),
-                                            client_secret=json.dumps(self.sp_creds['clientSecret']).replace('"', ''),
-                                            client_id=json.dumps(self.sp_creds['clientId']).replace('"', ''),
-                                            resource='https://datalake.azure.net/')
-        logger = logging.getLogger('azure')
-        logger.setLevel(logging.ERROR)
+        datalab.clients_lib.get_auth()
 
     def create_resource_group(self, resource_group_name, region):
         try:
@@ -142,6 +87,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_vpc(self, resource_group_name, vpc_name, region, vpc_cidr):
         try:
             result = self.network_client.virtual_networks.begin_create_or_update(
@@ -181,6 +127,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_virtual_network_peerings(self, resource_group_name,
                                         virtual_network_name,
                                         virtual_network_peering_name,
@@ -209,6 +156,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_vpc(self, resource_group_name, vpc_name):
         try:
             result = self.network_client.virtual_networks.begin_delete(
@@ -225,6 +173,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_subnet(self, resource_group_name, vpc_name, subnet_name, subnet_cidr):
         try:
             region = os.environ['azure_region']
@@ -253,6 +202,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_subnet(self, resource_group_name, vpc_name, subnet_name):
         try:
             result = self.network_client.subnets.begin_delete(
@@ -589,6 +539,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_static_public_ip(self, resource_group_name, ip_name, region, instance_name, tags):
         try:
             self.network_client.public_ip_addresses.begin_create_or_update(
@@ -633,6 +584,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def delete_static_public_ip(self, resource_group_name, ip_name):
         try:
             result = self.network_client.public_ip_addresses.begin_delete(
@@ -649,6 +601,7 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_instance(self, region, instance_size, service_base_name, instance_name, datalab_ssh_user_name,
                         public_key,
                         network_interface_resource_id, resource_group_name, primary_disk_size, instance_type,
@@ -951,9 +904,12 @@ class AzureActions:
             disk.tags = tags_copy
             self.compute_client.disks.begin_create_or_update(resource_group_name, disk.name, disk)
 
+    @datalab.lookup_cache.invalidates
     def stop_instance(self, resource_group_name, instance_name):
         try:
-            result = self.compute_client.virtual_machines.begin_deallocate(resource_group_name, instance_name).wait()
+            result = datalab.waiter.wait_for_poller(
+                self.compute_client.virtual_machines.begin_deallocate(resource_group_name, instance_name),
+                'azure_vm_deallocate')
             return result
         except Exception as err:
             logging.info(
@@ -963,9 +919,11 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def start_instance(self, resource_group_name, instance_name):
         try:
-            result = self.compute_client.virtual_machines.begin_start(resource_group_name, instance_name).wait()
+            result = datalab.waiter.wait_for_poller(
+                self.compute_client.virtual_machines.begin_start(resource_group_name, instance_name), 'azure_vm_start')
             return result
         except Exception as err:
             logging.info(
@@ -990,9 +948,11 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_instance(self, resource_group_name, instance_name):
         try:
-            result = self.compute_client.virtual_machines.begin_delete(resource_group_name, instance_name).wait()
+            result = datalab.waiter.wait_for_poller(
+                self.compute_client.virtual_machines.begin_delete(resource_group_name, instance_name), 'azure_vm_delete')
             print("Instance {} has been removed".format(instance_name))
             # Removing instance disks
             disk_names = []
@@ -1024,7 +984,8 @@ class AzureActions:
 
     def remove_disk(self, resource_group_name, disk_name):
         try:
-            result = self.compute_client.disks.begin_delete(resource_group_name, disk_name).wait()
+            result = datalab.waiter.wait_for_poller(
+                self.compute_client.disks.begin_delete(resource_group_name, disk_name), 'azure_disk_delete')
             return result
         except Exception as err:
             logging.info(
@@ -1037,6 +998,7 @@ class AzureActions:
     @backoff.on_exception(backoff.expo,
                           TypeError,
                           max_tries=5)
+    @datalab.lookup_cache.invalidates
     def create_network_if(self, resource_group_name, vpc_name, subnet_name, interface_name, region, security_group_name,
                           tags, public_ip_name="None"):
         try:
@@ -1097,9 +1059,12 @@ class AzureActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def delete_network_if(self, resource_group_name, interface_name):
         try:
-            result = self.network_client.network_interfaces.begin_delete(resource_group_name, interface_name).wait()
+            result = datalab.waiter.wait_for_poller(
+                self.network_client.network_interfaces.begin_delete(resource_group_name, interface_name),
+                'azure_network_interface_delete')
             return result
         except Exception as err:
             logging.info(
@@ -1113,84 +1078,11 @@ class AzureActions:
     def remove_dataengine_kernels(self, resource_group_name, notebook_name, os_user, key_path, cluster_name):
         try:
             private = datalab.meta_lib.AzureMeta().get_private_ip_address(resource_group_name, notebook_name)
-            global conn
-            conn = datalab.fab.init_datalab_connection(private, os_user, key_path)
-            conn.sudo('rm -rf /home/{}/.local/share/jupyter/kernels/*_{}'.format(os_user, cluster_name))
-            if exists(conn, '/home/{}/.ensure_dir/dataengine_{}_interpreter_ensured'.format(os_user, cluster_name)):
-                if os.environ['notebook_multiple_clusters'] == 'true':
-                    try:
-                        livy_port = conn.sudo("cat /opt/" + cluster_name +
-                                              "/livy/conf/livy.conf | grep livy.server.port | tail -n 1 | awk '{printf $3}'").stdout.replace(
-                            '\n', '')
-                        process_number = conn.sudo("netstat -natp 2>/dev/null | grep ':" + livy_port +
-                                                   "' | awk '{print $7}' | sed 's|/.*||g'").stdout.replace('\n', '')
-                        conn.sudo('kill -9 ' + process_number)
-                        conn.sudo('systemctl disable livy-server-' + livy_port)
-                    except:
-                        print("Wasn't able to find Livy server for this dataengine!")
-                conn.sudo(
-                    'sed -i \"s/^export SPARK_HOME.*/export SPARK_HOME=\/opt\/spark/\" /opt/zeppelin/conf/zeppelin-env.sh')
-                conn.sudo("rm -rf /home/{}/.ensure_dir/dataengine_interpreter_ensure".format(os_user))
-                zeppelin_url = 'http://' + private + ':8080/api/interpreter/setting/'
-                opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
-                req = opener.open(urllib.request.Request(zeppelin_url))
-                r_text = req.read()
-                interpreter_json = json.loads(r_text)
-                interpreter_prefix = cluster_name
-                for interpreter in interpreter_json['body']:
-                    if interpreter_prefix in interpreter['name']:
-                        print("Interpreter with ID: {0} and name: {1} will be removed from zeppelin!".
-                              format(interpreter['id'], interpreter['name']))
-                        request = urllib.request.Request(zeppelin_url + interpreter['id'], data=''.encode())
-                        request.get_method = lambda: 'DELETE'
-                        url = opener.open(request)
-                        print(url.read())
-                conn.sudo('chown ' + os_user + ':' + os_user + ' -R /opt/zeppelin/')
-                conn.sudo('systemctl daemon-reload')
-                conn.sudo("service zeppelin-notebook stop")
-                conn.sudo("service zeppelin-notebook start")
-                zeppelin_restarted = False
-                while not zeppelin_restarted:
-                    conn.sudo('sleep 5')
-                    result = conn.sudo('nmap -p 8080 localhost | grep "closed" > /dev/null; echo $?').stdout
-                    result = result[:1]
-                    if result == '1':
-                        zeppelin_restarted = True
-                conn.sudo('sleep 5')
-                conn.sudo('rm -rf /home/{}/.ensure_dir/dataengine_{}_interpreter_ensured'.format(os_user, cluster_name))
-            if exists(conn, '/home/{}/.ensure_dir/rstudio_dataengine_ensured'.format(os_user)):
-                datalab.fab.remove_rstudio_dataengines_kernel(os.environ['computational_name'], os_user)
-            if exists(conn, '/home/{}/.ensure_dir/dataengine-service_{}_interpreter_ensured'.format(os_user,
-                                                                                                    cluster_name)):
-                conn.sudo("rm -rf /home/{}/.ensure_dir/dataengine-service_interpreter_ensure".format(os_user))
-                zeppelin_url = 'http://' + private + ':8080/api/interpreter/setting/'
-                opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
-                req = opener.open(urllib.request.Request(zeppelin_url))
-                r_text = req.read()
-                interpreter_json = json.loads(r_text)
-                interpreter_prefix = cluster_name
-                for interpreter in interpreter_json['body']:
-                    if interpreter_prefix in interpreter['name']:
-                        print("Interpreter with ID: {0} and name: {1} will be removed from zeppelin!".
-                              format(interpreter['id'], interpreter['name']))
-                        request = urllib.request.Request(zeppelin_url + interpreter['id'], data=''.encode())
-                        request.get_method = lambda: 'DELETE'
-                        url = opener.open(request)
-                        print(url.read())
-                conn.sudo('chown ' + os_user + ':' + os_user + ' -R /opt/zeppelin/')
-                conn.sudo('systemctl daemon-reload')
-                conn.sudo("service zeppelin-notebook stop")
-                conn.sudo("service zeppelin-notebook start")
-                zeppelin_restarted = False
-                while not zeppelin_restarted:
-                    conn.sudo('sleep 5')
-                    result = conn.sudo('nmap -p 8080 localhost | grep "closed" > /dev/null; echo $?').stdout
-                    result = result[:1]
-                    if result == '1':
-                        zeppelin_restarted = True
-                conn.sudo('sleep 5')
-                conn.sudo('rm -rf /home/{}/.ensure_dir/dataengine-service_{}_interpreter_ensured'.format(os_user,
-                                                                                                         cluster_name))
+            # HDInsight clusters are remote, their Livy server and the SPARK_HOME of Zeppelin are left as they are
+            conn = datalab.fab.remove_cluster_kernels(private, os_user, key_path, [
+                {'name': cluster_name, 'dir': '/opt/{}/'.format(cluster_name), 'type': 'dataengine'},
+                {'name': cluster_name, 'dir': '/opt/{}/'.format(cluster_name), 'type': 'dataengine-service',
+                 'reset_spark': False}], os.environ.get('computational_name', ''))
             if exists(conn, '/home/{}/.ensure_dir/hdinsight_secret_ensured'.format(os_user)):
                 conn.sudo("sed -i '/-access-password/d' /home/{}/.Renviron".format(os_user))
             if exists(conn, '/home/{}/.ensure_dir/sparkmagic_kernels_ensured'.format(os_user)):
@@ -1198,8 +1090,6 @@ class AzureActions:
                           '/home/{0}/.local/share/jupyter/kernels/sparkkernel/ '
                           '/home/{0}/.sparkmagic/ '
                           '/home/{0}/.ensure_dir/sparkmagic_kernels_ensured'.format(os_user))
-            conn.sudo('rm -rf  /opt/' + cluster_name + '/')
-            print("Notebook's {} kernels were removed".format(private))
         except Exception as err:
             logging.info("Unable to remove kernels on Notebook: " + str(err) + "\n Traceback: " + traceback.print_exc(
                 file=sys.stdout))
@@ -1210,7 +1100,9 @@ class AzureActions:
     def create_image_from_instance(self, resource_group_name, instance_name, region, image_name, tags):
         try:
             instance_id = datalab.meta_lib.AzureMeta().get_instance(resource_group_name, instance_name).id
-            self.compute_client.virtual_machines.begin_deallocate(resource_group_name, instance_name).wait()
+            datalab.waiter.wait_for_poller(
+                self.compute_client.virtual_machines.begin_deallocate(resource_group_name, instance_name),
+                'azure_vm_deallocate')
             self.compute_client.virtual_machines.generalize(resource_group_name, instance_name)
             if not datalab.meta_lib.AzureMeta().get_image(resource_group_name, image_name):
                 self.compute_client.images.begin_create_or_update(resource_group_name, image_name, parameters={
@@ -1244,13 +1136,11 @@ class AzureActions:
         try:
             logging.info('Starting to create HDInsight Spark cluster {}'.format(cluster_name))
             result = self.hdinsight_client.clusters.begin_create(resource_group_name, cluster_name, cluster_parameters)
-            cluster = datalab.meta_lib.AzureMeta().get_hdinsight_cluster(resource_group_name, cluster_name)
-            while cluster.properties.cluster_state != 'Running':
-                time.sleep(30)
-                logging.info('The cluster is being provisioned... Please wait')
-                cluster = datalab.meta_lib.AzureMeta().get_hdinsight_cluster(resource_group_name, cluster_name)
-                if cluster.properties.cluster_state in 'Error|Unknown|TimedOut':
-                    raise Exception
+            logging.info('The cluster is being provisioned... Please wait')
+            cluster = datalab.waiter.wait_for_poller(result, 'azure_hdinsight_create')
+            if cluster.properties.cluster_state != 'Running':
+                raise Exception('HDInsight cluster {} is in state {}'.format(cluster_name,
+                                                                             cluster.properties.cluster_state))
             return result
         except Exception as err:
             logging.info(
@@ -1266,11 +1156,8 @@ class AzureActions:
         try:
             logging.info('Starting to terminate HDInsight cluster {}'.format(cluster_name))
             result = self.hdinsight_client.clusters.begin_delete(resource_group_name, cluster_name)
-            cluster_status = datalab.meta_lib.AzureMeta().get_hdinsight_cluster(resource_group_name, cluster_name)
-            while cluster_status:
-                time.sleep(30)
-                logging.info('The cluster is being terminated... Please wait')
-                cluster_status = datalab.meta_lib.AzureMeta().get_hdinsight_cluster(resource_group_name, cluster_name)
+            logging.info('The cluster is being terminated... Please wait')
+            datalab.waiter.wait_for_poller(result, 'azure_hdinsight_delete')
             return result
         except Exception as err:
             logging.info(
@@ -1470,7 +1357,7 @@ def configure_local_spark(jars_dir, templates_dir, memory_type='driver'):
         if exists(datalab.fab.conn, '/opt/spark/conf/spark-defaults.conf'):
             try:
                 spark_jars_paths = datalab.fab.conn.sudo(
-                    'cat /opt/spark/conf/spark-defaults.conf | grep -e "^spark.jars " ').stdout
+                    'cat /opt/spark/conf/spark-defaults.conf | grep -e "^spark.jars " | tail -n 1').stdout
             except:
                 spark_jars_paths = None
         user_storage_account_tag = "{}-{}-{}-bucket".format(os.environ['conf_service_base_name'],
@@ -1528,31 +1415,12 @@ def configure_local_spark(jars_dir, templates_dir, memory_type='driver'):
             0].replace('\n', '')
         datalab.fab.conn.sudo("echo 'export JAVA_HOME=\'{}\'' >> /opt/spark/conf/spark-env.sh".format(java_home))
         if 'spark_configurations' in os.environ:
-            datalab_header = datalab.fab.conn.sudo('cat /tmp/notebook_spark-defaults_local.conf | grep "^#"').stdout
             spark_configurations = ast.literal_eval(os.environ['spark_configurations'])
-            new_spark_defaults = list()
-            spark_defaults = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf').stdout
-            current_spark_properties = spark_defaults.split('\n')
-            for param in current_spark_properties:
-                if param.split(' ')[0] != '#':
-                    for config in spark_configurations:
-                        if config['Classification'] == 'spark-defaults':
-                            for property in config['Properties']:
-                                if property == param.split(' ')[0]:
-                                    param = property + ' ' + config['Properties'][property]
-                                else:
-                                    new_spark_defaults.append(property + ' ' + config['Properties'][property])
-                    new_spark_defaults.append(param)
-            new_spark_defaults = set(new_spark_defaults)
-            datalab.fab.conn.sudo(
-                '''bash -c 'echo "{}" > /opt/spark/conf/spark-defaults.conf' '''.format(datalab_header))
-            for prop in new_spark_defaults:
-                prop = prop.rstrip()
-                datalab.fab.conn.sudo('''bash -c 'echo "{}" >> /opt/spark/conf/spark-defaults.conf' '''.format(prop))
-            datalab.fab.conn.sudo('sed -i "/^\s*$/d" /opt/spark/conf/spark-defaults.conf')
-            if spark_jars_paths:
-                datalab.fab.conn.sudo(
-                    '''bash -c 'echo "{}" >> /opt/spark/conf/spark-defaults.conf' '''.format(spark_jars_paths))
+            extra_properties = dict()
+            if spark_jars_paths and spark_jars_paths.strip():
+                extra_properties['spark.jars'] = spark_jars_paths.strip().split(None, 1)[-1]
+            datalab.spark_conf.merge_remote(datalab.fab.conn, '/opt/spark/conf/spark-defaults.conf',
+                                            spark_configurations, extra_properties)
     except Exception as err:
         print('Error:', str(err))
         sys.exit(1)
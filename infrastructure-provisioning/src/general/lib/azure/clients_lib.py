@@ -0,0 +1,131 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import json
+import logging
+import os
+import threading
+import time
+from azure.datalake.store import lib
+from azure.identity import ClientSecretCredential
+from azure.mgmt.compute import ComputeManagementClient
+from azure.mgmt.datalake.store import DataLakeStoreAccountManagementClient
+from azure.mgmt.hdinsight import HDInsightManagementClient
+from azure.mgmt.network import NetworkManagementClient
+from azure.mgmt.resource import ResourceManagementClient
+from azure.mgmt.storage import StorageManagementClient
+
+AUTH_FILE = '/root/azure_auth.json'
+# Data Lake tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 300
+
+_lock = threading.RLock()
+_registry = dict()
+
+
+def get_auth():
+    with _lock:
+        if 'auth' not in _registry:
+            os.environ['AZURE_AUTH_LOCATION'] = AUTH_FILE
+            with open(AUTH_FILE) as json_file:
+                _registry['auth'] = json.load(json_file)
+            logging.getLogger('azure').setLevel(logging.ERROR)
+        return _registry['auth']
+
+
+def get_credential():
+    with _lock:
+        if 'credential' not in _registry:
+            auth = get_auth()
+            # ClientSecretCredential caches and refreshes its own AAD tokens, so a single
+            # instance shared by every management client keeps one token per scope
+            _registry['credential'] = ClientSecretCredential(
+                tenant_id=auth["tenantId"],
+                client_id=auth["clientId"],
+                client_secret=auth["clientSecret"],
+                authority=auth["activeDirectoryEndpointUrl"]
+            )
+        return _registry['credential']
+
+
+def get_client(client_class):
+    with _lock:
+        if client_class.__name__ not in _registry:
+            auth = get_auth()
+            kwargs = {'base_url': auth["resourceManagerEndpointUrl"]}
+            if client_class not in (DataLakeStoreAccountManagementClient, HDInsightManagementClient):
+                kwargs['credential_scopes'] = ["{}/.default".format(auth["resourceManagerEndpointUrl"])]
+            _registry[client_class.__name__] = client_class(get_credential(), auth["subscriptionId"], **kwargs)
+        return _registry[client_class.__name__]
+
+
+def get_datalake_token():
+    with _lock:
+        token = _registry.get('datalake_token')
+        if token is None or time.time() > _registry['datalake_token_expires'] - TOKEN_REFRESH_MARGIN:
+            auth = get_auth()
+            token = lib.auth(tenant_id=auth['tenantId'],
+                             client_secret=auth['clientSecret'],
+                             client_id=auth['clientId'],
+                             resource='https://datalake.azure.net/')
+            _registry['datalake_token'] = token
+            _registry['datalake_token_expires'] = time.time() + int(token.token.get('expiresIn', 3600))
+        return token
+
+
+class AzureClients:
+    # Management clients are built on first attribute access and shared through the module
+    # registry, so AzureMeta()/AzureActions() can be created freely inside scripts
+    @property
+    def credential(self):
+        return get_credential()
+
+    @property
+    def compute_client(self):
+        return get_client(ComputeManagementClient)
+
+    @property
+    def resource_client(self):
+        return get_client(ResourceManagementClient)
+
+    @property
+    def network_client(self):
+        return get_client(NetworkManagementClient)
+
+    @property
+    def storage_client(self):
+        return get_client(StorageManagementClient)
+
+    @property
+    def datalake_client(self):
+        return get_client(DataLakeStoreAccountManagementClient)
+
+    @property
+    def hdinsight_client(self):
+        return get_client(HDInsightManagementClient)
+
+    @property
+    def sp_creds(self):
+        return get_auth()
+
+    @property
+    def dl_filesystem_creds(self):
+        return get_datalake_token()
@@ -20,77 +20,21 @@
 # ******************************************************************************
 
 from azure.common.client_factory import get_client_from_auth_file
-from azure.mgmt.compute import ComputeManagementClient
-from azure.mgmt.resource import ResourceManagementClient
-from azure.mgmt.network import NetworkManagementClient
-from azure.mgmt.storage import StorageManagementClient
 from azure.storage.blob import BlobServiceClient
-from azure.mgmt.datalake.store import DataLakeStoreAccountManagementClient
-from azure.datalake.store import core, lib
-from azure.identity import ClientSecretCredential
+from azure.datalake.store import core
 from azure.core.exceptions import ResourceNotFoundError
-from azure.mgmt.hdinsight import HDInsightManagementClient
+import datalab.clients_lib
+import datalab.executor
+import datalab.lookup_cache
 import logging
 import traceback
 import sys
 import os
-import json
 
 
-class AzureMeta:
+class AzureMeta(datalab.clients_lib.AzureClients):
     def __init__(self):
-        os.environ['AZURE_AUTH_LOCATION'] = '/root/azure_auth.json'
-        with open('/root/azure_auth.json') as json_file:
-            json_dict = json.load(json_file)
-
-        credential = ClientSecretCredential(
-            tenant_id=json_dict["tenantId"],
-            client_id=json_dict["clientId"],
-            client_secret=json_dict["clientSecret"],
-            authority=json_dict["activeDirectoryEndpointUrl"]
-        )
-
-        self.compute_client = ComputeManagementClient(
-            credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.resource_client = ResourceManagementClient(
-            credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.network_client = NetworkManagementClient(
-            credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.storage_client = StorageManagementClient(
-            credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"],
-            credential_scopes=["{}/.default".format(json_dict["resourceManagerEndpointUrl"])]
-        )
-        self.datalake_client = DataLakeStoreAccountManagementClient(
-            credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"]
-        )
-        self.hdinsight_client = HDInsightManagementClient(
-            credential,
-            json_dict["subscriptionId"],
-            base_url=json_dict["resourceManagerEndpointUrl"]
-        )
-        self.sp_creds = json.loads(open(os.environ['AZURE_AUTH_LOCATION']).read())
-        self.dl_filesystem_creds = lib.auth(tenant_id=json.dumps(self.sp_creds['tenantId']).replace('"', ''),
-                                            client_secret=json.dumps(self.sp_creds['clientSecret']).replace('"', ''),
-                                            client_id=json.dumps(self.sp_creds['clientId']).replace('"', ''),
-                                            resource='https://datalake.azure.net/')
-        logger = logging.getLogger('azure')
-        logger.setLevel(logging.ERROR)
+        datalab.clients_lib.get_auth()
 
     def get_resource_group(self, resource_group_name):
         try:
@@ -107,6 +51,7 @@ class AzureMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_vpc(self, resource_group_name, vpc_name):
         try:
             result = self.network_client.virtual_networks.get(resource_group_name, vpc_name)
@@ -122,6 +67,7 @@ class AzureMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_subnet(self, resource_group_name, vpc_name, subnet_name):
         try:
             result = self.network_client.subnets.get(resource_group_name, vpc_name, subnet_name)
@@ -408,6 +354,7 @@ class AzureMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_instance_public_ip_address(self, resource_group_name, instance_name):
         try:
             instance = self.compute_client.virtual_machines.get(resource_group_name, instance_name)
@@ -425,6 +372,7 @@ class AzureMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_private_ip_address(self, resource_group_name, instance_name):
         try:
             instance = self.compute_client.virtual_machines.get(resource_group_name, instance_name)
@@ -517,49 +465,53 @@ class AzureMeta:
 
     def get_list_instance_statuses(self, resource_group_name, instance_name_list):
         data = []
-        for instance_name in instance_name_list:
-            instance_name = instance_name['id']
-            host = {}
-            try:
-                request = self.compute_client.virtual_machines.get(resource_group_name, instance_name,
-                                                                   expand='instanceView')
-                host['id'] = instance_name
+        names = [instance_name['id'] for instance_name in instance_name_list]
+        try:
+            # One resource group wide listing with instance view instead of a get() per VM
+            instances = {vm.name: vm for vm in self.compute_client.virtual_machines.list(resource_group_name,
+                                                                                         expand='instanceView')}
+        except TypeError:
+            # Older compute SDKs can't expand the instance view on list
+            instances = {}
+            for name in names:
                 try:
-                    host['status'] = request.instance_view.statuses[1].display_status.split(' ')[1].replace("deallocat",
-                                                                                                            "stopp")
-                    data.append(host)
+                    instances[name] = self.compute_client.virtual_machines.get(resource_group_name, name,
+                                                                               expand='instanceView')
                 except:
-                    host['status'] = request.instance_view.statuses[0].display_status.lower()
-                    data.append(host)
-            except:
-                host['id'] = instance_name
+                    pass
+        for instance_name in names:
+            host = {'id': instance_name}
+            if instance_name not in instances or instances[instance_name].instance_view is None:
                 host['status'] = 'terminated'
-                data.append(host)
+            else:
+                statuses = instances[instance_name].instance_view.statuses
+                try:
+                    host['status'] = statuses[1].display_status.split(' ')[1].replace("deallocat", "stopp")
+                except:
+                    host['status'] = statuses[0].display_status.lower()
+            data.append(host)
         return data
 
     def get_image_statuses(self, resource_group_name, image_name_list):
         data = []
+        images = {image.name: image for image in self.compute_client.images.list_by_resource_group(
+            resource_group_name)}
         for image_name in image_name_list:
             image_name = image_name['id']
-            host = {}
-            try:
-                request = self.compute_client.images.get(resource_group_name, image_name)
-                host['id'] = image_name
-                if request.provisioning_state == 'Succeeded':
-                    host['status'] = 'ACTIVE'
-                elif request.provisioning_state == 'Deleting':
-                    host['status'] = 'TERMINATING'
-                elif request.provisioning_state == 'Canceled':
-                    host['status'] = 'FAILED'
-                elif request.provisioning_state == 'Creating':
-                    host['status'] = 'CREATING'
-                elif request.provisioning_state == 'Locked':
-                    host['status'] = 'FAILED'
-                data.append(host)
-            except:
-                host['id'] = image_name
+            host = {'id': image_name}
+            if image_name not in images:
                 host['status'] = 'TERMINATED'
-                data.append(host)
+            elif images[image_name].provisioning_state == 'Succeeded':
+                host['status'] = 'ACTIVE'
+            elif images[image_name].provisioning_state == 'Deleting':
+                host['status'] = 'TERMINATING'
+            elif images[image_name].provisioning_state == 'Canceled':
+                host['status'] = 'FAILED'
+            elif images[image_name].provisioning_state == 'Creating':
+                host['status'] = 'CREATING'
+            elif images[image_name].provisioning_state == 'Locked':
+                host['status'] = 'FAILED'
+            data.append(host)
         return data
 
 
@@ -701,29 +653,30 @@ class AzureMeta:
 
 
     def list_hdinsight_statuses(self, resource_group_name, cluster_name_list):
-        data = []
-        for cluster_name in cluster_name_list:
-            cluster_name = cluster_name['id']
-            host = {}
+        def get_cluster_status(cluster_name):
+            host = {'id': cluster_name}
             try:
                 request = self.hdinsight_client.clusters.get(resource_group_name, cluster_name)
-                host['id'] = cluster_name
-                if request.properties.cluster_state == 'Accepted' or request.properties.cluster_state == 'HdInsightConfiguration' or request.properties.cluster_state == 'ClusterStorageProvisioned' or request.properties.cluster_state == 'ReadyForDeployment':
-                    host['status'] = 'creating'
-                elif request.properties.cluster_state == 'AzureVMConfiguration' or request.properties.cluster_state == 'Operational' or request.properties.cluster_state == 'ClusterCustomization':
-                    host['status'] = 'creating'
-                elif request.properties.cluster_state == 'DeletePending' or request.properties.cluster_state == 'Deleting':
-                    host['status'] = 'terminating'
-                elif request.properties.cluster_state == 'Error' or request.properties.cluster_state == 'TimedOut' or request.properties.cluster_state == 'Unknown':
-                    host['status'] = 'failed'
-                elif request.properties.cluster_state == 'Running':
-                    host['status'] = 'running'
-                data.append(host)
-            except:
-                host['id'] = cluster_name
+            except Exception as err:
+                if datalab.executor.is_throttling_error(err):
+                    raise err
                 host['status'] = 'terminated'
-                data.append(host)
-        return data
+                return host
+            if request.properties.cluster_state == 'Accepted' or request.properties.cluster_state == 'HdInsightConfiguration' or request.properties.cluster_state == 'ClusterStorageProvisioned' or request.properties.cluster_state == 'ReadyForDeployment':
+                host['status'] = 'creating'
+            elif request.properties.cluster_state == 'AzureVMConfiguration' or request.properties.cluster_state == 'Operational' or request.properties.cluster_state == 'ClusterCustomization':
+                host['status'] = 'creating'
+            elif request.properties.cluster_state == 'DeletePending' or request.properties.cluster_state == 'Deleting':
+                host['status'] = 'terminating'
+            elif request.properties.cluster_state == 'Error' or request.properties.cluster_state == 'TimedOut' or request.properties.cluster_state == 'Unknown':
+                host['status'] = 'failed'
+            elif request.properties.cluster_state == 'Running':
+                host['status'] = 'running'
+            return host
+
+        return datalab.executor.map_concurrently(get_cluster_status,
+                                                 [cluster_name['id'] for cluster_name in cluster_name_list],
+                                                 service='hdinsight', region=os.environ.get('azure_region', ''))
 
 
 def get_instance_private_ip_address(tag_name, instance_name):
@@ -738,6 +691,31 @@ def get_instance_private_ip_address(tag_name, instance_name):
             return ''
 
 
+def get_instance_private_ip_addresses(tag_name, instance_names):
+    # Two resource group wide listings (VMs and interfaces) instead of two get() calls per instance
+    try:
+        resource_group_name = os.environ['azure_resource_group_name']
+        meta = AzureMeta()
+        interfaces = {interface.id.lower(): interface for interface in
+                      meta.network_client.network_interfaces.list(resource_group_name)}
+        ips = dict()
+        for instance in meta.compute_client.virtual_machines.list(resource_group_name):
+            if instance.name not in instance_names:
+                continue
+            for interface_reference in instance.network_profile.network_interfaces:
+                interface = interfaces.get(interface_reference.id.lower())
+                if interface is not None and interface.ip_configurations:
+                    ips[instance.name] = interface.ip_configurations[0].private_ip_address
+                    break
+        return ips
+    except Exception as err:
+        logging.info("Error with getting private ip addresses by names: " + str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout))
+        append_result(str({"error": "Error with getting private ip addresses by names",
+                           "error_message": str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout)}))
+        traceback.print_exc(file=sys.stdout)
+        return {}
+
+
 def node_count(cluster_name):
     try:
         node_list = []
@@ -20,12 +20,14 @@
 # ******************************************************************************
 
 import ast
-import backoff
+import datalab.artifact_store
+import datalab.clients_lib
 import datalab.common_lib
 import datalab.fab
+import datalab.lookup_cache
 import datalab.meta_lib
-import google.auth
-import json
+import datalab.spark_conf
+import datalab.waiter
 import logging
 import os
 import random
@@ -33,7 +35,6 @@ import sys
 import time
 import traceback
 import urllib3
-import urllib.request
 import subprocess
 from Crypto.PublicKey import RSA
 from datalab.fab import *
@@ -41,44 +42,14 @@ from fabric import *
 from google.cloud import exceptions
 from google.cloud import storage
 from googleapiclient import errors
-from googleapiclient.discovery import build
 
 
-class GCPActions:
+class GCPActions(datalab.clients_lib.GCPClients):
     def __init__(self, auth_type='service_account'):
-        @backoff.on_exception(backoff.expo,
-                              google.auth.exceptions.DefaultCredentialsError,
-                              max_tries=15)
-        def get_gcp_cred():
-            credentials, project = google.auth.default()
-            return credentials, project
-
         self.auth_type = auth_type
         self.project = os.environ['gcp_project_id']
 
-        if os.environ['conf_resource'] == 'ssn':
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = "/root/service_account.json"
-            credentials, project = google.auth.default()
-            if credentials.requires_scopes:
-                credentials = credentials.with_scopes(
-                    ['https://www.googleapis.com/auth/compute',
-                     'https://www.googleapis.com/auth/iam',
-                     'https://www.googleapis.com/auth/cloud-platform'])
-            self.service = build('compute', 'v1', credentials=credentials)
-            self.service_iam = build('iam', 'v1', credentials=credentials)
-            self.dataproc = build('dataproc', 'v1', credentials=credentials)
-            self.service_storage = build('storage', 'v1', credentials=credentials)
-            self.storage_client = storage.Client(project=project, credentials=credentials)
-            self.service_resource = build('cloudresourcemanager', 'v1', credentials=credentials)
-        else:
-            credentials, project = get_gcp_cred()
-            self.service = build('compute', 'v1', credentials=credentials)
-            self.service_iam = build('iam', 'v1', credentials=credentials)
-            self.dataproc = build('dataproc', 'v1', credentials=credentials)
-            self.service_storage = build('storage', 'v1', credentials=credentials)
-            self.storage_client = storage.Client(project=project, credentials=credentials)
-            self.service_resource = build('cloudresourcemanager', 'v1', credentials=credentials)
-
+    @datalab.lookup_cache.invalidates
     def create_vpc(self, vpc_name):
         network_params = {'name': vpc_name, 'autoCreateSubnetworks': False}
         request = self.service.networks().insert(project=self.project, body=network_params)
@@ -96,6 +67,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_vpc(self, vpc_name):
         request = self.service.networks().delete(project=self.project, network=vpc_name)
         try:
@@ -111,6 +83,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_subnet(self, subnet_name, subnet_cidr, vpc_selflink, region):
         subnetwork_params = {
             'name': subnet_name,
@@ -134,6 +107,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_subnet(self, subnet_name, region):
         request = self.service.subnetworks().delete(project=self.project, region=region, subnetwork=subnet_name)
         try:
@@ -149,6 +123,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_firewall(self, firewall_params):
         request = self.service.firewalls().insert(project=self.project, body=firewall_params)
         try:
@@ -164,6 +139,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_firewall(self, firewall_name):
         request = self.service.firewalls().delete(project=self.project, firewall=firewall_name)
         try:
@@ -327,6 +303,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_instance(self, instance_name, service_base_name, cluster_name, region, zone, vpc_name, subnet_name,
                         instance_size, ssh_key_path, initial_user, image_name, secondary_image_name,
                         service_account_name, instance_class, network_tag, labels, static_ip='',
@@ -537,6 +514,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_instance(self, instance_name, zone):
         request = self.service.instances().delete(project=self.project, zone=zone,
                                                   instance=instance_name)
@@ -553,6 +531,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def stop_instance(self, instance_name, zone):
         request = self.service.instances().stop(project=self.project, zone=zone, instance=instance_name)
         try:
@@ -567,6 +546,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def start_instance(self, instance_name, zone, rsa_encrypted_csek=''):
         if rsa_encrypted_csek:
             params = dict()
@@ -598,10 +578,9 @@ class GCPActions:
             name='projects/{}/serviceAccounts/{}'.format(self.project, service_account_email))
         try:
             result = request.execute()
-            service_account_removed = datalab.meta_lib.GCPMeta().get_service_account(service_account_name, service_base_name)
-            while service_account_removed:
-                time.sleep(5)
-                service_account_removed = datalab.meta_lib.GCPMeta().get_service_account(service_account_name, service_base_name)
+            datalab.waiter.wait_until(
+                lambda: not datalab.meta_lib.GCPMeta().get_service_account(service_account_name, service_base_name),
+                'gcp_service_account_removal')
             time.sleep(30)
             print('Service account {} removed.'.format(service_account_name))
             return result
@@ -622,10 +601,9 @@ class GCPActions:
                                                                        body=params)
         try:
             result = request.execute()
-            service_account_created = datalab.meta_lib.GCPMeta().get_service_account(service_account_name, service_base_name)
-            while not service_account_created:
-                time.sleep(5)
-                service_account_created = datalab.meta_lib.GCPMeta().get_service_account(service_account_name, service_base_name)
+            datalab.waiter.wait_until(
+                lambda: datalab.meta_lib.GCPMeta().get_service_account(service_account_name, service_base_name),
+                'gcp_service_account_creation')
             time.sleep(30)
             print('Service account {} created.'.format(service_account_name))
             return result
@@ -799,6 +777,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def create_static_address(self, address_name, region):
         params = {"name": address_name}
         request = self.service.addresses().insert(project=self.project, region=region, body=params)
@@ -816,6 +795,7 @@ class GCPActions:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.invalidates
     def remove_static_address(self, address_name, region):
         request = self.service.addresses().delete(project=self.project, region=region, address=address_name)
         try:
@@ -857,11 +837,10 @@ class GCPActions:
                 return ''
             primary_result = primary_request.execute()
             secondary_result = secondary_request.execute()
-            datalab.meta_lib.GCPMeta().wait_for_operation(primary_result['name'])
-            print('Image {} has been created.'.format(primary_image_name))
+            # Both images are created at the same time, one list call per poll covers them
+            datalab.meta_lib.GCPMeta().wait_for_operations([primary_result['name'], secondary_result['name']])
+            print('Images {} and {} have been created.'.format(primary_image_name, secondary_image_name))
             id_list.append(primary_result.get('id'))
-            datalab.meta_lib.GCPMeta().wait_for_operation(secondary_result['name'])
-            print('Image {} has been created.'.format(secondary_image_name))
             id_list.append(secondary_result.get('id'))
             GCPActions().start_instance(instance_name, zone, rsa_encrypted_csek)
             return id_list
@@ -967,14 +946,17 @@ class GCPActions:
         request = self.dataproc.projects().regions().clusters().create(projectId=self.project, region=region, body=params)
         try:
             result = request.execute()
+            print('The cluster is being created... Please wait')
+            # The cluster list is eventually consistent, a new cluster would be reported as terminated
             time.sleep(5)
-            cluster_status = datalab.meta_lib.GCPMeta().get_list_cluster_statuses([cluster_name])
-            while cluster_status[0]['status'] != 'running':
-                time.sleep(5)
-                print('The cluster is being created... Please wait')
-                cluster_status = datalab.meta_lib.GCPMeta().get_list_cluster_statuses([cluster_name])
-                if cluster_status[0]['status'] == 'terminated':
-                    raise Exception
+
+            def is_running():
+                status = datalab.meta_lib.GCPMeta().get_list_cluster_statuses([cluster_name])[0]['status']
+                if status == 'terminated':
+                    raise Exception('Dataproc cluster {} has been terminated during creation'.format(cluster_name))
+                return status == 'running'
+
+            datalab.waiter.wait_until(is_running, 'dataproc_creation', initial_interval=5, max_interval=60)
             return result
         except Exception as err:
             logging.info(
@@ -1028,11 +1010,10 @@ class GCPActions:
         request = self.dataproc.projects().regions().clusters().delete(projectId=self.project, region=region, clusterName=cluster_name)
         try:
             result = request.execute()
-            cluster_status = datalab.meta_lib.GCPMeta().get_list_cluster_statuses([cluster_name])
-            while cluster_status[0]['status'] != 'terminated':
-                time.sleep(5)
-                print('The cluster is being terminated... Please wait')
-                cluster_status = datalab.meta_lib.GCPMeta().get_list_cluster_statuses([cluster_name])
+            print('The cluster is being terminated... Please wait')
+            datalab.waiter.wait_until(
+                lambda: datalab.meta_lib.GCPMeta().get_list_cluster_statuses([cluster_name])[0]['status'] == 'terminated',
+                'dataproc_deletion', initial_interval=5, max_interval=60)
             GCPActions().delete_dataproc_jobs(cluster_name)
             return result
         except Exception as err:
@@ -1076,13 +1057,15 @@ class GCPActions:
         try:
             res = request.execute()
             print("Job ID: {}".format(res['reference']['jobId']))
-            job_status = datalab.meta_lib.GCPMeta().get_dataproc_job_status(res['reference']['jobId'])
-            while job_status != 'done':
-                time.sleep(5)
+
+            def is_done():
                 job_status = datalab.meta_lib.GCPMeta().get_dataproc_job_status(res['reference']['jobId'])
                 if job_status in ('failed', 'error'):
-                    raise Exception
-            return job_status
+                    raise Exception('Dataproc job {} is in state {}'.format(res['reference']['jobId'], job_status))
+                return job_status == 'done'
+
+            datalab.waiter.wait_until(is_done, 'dataproc_job', max_interval=15)
+            return 'done'
         except Exception as err:
             logging.info(
                 "Unable to submit dataproc job: " + str(err) + "\n Traceback: " + traceback.print_exc(
@@ -1139,17 +1122,35 @@ class GCPActions:
             traceback.print_exc(file=sys.stdout)
             return ''
 
+    def get_artifact(self, bucket, key, local_file):
+        if not GCPActions().get_from_bucket(bucket, key, local_file):
+            raise Exception('There is no {} in bucket {}'.format(key, bucket))
+
+    def get_legacy_archive(self, bucket, prefix, name, target_dir, sudo=True):
+        # Clusters created before the artifact store only published <name>.tar.gz and its md5 checksum
+        archive = '/tmp/{}.tar.gz'.format(name)
+        checksum = '/tmp/{}-checksum.chk'.format(name)
+        self.get_artifact(bucket, '{}{}.tar.gz'.format(prefix, name), archive)
+        self.get_artifact(bucket, '{}{}-checksum.chk'.format(prefix, name), checksum)
+        if subprocess.run('md5sum -c {}'.format(checksum), shell=True).returncode != 0:
+            subprocess.run('rm -f {}'.format(archive), shell=True, check=True)
+            self.get_artifact(bucket, '{}{}.tar.gz'.format(prefix, name), archive)
+            if subprocess.run('md5sum -c {}'.format(checksum), shell=True).returncode != 0:
+                print("The checksum of {}.tar.gz is mismatched. It could be caused by gcp network issue.".format(name))
+                sys.exit(1)
+        subprocess.run('{}tar -zhxvf {} -C {}'.format('sudo ' if sudo else '', archive, target_dir), shell=True,
+                       check=True)
+
     def jars(self, args, dataproc_dir):
         print("Downloading jars...")
-        GCPActions().get_from_bucket(args.bucket, 'jars/{0}/jars.tar.gz'.format(args.dataproc_version), '/tmp/jars.tar.gz')
-        GCPActions().get_from_bucket(args.bucket, 'jars/{0}/jars-checksum.chk'.format(args.dataproc_version), '/tmp/jars-checksum.chk')
-        if 'WARNING' in subprocess.run('md5sum -c /tmp/jars-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-            subprocess.run('rm -f /tmp/jars.tar.gz', shell=True, check=True)
-            GCPActions().get_from_bucket(args.bucket, 'jars/{0}/jars.tar.gz'.format(args.cluster_name), '/tmp/jars.tar.gz')
-            if 'WARNING' in subprocess.run('md5sum -c /tmp/jars-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-                print("The checksum of jars.tar.gz is mismatched. It could be caused by gcp network issue.")
-                sys.exit(1)
-        subprocess.run('tar -zhxvf /tmp/jars.tar.gz -C {}'.format(dataproc_dir), shell=True, check=True)
+        if not GCPActions().get_from_bucket(args.bucket, 'jars/{0}/jars-manifest.json'.format(args.dataproc_version),
+                                            '/tmp/jars-manifest.json'):
+            self.get_legacy_archive(args.bucket, 'jars/{0}/'.format(args.dataproc_version), 'jars', dataproc_dir,
+                                    sudo=False)
+            return
+        datalab.artifact_store.sync('/tmp/jars-manifest.json',
+                                    lambda key, local_file: self.get_artifact(args.bucket, key, local_file),
+                                    dataproc_dir)
 
     def yarn(self, args, yarn_dir):
         print("Downloading yarn configuration...")
@@ -1164,15 +1165,14 @@ class GCPActions:
 
     def install_dataproc_spark(self, args):
         print("Installing spark...")
-        GCPActions().get_from_bucket(args.bucket, '{0}/{1}/spark.tar.gz'.format(args.user_name, args.cluster_name), '/tmp/spark.tar.gz')
-        GCPActions().get_from_bucket(args.bucket, '{0}/{1}/spark-checksum.chk'.format(args.user_name, args.cluster_name), '/tmp/spark-checksum.chk')
-        if 'WARNING' in subprocess.run('md5sum -c /tmp/spark-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-            subprocess.run('rm -f /tmp/spark.tar.gz', shell=True, check=True)
-            GCPActions().get_from_bucket(args.bucket, '{0}/{1}/spark.tar.gz'.format(args.user_name, args.cluster_name), '/tmp/spark.tar.gz')
-            if 'WARNING' in subprocess.run('md5sum -c /tmp/spark-checksum.chk', capture_output=True, shell=True, check=True).stdout.decode('UTF-8'):
-                print("The checksum of spark.tar.gz is mismatched. It could be caused by gcp network issue.")
-                sys.exit(1)
-        subprocess.run('sudo tar -zhxvf /tmp/spark.tar.gz -C /opt/{0}/{1}/'.format(args.dataproc_version, args.cluster_name), shell=True, check=True)
+        if not GCPActions().get_from_bucket(args.bucket, '{0}/{1}/spark-manifest.json'.format(
+                args.user_name, args.cluster_name), '/tmp/spark-manifest.json'):
+            self.get_legacy_archive(args.bucket, '{0}/{1}/'.format(args.user_name, args.cluster_name), 'spark',
+                                    '/opt/{0}/{1}/'.format(args.dataproc_version, args.cluster_name))
+            return
+        datalab.artifact_store.sync('/tmp/spark-manifest.json',
+                                    lambda key, local_file: self.get_artifact(args.bucket, key, local_file),
+                                    '/opt/{0}/{1}/'.format(args.dataproc_version, args.cluster_name))
 
     def spark_defaults(self, args):
         spark_def_path = '/opt/{0}/{1}/spark/conf/spark-env.sh'.format(args.dataproc_version, args.cluster_name)
@@ -1190,51 +1190,9 @@ class GCPActions:
     def remove_kernels(self, notebook_name, dataproc_name, dataproc_version, ssh_user, key_path, computational_name):
         try:
             notebook_ip = datalab.meta_lib.GCPMeta().get_private_ip_address(notebook_name)
-            global con
-            con = datalab.fab.init_datalab_connection(notebook_ip, ssh_user, key_path)
-            con.sudo('rm -rf /home/{}/.local/share/jupyter/kernels/*_{}'.format(ssh_user, dataproc_name))
-            if exists(con, '/home/{}/.ensure_dir/dataengine-service_{}_interpreter_ensured'.format(ssh_user, dataproc_name)):
-                if os.environ['notebook_multiple_clusters'] == 'true':
-                    try:
-                        livy_port = con.sudo("cat /opt/" + dataproc_version + "/" + dataproc_name
-                                         + "/livy/conf/livy.conf | grep livy.server.port | tail -n 1 | awk '{printf $3}'").stdout.replace('\n','')
-                        process_number = con.sudo("netstat -natp 2>/dev/null | grep ':" + livy_port +
-                                              "' | awk '{print $7}' | sed 's|/.*||g'").stdout.replace('\n','')
-                        con.sudo('kill -9 ' + process_number)
-                        con.sudo('systemctl disable livy-server-' + livy_port)
-                    except:
-                        print("Wasn't able to find Livy server for this EMR!")
-                con.sudo('sed -i \"s/^export SPARK_HOME.*/export SPARK_HOME=\/opt\/spark/\" /opt/zeppelin/conf/zeppelin-env.sh')
-                con.sudo("rm -rf /home/{}/.ensure_dir/dataengine-service_interpreter_ensure".format(ssh_user))
-                zeppelin_url = 'http://' + notebook_ip + ':8080/api/interpreter/setting/'
-                opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
-                req = opener.open(urllib.request.Request(zeppelin_url))
-                r_text = req.read()
-                interpreter_json = json.loads(r_text)
-                interpreter_prefix = dataproc_name
-                for interpreter in interpreter_json['body']:
-                    if interpreter_prefix in interpreter['name']:
-                        print("Interpreter with ID: {} and name: {} will be removed from zeppelin!".format(
-                            interpreter['id'], interpreter['name']))
-                        request = urllib.request.Request(zeppelin_url + interpreter['id'], data=''.encode())
-                        request.get_method = lambda: 'DELETE'
-                        url = opener.open(request)
-                        print(url.read())
-                con.sudo('chown {0}:{0} -R /opt/zeppelin/'.format(ssh_user))
-                con.sudo('systemctl restart zeppelin-notebook.service')
-                zeppelin_restarted = False
-                while not zeppelin_restarted:
-                    con.sudo('sleep 5')
-                    result = con.sudo('nmap -p 8080 localhost | grep "closed" > /dev/null; echo $?').stdout.replace('\n','')
-                    result = result[:1]
-                    if result == '1':
-                        zeppelin_restarted = True
-                con.sudo('sleep 5')
-                con.sudo('rm -rf /home/{}/.ensure_dir/dataengine-service_{}_interpreter_ensured'.format(ssh_user, dataproc_name))
-            if exists(con, '/home/{}/.ensure_dir/rstudio_dataengine-service_ensured'.format(ssh_user)):
-                datalab.fab.remove_rstudio_dataengines_kernel(computational_name, ssh_user)
-            con.sudo('rm -rf  /opt/{0}/{1}/'.format(dataproc_version, dataproc_name))
-            print("Notebook's {} kernels were removed".format(notebook_ip))
+            datalab.fab.remove_cluster_kernels(notebook_ip, ssh_user, key_path, [
+                {'name': dataproc_name, 'dir': '/opt/{}/{}/'.format(dataproc_version, dataproc_name),
+                 'type': 'dataengine-service'}], computational_name)
         except Exception as err:
             logging.info(
                 "Unable to delete dataproc kernels from notebook: " + str(err) + "\n Traceback: " + traceback.print_exc(
@@ -1445,7 +1403,7 @@ def configure_local_spark(jars_dir, templates_dir, memory_type='driver'):
         spark_jars_paths = None
         if exists(datalab.fab.conn, '/opt/spark/conf/spark-defaults.conf'):
             try:
-                spark_jars_paths = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf | grep -e "^spark.jars " ').stdout.replace('\n','')
+                spark_jars_paths = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf | grep -e "^spark.jars " | tail -n 1').stdout.replace('\n','')
             except:
                 spark_jars_paths = None
         datalab.fab.conn.put(templates_dir + 'notebook_spark-defaults_local.conf', '/tmp/notebook_spark-defaults_local.conf')
@@ -1467,28 +1425,12 @@ def configure_local_spark(jars_dir, templates_dir, memory_type='driver'):
         datalab.fab.conn.sudo(
             '''bash -l -c 'echo "export JAVA_HOME={}" >> /opt/spark/conf/spark-env.sh' '''.format(java_home))
         if 'spark_configurations' in os.environ:
-            datalab_header = datalab.fab.conn.sudo('cat /tmp/notebook_spark-defaults_local.conf | grep "^#"').stdout
             spark_configurations = ast.literal_eval(os.environ['spark_configurations'])
-            new_spark_defaults = list()
-            spark_defaults = datalab.fab.conn.sudo('cat /opt/spark/conf/spark-defaults.conf').stdout
-            current_spark_properties = spark_defaults.split('\n')
-            for param in current_spark_properties:
-                if param.split(' ')[0] != '#':
-                    for config in spark_configurations:
-                        if config['Classification'] == 'spark-defaults':
-                            for property in config['Properties']:
-                                if property == param.split(' ')[0]:
-                                    param = property + ' ' + config['Properties'][property]
-                                else:
-                                    new_spark_defaults.append(property + ' ' + config['Properties'][property])
-                    new_spark_defaults.append(param)
-            new_spark_defaults = set(new_spark_defaults)
-            datalab.fab.conn.sudo('''bash -c 'echo "{}" > /opt/spark/conf/spark-defaults.conf' '''.format(datalab_header))
-            for prop in new_spark_defaults:
-                datalab.fab.conn.sudo('''bash -c 'echo "{}" >> /opt/spark/conf/spark-defaults.conf' '''.format(prop))
-            datalab.fab.conn.sudo('sed -i "/^\s*$/d" /opt/spark/conf/spark-defaults.conf')
-            if spark_jars_paths:
-                datalab.fab.conn.sudo('''bash -c 'echo "{}" >> /opt/spark/conf/spark-defaults.conf' '''.format(spark_jars_paths))
+            extra_properties = dict()
+            if spark_jars_paths and spark_jars_paths.strip():
+                extra_properties['spark.jars'] = spark_jars_paths.strip().split(None, 1)[-1]
+            datalab.spark_conf.merge_remote(datalab.fab.conn, '/opt/spark/conf/spark-defaults.conf',
+                                            spark_configurations, extra_properties)
     except Exception as err:
         print('Error:', str(err))
         sys.exit(1)
@@ -1498,54 +1440,8 @@ def remove_dataengine_kernels(notebook_name, os_user, key_path, cluster_name):
     try:
         computational_name = os.environ['computational_name'].replace('_', '-').lower()
         private = datalab.meta_lib.get_instance_private_ip_address(cluster_name, notebook_name)
-        global con
-        con = datalab.fab.init_datalab_connection(private, os_user, key_path)
-        con.sudo('rm -rf /home/{}/.local/share/jupyter/kernels/*_{}'.format(os_user, cluster_name))
-        if exists(con, '/home/{}/.ensure_dir/dataengine_{}_interpreter_ensured'.format(os_user, cluster_name)):
-            if os.environ['notebook_multiple_clusters'] == 'true':
-                try:
-                    livy_port = con.sudo("cat /opt/" + cluster_name +
-                                     "/livy/conf/livy.conf | grep livy.server.port | tail -n 1 | awk '{printf $3}'").stdout.replace('\n','')
-                    process_number = con.sudo("netstat -natp 2>/dev/null | grep ':" + livy_port +
-                                          "' | awk '{print $7}' | sed 's|/.*||g'").stdout.replace('\n','')
-                    con.sudo('kill -9 ' + process_number)
-                    con.sudo('systemctl disable livy-server-' + livy_port)
-                except:
-                    print("Wasn't able to find Livy server for this EMR!")
-            con.sudo(
-                'sed -i \"s/^export SPARK_HOME.*/export SPARK_HOME=\/opt\/spark/\" /opt/zeppelin/conf/zeppelin-env.sh')
-            con.sudo("rm -rf /home/{}/.ensure_dir/dataengine_interpreter_ensure".format(os_user))
-            zeppelin_url = 'http://' + private + ':8080/api/interpreter/setting/'
-            opener = urllib.request.build_opener(urllib.request.ProxyHandler({}))
-            req = opener.open(urllib.request.Request(zeppelin_url))
-            r_text = req.read()
-            interpreter_json = json.loads(r_text)
-            interpreter_prefix = cluster_name
-            for interpreter in interpreter_json['body']:
-                if interpreter_prefix in interpreter['name']:
-                    print("Interpreter with ID: {} and name: {} will be removed from zeppelin!".format(
-                        interpreter['id'], interpreter['name']))
-                    request = urllib.request.Request(zeppelin_url + interpreter['id'], data=''.encode())
-                    request.get_method = lambda: 'DELETE'
-                    url = opener.open(request)
-                    print(url.read())
-            con.sudo('chown ' + os_user + ':' + os_user + ' -R /opt/zeppelin/')
-            con.sudo('systemctl daemon-reload')
-            con.sudo("service zeppelin-notebook stop")
-            con.sudo("service zeppelin-notebook start")
-            zeppelin_restarted = False
-            while not zeppelin_restarted:
-                con.sudo('sleep 5')
-                result = con.sudo('nmap -p 8080 localhost | grep "closed" > /dev/null; echo $?').stdout
-                result = result[:1]
-                if result == '1':
-                    zeppelin_restarted = True
-            con.sudo('sleep 5')
-            con.sudo('rm -rf /home/{}/.ensure_dir/dataengine_{}_interpreter_ensured'.format(os_user, cluster_name))
-        if exists(con, '/home/{}/.ensure_dir/rstudio_dataengine_ensured'.format(os_user)):
-            datalab.fab.remove_rstudio_dataengines_kernel(computational_name, os_user)
-        con.sudo('rm -rf  /opt/' + cluster_name + '/')
-        print("Notebook's {} kernels were removed".format(private))
+        datalab.fab.remove_cluster_kernels(private, os_user, key_path, [
+            {'name': cluster_name, 'dir': '/opt/{}/'.format(cluster_name), 'type': 'dataengine'}], computational_name)
     except Exception as err:
         logging.info("Unable to remove kernels on Notebook: " + str(err) + "\n Traceback: " + traceback.print_exc(
             file=sys.stdout))
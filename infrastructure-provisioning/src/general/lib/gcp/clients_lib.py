@@ -0,0 +1,145 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import backoff
+import google.auth
+import hashlib
+import json
+import os
+import threading
+from google.auth.transport.requests import Request
+from google.cloud import storage
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache.base import Cache
+
+DISCOVERY_CACHE_DIR = '/root/.cache/gcp_discovery'
+
+_lock = threading.Lock()
+_credentials = dict()
+# googleapiclient services sit on top of httplib2, which is not thread safe,
+# so built services are shared by every instance but kept per thread
+_services = threading.local()
+
+
+class DiscoveryFileCache(Cache):
+    def __init__(self, cache_dir=DISCOVERY_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.md5(url.encode()).hexdigest() + '.json')
+
+    def get(self, url):
+        try:
+            with open(self._path(url)) as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def set(self, url, content):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = '{}.{}.tmp'.format(self._path(url), os.getpid())
+            with open(tmp_path, 'w') as f:
+                f.write(content)
+            os.replace(tmp_path, self._path(url))
+        except (IOError, OSError):
+            pass
+
+
+@backoff.on_exception(backoff.expo,
+                      google.auth.exceptions.DefaultCredentialsError,
+                      max_tries=15)
+def get_gcp_cred():
+    credentials, project = google.auth.default()
+    return credentials, project
+
+
+def get_credentials():
+    with _lock:
+        if 'default' not in _credentials:
+            if os.environ['conf_resource'] == 'ssn':
+                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = "/root/service_account.json"
+                credentials, project = google.auth.default()
+                if credentials.requires_scopes:
+                    credentials = credentials.with_scopes(
+                        ['https://www.googleapis.com/auth/compute',
+                         'https://www.googleapis.com/auth/iam',
+                         'https://www.googleapis.com/auth/cloud-platform'])
+            else:
+                credentials, project = get_gcp_cred()
+            _credentials['default'] = (credentials, project)
+        credentials, project = _credentials['default']
+        if credentials.token and not credentials.valid:
+            credentials.refresh(Request())
+        return credentials, project
+
+
+def get_service(name, version='v1'):
+    key = '{}_{}'.format(name, version)
+    service = getattr(_services, key, None)
+    if service is None:
+        credentials, project = get_credentials()
+        # gcp_discovery_dir may point to pre-fetched '<name>.<version>.json' documents
+        document_path = os.path.join(os.environ.get('gcp_discovery_dir', ''), '{}.{}.json'.format(name, version))
+        if os.environ.get('gcp_discovery_dir') and os.path.exists(document_path):
+            with open(document_path) as f:
+                service = build_from_document(json.load(f), credentials=credentials)
+        else:
+            service = build(name, version, credentials=credentials, cache=DiscoveryFileCache())
+        setattr(_services, key, service)
+    return service
+
+
+def get_storage_client():
+    client = getattr(_services, 'storage_client', None)
+    if client is None:
+        credentials, project = get_credentials()
+        client = storage.Client(project=project, credentials=credentials)
+        _services.storage_client = client
+    return client
+
+
+class GCPClients:
+    # Clients are resolved on first attribute access and shared through the module registry,
+    # so creating GCPMeta()/GCPActions() many times per script costs nothing after the first one
+    @property
+    def service(self):
+        return get_service('compute')
+
+    @property
+    def service_iam(self):
+        return get_service('iam')
+
+    @property
+    def dataproc(self):
+        return get_service('dataproc')
+
+    @property
+    def service_storage(self):
+        return get_service('storage')
+
+    @property
+    def service_resource(self):
+        return get_service('cloudresourcemanager')
+
+    @property
+    def storage_client(self):
+        return get_storage_client()
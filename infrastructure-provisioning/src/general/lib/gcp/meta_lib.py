@@ -19,87 +19,69 @@
 #
 # ******************************************************************************
 
-import backoff
-import google.auth
+import datalab.clients_lib
+import datalab.executor
+import datalab.lookup_cache
+import datalab.waiter
 import logging
 import os
 import re
 import sys
-import time
 import traceback
-import subprocess
 from fabric import *
 from datalab.fab import *
 from google.cloud import exceptions
-from google.cloud import storage
 from googleapiclient import errors
-from googleapiclient.discovery import build
 
 
-class GCPMeta:
+class GCPMeta(datalab.clients_lib.GCPClients):
     def __init__(self, auth_type='service_account'):
-        @backoff.on_exception(backoff.expo,
-                              google.auth.exceptions.DefaultCredentialsError,
-                              max_tries=15)
-        def get_gcp_cred():
-            credentials, project = google.auth.default()
-            return credentials, project
-
         self.auth_type = auth_type
         self.project = os.environ['gcp_project_id']
 
-        if os.environ['conf_resource'] == 'ssn':
-            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = "/root/service_account.json"
-            credentials, project = google.auth.default()
-            if credentials.requires_scopes:
-                credentials = credentials.with_scopes(
-                    ['https://www.googleapis.com/auth/compute',
-                     'https://www.googleapis.com/auth/iam',
-                     'https://www.googleapis.com/auth/cloud-platform'])
-            self.service = build('compute', 'v1', credentials=credentials)
-            self.service_iam = build('iam', 'v1', credentials=credentials)
-            self.dataproc = build('dataproc', 'v1', credentials=credentials)
-            self.service_storage = build('storage', 'v1', credentials=credentials)
-            self.storage_client = storage.Client(project=project, credentials=credentials)
-            self.service_resource = build('cloudresourcemanager', 'v1', credentials=credentials)
+    def get_operations_api(self, region='', zone=''):
+        if region != '':
+            return self.service.regionOperations(), {'project': self.project, 'region': region}
+        elif zone != '':
+            return self.service.zoneOperations(), {'project': self.project, 'zone': zone}
         else:
-            credentials, project = get_gcp_cred()
-            self.service = build('compute', 'v1', credentials=credentials)
-            self.service_iam = build('iam', 'v1', credentials=credentials)
-            self.dataproc = build('dataproc', 'v1', credentials=credentials)
-            self.service_storage = build('storage', 'v1', credentials=credentials)
-            self.storage_client = storage.Client(project=project, credentials=credentials)
-            self.service_resource = build('cloudresourcemanager', 'v1', credentials=credentials)
+            return self.service.globalOperations(), {'project': self.project}
 
     def wait_for_operation(self, operation, region='', zone=''):
         print('Waiting for operation to finish...')
-        execution = False
-        while not execution:
+        operations, params = self.get_operations_api(region, zone)
+
+        def check():
+            # operations().wait returns as soon as the operation is done or after about 2 minutes
             try:
-                if region != '':
-                    result = self.service.regionOperations().get(
-                        project=self.project,
-                        operation=operation,
-                        region=region).execute()
-                elif zone != '':
-                    result = self.service.zoneOperations().get(
-                        project=self.project,
-                        operation=operation,
-                        zone=zone).execute()
-                else:
-                    result = self.service.globalOperations().get(
-                        project=self.project,
-                        operation=operation).execute()
-                if result['status'] == 'DONE':
-                    print("Done.")
-                    execution = True
-                time.sleep(1)
+                result = operations.wait(operation=operation, **params).execute()
             except errors.HttpError as err:
                 if err.resp.status == 404:
                     print(err)
-                else:
-                    raise err
+                    return False
+                raise err
+            return result if result['status'] == 'DONE' else False
+
+        result = datalab.waiter.wait_until(check, 'gcp_operation', max_interval=5)
+        print("Done.")
+        return result
+
+    def wait_for_operations(self, operations_names, region='', zone=''):
+        # Waits for many operations of the same scope with a single list call of unfinished operations per poll
+        operations, params = self.get_operations_api(region, zone)
+
+        def check_many(pending):
+            running = set()
+            request = operations.list(filter='status != DONE', **params)
+            while request is not None:
+                response = request.execute()
+                running.update(item['name'] for item in response.get('items', []))
+                request = operations.list_next(previous_request=request, previous_response=response)
+            return [name for name in pending if name not in running]
 
+        datalab.waiter.wait_all(check_many, operations_names, 'gcp_operation')
+
+    @datalab.lookup_cache.cached_method
     def get_vpc(self, network_name):
         request = self.service.networks().get(
             project=self.project,
@@ -120,6 +102,7 @@ class GCPMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_subnet(self, subnet_name, region):
         request = self.service.subnetworks().get(
             project=self.project,
@@ -140,6 +123,7 @@ class GCPMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_firewall(self, firewall_name):
         request = self.service.firewalls().get(
             project=self.project,
@@ -230,6 +214,7 @@ class GCPMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_instance_public_ip_by_name(self, instance_name):
         try:
             result = self.get_instance(instance_name)
@@ -353,6 +338,7 @@ class GCPMeta:
                                    file=sys.stdout)}))
             traceback.print_exc(file=sys.stdout)
 
+    @datalab.lookup_cache.cached_method
     def get_static_address(self, region, static_address_name):
         request = self.service.addresses().get(project=self.project, region=region, address=static_address_name)
         try:
@@ -363,6 +349,7 @@ class GCPMeta:
             else:
                 raise err
 
+    @datalab.lookup_cache.cached_method
     def get_private_ip_address(self, instance_name):
         try:
             result = self.get_instance(instance_name)
@@ -636,62 +623,77 @@ class GCPMeta:
             traceback.print_exc(file=sys.stdout)
             return ''
 
+    def get_list_by_names(self, collection, names, **kwargs):
+        # One filtered list call per chunk of names instead of one get() per resource;
+        # chunks run on the shared executor, each thread using its own compute service
+        def list_chunk(chunk):
+            items = []
+            resource = getattr(self.service, collection)()
+            name_filter = ' OR '.join('(name = "{}")'.format(name) for name in chunk)
+            request = resource.list(project=self.project, filter=name_filter, **kwargs)
+            while request is not None:
+                result = request.execute()
+                items.extend(result.get('items', []))
+                request = resource.list_next(previous_request=request, previous_response=result)
+            return items
+
+        items = []
+        for chunk_items in datalab.executor.map_concurrently(list_chunk,
+                                                             [names[i:i + 50] for i in range(0, len(names), 50)],
+                                                             service='compute',
+                                                             region=os.environ.get('gcp_region', '')):
+            items.extend(chunk_items)
+        return items
+
     def get_list_instance_statuses(self, instance_name_list):
         data = []
+        found = {}
+        for instance in self.get_list_by_names('instances', instance_name_list,
+                                               zone=os.environ['gcp_zone']):
+            found[instance.get('name')] = instance.get('status').lower().replace("terminated", "stopped")
         for instance in instance_name_list:
-            host = {}
-            try:
-                request = self.service.instances().get(project=self.project, zone=os.environ['gcp_zone'],
-                                                       instance=instance)
-                result = request.execute()
-                host['id'] = instance
-                host['status'] = result.get('status').lower().replace("terminated", "stopped")
-                data.append(host)
-            except:
-                host['id'] = instance
-                host['status'] = 'terminated'
-                data.append(host)
+            data.append({'id': instance, 'status': found.get(instance, 'terminated')})
         return data
 
     def get_list_cluster_statuses(self, cluster_names, full_check=True):
         data = []
+        found = {}
+        # Dataproc filters can't OR cluster names, but a region holds few clusters
+        clusters = self.dataproc.projects().regions().clusters()
+        request = clusters.list(projectId=self.project, region=os.environ['gcp_region'])
+        while request is not None:
+            result = request.execute()
+            for cluster in result.get('clusters', []):
+                found[cluster.get('clusterName')] = cluster
+            request = clusters.list_next(previous_request=request, previous_response=result)
         for cluster in cluster_names:
-            host = {}
-            try:
-                request = self.dataproc.projects().regions().clusters().get(projectId=self.project,
-                                                                            region=os.environ['gcp_region'],
-                                                                            clusterName=cluster)
-                result = request.execute()
-                host['id'] = cluster
+            host = {'id': cluster}
+            if cluster in found:
                 if full_check:
-                    host['version'] = result.get('config').get('softwareConfig').get('imageVersion')[:3]
-                host['status'] = result.get('status').get('state').lower()
-                data.append(host)
-            except:
-                host['id'] = cluster
+                    host['version'] = found[cluster].get('config').get('softwareConfig').get('imageVersion')[:3]
+                host['status'] = found[cluster].get('status').get('state').lower()
+            else:
                 host['status'] = 'terminated'
-                data.append(host)
+            data.append(host)
         return data
 
     def get_list_image_statuses(self, image_name_list):
         data = []
+        found = {}
+        for image in self.get_list_by_names('images', image_name_list):
+            found[image.get('name')] = image.get('status')
         for image in image_name_list:
-            host = {}
-            try:
-                request = self.service.images().get(project=self.project, image=image)
-                result = request.execute()
-                host['id'] = image
-                if result.get('status') == 'PENDING':
-                    host['status'] = 'CREATING'
-                elif result.get('status') == 'READY':
-                    host['status'] = 'ACTIVE'
-                else:
-                    host['status'] = result.get('status')
-                data.append(host)
-            except:
-                host['id'] = image
+            host = {'id': image}
+            status = found.get(image)
+            if status is None:
                 host['status'] = 'TERMINATED'
-                data.append(host)
+            elif status == 'PENDING':
+                host['status'] = 'CREATING'
+            elif status == 'READY':
+                host['status'] = 'ACTIVE'
+            else:
+                host['status'] = status
+            data.append(host)
         return data
 
     def get_cluster(self, cluster_name):
@@ -778,16 +780,15 @@ class GCPMeta:
             return ''
 
     def dataproc_waiter(self, labels):
-        if os.path.exists(
-                '/response/.dataproc_creating_' + os.environ['exploratory_name']) or self.get_not_configured_dataproc(
-                os.environ['notebook_instance_name']):
-            with hide('stderr', 'running', 'warnings'):
-                subprocess.run("echo 'Some Dataproc cluster is still being created/terminated, waiting..'", shell=True, check=True)
-            time.sleep(60)
-            self.dataproc_waiter(labels)
-        else:
+        def check():
+            if os.path.exists('/response/.dataproc_creating_' + os.environ['exploratory_name']) or \
+                    self.get_not_configured_dataproc(os.environ['notebook_instance_name']):
+                print('Some Dataproc cluster is still being created/terminated, waiting..')
+                return False
             return True
 
+        return datalab.waiter.wait_until(check, 'dataproc_creation', initial_interval=10, max_interval=60)
+
     def get_dataproc_jobs(self):
         jobs = []
         try:
@@ -850,6 +851,23 @@ def get_instance_private_ip_address(tag_name, instance_name):
         return ''
 
 
+def get_instance_private_ip_addresses(tag_name, instance_names):
+    try:
+        ips = dict()
+        for instance in GCPMeta().get_list_by_names('instances', instance_names, zone=os.environ['gcp_zone']):
+            if instance.get('status') == 'RUNNING':
+                ips[instance.get('name')] = instance.get('networkInterfaces')[0].get('networkIP')
+        return ips
+    except Exception as err:
+        logging.info(
+            "Error with getting private ip addresses by names: " + str(err) + "\n Traceback: " + traceback.print_exc(
+                file=sys.stdout))
+        append_result(str({"error": "Error with getting private ip addresses by names",
+                           "error_message": str(err) + "\n Traceback: " + traceback.print_exc(file=sys.stdout)}))
+        traceback.print_exc(file=sys.stdout)
+        return {}
+
+
 def node_count(cluster_name):
     try:
         list_instances = GCPMeta().get_list_instances(os.environ['gcp_zone'], cluster_name)
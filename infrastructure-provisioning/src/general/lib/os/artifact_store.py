@@ -0,0 +1,179 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Local store of the jars and spark files published by the dataengine-service jars parser. The parser uploads
+# every file once under its sha256 together with a manifest, so a notebook only transfers the files it does not
+# have yet and clusters of the same version share them.
+
+import datalab.executor
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+from datalab.logger import logging
+
+STORE_DIR = '/opt/datalab/artifacts'
+REMOTE_PREFIX = 'artifacts/objects/'
+
+
+def get_object_path(sha256, store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'objects', sha256[:2], sha256)
+
+
+def get_object_name(sha256, compression='none'):
+    # Key of the object in the bucket, sharded the same way as the local store
+    return '{}{}/{}{}'.format(REMOTE_PREFIX, sha256[:2], sha256, '.zst' if compression == 'zstd' else '')
+
+
+def get_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def load_manifest(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def ensure_zstd():
+    # Only the SSN and the cluster masters get zstd with their setup, notebooks install it the first time
+    # they fetch compressed objects
+    if shutil.which('zstd'):
+        return
+    from datalab.common_lib import manage_pkg
+    manage_pkg('-y install', 'local', 'zstd')
+    if not shutil.which('zstd'):
+        raise Exception('Unable to install zstd to decompress artifacts')
+
+
+def get_ref_path(target_dir, store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'refs', '{}.json'.format(
+        hashlib.sha256(os.path.abspath(target_dir).encode()).hexdigest()))
+
+
+def add_ref(manifest, target_dir, store_dir=STORE_DIR):
+    # Every target directory records the objects it was materialized from, prune() keeps them while it exists
+    ref_path = get_ref_path(target_dir, store_dir)
+    os.makedirs(os.path.dirname(ref_path), exist_ok=True)
+    tmp_path = '{}.{}.part'.format(ref_path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump({'target_dir': os.path.abspath(target_dir),
+                   'objects': sorted({entry['sha256'] for entry in manifest['files']})}, f)
+    os.replace(tmp_path, ref_path)
+
+
+def prune(store_dir=STORE_DIR):
+    # Cluster directories are removed from the notebook when the cluster is terminated; their refs are dropped
+    # and objects no remaining directory refers to are deleted. Materialized jars are hard links, so files of
+    # existing directories are not affected.
+    refs_dir = os.path.join(store_dir, 'refs')
+    referenced = set()
+    for name in sorted(os.listdir(refs_dir)) if os.path.isdir(refs_dir) else []:
+        if not name.endswith('.json'):
+            continue
+        ref = load_manifest(os.path.join(refs_dir, name))
+        if os.path.isdir(ref['target_dir']):
+            referenced.update(ref['objects'])
+        else:
+            os.remove(os.path.join(refs_dir, name))
+    removed = 0
+    for root, dirs, files in os.walk(os.path.join(store_dir, 'objects')):
+        # Partial downloads have a suffix after the sha256 and belong to a running fetch
+        for name in files:
+            if '.' not in name and name not in referenced:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def fetch_objects(manifest, fetch, store_dir=STORE_DIR):
+    # fetch(object_key, local_path) downloads one object of the bucket; objects already in the store are not requested
+    compression = manifest.get('compression', 'none')
+    missing = sorted({entry['sha256'] for entry in manifest['files']
+                      if not os.path.exists(get_object_path(entry['sha256'], store_dir))})
+    if missing and compression == 'zstd':
+        ensure_zstd()
+
+    def fetch_object(sha256):
+        object_path = get_object_path(sha256, store_dir)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        tmp_path = '{}.{}.part'.format(object_path, os.getpid())
+        try:
+            if compression == 'zstd':
+                fetch(get_object_name(sha256, compression), tmp_path + '.zst')
+                subprocess.run('zstd -d -q -f {0}.zst -o {0}'.format(tmp_path), shell=True, check=True)
+            else:
+                fetch(get_object_name(sha256, compression), tmp_path)
+            if get_sha256(tmp_path) != sha256:
+                raise Exception('Checksum of artifact {} is mismatched'.format(sha256))
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, object_path)
+        finally:
+            for path in (tmp_path, tmp_path + '.zst'):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    datalab.executor.map_concurrently(fetch_object, missing)
+    return len(missing)
+
+
+def materialize(manifest, target_dir, store_dir=STORE_DIR):
+    # Jars are never modified in place, so they are hard-linked from the store; other files (configs, scripts)
+    # are edited after extraction and get their own copy
+    linked = copied = 0
+    for directory in manifest.get('dirs', []):
+        os.makedirs(os.path.join(target_dir, directory), exist_ok=True)
+    for entry in manifest['files']:
+        object_path = get_object_path(entry['sha256'], store_dir)
+        dest = os.path.join(target_dir, entry['path'])
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        if os.path.lexists(dest):
+            if os.path.exists(dest) and os.path.samefile(dest, object_path):
+                continue
+            os.remove(dest)
+        if dest.endswith('.jar'):
+            try:
+                os.link(object_path, dest)
+                linked += 1
+                continue
+            except OSError:
+                pass
+        shutil.copyfile(object_path, dest)
+        os.chmod(dest, entry.get('mode', 0o644))
+        copied += 1
+    return linked, copied
+
+
+def sync(manifest_path, fetch, target_dir, store_dir=STORE_DIR):
+    # The ref is written before pruning, so a sync running at the same time for another directory keeps
+    # the objects this one is about to use
+    manifest = load_manifest(manifest_path)
+    os.makedirs(target_dir, exist_ok=True)
+    add_ref(manifest, target_dir, store_dir)
+    pruned = prune(store_dir)
+    fetched = fetch_objects(manifest, fetch, store_dir)
+    linked, copied = materialize(manifest, target_dir, store_dir)
+    logging.info('Artifacts of {} in {}: {} files, {} fetched, {} linked, {} copied, {} pruned'.format(
+        manifest_path, target_dir, len(manifest['files']), fetched, linked, copied, pruned))
@@ -145,9 +145,12 @@ def install_nginx_lua(edge_ip, nginx_version, keycloak_auth_server_url, keycloak
                 keycloak_client_secret))
 
             datalab.fab.conn.sudo('cp /opt/datalab/templates/nginx.conf /usr/local/openresty/nginx/conf')
+            datalab.fab.conn.sudo('cp /opt/datalab/templates/datalab_routes.conf /usr/local/openresty/nginx/conf')
             datalab.fab.conn.sudo('mkdir /usr/local/openresty/nginx/conf/conf.d')
             datalab.fab.conn.sudo('cp /opt/datalab/templates/conf.d/proxy.conf /usr/local/openresty/nginx/conf/conf.d/')
             datalab.fab.conn.sudo('mkdir /usr/local/openresty/nginx/conf/locations')
+            datalab.fab.conn.sudo('mkdir -p /usr/local/openresty/nginx/conf/lua /usr/local/openresty/nginx/conf/routes')
+            datalab.fab.conn.sudo('cp /opt/datalab/templates/lua/datalab_routes.lua /usr/local/openresty/nginx/conf/lua/')
             datalab.fab.conn.sudo('systemctl start openresty')
             datalab.fab.conn.sudo('touch /tmp/nginx_installed')
             if os.environ['conf_letsencrypt_enabled'] == 'true':
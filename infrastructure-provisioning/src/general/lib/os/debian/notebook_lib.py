@@ -485,6 +485,66 @@ def install_nodejs(os_user):
         datalab.fab.conn.sudo('cp -R .nvm/versions/node/v16.15.0/* /usr/')
         datalab.fab.conn.sudo('touch /home/{}/.ensure_dir/nodejs_ensured'.format(os_user))
 
+def get_installed_os_pkgs():
+    installed = dict()
+    output = datalab.fab.conn.sudo("dpkg-query -W -f='${Package} ${Version} ${db:Status-Abbrev}\\n'", hide=True).stdout
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) == 3 and fields[2].startswith('ii'):
+            installed[fields[0].split(':')[0]] = fields[1]
+    return installed
+
+
+def get_new_os_pkgs(output, new_pkgs_parser):
+    new_pkgs = set()
+    in_section = False
+    for line in output.splitlines():
+        if new_pkgs_parser in line:
+            in_section = True
+        elif in_section and line.startswith(' '):
+            new_pkgs.update(line.split())
+        else:
+            in_section = False
+    return new_pkgs
+
+
+def get_os_pkgs_dependencies(names):
+    # One recursive apt-cache call gives the dependency graph of every requested package
+    graph = dict()
+    current = None
+    output = datalab.fab.conn.sudo('apt-cache depends --recurse --no-recommends --no-suggests --no-conflicts '
+                                   '--no-breaks --no-replaces --no-enhances {} 2>/dev/null'.format(' '.join(names)),
+                                   warn=True, hide=True).stdout
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        if not line[0].isspace():
+            current = line.strip().strip('<>')
+            graph.setdefault(current, set())
+        elif current:
+            dep = line.strip().lstrip('|')
+            if ': ' in dep:
+                dep = dep.split(': ', 1)[1]
+            graph[current].add(dep.strip('<>').split(':')[0])
+    return graph
+
+
+def get_pkg_dependencies(graph, name):
+    deps = set()
+    queue = [name]
+    while queue:
+        for dep in graph.get(queue.pop(), ()):
+            if dep not in deps and dep != name:
+                deps.add(dep)
+                queue.append(dep)
+    return deps
+
+
+def run_os_pkg_install(pkgs, simulate=False):
+    return datalab.fab.conn.sudo('DEBIAN_FRONTEND=noninteractive apt-get -y {0}install --allow-downgrades {1} 2>&1'.format(
+        '-s ' if simulate else '', ' '.join(pkgs)), warn=True).stdout.replace('"', "'")
+
+
 def install_os_pkg(requisites):
     status = list()
     error_parser = "Could not|No matching|Error:|E:|failed|Requires:"
@@ -492,48 +552,55 @@ def install_os_pkg(requisites):
     try:
         print("Updating repositories and installing requested tools: {}".format(requisites))
         manage_pkg('update', 'remote', '')
-        for os_pkg in requisites:
-            name, vers = os_pkg
-            if os_pkg[1] != '' and os_pkg[1] !='N/A':
-                version = os_pkg[1]
-                os_pkg = "{}={}".format(os_pkg[0], os_pkg[1])
-            else:
-                version = 'N/A'
-                os_pkg = os_pkg[0]
-            datalab.fab.conn.sudo('DEBIAN_FRONTEND=noninteractive apt-get -y install --allow-downgrades {0} 2>&1 | '
-                                  'tee /tmp/os_install_{2}.tmp; if ! grep -w -E "({1})" /tmp/os_install_{2}.tmp > '
-                                  '/tmp/os_install_{2}.log; then echo "no_error" > /tmp/os_install_{2}.log;fi'
-                                  .format(os_pkg, error_parser, name))
-            err = datalab.fab.conn.sudo('cat /tmp/os_install_{}.log'.format(name)).stdout.replace('"', "'")
-            datalab.fab.conn.sudo('cat /tmp/os_install_{0}.tmp | if ! grep -w -E -A 30 "({1})" /tmp/os_install_{0}.tmp > '
-                                  '/tmp/os_install_{0}.log; then echo "no_new_pkgs" > /tmp/os_install_{0}.log;fi'
-                                  .format(name, new_pkgs_parser))
-            dep = datalab.fab.conn.sudo('cat /tmp/os_install_{}.log'.format(name)).stdout
-            if 'no_new_pkgs' in dep:
-                dep = []
+        pkgs = dict()
+        for name, vers in requisites:
+            pkgs[name] = "{}={}".format(name, vers) if vers != '' and vers != 'N/A' else name
+        errors = dict()
+        outputs = dict()
+        # A simulated transaction of the whole set reports unknown names and versions without touching the host
+        simulation_errors = grep_output(run_os_pkg_install(pkgs.values(), simulate=True), error_parser)
+        for name in pkgs:
+            pkg_errors = [line for line in simulation_errors
+                          if re.search(r"(?<![\w.+-]){}(?![\w.+-])".format(re.escape(name)), line)]
+            if pkg_errors:
+                errors[name] = pkg_errors
+        batch = [name for name in pkgs if name not in errors]
+        isolated = list()
+        attributed_errors = set(line for pkg_errors in errors.values() for line in pkg_errors)
+        if batch and set(simulation_errors) <= attributed_errors:
+            output = run_os_pkg_install([pkgs[name] for name in batch])
+            if grep_output(output, error_parser):
+                isolated = batch
             else:
-                dep = dep[len(new_pkgs_parser): dep.find(" upgraded, ") - 1].replace('\r', '') \
-                        .replace('\n', '').replace('  ', ' ').strip().split(' ')
-                for n, i in enumerate(dep):
-                    if i == name:
-                        dep[n] = ''
-                    else:
-                        datalab.fab.conn.sudo('apt show {0} 2>&1 | if ! grep Version: > '
-                 '/tmp/os_install_{0}.log; then echo "no_version" > /tmp/os_install_{0}.log;fi'.format(i))
-                        dep[n] = datalab.fab.conn.sudo('cat /tmp/os_install_{}.log'.format(i)).stdout.replace('Version: ', '{} v.'.format(i)).replace('\n', '')
-                dep = [i for i in dep if i]
+                outputs.update({name: output for name in batch})
+        else:
+            isolated = batch
+        # Only packages of a failed transaction are retried one by one to find out which of them is broken
+        for name in isolated:
+            outputs[name] = run_os_pkg_install([pkgs[name]])
+            pkg_errors = grep_output(outputs[name], error_parser)
+            if pkg_errors:
+                errors[name] = pkg_errors
+        installed = get_installed_os_pkgs()
+        new_pkgs = set()
+        for name, output in outputs.items():
+            if name not in errors:
+                new_pkgs.update(get_new_os_pkgs(output, new_pkgs_parser))
+        graph = get_os_pkgs_dependencies([name for name in outputs if name not in errors]) if new_pkgs else dict()
+        for name, vers in requisites:
+            version = vers if vers != '' and vers != 'N/A' else 'N/A'
+            err = '\n'.join(errors.get(name, ['no_error']))
             versions = []
-            datalab.fab.conn.sudo('apt list --installed | if ! grep {0}/ > /tmp/os_install_{0}.list; then  echo "not_installed" > /tmp/os_install_{0}.list;fi'.format(name))
-            res = datalab.fab.conn.sudo('cat /tmp/os_install_{}.list'.format(name)).stdout.replace('\n', '')
-            if "no_error" not in err:
-                status_msg = 'installation_error'
+            dep = list()
+            status_msg = 'installation_error'
+            if name in errors:
                 if 'E: Unable to locate package {}'.format(name) in err:
                     status_msg = 'invalid_name'
-            elif "not_installed" not in res:
-                ansi_escape = re.compile(r'\x1b[^m]*m')
-                ver = ansi_escape.sub('', res).split("\r\n")
-                version = [i for i in ver if os_pkg.split("=")[0] in i][0].split(' ')[1]
+            elif name in installed:
+                version = installed[name]
                 status_msg = "installed"
+                dep = ['{} v.{}'.format(i, installed[i]) for i in
+                       sorted(get_pkg_dependencies(graph, name) & new_pkgs) if i in installed]
             if 'E: Version' in err and 'was not found' in err:
                 versions = datalab.fab.conn.sudo('apt-cache policy {} | grep 500 | grep -v Packages'.format(name)).stdout\
                     .replace('\r\n', '').replace(' 500', '').replace('     ', ' ').replace('***', '').strip().split(' ')
@@ -542,8 +609,6 @@ def install_os_pkg(requisites):
             status.append({"group": "os_pkg", "name": name, "version": version, "status": status_msg,
                            "error_message": err, "add_pkgs": dep, "available_versions": versions})
         datalab.fab.conn.sudo('unattended-upgrades -v')
-        #datalab.fab.conn.sudo('export LC_ALL=C')
-        datalab.fab.conn.sudo('rm /tmp/*{}*'.format(name))
         return status
     except Exception as err:
         for os_pkg in requisites:
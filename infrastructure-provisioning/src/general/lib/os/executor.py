@@ -0,0 +1,159 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import backoff
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datalab.logger import logging
+
+THROTTLING_CODES = ('Throttling', 'ThrottlingException', 'RequestLimitExceeded', 'TooManyRequestsException',
+                    'SlowDown', 'rateLimitExceeded', 'userRateLimitExceeded', 'TooManyRequests')
+
+_buckets = dict()
+_buckets_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def get_max_workers():
+    return int(os.environ.get('conf_api_max_workers', 10))
+
+
+def get_bucket(service, region=''):
+    # Provider quotas are per API and region, so each pair gets its own bucket
+    key = (service, region)
+    with _buckets_lock:
+        if key not in _buckets:
+            _buckets[key] = TokenBucket(float(os.environ.get('conf_api_rate_limit', 20)))
+        return _buckets[key]
+
+
+def is_throttling_error(err):
+    response = getattr(err, 'response', None)
+    if isinstance(response, dict) and response.get('Error', {}).get('Code') in THROTTLING_CODES:
+        return True
+    status = getattr(err, 'status_code', None) or getattr(getattr(err, 'resp', None), 'status', None)
+    if status is not None and int(status) == 429:
+        return True
+    return any(code in str(err) for code in THROTTLING_CODES)
+
+
+def call(func, *args, service='', region='', max_tries=6, **kwargs):
+    @backoff.on_exception(backoff.expo, Exception, max_tries=max_tries, jitter=backoff.full_jitter,
+                          giveup=lambda err: not is_throttling_error(err))
+    def limited_call():
+        if service:
+            get_bucket(service, region).acquire()
+        return func(*args, **kwargs)
+
+    return limited_call()
+
+
+def map_concurrently(func, items, service='', region='', max_workers=None):
+    # Results keep the order of items; the first exception raised by func is re-raised
+    items = list(items)
+    if not items:
+        return []
+    workers = min(max_workers or get_max_workers(), len(items))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(lambda item: call(func, item, service=service, region=region), items))
+
+
+def run_concurrently(tasks, max_workers=None):
+    # tasks is a dict of name -> callable; failed tasks are logged and left out of the result
+    results = dict()
+    if not tasks:
+        return results
+    with ThreadPoolExecutor(max_workers=min(max_workers or get_max_workers(), len(tasks))) as pool:
+        futures = {name: pool.submit(task) for name, task in tasks.items()}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as err:
+                logging.error('Task {} failed: {}'.format(name, str(err)))
+    return results
+
+
+def run_dag(tasks, dependencies=None, max_workers=None):
+    # tasks is a dict of name -> callable and dependencies a dict of name -> names that have to finish first.
+    # Every task starts as soon as its dependencies are done; tasks depending on a failed one are skipped.
+    # When all runnable tasks are finished an exception naming the failed ones is raised.
+    dependencies = dependencies or dict()
+    pending = dict(tasks)
+    running = dict()
+    results = dict()
+    failed = list()
+    if not tasks:
+        return results
+    with ThreadPoolExecutor(max_workers=min(max_workers or get_max_workers(), len(tasks))) as pool:
+        while pending or running:
+            scheduled = True
+            while scheduled:
+                scheduled = False
+                for name in list(pending):
+                    deps = dependencies.get(name, [])
+                    if any(dep in failed for dep in deps):
+                        logging.error('Task {} skipped because of failed dependencies'.format(name))
+                        failed.append(name)
+                    elif all(dep in results for dep in deps):
+                        running[pool.submit(pending[name])] = name
+                    else:
+                        continue
+                    del pending[name]
+                    scheduled = True
+            if not running:
+                for name in pending:
+                    logging.error('Task {} has unresolvable dependencies'.format(name))
+                failed.extend(pending)
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                    logging.info('Task {} finished'.format(name))
+                except (Exception, SystemExit) as err:
+                    logging.error('Task {} failed: {}'.format(name, str(err)))
+                    failed.append(name)
+    if failed:
+        raise Exception('Failed tasks: {}'.format(', '.join(failed)))
+    return results
@@ -19,17 +19,24 @@
 #
 # ******************************************************************************
 
+import base64
 import csv
 import datetime
+import http.client
 import json
 import os
 import random
 import re
+import shutil
 import string
 import sys
+import tempfile
 import time
 import traceback
 import subprocess
+import datalab.result_journal
+import datalab.ssh_pool
+import datalab.waiter
 from datalab.actions_lib import *
 from datalab.common_lib import *
 from datalab.meta_lib import *
@@ -48,22 +55,13 @@ def init_datalab_connection(hostname, username, keyfile, reserve_user='', run_ec
         else:
             users = [username]
         for user in users:
-            attempt = 0
-            while attempt < 15:
-                logging.info('connection attempt {} with user {}'.format(attempt, user))
-                conn = Connection(host=hostname, user=user, connect_kwargs={'banner_timeout': 200,
-                                                                            'key_filename': keyfile})
-                conn.config.run.echo = run_echo
-                try:
-                    conn.run('hostname')
-                    conn.config.run.echo = run_echo
-                    return conn
-                except:
-                    attempt += 1
-                    time.sleep(10)
-        if attempt == 15:
-            logging.info('Unable to establish connection')
-            raise Exception
+            try:
+                conn = datalab.ssh_pool.get_connection(hostname, user, keyfile, run_echo)
+                return conn
+            except Exception as err:
+                logging.info('Unable to connect with user {}: {}'.format(user, str(err)))
+        logging.info('Unable to establish connection')
+        raise Exception
     except Exception as err:
         logging.error('Function init_datalab_connection error:', str(err))
         traceback.print_exc()
@@ -107,6 +105,13 @@ def replace_multi_symbols(string, symbol, symbol_cut=False):
         sys.exit(1)
 
 
+def grep_output(output, pattern, ignore_case=False):
+    # Local equivalent of 'grep -w -E' for command output that was already fetched from the host
+    regex = re.compile(r'(?<!\w)(?:{})(?!\w)'.format(pattern), re.IGNORECASE if ignore_case else 0)
+    ansi_escape = re.compile(r'\x1b[^m]*m')
+    return [line.strip() for line in ansi_escape.sub('', output).splitlines() if regex.search(line)]
+
+
 def append_result(error, exception=''):
     try:
         ts = time.time()
@@ -117,18 +122,7 @@ def append_result(error, exception=''):
         else:
             error_message = "[Error-{}]: {}.".format(st, error)
             logging.error(error_message)
-        with open('/root/result.json', 'a+') as f:
-            text = f.read()
-        if len(text) == 0:
-            res = '{"error": ""}'
-            with open('/root/result.json', 'w') as f:
-                f.write(res)
-        with open("/root/result.json") as f:
-            data = json.load(f)
-        data['error'] = data['error'] + error_message
-        with open("/root/result.json", 'w') as f:
-            json.dump(data, f)
-        logging.error(data)
+        datalab.result_journal.append_error(error, exception)
     except Exception as err:
         logging.error('Function append_result error:', str(err))
         traceback.print_exc()
@@ -425,8 +419,6 @@ def install_venv_pip_pkg(pkg_name, pkg_version=''):
 
 def install_pip_pkg(requisites, pip_version, lib_group, dataengine_service=False):
     status = list()
-    error_parser = "Could not|No matching|ImportError:|failed|EnvironmentError:|requires|FileNotFoundError:|" \
-                   "RuntimeError:|error:"
     try:
         if dataengine_service:
             install_command = pip_version
@@ -435,89 +427,14 @@ def install_pip_pkg(requisites, pip_version, lib_group, dataengine_service=False
         else:
             install_command = 'source /opt/python/python{0}/bin/activate && /opt/python/python{0}/bin/pip{1}'.format(
                 os.environ['notebook_python_venv_version'], os.environ['notebook_python_venv_version'][:3])
-        for pip_pkg in requisites:
-            name, vers = pip_pkg
-            if pip_pkg[1] == '' or pip_pkg[1] == 'N/A':
-                pip_pkg = pip_pkg[0]
-                version = 'N/A'
-            else:
-                version = pip_pkg[1]
-                pip_pkg = "{}=={}".format(pip_pkg[0], pip_pkg[1])
-            conn.sudo(
-                '''bash -l -c '{0} install -U {1} --use-deprecated=legacy-resolver --no-cache-dir 2>&1 | '''
-                '''tee /tmp/{4}_install_{3}.tmp; if ! grep -w -i -E  "({2})" /tmp/{4}_install_{3}.tmp > /tmp/{4}_install_{3}.log; '''
-                '''then  echo "" > /tmp/{4}_install_{3}.log;fi' '''.format(
-                    install_command, pip_pkg, error_parser, name, pip_version))
-            err = conn.sudo('cat /tmp/{0}_install_{1}.log'.format(pip_version, pip_pkg.split("==")[0])).stdout.replace(
-                '"', "'").replace('\n', ' ')
-            conn.sudo(
-                '''bash -l -c '{0} freeze --all | if ! grep -w -i {1} > /tmp/{2}_install_{1}.list; '''
-                '''then  echo "not_found" > /tmp/{2}_install_{1}.list;fi' '''.format(
-                    install_command, name, pip_version))
-            res = conn.sudo('''bash -l -c 'cat /tmp/{0}_install_{1}.list' '''.format(pip_version, name)).stdout.replace(
-                '\n', '')
-            conn.sudo(
-                '''bash -l -c 'cat /tmp/{0}_install_{1}.tmp | if ! grep -w -i -E "(Successfully installed|up-to-date)" > '''
-                '''/tmp/{0}_install_{1}.list; then  echo "not_installed" > /tmp/{0}_install_{1}.list;fi' '''.format(
-                    pip_version, name))
-            installed_out = conn.sudo(
-                '''bash -l -c 'cat /tmp/{0}_install_{1}.list' '''.format(pip_version, name)).stdout.replace('\n', '')
-            changed_pip_pkg = False
-            if 'not_found' in res:
-                changed_pip_pkg = pip_pkg.split("==")[0].replace("_", "-").split('-')
-                changed_pip_pkg = changed_pip_pkg[0]
-                conn.sudo(
-                    '''bash -l -c '{0} freeze --all | if ! grep -w -i {1} > /tmp/{2}_install_{1}.list; then  echo "" > '''
-                    '''/tmp/{2}_install_{1}.list;fi' '''.format(
-                        install_command, changed_pip_pkg, pip_version))
-                res = conn.sudo('cat /tmp/{0}_install_{1}.list'.format(pip_version, changed_pip_pkg)).stdout.replace(
-                    '\n', '')
-            if err and name not in installed_out:
-                status_msg = 'installation_error'
-                if 'ERROR: No matching distribution found for {}'.format(name) in err:
-                    status_msg = 'invalid_name'
-            elif res:
-                res = res.lower()
-                ansi_escape = re.compile(r'\x1b[^m]*m')
-                ver = ansi_escape.sub('', res).split("\r\n")
-                if changed_pip_pkg:
-                    version = [i for i in ver if changed_pip_pkg.lower() in i][0].split('==')[1]
-                else:
-                    version = \
-                        [i for i in ver if pip_pkg.split("==")[0].lower() in i][0].split('==')[1]
-                status_msg = "installed"
-            versions = []
-            if 'Could not find a version that satisfies the requirement' in err \
-                    and 'ERROR: No matching distribution found for {}=='.format(name) in err:
-                versions = err[err.find("(from versions: ") + 16: err.find(") ")]
-                if versions != '' and versions != 'none':
-                    versions = versions.split(', ')
-                    version = vers
-                    status_msg = 'invalid_version'
-                else:
-                    versions = []
-
-            conn.sudo('cat /tmp/{0}_install_{1}.tmp | if ! grep -w -i -E  "Installing collected packages:" > '
-                      '/tmp/{0}_install_{1}.dep; then  echo "" > /tmp/{0}_install_{1}.dep;fi'.format(pip_version, name))
-            dep = conn.sudo('cat /tmp/{0}_install_{1}.dep'.format(pip_version, name)).stdout.replace('\n', '').strip()[
-                  31:]
-            if dep == '':
-                dep = []
-            else:
-                dep = dep.split(', ')
-                for n, i in enumerate(dep):
-                    if i == name:
-                        dep[n] = ''
-                    else:
-                        conn.sudo('{0} show {1} 2>&1 | if ! grep Version: > '
-                                  '/tmp/{0}_install_{1}.log; then echo "" > /tmp/{0}_install_{1}.log;fi'.format(
-                            pip_version, i))
-                        dep[n] = conn.sudo('cat /tmp/{0}_install_{1}.log'.format(
-                            pip_version, i)).stdout.replace('\n', '').replace('Version: ', '{} v.'.format(i))
-                dep = [i for i in dep if i]
-            status.append({"group": lib_group, "name": name, "version": version, "status": status_msg,
-                           "error_message": err, "available_versions": versions, "add_pkgs": dep})
-            conn.sudo('rm -rf /tmp/*{}*'.format(name))
+        # All packages are installed by one helper run on the host, which reports every status as JSON
+        helper = '/tmp/{}_install_pip_pkgs.py'.format(pip_version)
+        conn.put('/root/scripts/install_pip_pkgs.py', helper)
+        pkgs = base64.b64encode(json.dumps([list(pip_pkg) for pip_pkg in requisites]).encode()).decode()
+        output = conn.sudo('python3 {0} --install_command "{1}" --pkgs {2} --lib_group {3}'.format(
+            helper, install_command, pkgs, lib_group)).stdout
+        conn.sudo('rm -f {}'.format(helper))
+        status = json.loads(output.strip().splitlines()[-1])
         return status
     except Exception as err:
         for pip_pkg in requisites:
@@ -614,19 +531,39 @@ def install_r_pkg(requisites):
         return status
 
 
-def update_spark_jars(jars_dir='/opt/jars'):
+def get_jars_manifest(jars_dir='/opt/jars', rebuild=False):
+    manifest = '{}/.jars_manifest'.format(jars_dir)
+    # Jars are also written to the directory by other install paths; adding, removing or renaming one updates
+    # the mtime of its directory, so the manifest is rebuilt whenever a directory is newer than the manifest
+    if rebuild or conn.sudo('''bash -c '[ -f {1} ] && [ -z "$(find {0} -type d -newer {1} -print -quit)" ] || '''
+                            '''echo stale' '''.format(jars_dir, manifest)).stdout.strip():
+        conn.sudo('find {0} -name "*.jar" > {1}'.format(jars_dir, manifest))
+    return [jar for jar in conn.sudo('cat {}'.format(manifest)).stdout.replace('\r', '').split('\n') if jar]
+
+
+def add_to_jars_manifest(jars, jars_dir='/opt/jars'):
+    all_jars = get_jars_manifest(jars_dir)
+    all_jars.extend(jar for jar in jars if jar not in all_jars)
+    conn.sudo('''bash -c 'echo "{0}" > {1}/.jars_manifest' '''.format('\n'.join(all_jars), jars_dir))
+    return all_jars
+
+
+def update_spark_jars(jars_dir='/opt/jars', all_jars=None):
     try:
         configs = conn.sudo('find /opt/ /etc/ /usr/lib/ -name spark-defaults.conf -type f').stdout.split('\n')
         if exists(conn, jars_dir):
+            # Without an explicit list the jars directory is scanned once and the manifest is refreshed
+            if all_jars is None:
+                all_jars = get_jars_manifest(jars_dir, rebuild=True)
             for conf in filter(None, configs):
                 des_path = ''
-                all_jars = conn.sudo('find {0} -name "*.jar"'.format(jars_dir)).stdout.split('\n')
+                conf_jars = list(all_jars)
                 if ('-des-' in conf):
                     des_path = '/'.join(conf.split('/')[:3])
-                    all_jars = find_des_jars(all_jars, des_path)
+                    conf_jars = find_des_jars(conf_jars, des_path)
                 conn.sudo('''sed -i '/^# Generated\|^spark.jars/d' {0}'''.format(conf))
                 conn.sudo(''' bash -l -c 'echo "# Generated spark.jars by DataLab from {0}\nspark.jars {1}" >> {2}' '''
-                          .format(','.join(filter(None, [jars_dir, des_path])), ','.join(all_jars), conf))
+                          .format(','.join(filter(None, [jars_dir, des_path])), ','.join(conf_jars), conf))
                 # conn.sudo("sed -i 's/^[[:space:]]*//' {0}".format(conf))
         else:
             logging.info("Can't find directory {0} with jar files".format(jars_dir))
@@ -636,18 +573,30 @@ def update_spark_jars(jars_dir='/opt/jars'):
         sys.exit(1)
 
 
+def clean_ivy_cache(ivy_cache_dir):
+    # Whole module directories are evicted, first by age and then the oldest ones until the cache fits its size limit
+    max_age = os.environ.get('notebook_ivy_cache_max_age', '30')
+    max_size = os.environ.get('notebook_ivy_cache_max_size', '2048')
+    conn.sudo('find {0} -mindepth 2 -maxdepth 2 -type d -mtime +{1} -exec rm -rf {{}} +'.format(ivy_cache_dir, max_age))
+    conn.sudo('''bash -c 'for dir in $(find {0} -mindepth 2 -maxdepth 2 -type d -printf "%T@ %p\\n" | sort -n | '''
+              '''cut -d " " -f2); do [ $(du -sm {0} | cut -f1) -le {1} ] && break; rm -rf $dir; done' '''.format(
+               ivy_cache_dir, max_size))
+
+
 def install_java_pkg(requisites):
     status = list()
     error_parser = "ERROR|error|No such|no such|Please run|requires|module not found|Exception"
     templates_dir = '/root/templates/'
     ivy_dir = '/opt/ivy'
     ivy_cache_dir = '{0}/cache/'.format(ivy_dir)
+    ivy_retrieve_dir = '{0}/retrieve'.format(ivy_dir)
     ivy_settings = 'ivysettings.xml'
+    logs_dir = '/tmp/ivy_install'
     dest_dir = '/opt/jars/java'
     try:
         ivy_jar = conn.sudo('find /opt /usr -name "*ivy-{0}.jar" | head -n 1'.format(
             os.environ['notebook_ivy_version'])).stdout.replace('\n', '')
-        conn.sudo('mkdir -p {0} {1}'.format(ivy_dir, dest_dir))
+        conn.sudo('mkdir -p {0} {1} {2}'.format(ivy_dir, ivy_cache_dir, dest_dir))
         conn.put('{0}{1}'.format(templates_dir, ivy_settings), '/tmp/{}'.format(ivy_settings))
         conn.sudo('cp -f /tmp/{1} {0}/{1}'.format(ivy_dir, ivy_settings))
         proxy_string = conn.sudo('cat /etc/profile | grep http_proxy | cut -f2 -d"="').stdout.replace('\n', '')
@@ -655,29 +604,50 @@ def install_java_pkg(requisites):
         proxy_find = re.search(proxy_re, proxy_string)
         java_proxy = "export _JAVA_OPTIONS='-Dhttp.proxyHost={0} -Dhttp.proxyPort={1} \
             -Dhttps.proxyHost={0} -Dhttps.proxyPort={1}'".format(proxy_find.group('host'), proxy_find.group('port'))
-        for java_pkg in requisites:
-            conn.sudo('rm -rf {0}'.format(ivy_cache_dir))
-            conn.sudo('mkdir -p {0}'.format(ivy_cache_dir))
-            group, artifact, version, override = java_pkg
+        # The cache is kept between installs, so transitive dependencies shared by packages are downloaded once
+        clean_ivy_cache(ivy_cache_dir)
+        # Every coordinate is resolved by its own Ivy process in parallel and retrieved into its own directory,
+        # the artifact-lock strategy in ivysettings.xml keeps the shared cache consistent
+        script = ['#!/bin/bash', java_proxy,
+                  'install() {{ java -jar {0} -settings {1}/{2} -cache {3} -dependency $1 $2 $3 -types jar bundle '
+                  '-retrieve "{4}/$1_$2/[artifact]-[revision](-[classifier]).[ext]" > {5}/$1_$2.log 2>&1; }}'.format(
+                      ivy_jar, ivy_dir, ivy_settings, ivy_cache_dir, ivy_retrieve_dir, logs_dir),
+                  'export -f install',
+                  'rm -rf {0} {1}; mkdir -p {0} {1}'.format(ivy_retrieve_dir, logs_dir),
+                  "xargs -P {} -n 3 bash -c 'install $0 $1 $2' <<EOF".format(
+                      os.environ.get('notebook_ivy_max_workers', '4'))]
+        for group, artifact, version, override in requisites:
             logging.info("Installing package (override: {3}): {0}:{1}:{2}".format(group, artifact, version, override))
-            conn.sudo(
-                '''bash -c "{8}; java -jar {0} -settings {1}/{2} -cache {3} -dependency {4} {5} {6} 2>&1 | tee /tmp/install_{5}.tmp; if ! grep -w -E  \\"({7})\\" /tmp/install_{5}.tmp > /tmp/install_{5}.log; then echo \\"\\" > /tmp/install_{5}.log;fi" '''.format(
-                    ivy_jar, ivy_dir, ivy_settings, ivy_cache_dir, group, artifact, version, error_parser, java_proxy))
-            err = conn.sudo('cat /tmp/install_{0}.log'.format(artifact)).stdout.replace('"', "'").strip()
-            conn.sudo('find {0} -name "{1}*.jar" | head -n 1 | rev | cut -f1 -d "/" | rev | \
-                if ! grep -w -i {1} > /tmp/install_{1}.list; then echo "" > /tmp/install_{1}.list;fi'.format(
-                ivy_cache_dir, artifact))
-            res = conn.sudo('cat /tmp/install_{0}.list'.format(artifact)).stdout.replace('\n', '')
-            if res:
-                conn.sudo('cp -f $(find {0} -name "*.jar" | xargs) {1}'.format(ivy_cache_dir, dest_dir))
+            script.append('{} {} {}'.format(group, artifact, version))
+        script.append('EOF')
+        with open('/tmp/ivy_install.sh', 'w') as f:
+            f.write('\n'.join(script) + '\n')
+        conn.put('/tmp/ivy_install.sh', '/tmp/ivy_install.sh')
+        # xargs exits 123 when any of the resolves fails, the retrieve directories and logs below decide per package
+        conn.sudo('bash /tmp/ivy_install.sh', warn=True)
+        errors = conn.sudo('grep -w -E -H "({0})" {1}/*.log || true'.format(error_parser, logs_dir)).stdout
+        retrieved = conn.sudo('find {0} -name "*.jar"'.format(ivy_retrieve_dir)).stdout.replace('\r', '').split('\n')
+        new_jars = list()
+        copy_dirs = list()
+        for group, artifact, version, override in requisites:
+            pkg_dir = '{0}/{1}_{2}/'.format(ivy_retrieve_dir, group, artifact)
+            jars = [jar for jar in retrieved if jar.startswith(pkg_dir)]
+            if [jar for jar in jars if jar[len(pkg_dir):].lower().startswith(artifact.lower())]:
+                copy_dirs.append(pkg_dir)
+                new_jars.extend('{0}/{1}'.format(dest_dir, jar[len(pkg_dir):]) for jar in jars)
                 status.append({"group": "java", "name": "{0}:{1}".format(group, artifact), "version": version,
                                "status": "installed"})
             else:
+                err = ' '.join(line.split(':', 1)[1] for line in errors.replace('\r', '').split('\n')
+                               if line.startswith('{0}/{1}_{2}.log:'.format(logs_dir, group, artifact)))
                 status.append(
                     {"group": "java", "name": "{0}:{1}".format(group, artifact), "status": "installation_error",
-                     "error_message": err})
-        update_spark_jars()
-        conn.sudo('rm -rf /tmp/*{}*'.format(artifact))
+                     "error_message": err.replace('"', "'").strip()})
+        if copy_dirs:
+            # Only jars that are not in place yet are copied and appended to the manifest used for spark.jars
+            conn.sudo('cp -u {0} {1}'.format(' '.join('{}*.jar'.format(i) for i in copy_dirs), dest_dir))
+            update_spark_jars(all_jars=add_to_jars_manifest(new_jars))
+        conn.sudo('rm -rf {0} {1} /tmp/ivy_install.sh'.format(ivy_retrieve_dir, logs_dir))
         return status
     except Exception as err:
         for java_pkg in requisites:
@@ -773,29 +743,26 @@ def install_ungit(os_user, notebook_name, edge_ip):
         sys.exit(1)
 
 
-def install_inactivity_checker(os_user, ip_address, rstudio=False):
+def install_inactivity_checker(os_user, ip_address):
+    # The agent reads spark.master of sparklyr drivers from their UI, so RStudio needs no separate checker
     if not exists(conn, '/home/{}/.ensure_dir/inactivity_ensured'.format(os_user)):
         try:
             if not exists(conn, '/opt/inactivity'):
                 conn.sudo('mkdir /opt/inactivity')
             conn.put('/root/templates/inactive.service', '/tmp/inactive.service')
             conn.sudo('cp /tmp/inactive.service /etc/systemd/system/inactive.service')
-            conn.put('/root/templates/inactive.timer', '/tmp/inactive.timer')
-            conn.sudo('cp /tmp/inactive.timer /etc/systemd/system/inactive.timer')
-            if rstudio:
-                conn.put('/root/templates/inactive_rs.sh', '/tmp/inactive.sh')
-                conn.sudo('cp /tmp/inactive.sh /opt/inactivity/inactive.sh')
-            else:
-                conn.put('/root/templates/inactive.sh', '/tmp/inactive.sh')
-                conn.sudo('cp /tmp/inactive.sh /opt/inactivity/inactive.sh')
-            conn.sudo("sed -i 's|IP_ADRESS|{}|g' /opt/inactivity/inactive.sh".format(ip_address))
-            conn.sudo("chmod 755 /opt/inactivity/inactive.sh")
+            conn.put('/root/templates/inactivity_agent.py', '/tmp/inactivity_agent.py')
+            conn.sudo('cp /tmp/inactivity_agent.py /opt/inactivity/inactivity_agent.py')
+            conn.sudo("sed -i 's|IP_ADRESS|{}|g' /etc/systemd/system/inactive.service".format(ip_address))
+            conn.sudo("chmod 755 /opt/inactivity/inactivity_agent.py")
             conn.sudo("chown root:root /etc/systemd/system/inactive.service")
-            conn.sudo("chown root:root /etc/systemd/system/inactive.timer")
             conn.sudo('''bash -l -c "date +%s > /opt/inactivity/local_inactivity" ''')
+            # Images of older notebooks still have the timer driven shell checker
+            conn.sudo('systemctl disable --now inactive.timer 2>/dev/null; rm -f /etc/systemd/system/inactive.timer '
+                      '/opt/inactivity/inactive.sh')
             conn.sudo('systemctl daemon-reload')
-            conn.sudo('systemctl enable inactive.timer')
-            conn.sudo('systemctl start inactive.timer')
+            conn.sudo('systemctl enable inactive.service')
+            conn.sudo('systemctl restart inactive.service')
             conn.sudo('touch /home/{}/.ensure_dir/inactive_ensured'.format(os_user))
         except Exception as err:
             logging.error('Function install_inactivity_checker error:', str(err))
@@ -803,6 +770,24 @@ def install_inactivity_checker(os_user, ip_address, rstudio=False):
             sys.exit(1)
 
 
+def get_inactivity_timestamps(connection):
+    # Last activity of the notebook ("local") and of every Data Engine, as published by the inactivity agent.
+    # Notebooks provisioned before the agent only have the *_inactivity files, they are read by the same command.
+    output = connection.sudo('cat /opt/inactivity/inactivity.json 2>/dev/null || '
+                             'grep -H "" /opt/inactivity/*_inactivity 2>/dev/null; true').stdout
+    if output.strip().startswith('{'):
+        try:
+            return json.loads(output).get('last_activity', {})
+        except ValueError:
+            return {}
+    timestamps = dict()
+    for line in output.splitlines():
+        path, _, value = line.partition(':')
+        if path.endswith('_inactivity') and value.strip().isdigit():
+            timestamps[os.path.basename(path)[:-len('_inactivity')]] = int(value)
+    return timestamps
+
+
 def get_spark_memory(creds=False, os_user='', hostname='', keyfile=''):
     try:
         if creds:
@@ -865,13 +850,16 @@ def configure_data_engine_service_livy(hostname, os_user, keyfile):
         sys.exit(1)
 
 
-def remove_rstudio_dataengines_kernel(cluster_name, os_user):
+def remove_rstudio_dataengines_kernel(cluster_name, os_user, connection=None):
+    # The connection and a private temp folder may be passed, so notebooks can be cleaned up concurrently
+    connection = connection or conn
+    local_dir = tempfile.mkdtemp()
     try:
         cluster_re = ['-{}"'.format(cluster_name),
                       '-{}-'.format(cluster_name),
                       '-{}/'.format(cluster_name)]
-        conn.get('/home/{}/.Rprofile'.format(os_user), 'Rprofile')
-        data = open('Rprofile').read()
+        connection.get('/home/{}/.Rprofile'.format(os_user), os.path.join(local_dir, 'Rprofile'))
+        data = open(os.path.join(local_dir, 'Rprofile')).read()
         conf = filter(None, data.split('\n'))
         # Filter config from any math of cluster_name in line,
         # separated by defined symbols to avoid partly matches
@@ -884,12 +872,12 @@ def remove_rstudio_dataengines_kernel(cluster_name, os_user):
         active_cluster = conf[last_spark].split('"')[-2] if last_spark != 0 else None
         conf = conf[:last_spark] + [conf[l][1:] for l in range(last_spark, len(conf)) if conf[l].startswith("#")] \
                + [conf[l] for l in range(last_spark, len(conf)) if not conf[l].startswith('#')]
-        with open('.Rprofile', 'w') as f:
+        with open(os.path.join(local_dir, '.Rprofile'), 'w') as f:
             for line in conf:
                 f.write('{}\n'.format(line))
-        conn.put('.Rprofile', '/home/{}/.Rprofile'.format(os_user))
-        conn.get('/home/{}/.Renviron'.format(os_user), 'Renviron')
-        data = open('Renviron').read()
+        connection.put(os.path.join(local_dir, '.Rprofile'), '/home/{}/.Rprofile'.format(os_user))
+        connection.get('/home/{}/.Renviron'.format(os_user), os.path.join(local_dir, 'Renviron'))
+        data = open(os.path.join(local_dir, 'Renviron')).read()
         conf = filter(None, data.split('\n'))
         comment_all = lambda x: x if x.startswith('#') else '#{}'.format(x)
         conf = [comment_all(i) for i in conf]
@@ -902,18 +890,118 @@ def remove_rstudio_dataengines_kernel(cluster_name, os_user):
         else:
             last_spark = max([conf.index(i) for i in conf if 'SPARK_HOME' in i])
             conf = conf[:last_spark] + [conf[l][1:] for l in range(last_spark, len(conf)) if conf[l].startswith("#")]
-        with open('.Renviron', 'w') as f:
+        with open(os.path.join(local_dir, '.Renviron'), 'w') as f:
             for line in conf:
                 f.write('{}\n'.format(line))
-        conn.put('.Renviron', '/home/{}/.Renviron'.format(os_user))
+        connection.put(os.path.join(local_dir, '.Renviron'), '/home/{}/.Renviron'.format(os_user))
         if len(conf) == 1:
-            conn.sudo('rm -f /home/{}/.ensure_dir/rstudio_dataengine_ensured'.format(os_user))
-            conn.sudo('rm -f /home/{}/.ensure_dir/rstudio_dataengine-service_ensured'.format(os_user))
-        conn.sudo('''R -e "source('/home/{}/.Rprofile')"'''.format(os_user))
+            connection.sudo('rm -f /home/{}/.ensure_dir/rstudio_dataengine_ensured'.format(os_user))
+            connection.sudo('rm -f /home/{}/.ensure_dir/rstudio_dataengine-service_ensured'.format(os_user))
+        connection.sudo('''R -e "source('/home/{}/.Rprofile')"'''.format(os_user))
     except Exception as err:
         logging.error('Function remove_rstudio_dataengines_kernel error:', str(err))
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+
+def get_kernel_cleanup_max_workers():
+    return int(os.environ.get('conf_kernel_cleanup_max_workers', 10))
+
+
+def is_zeppelin_up(host):
+    try:
+        connection = http.client.HTTPConnection(host, 8080, timeout=10)
+        connection.request('GET', '/api/version')
+        status = connection.getresponse().status
+        connection.close()
+        return status == 200
+    except (OSError, http.client.HTTPException):
+        return False
+
+
+def wait_for_zeppelin(host, timeout=None):
+    # The REST API answers only when Zeppelin is ready, an open port alone does not mean that
+    datalab.waiter.wait_until(lambda: is_zeppelin_up(host), 'zeppelin_restart', timeout, initial_interval=2,
+                              max_interval=10)
+
+
+def remove_zeppelin_interpreters(host, cluster_names):
+    # One listing for all clusters, the deletes reuse its keep-alive connection. Returns the number of removed
+    # interpreters.
+    connection = http.client.HTTPConnection(host, 8080, timeout=60)
+    try:
+        connection.request('GET', '/api/interpreter/setting')
+        response = connection.getresponse()
+        interpreters = json.loads(response.read())['body']
+        removed = 0
+        for interpreter in interpreters:
+            if any(cluster_name in interpreter['name'] for cluster_name in cluster_names):
+                print("Interpreter with ID: {} and name: {} will be removed from zeppelin!".format(
+                    interpreter['id'], interpreter['name']))
+                connection.request('DELETE', '/api/interpreter/setting/' + interpreter['id'])
+                response = connection.getresponse()
+                print(response.read())
+                if response.status != 200:
+                    raise Exception('Unable to remove interpreter {}: HTTP {}'.format(interpreter['name'],
+                                                                                      response.status))
+                removed += 1
+        return removed
+    finally:
+        connection.close()
+
+
+def remove_cluster_kernels(host, os_user, key_path, clusters, computational_name):
+    # clusters is a list of {'name', 'dir', 'type'} with type dataengine or dataengine-service; 'reset_spark'
+    # set to False keeps the Livy server and SPARK_HOME of Zeppelin. Zeppelin is restarted once, and only when
+    # the cleanup changed it.
+    connection = datalab.ssh_pool.get_connection(host, os_user, key_path)
+    connection.sudo('rm -rf {}'.format(' '.join('/home/{}/.local/share/jupyter/kernels/*_{}'.format(
+        os_user, cluster['name']) for cluster in clusters)))
+    zeppelin_clusters = [cluster for cluster in clusters if exists(
+        connection, '/home/{}/.ensure_dir/{}_{}_interpreter_ensured'.format(os_user, cluster['type'], cluster['name']))]
+    if zeppelin_clusters:
+        env_changed = False
+        for cluster in zeppelin_clusters:
+            if not cluster.get('reset_spark', True):
+                continue
+            if os.environ['notebook_multiple_clusters'] == 'true':
+                try:
+                    livy_port = connection.sudo("cat " + cluster['dir'] + "livy/conf/livy.conf | grep "
+                                                "livy.server.port | tail -n 1 | awk '{printf $3}'").stdout.replace('\n', '')
+                    process_number = connection.sudo("netstat -natp 2>/dev/null | grep ':" + livy_port +
+                                                     "' | awk '{print $7}' | sed 's|/.*||g'").stdout.replace('\n', '')
+                    connection.sudo('kill -9 ' + process_number)
+                    connection.sudo('systemctl disable livy-server-' + livy_port)
+                except:
+                    print("Wasn't able to find Livy server for cluster {}!".format(cluster['name']))
+            if connection.sudo('grep -q "^export SPARK_HOME=/opt/spark$" /opt/zeppelin/conf/zeppelin-env.sh; echo $?'
+                               ).stdout.strip() != '0':
+                connection.sudo('sed -i \"s/^export SPARK_HOME.*/export SPARK_HOME=\/opt\/spark/\" '
+                                '/opt/zeppelin/conf/zeppelin-env.sh')
+                env_changed = True
+        connection.sudo('rm -rf {}'.format(' '.join('/home/{}/.ensure_dir/{}_interpreter_ensure'.format(
+            os_user, cluster_type) for cluster_type in {cluster['type'] for cluster in zeppelin_clusters})))
+        removed = remove_zeppelin_interpreters(host, [cluster['name'] for cluster in zeppelin_clusters])
+        if removed or env_changed:
+            connection.sudo('chown {0}:{0} -R /opt/zeppelin/'.format(os_user))
+            connection.sudo('systemctl daemon-reload')
+            connection.sudo('systemctl restart zeppelin-notebook')
+            wait_for_zeppelin(host)
+        else:
+            print('Zeppelin on {} has no interpreters of the clusters, not restarting it'.format(host))
+        connection.sudo('rm -rf {}'.format(' '.join('/home/{}/.ensure_dir/{}_{}_interpreter_ensured'.format(
+            os_user, cluster['type'], cluster['name']) for cluster in zeppelin_clusters)))
+    for cluster_type in sorted({cluster['type'] for cluster in clusters}):
+        if computational_name and exists(connection, '/home/{}/.ensure_dir/rstudio_{}_ensured'.format(
+                os_user, cluster_type)):
+            remove_rstudio_dataengines_kernel(computational_name, os_user, connection)
+            break
+    connection.sudo('rm -rf {}'.format(' '.join(sorted({cluster['dir'] for cluster in clusters}))))
+    print("Notebook's {} kernels were removed".format(host))
+    return connection
+
 
 #following function should be checked if it needed
 def configure_data_engine_service_pip(hostname, os_user, keyfile, emr=False):
@@ -0,0 +1,103 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import fcntl
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datalab.logger import logging
+
+# /response is shared by every provisioning container, so the catalog outlives a single request
+CATALOG_PATH = '/response/.libs_catalog.db'
+
+
+def get_ttl():
+    return int(os.environ.get('conf_libs_catalog_ttl', 86400))
+
+
+def connect(path=CATALOG_PATH):
+    db = sqlite3.connect(path, timeout=60)
+    db.execute('CREATE TABLE IF NOT EXISTS catalogs (key TEXT PRIMARY KEY, updated REAL)')
+    # Rows are clustered by (key, name), which keeps every catalog sorted by name
+    db.execute('CREATE TABLE IF NOT EXISTS packages (key TEXT, name TEXT, version TEXT, '
+               'PRIMARY KEY (key, name)) WITHOUT ROWID')
+    return db
+
+
+@contextmanager
+def refresh_lock(key, path=CATALOG_PATH):
+    # Requests of notebooks from the same template wait for one refresh instead of all hitting the network
+    with open('{}.{}.lock'.format(path, key.replace('/', '_')), 'w') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def get_updated(db, key):
+    row = db.execute('SELECT updated FROM catalogs WHERE key = ?', (key,)).fetchone()
+    return row[0] if row else None
+
+
+def read(db, key):
+    return dict(db.execute('SELECT name, version FROM packages WHERE key = ? ORDER BY name', (key,)))
+
+
+def store(db, key, pkgs):
+    # Only the difference to the previous snapshot is written
+    current = read(db, key)
+    removed = [(key, name) for name in current if name not in pkgs]
+    changed = [(key, name, version) for name, version in pkgs.items() if current.get(name) != version]
+    with db:
+        db.executemany('DELETE FROM packages WHERE key = ? AND name = ?', removed)
+        db.executemany('INSERT OR REPLACE INTO packages (key, name, version) VALUES (?, ?, ?)', changed)
+        db.execute('INSERT OR REPLACE INTO catalogs (key, updated) VALUES (?, ?)', (key, time.time()))
+    logging.info('Catalog {}: {} packages, {} added or changed, {} removed'.format(
+        key, len(pkgs), len(changed), len(removed)))
+
+
+def get_catalog(key, loader, ttl=None, path=CATALOG_PATH):
+    # Returns the cached list while it is younger than ttl, otherwise refreshes it with loader();
+    # a failed refresh falls back to the stale list if there is one
+    ttl = get_ttl() if ttl is None else ttl
+    db = connect(path)
+    try:
+        updated = get_updated(db, key)
+        if updated is not None and time.time() - updated < ttl:
+            logging.info('Catalog {} served from cache'.format(key))
+            return read(db, key)
+        with refresh_lock(key, path):
+            updated = get_updated(db, key)
+            if updated is not None and time.time() - updated < ttl:
+                return read(db, key)
+            try:
+                pkgs = loader()
+            except (Exception, SystemExit) as err:
+                if updated is None:
+                    raise
+                logging.error('Failed to refresh catalog {}, using cached one: {}'.format(key, str(err)))
+                return read(db, key)
+            store(db, key, pkgs)
+            return pkgs
+    finally:
+        db.close()
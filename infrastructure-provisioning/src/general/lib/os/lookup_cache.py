@@ -0,0 +1,142 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Memoization of the meta_lib lookups (IDs and addresses of VPCs, subnets, security groups, instances, images).
+# Results are stored per request on disk, so every script of a request shares them, expire after a TTL and are
+# dropped by the actions which create, change or remove resources. Empty results are never stored: a resource
+# which does not exist yet is usually created next.
+
+import atexit
+import functools
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datalab.logger import logging
+
+counters = dict()
+_counters_lock = threading.Lock()
+
+
+def get_ttl():
+    return int(os.environ.get('conf_lookup_cache_ttl', 300))
+
+
+def get_store_path():
+    return '/tmp/datalab_lookup_cache_{}.db'.format(os.environ.get('request_id', 'local'))
+
+
+def connect():
+    db = sqlite3.connect(get_store_path(), timeout=60)
+    db.execute('CREATE TABLE IF NOT EXISTS lookups (key TEXT PRIMARY KEY, value BLOB, updated REAL)')
+    return db
+
+
+def count(name, counter):
+    with _counters_lock:
+        counters.setdefault(name, {'hits': 0, 'misses': 0})[counter] += 1
+
+
+def get_key(name, args, kwargs):
+    return '{}:{}'.format(name, json.dumps([args, sorted(kwargs.items())], default=str))
+
+
+def lookup(name, args, kwargs, loader):
+    ttl = get_ttl()
+    if ttl <= 0:
+        return loader()
+    key = get_key(name, args, kwargs)
+    try:
+        db = connect()
+    except sqlite3.Error as err:
+        logging.error('Lookup cache is not available: {}'.format(str(err)))
+        return loader()
+    try:
+        row = db.execute('SELECT value, updated FROM lookups WHERE key = ?', (key,)).fetchone()
+        if row is not None and time.time() - row[1] < ttl:
+            count(name, 'hits')
+            return pickle.loads(row[0])
+        count(name, 'misses')
+        value = loader()
+        if value:
+            try:
+                with db:
+                    db.execute('INSERT OR REPLACE INTO lookups (key, value, updated) VALUES (?, ?, ?)',
+                               (key, pickle.dumps(value), time.time()))
+            except (sqlite3.Error, pickle.PicklingError, TypeError, AttributeError) as err:
+                logging.error('Unable to cache result of {}: {}'.format(name, str(err)))
+        return value
+    finally:
+        db.close()
+
+
+def cached(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return lookup(func.__qualname__, args, kwargs, lambda: func(*args, **kwargs))
+    return wrapper
+
+
+def cached_method(func):
+    # self is left out of the key, every instance of a meta class looks at the same resources
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return lookup(func.__qualname__, args, kwargs, lambda: func(self, *args, **kwargs))
+    return wrapper
+
+
+def invalidate():
+    try:
+        db = connect()
+        try:
+            with db:
+                db.execute('DELETE FROM lookups')
+        finally:
+            db.close()
+    except sqlite3.Error as err:
+        logging.error('Unable to invalidate lookup cache: {}'.format(str(err)))
+
+
+def invalidates(func):
+    # The store is dropped even if the action fails halfway, it may have changed resources already
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate()
+    return wrapper
+
+
+def remove_store():
+    for path in (get_store_path(), get_store_path() + '-journal'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@atexit.register
+def log_stats():
+    with _counters_lock:
+        stats = sorted(counters.items())
+    for name, item in stats:
+        logging.info('Lookup cache of {}: {} hits, {} misses'.format(name, item['hits'], item['misses']))
@@ -0,0 +1,137 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Client of the route registry of the edge reverse proxy (project/templates/lua/datalab_routes.lua). Every
+# notebook or cluster is a group of routes which is persisted on the edge and pushed to the local admin API,
+# so nginx does not need a reload.
+
+import datalab.ssh_pool
+import json
+import os
+import time
+from datalab.logger import logging
+
+ADMIN_URL = 'http://127.0.0.1:8090/routes'
+# conf/routes of the OpenResty (debian) and the nginx (redhat) prefix
+ROUTES_DIRS = ['/usr/local/openresty/nginx/conf/routes', '/etc/nginx/conf/routes']
+BENCHMARK_GROUP = 'datalab-route-benchmark'
+
+
+def get_routes_dir(conn):
+    # Empty for edges deployed before the registry, which still get location files and a reload
+    return conn.sudo('curl -sf -o /dev/null {} && ls -d {} 2>/dev/null | head -n 1; true'.format(
+        ADMIN_URL, ' '.join(ROUTES_DIRS)), hide=True).stdout.strip()
+
+
+def call_admin(conn, method, path='', data_file=None):
+    command = 'curl -s -X {} -w "\\n%{{http_code}}" {}{}'.format(method, ADMIN_URL, path)
+    if data_file:
+        command += ' --data-binary @{}'.format(data_file)
+    output = conn.run(command, hide=True, warn=True).stdout.strip()
+    body, _, status = output.rpartition('\n')
+    if status != '200':
+        raise Exception('Route registry returned {} for {} {}: {}'.format(status or 'no response', method,
+                                                                          path or '/', body))
+    return json.loads(body)
+
+
+def upload_group(conn, group, routes):
+    local_file = '/tmp/{}_{}.json'.format(group, os.getpid())
+    with open(local_file, 'w') as f:
+        json.dump(routes, f)
+    try:
+        conn.put(local_file, '/tmp/{}.json'.format(group))
+    finally:
+        os.remove(local_file)
+    return '/tmp/{}.json'.format(group)
+
+
+def put_routes(conn, routes_dir, group, routes):
+    # The file is written first, so a restart of nginx or a sync never loses a route which was announced
+    remote_file = upload_group(conn, group, routes)
+    conn.sudo('cp -f {} {}/{}.json'.format(remote_file, routes_dir, group))
+    start = time.time()
+    result = call_admin(conn, 'PUT', '/' + group, remote_file)
+    logging.info('Registered {} routes of {} in {:.3f} sec'.format(result['routes'], group, time.time() - start))
+    return result
+
+
+def remove_routes(conn, routes_dir, group):
+    conn.sudo('rm -f {}/{}.json'.format(routes_dir, group))
+    result = call_admin(conn, 'DELETE', '/' + group)
+    logging.info('Removed {} routes of {}'.format(result['routes'], group))
+    return result
+
+
+def remove_terminated_routes(edge_hostname, os_user, keyfile, group, clusters=False):
+    # Called by the terminate scripts; with clusters the groups of the clusters of a notebook (<notebook>_<cluster>)
+    # are removed as well. A stopped or unreachable edge must not fail the termination.
+    if not edge_hostname or not group:
+        return
+    try:
+        conn = datalab.ssh_pool.get_connection(edge_hostname, os_user, keyfile, run_echo=False, max_tries=3)
+        routes_dir = get_routes_dir(conn)
+        if not routes_dir:
+            return
+        groups = [group]
+        if clusters:
+            groups += [name for name in list_routes(conn) if name.startswith(group + '_')]
+        for name in groups:
+            remove_routes(conn, routes_dir, name)
+    except Exception as err:
+        logging.warning('Unable to remove routes of {} from {}: {}'.format(group, edge_hostname, str(err)))
+
+
+def list_routes(conn):
+    return call_admin(conn, 'GET')
+
+
+def sync_routes(conn):
+    # Replaces the routes in memory with the persisted groups, stale groups are dropped
+    result = call_admin(conn, 'POST')
+    logging.info('Synced {} groups with {} routes'.format(result['groups'], result['routes']))
+    return result
+
+
+def get_percentile(values, percentile):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))] if values else 0
+
+
+def benchmark(conn, count=100):
+    # The requests are sent by one loop on the edge, so the numbers are the latency of the registry and
+    # not of SSH round trips; the benchmark group is not persisted
+    remote_file = upload_group(conn, BENCHMARK_GROUP, {BENCHMARK_GROUP: {'upstream': '127.0.0.1:9', 'strip': True}})
+    output = conn.run('for i in $(seq {0}); do '
+                      'curl -s -o /dev/null -w "%{{time_total}} " -X PUT --data-binary @{1} {2}/{3}; '
+                      'curl -s -o /dev/null -w "%{{time_total}}\\n" -X DELETE {2}/{3}; done'.format(
+                          int(count), remote_file, ADMIN_URL, BENCHMARK_GROUP), hide=True).stdout
+    timings = [line.split() for line in output.splitlines() if len(line.split()) == 2]
+    stats = dict()
+    for operation, values in (('put', [float(item[0]) * 1000 for item in timings]),
+                              ('delete', [float(item[1]) * 1000 for item in timings])):
+        stats[operation] = {'count': len(values), 'p50_ms': round(get_percentile(values, 50), 2),
+                            'p95_ms': round(get_percentile(values, 95), 2),
+                            'max_ms': round(max(values), 2) if values else 0}
+        logging.info('Route {}: {} requests, p50 {} ms, p95 {} ms, max {} ms'.format(
+            operation, stats[operation]['count'], stats[operation]['p50_ms'], stats[operation]['p95_ms'],
+            stats[operation]['max_ms']))
+    return stats
@@ -151,9 +151,12 @@ def install_nginx_lua(edge_ip, nginx_version, keycloak_auth_server_url, keycloak
                 keycloak_client_secret))
 
             conn.sudo('cp /opt/datalab/templates/nginx.conf /etc/nginx/')
+            conn.sudo('cp /opt/datalab/templates/datalab_routes.conf /etc/nginx/')
             conn.sudo('mkdir /etc/nginx/conf.d')
             conn.sudo('cp /opt/datalab/templates/conf.d/proxy.conf /etc/nginx/conf.d/')
             conn.sudo('mkdir /etc/nginx/locations')
+            conn.sudo('mkdir -p /etc/nginx/conf/lua /etc/nginx/conf/routes')
+            conn.sudo('cp /opt/datalab/templates/lua/datalab_routes.lua /etc/nginx/conf/lua/')
             conn.sudo('cp /opt/datalab/templates/nginx_redhat /etc/init.d/nginx')
             conn.sudo('chmod +x /etc/init.d/nginx')
             conn.sudo('chkconfig --add nginx')
@@ -23,6 +23,7 @@
 
 import json
 import os
+import re
 import sys
 import time
 from datalab.common_lib import manage_pkg
@@ -310,50 +311,109 @@ def install_nodejs(os_user):
         datalab.fab.conn.sudo('touch /home/{}/.ensure_dir/nodejs_ensured'.format(os_user))
 
 
+def get_installed_os_pkgs():
+    installed = dict()
+    output = datalab.fab.conn.sudo("rpm -qa --qf '%{NAME} %{VERSION}-%{RELEASE}\\n'", hide=True).stdout
+    for line in output.splitlines():
+        fields = line.split()
+        if len(fields) == 2:
+            installed[fields[0]] = fields[1]
+    return installed
+
+
+def get_new_os_pkgs(output):
+    # yum prints 'Dependency Installed:' with name.arch entries, dnf prints an 'Installing dependencies:' table
+    new_pkgs = set()
+    section = None
+    for line in output.splitlines():
+        if 'Dependency Installed:' in line:
+            section = 'yum'
+        elif 'Installing dependencies:' in line:
+            section = 'dnf'
+        elif section and line.startswith(' ') and line.strip():
+            if section == 'yum':
+                new_pkgs.update(re.findall(r'(\S+)\.(?:x86_64|noarch|i686|aarch64)\b', line))
+            else:
+                new_pkgs.add(line.split()[0])
+        else:
+            section = None
+    return new_pkgs
+
+
+def get_os_pkgs_dependencies(names):
+    # Dependencies of every installed package are resolved in a single remote call
+    graph = dict()
+    current = None
+    output = datalab.fab.conn.sudo('''bash -c 'for pkg in {}; do echo "=== $pkg"; repoquery --installed --requires '''
+                                   '''--resolve --recursive --qf "%{{name}}" $pkg 2>/dev/null; done' '''.format(
+                                    ' '.join(names)), warn=True, hide=True).stdout
+    for line in output.splitlines():
+        if line.startswith('=== '):
+            current = line[4:].strip()
+            graph[current] = set()
+        elif current and line.strip():
+            graph[current].add(line.strip())
+    return graph
+
+
+def run_os_pkg_install(pkgs, simulate=False):
+    return datalab.fab.conn.sudo('yum {0} install {1} --nogpgcheck 2>&1'.format(
+        '--assumeno' if simulate else '-y', ' '.join(pkgs)), warn=True).stdout.replace('"', "'")
+
+
+def is_missing_os_pkg(output, pkg):
+    return 'No package {} available'.format(pkg) in output or 'No match for argument: {}'.format(pkg) in output
+
+
 def install_os_pkg(requisites):
     status = list()
     error_parser = "Could not|No matching|Error:|failed|Requires:|Errno"
-    new_pkgs_parser = "Dependency Installed:"
     try:
         print("Updating repositories and installing requested tools: {}".format(requisites))
         manage_pkg('update-minimal --security -y --skip-broken', 'remote', '')
-        #datalab.fab.conn.sudo('export LC_ALL=C')
-        for os_pkg in requisites:
-            name, vers = os_pkg
-            if vers != '' and vers !='N/A':
-                version = vers
-                os_pkg = "{}-{}".format(name, vers)
-            else:
-                version = 'N/A'
-                os_pkg = name
-            manage_pkg('-y install', 'remote', '{0} --nogpgcheck 2>&1 | tee /tmp/os_install_{2}.tmp; if ! grep -w -E  "({1})" '
-                                               '/tmp/os_install_{2}.tmp >  /tmp/os_install_{2}.log; then  echo "no_error" > /tmp/os_install_{2}.log;fi'.format(os_pkg, error_parser, name))
-            install_output = datalab.fab.conn.sudo('cat /tmp/os_install_{}.tmp'.format(name)).stdout
-            err = datalab.fab.conn.sudo('cat /tmp/os_install_{}.log'.format(name)).stdout.replace('"', "'")
-            datalab.fab.conn.sudo('cat /tmp/os_install_{0}.tmp | if ! grep -w -E -A 30 "({1})" /tmp/os_install_{0}.tmp > '
-                 '/tmp/os_install_{0}.log; then echo "no_dependencies" > /tmp/os_install_{0}.log;fi'.format(name, new_pkgs_parser))
-            dep = datalab.fab.conn.sudo('cat /tmp/os_install_{}.log'.format(name)).stdout
-            if 'no_dependencies' in dep:
-                dep = []
+        pkgs = dict()
+        for name, vers in requisites:
+            pkgs[name] = "{}-{}".format(name, vers) if vers != '' and vers != 'N/A' else name
+        errors = dict()
+        outputs = dict()
+        # The dry run of the whole set finds unknown names and versions, the rest goes in one transaction
+        simulation = run_os_pkg_install(pkgs.values(), simulate=True)
+        for name in pkgs:
+            if is_missing_os_pkg(simulation, pkgs[name]):
+                outputs[name] = simulation
+                errors[name] = ['No package {} available.'.format(pkgs[name])]
+        batch = [name for name in pkgs if name not in errors]
+        isolated = list()
+        if batch:
+            output = run_os_pkg_install([pkgs[name] for name in batch])
+            if grep_output(output, error_parser):
+                isolated = batch
             else:
-                dep = dep[len(new_pkgs_parser): dep.find("Complete!") - 1].replace('  ', '').strip().split('\r\n')
-                for n, i in enumerate(dep):
-                    i = i.split('.')[0]
-                    datalab.fab.conn.sudo('yum info {0} 2>&1 | if ! grep Version > /tmp/os_install_{0}.log; then echo "" > /tmp/os_install_{0}.log;fi'.format(i))
-                    dep[n] =sudo('cat /tmp/os_install_{}.log'.format(i)).replace('Version     : ', '{} v.'.format(i))
-                dep = [i for i in dep if i]
+                outputs.update({name: output for name in batch})
+        # Only packages of a failed transaction are retried one by one to find out which of them is broken
+        for name in isolated:
+            outputs[name] = run_os_pkg_install([pkgs[name]])
+            pkg_errors = grep_output(outputs[name], error_parser)
+            if pkg_errors:
+                errors[name] = pkg_errors
+        installed = get_installed_os_pkgs()
+        new_pkgs = set()
+        for name, output in outputs.items():
+            if name not in errors:
+                new_pkgs.update(get_new_os_pkgs(output))
+        graph = get_os_pkgs_dependencies([name for name in outputs if name not in errors]) if new_pkgs else dict()
+        for name, vers in requisites:
+            version = vers if vers != '' and vers != 'N/A' else 'N/A'
+            err = '\n'.join(errors.get(name, ['no_error']))
             versions = []
-            datalab.fab.conn.sudo(
-                'yum list installed | if ! grep "{0}\." > /tmp/os_install_{0}.list; then echo "not_installed" > /tmp/os_install_{0}.list;fi'.format(
-                    name))
-            res = datalab.fab.conn.sudo('cat /tmp/os_install_{}.list '.format(name) + '| awk \'{print $1":"$2}\'').stdout.replace('\n', '')
-            #res = datalab.fab.conn.sudo('python3 -c "import os,sys,yum; yb = yum.YumBase(); pl = yb.doPackageLists(); print [pkg.vr for pkg in pl.installed if pkg.name == \'{0}\']"'.format(name)).stdout.split('\r\n')[1]
-            if "no_error" not in err:
-                status_msg = 'installation_error'
-            elif "not_installed" not in res:
-                version = res.split(":")[1]
+            dep = list()
+            status_msg = 'installation_error'
+            if name not in errors and name in installed:
+                version = installed[name]
                 status_msg = "installed"
-            if 'No package {} available'.format(os_pkg) in install_output:
+                dep = ['{} v.{}'.format(i, installed[i].split('-')[0]) for i in
+                       sorted(graph.get(name, set()) & new_pkgs) if i in installed and i != name]
+            if is_missing_os_pkg(outputs.get(name, ''), pkgs[name]):
                 versions = datalab.fab.conn.sudo('yum --showduplicates list ' + name + ' | expand | grep ' + name + ' | awk \'{print $2}\'').stdout.replace('\r\n', '')
                 if versions and versions != 'Error: No matching Packages to list':
                     versions = versions.split(' ')
@@ -368,7 +428,6 @@ def install_os_pkg(requisites):
                     status_msg = 'invalid_name'
             status.append({"group": "os_pkg", "name": name, "version": version, "status": status_msg,
                            "error_message": err, "add_pkgs": dep, "available_versions": versions})
-        datalab.fab.conn.sudo('rm /tmp/*{}*'.format(name))
         return status
     except Exception as err:
         for os_pkg in requisites:
@@ -0,0 +1,110 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Results of a request are appended to a journal, one JSON document per line, instead of rewriting
+# /root/result.json on every error. Steps running in parallel processes append under a file lock and
+# api/*.py compacts the journal into result.json once, when the request is finished.
+
+import datetime
+import fcntl
+import json
+import os
+import sys
+from datalab.logger import logging
+
+RESULT_PATH = '/root/result.json'
+JOURNAL_PATH = '/root/result.journal'
+
+
+def reset(result_path=RESULT_PATH, journal_path=JOURNAL_PATH):
+    # Called when a request starts, so compact() only sees what the steps of this request wrote
+    for path in (result_path, journal_path):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def append(entry, journal_path=JOURNAL_PATH):
+    line = json.dumps(entry) + '\n'
+    with open(journal_path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.write(line)
+            f.flush()
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def append_error(error, exception='', journal_path=JOURNAL_PATH):
+    append({'type': 'error',
+            'time': datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'step': os.path.basename(sys.argv[0]),
+            'pid': os.getpid(),
+            'error': str(error),
+            'exception': str(exception)}, journal_path)
+
+
+def format_error(entry):
+    if entry['exception']:
+        return '[Error-{}]: {}. Exception: {}'.format(entry['time'], entry['error'], entry['exception'])
+    return '[Error-{}]: {}.'.format(entry['time'], entry['error'])
+
+
+def read(journal_path=JOURNAL_PATH):
+    entries = list()
+    if not os.path.exists(journal_path):
+        return entries
+    with open(journal_path) as f:
+        fcntl.flock(f, fcntl.LOCK_SH)
+        try:
+            for line in f:
+                # A writer killed in the middle of a line leaves it truncated, the rest is still readable
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logging.error('Skipping malformed result journal line: {}'.format(line.strip()))
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+    return entries
+
+
+def compact(result_path=RESULT_PATH, journal_path=JOURNAL_PATH):
+    # Results written directly to result.json by the scripts are kept, journal errors are merged into them.
+    # "error" stays one string for the existing response consumers, "errors" holds the structured entries.
+    try:
+        result = dict()
+        if os.path.exists(result_path):
+            with open(result_path) as f:
+                result = json.loads(f.read())
+        errors = [entry for entry in read(journal_path) if entry.get('type') == 'error']
+        if not result and not errors:
+            return {"error": "Failed to open result.json"}
+        if errors:
+            result['error'] = result.get('error', '') + ''.join(format_error(entry) for entry in errors)
+            result['errors'] = result.get('errors', []) + [
+                {key: entry[key] for key in ('time', 'step', 'error', 'exception')} for entry in errors]
+        with open(result_path, 'w') as f:
+            json.dump(result, f)
+        if os.path.exists(journal_path):
+            os.remove(journal_path)
+        return result
+    except Exception as err:
+        logging.error('Unable to compact result journal: {}'.format(str(err)))
+        return {"error": "Failed to open result.json"}
@@ -0,0 +1,287 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import datalab.executor
+import functools
+import importlib
+import multiprocessing
+import os
+import runpy
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datalab.logger import logging
+
+SCRIPTS_DIR = '~/scripts'
+FABFILE_DIR = '/root'
+
+step_timings = list()
+
+
+def inprocess_enabled():
+    return os.environ.get('conf_inprocess_steps', 'false') == 'true'
+
+
+def run_path(path, params='', check=True, inprocess=None):
+    # conf_inprocess_steps=true runs the script inside the current interpreter with the same argv, so
+    # already imported cloud SDKs, fabric and datalab libraries are reused instead of re-imported per hop
+    path = os.path.expanduser(path)
+    command = '{} {}'.format(path, params).strip()
+    start = time.time()
+    try:
+        if not (inprocess_enabled() if inprocess is None else inprocess):
+            return subprocess.run(command, shell=True, check=check)
+        returncode = _run_inprocess(path, params)
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, command)
+        return subprocess.CompletedProcess(command, returncode)
+    finally:
+        duration = time.time() - start
+        step_timings.append({'step': os.path.basename(path), 'duration': round(duration, 3)})
+        logging.info('Step {} finished in {:.2f} sec'.format(os.path.basename(path), duration))
+
+
+def run_script(script, params='', check=True):
+    return run_path('{}/{}.py'.format(SCRIPTS_DIR, script), params, check)
+
+
+def run_scripts_concurrently(steps, max_workers=None):
+    # steps is a list of (script, params). Parallel steps always get their own interpreter because
+    # in-process steps share sys.argv, os.environ and the cwd; every step runs to completion before
+    # the first failure is raised, so callers can clean up all resources the steps created
+    def run(step):
+        try:
+            return run_path('{}/{}.py'.format(SCRIPTS_DIR, step[0]), step[1], check=True, inprocess=False)
+        except subprocess.CalledProcessError as err:
+            return err
+
+    if not steps:
+        return []
+    workers = min(max_workers or datalab.executor.get_max_workers(), len(steps))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, steps))
+    for result in results:
+        if isinstance(result, subprocess.CalledProcessError):
+            raise result
+    return results
+
+
+def get_pipeline_max_workers():
+    return int(os.environ.get('conf_node_pipeline_max_workers', 10))
+
+
+def _node_worker(channel, hostname, os_user, keyfile):
+    # Steps of one node run one after the other inside this process, so they all share its pooled SSH
+    # connections. Steps with a marker are skipped when /home/<os_user>/.ensure_dir already has it; the
+    # markers are listed once, on the connection the step would open anyway. A step may also be a library
+    # function, which is called with params as its arguments.
+    markers = None
+    while True:
+        step = channel.recv()
+        if step is None:
+            break
+        script, params, marker = step
+        try:
+            if marker:
+                import datalab.ssh_pool
+                conn = datalab.ssh_pool.get_connection(hostname, os_user, keyfile, run_echo=False)
+                if markers is None:
+                    markers = set(conn.sudo('ls /home/{}/.ensure_dir 2>/dev/null; true'.format(os_user),
+                                            hide=True).stdout.split())
+                if marker in markers:
+                    channel.send('skipped')
+                    continue
+            if callable(script):
+                script(*params)
+                returncode = 0
+            else:
+                returncode = run_path('{}/{}.py'.format(SCRIPTS_DIR, script), params, check=False,
+                                      inprocess=True).returncode
+            if returncode == 0 and marker:
+                conn.sudo('touch /home/{}/.ensure_dir/{}'.format(os_user, marker), hide=True)
+                markers.add(marker)
+            channel.send('done' if returncode == 0 else 'failed')
+        except (Exception, SystemExit) as err:
+            logging.error('Step {} on {} failed: {}'.format(getattr(script, '__name__', script), hostname, str(err)))
+            channel.send('failed')
+
+
+def chain_steps(node, items):
+    # items is a list of (script, params, marker) which run one after the other on the node; step names are
+    # <node>:<script>, so other steps can require them
+    steps = dict()
+    previous = None
+    for script, params, marker in items:
+        name = '{}:{}'.format(node, getattr(script, '__name__', script))
+        steps[name] = {'node': node, 'script': script, 'params': params, 'marker': marker,
+                       'requires': [previous] if previous else []}
+        previous = name
+    return steps
+
+
+def run_node_pipelines(nodes, steps, max_workers=None):
+    # nodes is a dict of node -> (hostname, os_user, keyfile) and steps a dict of name -> {'node', 'script',
+    # 'params', 'marker', 'requires'}. Every node gets one worker process; steps of different nodes run
+    # concurrently as soon as the steps they require are done, at most max_workers at a time.
+    channels = dict()
+    workers = list()
+    for node, (hostname, os_user, keyfile) in nodes.items():
+        channel, worker_channel = multiprocessing.Pipe()
+        worker = multiprocessing.Process(target=_node_worker, args=(worker_channel, hostname, os_user, keyfile))
+        worker.start()
+        # Only the worker keeps its end open, so a crashed worker shows up as EOF instead of a hang
+        worker_channel.close()
+        channels[node] = (channel, threading.Lock())
+        workers.append(worker)
+    timings = list()
+    start = time.time()
+
+    def run_step(name):
+        step = steps[name]
+        channel, lock = channels[step['node']]
+        with lock:
+            step_start = time.time()
+            channel.send((step['script'], step['params'], step.get('marker')))
+            try:
+                status = channel.recv()
+            except (EOFError, OSError):
+                status = 'failed'
+        timings.append({'step': name, 'node': step['node'], 'status': status,
+                        'started': round(step_start - start, 3), 'duration': round(time.time() - step_start, 3)})
+        if status == 'failed':
+            raise Exception('Step {} failed'.format(name))
+        return status
+
+    try:
+        return datalab.executor.run_dag({name: functools.partial(run_step, name) for name in steps},
+                                        {name: step.get('requires', []) for name, step in steps.items()},
+                                        max_workers or get_pipeline_max_workers())
+    finally:
+        for channel, lock in channels.values():
+            try:
+                channel.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.join()
+        log_pipeline_timings(timings, time.time() - start)
+
+
+def log_pipeline_timings(timings, duration):
+    for timing in sorted(timings, key=lambda item: item['started']):
+        logging.info('Step {} started at +{:.1f} sec: {} in {:.1f} sec'.format(
+            timing['step'], timing['started'], timing['status'], timing['duration']))
+    for node in sorted({timing['node'] for timing in timings}):
+        node_timings = [timing for timing in timings if timing['node'] == node]
+        logging.info('Node {}: {} steps, {} skipped, {:.1f} sec busy'.format(
+            node, len(node_timings), len([timing for timing in node_timings if timing['status'] == 'skipped']),
+            sum(timing['duration'] for timing in node_timings)))
+    logging.info('Node pipelines finished in {:.1f} sec'.format(duration))
+
+
+def run_fab_task(task, check=True):
+    command = 'cd {}; fab {}'.format(FABFILE_DIR, task)
+    if not inprocess_enabled():
+        return subprocess.run(command, shell=True, check=check)
+    from invoke import Context
+    cwd = os.getcwd()
+    saved_handlers = _reset_logging()
+    returncode = 0
+    try:
+        os.chdir(FABFILE_DIR)
+        fabfile = runpy.run_path('{}/fabfile.py'.format(FABFILE_DIR), run_name='fabfile')
+        fabfile[task.replace('-', '_')](Context())
+    except SystemExit as err:
+        returncode = _exit_code(err)
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        os.chdir(cwd)
+        _restore_logging(saved_handlers)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, command)
+    return subprocess.CompletedProcess(command, returncode)
+
+
+def _exit_code(err):
+    if err.code is None:
+        return 0
+    if isinstance(err.code, int):
+        return err.code
+    print(err.code, file=sys.stderr)
+    return 1
+
+
+def _reset_logging():
+    # Scripts configure logging with logging.basicConfig, which does nothing once the root logger has
+    # handlers. Like a fresh interpreter, every in-process step starts from the handlers datalab.logger
+    # sets up for the current request; the caller's handlers are returned to restore them afterwards.
+    import datalab.logger
+    root = logging.getLogger('')
+    saved_handlers = root.handlers[:]
+    for handler in saved_handlers:
+        root.removeHandler(handler)
+    importlib.reload(datalab.logger)
+    return saved_handlers
+
+
+def _restore_logging(saved_handlers):
+    root = logging.getLogger('')
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for handler in saved_handlers:
+        root.addHandler(handler)
+
+
+def _run_inprocess(path, params):
+    # Every step used to get a fresh process, so changes a script makes to the
+    # environment, cwd or the shared connection must not leak into the caller
+    import datalab.fab
+    saved_argv = sys.argv
+    saved_environ = dict(os.environ)
+    saved_cwd = os.getcwd()
+    saved_conn = getattr(datalab.fab, 'conn', None)
+    saved_handlers = _reset_logging()
+    returncode = 0
+    try:
+        sys.argv = [path] + shlex.split(params)
+        runpy.run_path(path, run_name='__main__')
+    except SystemExit as err:
+        returncode = _exit_code(err)
+    except Exception:
+        traceback.print_exc()
+        returncode = 1
+    finally:
+        sys.argv = saved_argv
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        os.chdir(saved_cwd)
+        datalab.fab.conn = saved_conn
+        sys.stdout.flush()
+        sys.stderr.flush()
+        _restore_logging(saved_handlers)
+    return returncode
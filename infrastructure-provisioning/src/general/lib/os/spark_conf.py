@@ -0,0 +1,90 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import os
+import tempfile
+
+
+def parse(text):
+    # Lines are kept in order; property lines become [key, value] pairs and the
+    # index maps every key to its last position, which is the one Spark uses
+    lines = list()
+    index = dict()
+    for line in text.replace('\r', '').rstrip('\n').split('\n'):
+        stripped = line.strip()
+        if not stripped or stripped.startswith('#'):
+            lines.append(line)
+            continue
+        parts = stripped.split(None, 1)
+        if parts[0] in index:
+            lines[index[parts[0]]] = None
+        index[parts[0]] = len(lines)
+        lines.append([parts[0], parts[1] if len(parts) > 1 else ''])
+    return lines, index
+
+
+def get_overrides(spark_configurations, classification='spark-defaults'):
+    overrides = dict()
+    for config in spark_configurations:
+        if config['Classification'] == classification:
+            overrides.update(config['Properties'])
+    return overrides
+
+
+def merge(text, overrides):
+    lines, index = parse(text)
+    for key, value in overrides.items():
+        if key in index:
+            lines[index[key]] = [key, value]
+        else:
+            index[key] = len(lines)
+            lines.append([key, value])
+    return render(lines)
+
+
+def render(lines):
+    rendered = list()
+    for line in lines:
+        if line is None:
+            continue
+        rendered.append(line if isinstance(line, str) else '{} {}'.format(*line).rstrip())
+    while rendered and not rendered[-1].strip():
+        rendered.pop()
+    return '\n'.join(rendered) + '\n'
+
+
+def upload(conn, text, path):
+    # The file is sent in one transfer and swapped in with a rename, so readers never see a partial config
+    with tempfile.NamedTemporaryFile('w', suffix='.conf', delete=False) as f:
+        f.write(text)
+    remote_tmp = '/tmp/{}'.format(os.path.basename(f.name))
+    try:
+        conn.put(f.name, remote_tmp)
+        conn.sudo('cp -f {0} {1}.new && mv -f {1}.new {1} && rm -f {0}'.format(remote_tmp, path))
+    finally:
+        os.remove(f.name)
+
+
+def merge_remote(conn, path, spark_configurations, extra_properties=None):
+    overrides = get_overrides(spark_configurations)
+    if extra_properties:
+        overrides.update(extra_properties)
+    upload(conn, merge(conn.sudo('cat {}'.format(path)).stdout, overrides), path)
@@ -0,0 +1,138 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import atexit
+import backoff
+import os
+import threading
+import time
+from datalab.logger import logging
+from fabric import Connection
+
+KEEPALIVE_INTERVAL = 30
+
+_pool = dict()
+_lock = threading.Lock()
+connect_timings = list()
+
+
+# Transports of the parent are not usable in a forked child, it starts with an empty pool
+def _reset_after_fork():
+    global _lock
+    _lock = threading.Lock()
+    _pool.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class PooledConnection(Connection):
+    # Scripts close their connection when they are done; the authenticated transport is kept
+    # for the next step that targets the same host and is only closed by close_all()
+    def close(self):
+        pass
+
+    def shutdown(self):
+        super().close()
+
+
+def get_max_tries():
+    return int(os.environ.get('conf_ssh_max_tries', 15))
+
+
+def get_wait_time():
+    return int(os.environ.get('conf_ssh_wait_time', 150))
+
+
+def _record(hostname, user, attempts, duration, reused):
+    connect_timings.append({'host': hostname, 'user': user, 'attempts': attempts, 'duration': round(duration, 3),
+                            'reused': reused})
+    if reused:
+        logging.info('Reusing connection to {} with user {}'.format(hostname, user))
+    else:
+        logging.info('Connected to {} with user {} in {:.2f} sec after {} attempt(s)'.format(
+            hostname, user, duration, attempts))
+
+
+def _connect(hostname, user, keyfile, run_echo, max_tries, wait_time):
+    attempts = list()
+    start = time.time()
+
+    # A host is given up on once both the attempts and the readiness window are used up,
+    # so jittered short delays never make the window shorter than wait_time
+    def exhausted(err):
+        return len(attempts) >= max_tries and time.time() - start >= wait_time
+
+    @backoff.on_exception(backoff.expo, Exception, max_tries=None, max_value=20, jitter=backoff.full_jitter,
+                          giveup=exhausted)
+    def probe():
+        logging.info('connection attempt {} with user {}'.format(len(attempts), user))
+        attempts.append(time.time())
+        conn = PooledConnection(host=hostname, user=user, connect_kwargs={'banner_timeout': 200,
+                                                                          'key_filename': keyfile})
+        conn.config.run.echo = run_echo
+        try:
+            conn.run('hostname')
+        except Exception:
+            conn.shutdown()
+            raise
+        return conn
+
+    conn = probe()
+    conn.transport.set_keepalive(KEEPALIVE_INTERVAL)
+    _record(hostname, user, len(attempts), time.time() - start, False)
+    return conn
+
+
+def get_connection(hostname, user, keyfile, run_echo=True, max_tries=None):
+    key = (hostname, user, keyfile)
+    with _lock:
+        conn = _pool.get(key)
+    if conn is not None and conn.is_connected:
+        conn.config.run.echo = run_echo
+        _record(hostname, user, 0, 0, True)
+        return conn
+    if max_tries:
+        conn = _connect(hostname, user, keyfile, run_echo, max_tries, 0)
+    else:
+        conn = _connect(hostname, user, keyfile, run_echo, get_max_tries(), get_wait_time())
+    with _lock:
+        _pool[key] = conn
+    return conn
+
+
+def close_connection(hostname, user, keyfile):
+    with _lock:
+        conn = _pool.pop((hostname, user, keyfile), None)
+    if conn is not None:
+        conn.shutdown()
+
+
+@atexit.register
+def close_all():
+    with _lock:
+        connections = list(_pool.values())
+        _pool.clear()
+    for conn in connections:
+        try:
+            conn.shutdown()
+        except Exception:
+            pass
@@ -0,0 +1,136 @@
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import atexit
+import os
+import random
+import threading
+import time
+from datalab.logger import logging
+
+wait_timings = list()
+_timings_lock = threading.Lock()
+
+
+def get_timeout(operation_type=''):
+    # conf_<operation_type>_wait_timeout overrides the common timeout for one kind of wait, 0 waits without a deadline
+    timeout = os.environ.get('conf_{}_wait_timeout'.format(operation_type)) if operation_type else None
+    return int(timeout if timeout is not None else os.environ.get('conf_operation_wait_timeout', 3600))
+
+
+def get_deadline(started, timeout):
+    return started + timeout if timeout else float('inf')
+
+
+def record(operation_type, started, polls, status):
+    duration = time.monotonic() - started
+    with _timings_lock:
+        wait_timings.append({'type': operation_type, 'duration': round(duration, 3), 'polls': polls,
+                             'status': status})
+    logging.info('Waited {:.1f} sec for {} ({} polls, {})'.format(duration, operation_type, polls, status))
+
+
+def get_stats():
+    # Aggregated wait time per operation type
+    stats = dict()
+    with _timings_lock:
+        timings = list(wait_timings)
+    for timing in timings:
+        item = stats.setdefault(timing['type'], {'count': 0, 'total': 0, 'max': 0, 'polls': 0, 'timeouts': 0})
+        item['count'] += 1
+        item['total'] = round(item['total'] + timing['duration'], 3)
+        item['max'] = max(item['max'], timing['duration'])
+        item['polls'] += timing['polls']
+        item['timeouts'] += timing['status'] == 'timeout'
+    return stats
+
+
+@atexit.register
+def log_stats():
+    for operation_type, item in sorted(get_stats().items()):
+        logging.info('Wait stats for {}: {} operations, {:.1f} sec total, {:.1f} sec max, {} polls, {} timeouts'.format(
+            operation_type, item['count'], item['total'], item['max'], item['polls'], item['timeouts']))
+
+
+def sleep_interval(interval, deadline):
+    # Equal jitter keeps at least half of the interval, so concurrent waiters spread out without polling too often
+    time.sleep(max(0, min(interval / 2 + random.uniform(0, interval / 2), deadline - time.monotonic())))
+
+
+def wait_until(check, operation_type, timeout=None, initial_interval=1, max_interval=30, factor=2):
+    # Calls check() until it returns a true value, which is returned. Fast operations are noticed within
+    # a second, long ones are polled at most every max_interval seconds.
+    started = time.monotonic()
+    timeout = timeout or get_timeout(operation_type)
+    deadline = get_deadline(started, timeout)
+    interval = initial_interval
+    polls = 0
+    while True:
+        polls += 1
+        result = check()
+        if result:
+            record(operation_type, started, polls, 'done')
+            return result
+        if time.monotonic() >= deadline:
+            record(operation_type, started, polls, 'timeout')
+            raise TimeoutError('{} has not finished in {} seconds'.format(operation_type, timeout))
+        sleep_interval(interval, deadline)
+        interval = min(interval * factor, max_interval)
+
+
+def wait_all(check_many, operations, operation_type, timeout=None, initial_interval=1, max_interval=30, factor=2):
+    # check_many(pending) gets the operations which are not finished yet and returns the ones that are,
+    # so one aggregated list call per poll covers all of them
+    started = time.monotonic()
+    timeout = timeout or get_timeout(operation_type)
+    deadline = get_deadline(started, timeout)
+    pending = list(operations)
+    interval = initial_interval
+    polls = 0
+    while pending:
+        polls += 1
+        finished = set(check_many(list(pending)))
+        for operation in finished:
+            if operation in pending:
+                record(operation_type, started, polls, 'done')
+        pending = [operation for operation in pending if operation not in finished]
+        if not pending:
+            break
+        if time.monotonic() >= deadline:
+            for operation in pending:
+                record(operation_type, started, polls, 'timeout')
+            raise TimeoutError('{} operations of {} have not finished in {} seconds'.format(
+                len(pending), operation_type, timeout))
+        sleep_interval(interval, deadline)
+        interval = min(interval * factor, max_interval)
+
+
+def wait_for_poller(poller, operation_type, timeout=None):
+    # Azure long running operation pollers follow the Retry-After hints of the service
+    started = time.monotonic()
+    timeout = timeout or get_timeout(operation_type)
+    poller.wait(timeout=timeout or None)
+    if not poller.done():
+        record(operation_type, started, 1, 'timeout')
+        raise TimeoutError('{} has not finished in {} seconds'.format(operation_type, timeout))
+    result = poller.result()
+    record(operation_type, started, 1, 'done')
+    return result
@@ -23,6 +23,7 @@
 
 import argparse
 import ast
+import datalab.executor
 import json
 import sys
 import traceback
@@ -40,21 +41,18 @@ if __name__ == "__main__":
     data = ast.literal_eval(args.list_resources.replace('\'', '"'))
     statuses = {}
     try:
-        try:
-            data_instances = get_list_instance_statuses(data.get('host'))
-            statuses['host'] = data_instances
-        except:
-            logging.info("Hosts JSON wasn't been provided")
-        try:
-            data_clusters = get_list_cluster_statuses(data.get('cluster'))
-            statuses['cluster'] = data_clusters
-        except:
-            logging.info("Clusters JSON wasn't provided")
-        try:
-            data_images = get_list_image_statuses(data.get('image'))
-            statuses['image'] = data_images
-        except:
-            logging.info("Images JSON wasn't been provided")
+        # Hosts, clusters and images are independent lookups, so they run side by side
+        tasks = dict()
+        if data.get('host') is not None:
+            tasks['host'] = lambda: get_list_instance_statuses(data.get('host'))
+        if data.get('cluster') is not None:
+            tasks['cluster'] = lambda: get_list_cluster_statuses(data.get('cluster'))
+        if data.get('image') is not None:
+            tasks['image'] = lambda: get_list_image_statuses(data.get('image'))
+        statuses = datalab.executor.run_concurrently(tasks)
+        for resource_type in ('host', 'cluster', 'image'):
+            if resource_type not in statuses:
+                logging.info("{} statuses weren't collected".format(resource_type.capitalize()))
         with open('/root/result.json', 'w') as outfile:
             json.dump(statuses, outfile)
     except Exception as err:
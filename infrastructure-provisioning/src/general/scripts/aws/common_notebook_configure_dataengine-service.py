@@ -24,11 +24,11 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -87,7 +87,7 @@ if __name__ == "__main__":
                     os.environ['conf_os_user'], edge_instance_hostname, '3128', os.environ['notebook_scala_version'],
                     os.environ['application'])
         try:
-            subprocess.run("~/scripts/{}_{}.py {}".format(application, 'install_dataengine-service_kernels', params), shell=True, check=True)
+            datalab.runner.run_script('{}_install_dataengine-service_kernels'.format(application), params)
             datalab.actions_lib.remove_emr_tag(notebook_config['cluster_id'], ['State'])
             datalab.actions_lib.tag_emr_volume(notebook_config['cluster_id'], notebook_config['cluster_name'],
                                                os.environ['conf_tag_resource_id'])
@@ -108,7 +108,7 @@ if __name__ == "__main__":
                     notebook_config['key_path'],
                     os.environ['conf_os_user'])
         try:
-            subprocess.run("~/scripts/{0}.py {1}".format('common_configure_spark', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_spark', params)
             datalab.actions_lib.remove_emr_tag(notebook_config['cluster_id'], ['State'])
             datalab.actions_lib.tag_emr_volume(notebook_config['cluster_id'], notebook_config['cluster_name'],
                                                os.environ['conf_tag_resource_id'])
@@ -24,20 +24,18 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
 
 def clear_resources():
-    datalab.actions_lib.remove_ec2(notebook_config['tag_name'], notebook_config['master_node_name'])
-    for i in range(notebook_config['instance_count'] - 1):
-        slave_name = notebook_config['slave_node_name'] + '{}'.format(i + 1)
-        datalab.actions_lib.remove_ec2(notebook_config['tag_name'], slave_name)
+    datalab.actions_lib.remove_ec2(notebook_config['tag_name'], [notebook_config['master_node_name']] + [
+        notebook_config['slave_node_name'] + '{}'.format(i + 1) for i in range(notebook_config['instance_count'] - 1)])
 
 
 if __name__ == "__main__":
@@ -101,7 +99,7 @@ if __name__ == "__main__":
                    notebook_config['spark_master_url'], notebook_config['key_path'],
                    notebook_config['notebook_ip'], notebook_config['spark_master_ip'])
         try:
-            subprocess.run("~/scripts/{}_{}.py {}".format(os.environ['application'], 'install_dataengine_kernels', params), shell=True, check=True)
+            datalab.runner.run_script('{}_install_dataengine_kernels'.format(os.environ['application']), params)
         except:
             traceback.print_exc()
             raise Exception
@@ -121,7 +119,7 @@ if __name__ == "__main__":
                     notebook_config['datalab_ssh_user'],
                     notebook_config['cluster_name'])
         try:
-            subprocess.run("~/scripts/{0}.py {1}".format('common_configure_spark', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_spark', params)
         except:
             traceback.print_exc()
             raise Exception
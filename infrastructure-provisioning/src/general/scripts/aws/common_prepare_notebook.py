@@ -25,11 +25,11 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -160,7 +160,7 @@ if __name__ == "__main__":
             notebook_config['tag_name'], notebook_config['instance_name'], instance_class,
             os.environ['notebook_disk_size'], notebook_config['primary_disk_size'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
 
         except:
             traceback.print_exc()
@@ -24,11 +24,11 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -62,7 +62,7 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(os.environ['conf_os_user'], notebook_config['notebook_ip'], notebook_config['keyfile'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            datalab.runner.run_script('manage_git_creds', params)
         except Exception as err:
             traceback.print_exc()
             datalab.fab.append_result("Failed to setup git credentials.", str(err))
@@ -75,7 +75,7 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(os.environ['conf_os_user'], notebook_config['notebook_ip'], notebook_config['keyfile'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('update_inactivity_on_start', params), shell=True, check=True)
+            datalab.runner.run_script('update_inactivity_on_start', params)
         except Exception as err:
             traceback.print_exc()
             datalab.fab.append_result("Failed to update last activity time.", str(err))
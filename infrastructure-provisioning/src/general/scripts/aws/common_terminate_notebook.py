@@ -25,6 +25,7 @@ import boto3
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 import os
 import sys
@@ -136,6 +137,17 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(notebook_config['service_base_name'],
+                                                    notebook_config['project_name'], notebook_config['endpoint_name'])
+        datalab.proxy_routes.remove_terminated_routes(
+            datalab.meta_lib.get_instance_hostname(notebook_config['tag_name'], edge_instance_name),
+            os.environ['conf_os_user'], '{}{}.pem'.format(os.environ['conf_key_dir'], os.environ['conf_key_name']),
+            notebook_config['exploratory_name'], clusters=True)
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"notebook_name": notebook_config['notebook_name'],
@@ -25,6 +25,7 @@ import argparse
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.runner
 import json
 import multiprocessing
 import os
@@ -33,7 +34,6 @@ import traceback
 from datalab.common_lib import manage_pkg
 from fabric import *
 from datalab.logger import logging
-import subprocess
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--uuid', type=str, default='')
@@ -49,7 +49,7 @@ def configure_dataengine_service(instance, emr_conf):
             (emr_conf['instance_ip'], emr_conf['key_path'], emr_conf['initial_user'],
              emr_conf['os_user'], emr_conf['sudo_group'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -66,7 +66,7 @@ def configure_dataengine_service(instance, emr_conf):
             .format(emr_conf['instance_ip'], emr_conf['cluster_name'], emr_conf['key_path'],
                     json.dumps(additional_config), emr_conf['os_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -125,7 +125,7 @@ def configure_dataengine_service(instance, emr_conf):
                     emr_conf['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
@@ -140,7 +140,7 @@ def configure_dataengine_service(instance, emr_conf):
         params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
             emr_conf['instance_ip'], emr_conf['key_path'], json.dumps(additional_config), emr_conf['os_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -125,7 +125,7 @@ cp_jars = "Name=CUSTOM_JAR, Args=aws " \
           "ActionOnFailure=TERMINATE_CLUSTER,Jar=command-runner.jar; " \
           "Name=CUSTOM_JAR, Args=/usr/bin/python3 /tmp/jars_parser.py " \
           "--bucket {0} --emr_version {3} --region {2} --user_name {4} " \
-          "--cluster_name {5}, " \
+          "--cluster_name {5} --compression {7}, " \
           "ActionOnFailure=TERMINATE_CLUSTER,Jar=command-runner.jar".\
     format(args.s3_bucket,
            args.release_label,
@@ -133,7 +133,8 @@ cp_jars = "Name=CUSTOM_JAR, Args=aws " \
            args.release_label,
            args.project_name,
            args.name,
-           endpoint_url)
+           endpoint_url,
+           os.environ.get('conf_artifacts_compression', 'none'))
 
 logfile = '{}_creation.log'.format(args.name)
 logpath = '/response/' + logfile
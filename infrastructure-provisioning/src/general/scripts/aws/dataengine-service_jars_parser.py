@@ -21,9 +21,14 @@
 #
 # ******************************************************************************
 
-import subprocess
-import os
 import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
 
 
 parser = argparse.ArgumentParser()
@@ -32,8 +37,53 @@ parser.add_argument('--emr_version', type=str, default='')
 parser.add_argument('--region', type=str, default='')
 parser.add_argument('--user_name', type=str, default='')
 parser.add_argument('--cluster_name', type=str, default='')
+parser.add_argument('--compression', type=str, default='none')
 args = parser.parse_args()
 
+# Same layout as datalab.artifact_store on the notebooks, this script runs on the cluster without the datalab lib
+ARTIFACTS_DIR = '/tmp/datalab_artifacts/'
+
+
+def get_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def build_manifest(paths, root, manifest_file, compression):
+    # Every file is stored once under its sha256, so files shared by clusters and versions are uploaded once
+    # and notebooks only download the ones they do not have yet
+    manifest = {'compression': compression, 'dirs': [], 'files': []}
+    for path in sorted(set(paths)):
+        if os.path.isdir(path):
+            manifest['dirs'].append(os.path.relpath(path, root))
+            continue
+        if not os.path.isfile(path):
+            continue
+        sha256 = get_sha256(path)
+        manifest['files'].append({'path': os.path.relpath(path, root), 'sha256': sha256,
+                                  'size': os.path.getsize(path), 'mode': stat.S_IMODE(os.stat(path).st_mode)})
+        object_path = '{0}objects/{1}/{2}'.format(ARTIFACTS_DIR, sha256[:2], sha256)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        if compression == 'zstd':
+            if not os.path.exists(object_path + '.zst'):
+                subprocess.check_call('zstd -q -T0 -f {} -o {}.zst'.format(path, object_path), shell=True)
+        elif not os.path.lexists(object_path):
+            # aws s3 sync follows symlinks, so the files are not copied for the upload
+            os.symlink(os.path.realpath(path), object_path)
+    with open(manifest_file, 'w') as outfile:
+        json.dump(manifest, outfile)
+
+
+def get_spark_paths(spark_dir):
+    paths = list()
+    for dirpath, dirnames, filenames in os.walk(spark_dir, followlinks=True):
+        paths.append(dirpath)
+        paths.extend(os.path.join(dirpath, name) for name in filenames)
+    return paths
+
 
 if __name__ == "__main__":
     spark_def_path = "/usr/lib/spark/conf/spark-defaults.conf"
@@ -67,28 +117,24 @@ if __name__ == "__main__":
         if python_ver != '':
             with open('/tmp/python_version', 'w') as outfile:
                 outfile.write(python_ver)
-    os.system('/bin/tar -zhcvf /tmp/jars.tar.gz '
-              '--no-recursion '
-              '--absolute-names '
-              '--ignore-failed-read /usr/lib/hadoop/* {} {} /usr/lib/hadoop/client/*'.
-              format(spark_def_path_line1,
-                     spark_def_path_line2))
-    os.system('/bin/tar -zhcvf /tmp/spark.tar.gz -C /usr/lib/ spark')
-    md5sum = subprocess.check_output('md5sum /tmp/jars.tar.gz', shell=True).decode('UTF-8')
-    with open('/tmp/jars-checksum.chk', 'w') as outfile:
-        outfile.write(md5sum)
-    md5sum = subprocess.check_output('md5sum /tmp/spark.tar.gz', shell=True).decode('UTF-8')
-    with open('/tmp/spark-checksum.chk', 'w') as outfile:
-        outfile.write(md5sum)
-    os.system('aws s3 cp /tmp/jars.tar.gz '
-              's3://{}/jars/{}/ '
+    if args.compression == 'zstd' and shutil.which('zstd') is None:
+        args.compression = 'none'
+    jars_paths = list()
+    for pattern in '/usr/lib/hadoop/* {} {} /usr/lib/hadoop/client/*'.format(spark_def_path_line1,
+                                                                            spark_def_path_line2).split():
+        jars_paths.extend(path for path in glob.glob(pattern) if not os.path.isdir(path))
+    build_manifest(jars_paths, '/', '/tmp/jars-manifest.json', args.compression)
+    build_manifest(get_spark_paths('/usr/lib/spark'), '/usr/lib/', '/tmp/spark-manifest.json', args.compression)
+    os.system('aws s3 sync {}objects/ '
+              's3://{}/artifacts/objects/ '
+              '--size-only '
               '--endpoint-url {} '
               '--region {} --sse AES256'.
-              format(args.bucket,
-                     args.emr_version,
+              format(ARTIFACTS_DIR,
+                     args.bucket,
                      endpoint,
                      args.region))
-    os.system('aws s3 cp /tmp/jars-checksum.chk '
+    os.system('aws s3 cp /tmp/jars-manifest.json '
               's3://{}/jars/{}/ '
               '--endpoint-url {} '
               '--region {} --sse AES256'.
@@ -115,16 +161,7 @@ if __name__ == "__main__":
                      args.cluster_name,
                      endpoint,
                      args.region))
-    os.system('aws s3 cp /tmp/spark.tar.gz '
-              's3://{}/{}/{}/ '
-              '--endpoint-url {} '
-              '--region {} --sse AES256'.
-              format(args.bucket,
-                     args.user_name,
-                     args.cluster_name,
-                     endpoint,
-                     args.region))
-    os.system('aws s3 cp /tmp/spark-checksum.chk '
+    os.system('aws s3 cp /tmp/spark-manifest.json '
               's3://{}/{}/{}/ '
               '--endpoint-url {} '
               '--region {} --sse AES256'.
@@ -25,6 +25,7 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
@@ -257,7 +258,7 @@ if __name__ == "__main__":
                 os.environ['conf_additional_tags'] = 'project_tag:{0};endpoint_tag:{1}'.format(emr_conf['project_tag'],
                                                                                                emr_conf['endpoint_tag'])
             print('Additional tags will be added: {}'.format(os.environ['conf_additional_tags']))
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -318,7 +319,7 @@ if __name__ == "__main__":
         if 'aws_permissions_boundary_arn' in os.environ:
             params = '{} --permissions_boundary_arn {}'.format(params, os.environ['aws_permissions_boundary_arn'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('dataengine-service_create', params), shell=True, check=True)
+            datalab.runner.run_script('dataengine-service_create', params)
         except:
             traceback.print_exc()
             raise Exception
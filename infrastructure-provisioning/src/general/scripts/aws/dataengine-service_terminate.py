@@ -25,6 +25,7 @@ import boto3
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 import os
 import sys
@@ -87,6 +88,18 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(emr_conf['service_base_name'],
+                                                    emr_conf['project_name'], emr_conf['endpoint_name'])
+        if os.environ.get('exploratory_name') and os.environ.get('computational_name'):
+            datalab.proxy_routes.remove_terminated_routes(
+                datalab.meta_lib.get_instance_hostname(emr_conf['tag_name'], edge_instance_name),
+                os.environ['conf_os_user'], emr_conf['key_path'],
+                '{}_{}'.format(os.environ['exploratory_name'].lower(), os.environ['computational_name'].lower()))
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"dataengine-service_name": emr_conf['emr_name'],
@@ -24,11 +24,11 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -153,66 +153,30 @@ if __name__ == "__main__":
     logging.info('Additional tags will be added: {}'.format(os.environ['conf_additional_tags']))
 
     try:
-        logging.info('[CREATE MASTER NODE]')
-        data_engine['cluster_nodes_tag_type'] = {"Key": "Type", "Value": "master"}
-        params = "--node_name {} --ami_id {} --instance_type {} --key_name {} --security_group_ids {} " \
-                 "--subnet_id {} --iam_profile {} --infra_tag_name {} --infra_tag_value {} --primary_disk_size {} " \
-                 "--instance_class {}" \
-            .format(data_engine['master_node_name'], data_engine['ami_id'], data_engine['master_size'],
-                    data_engine['key_name'],
-                    datalab.meta_lib.get_security_group_by_name(data_engine['dataengine_master_security_group_name']),
-                    datalab.meta_lib.get_subnet_by_cidr(data_engine['subnet_cidr'], os.environ['aws_notebook_vpc_id']),
-                    data_engine['notebook_dataengine_role_profile_name'], data_engine['tag_name'],
-                    data_engine['master_node_name'], data_engine['primary_disk_size'], data_engine['instance_class'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
-            data_engine['master_id'] = datalab.meta_lib.get_instance_by_name(data_engine['tag_name'],
-                                                                             data_engine['master_node_name'])
-            datalab.actions_lib.create_tag(data_engine['master_id'], data_engine['cluster_nodes_tag'], False)
-            datalab.actions_lib.create_tag(data_engine['master_id'], data_engine['cluster_nodes_resource_tag'], False)
-            datalab.actions_lib.create_tag(data_engine['master_id'], data_engine['cluster_nodes_billing_tag'], False)
-            datalab.actions_lib.create_tag(data_engine['master_id'], data_engine['cluster_nodes_tag_type'], False)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        datalab.fab.append_result("Failed to create master instance.", str(err))
-        sys.exit(1)
-
-    try:
+        logging.info('[CREATE MASTER AND SLAVE NODES]')
+        # Security groups and subnet are looked up once for the whole cluster and all nodes boot in parallel
+        master_security_group_id = datalab.meta_lib.get_security_group_by_name(
+            data_engine['dataengine_master_security_group_name'])
+        slave_security_group_id = datalab.meta_lib.get_security_group_by_name(
+            data_engine['dataengine_slave_security_group_name'])
+        subnet_id = datalab.meta_lib.get_subnet_by_cidr(data_engine['subnet_cidr'], os.environ['aws_notebook_vpc_id'])
+        cluster_nodes_tags = [data_engine['cluster_nodes_tag'], data_engine['cluster_nodes_resource_tag'],
+                              data_engine['cluster_nodes_billing_tag']]
+        nodes = [{'node_name': data_engine['master_node_name'], 'instance_type': data_engine['master_size'],
+                  'security_group_ids': master_security_group_id,
+                  'tags': cluster_nodes_tags + [{"Key": "Type", "Value": "master"}]}]
         for i in range(data_engine['instance_count'] - 1):
-            logging.info('[CREATE SLAVE NODE {}]'.format(i + 1))
-            slave_name = data_engine['slave_node_name'] + '{}'.format(i + 1)
-            data_engine['cluster_nodes_tag_type'] = {"Key": "Type", "Value": "slave"}
-            params = "--node_name {} --ami_id {} --instance_type {} --key_name {} --security_group_ids {} " \
-                     "--subnet_id {} --iam_profile {} --infra_tag_name {} --infra_tag_value {} " \
-                     "--primary_disk_size {} --instance_class {}" \
-                .format(slave_name, data_engine['ami_id'], data_engine['slave_size'],
-                        data_engine['key_name'],
-                        datalab.meta_lib.get_security_group_by_name(
-                            data_engine['dataengine_slave_security_group_name']),
-                        datalab.meta_lib.get_subnet_by_cidr(data_engine['subnet_cidr'],
-                                                            os.environ['aws_notebook_vpc_id']),
-                        data_engine['notebook_dataengine_role_profile_name'], data_engine['tag_name'],
-                        slave_name, data_engine['primary_disk_size'], data_engine['instance_class'])
-            try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
-                data_engine['slave_id'] = datalab.meta_lib.get_instance_by_name(data_engine['tag_name'], slave_name)
-                datalab.actions_lib.create_tag(data_engine['slave_id'], data_engine['cluster_nodes_tag'], False)
-                datalab.actions_lib.create_tag(data_engine['slave_id'], data_engine['cluster_nodes_resource_tag'],
-                                               False)
-                datalab.actions_lib.create_tag(data_engine['slave_id'], data_engine['cluster_nodes_billing_tag'], False)
-                datalab.actions_lib.create_tag(data_engine['slave_id'], data_engine['cluster_nodes_tag_type'], False)
-            except:
-                traceback.print_exc()
-                raise Exception
+            nodes.append({'node_name': data_engine['slave_node_name'] + '{}'.format(i + 1),
+                          'instance_type': data_engine['slave_size'], 'security_group_ids': slave_security_group_id,
+                          'tags': cluster_nodes_tags + [{"Key": "Type", "Value": "slave"}]})
+        instance_ids = datalab.actions_lib.create_instances_fleet(
+            nodes, data_engine['ami_id'], data_engine['key_name'], subnet_id,
+            data_engine['notebook_dataengine_role_profile_name'], data_engine['tag_name'],
+            data_engine['primary_disk_size'])
+        data_engine['master_id'] = instance_ids[data_engine['master_node_name']]
     except Exception as err:
-        datalab.actions_lib.remove_ec2(data_engine['tag_name'], data_engine['master_node_name'])
-        for i in range(data_engine['instance_count'] - 1):
-            slave_name = data_engine['slave_node_name'] + '{}'.format(i+1)
-            try:
-                datalab.actions_lib.remove_ec2(data_engine['tag_name'], slave_name)
-            except:
-                logging.error("The slave instance {} hasn't been created.".format(slave_name))
-        datalab.fab.append_result("Failed to create slave instances.", str(err))
+        traceback.print_exc()
+        datalab.actions_lib.remove_ec2(data_engine['tag_name'], [data_engine['master_node_name']] + [
+            data_engine['slave_node_name'] + '{}'.format(i + 1) for i in range(data_engine['instance_count'] - 1)])
+        datalab.fab.append_result("Failed to create cluster instances.", str(err))
         sys.exit(1)
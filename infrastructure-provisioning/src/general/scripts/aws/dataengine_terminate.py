@@ -23,6 +23,8 @@
 
 import datalab.actions_lib
 import datalab.fab
+import datalab.meta_lib
+import datalab.proxy_routes
 import json
 import os
 import sys
@@ -96,6 +98,17 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(data_engine['service_base_name'],
+                                                    data_engine['project_name'], data_engine['endpoint_name'])
+        datalab.proxy_routes.remove_terminated_routes(
+            datalab.meta_lib.get_instance_hostname(data_engine['tag_name'], edge_instance_name),
+            os.environ['conf_os_user'], data_engine['key_path'],
+            '{}_{}'.format(data_engine['exploratory_name'], data_engine['computational_name']))
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"service_base_name": data_engine['service_base_name'],
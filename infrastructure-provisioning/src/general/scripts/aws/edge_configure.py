@@ -24,12 +24,12 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
 import uuid
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -133,7 +133,7 @@ if __name__ == "__main__":
             edge_conf['initial_user'], edge_conf['datalab_ssh_user'], edge_conf['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -148,7 +148,7 @@ if __name__ == "__main__":
             format(edge_conf['instance_hostname'], edge_conf['keyfile_name'], edge_conf['datalab_ssh_user'],
                    os.environ['aws_region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -187,7 +187,7 @@ if __name__ == "__main__":
             edge_conf['instance_hostname'], edge_conf['keyfile_name'], json.dumps(additional_config),
             edge_conf['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_http_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('configure_http_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -206,7 +206,7 @@ if __name__ == "__main__":
             edge_conf['instance_hostname'], edge_conf['keyfile_name'], json.dumps(additional_config),
             edge_conf['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -225,7 +225,7 @@ if __name__ == "__main__":
                               edge_conf['endpoint_name']),
             edge_conf['keycloak_client_secret'], edge_conf['step_cert_sans'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_nginx_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('configure_nginx_reverse_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -242,7 +242,7 @@ if __name__ == "__main__":
                            edge_conf['instance_hostname'], edge_conf['project_name'],
                            edge_conf['endpoint_name'], edge_conf['edge_hostname'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+            datalab.runner.run_script('configure_keycloak', keycloak_params)
         except:
             traceback.print_exc()
             raise Exception
@@ -261,7 +261,7 @@ if __name__ == "__main__":
                 edge_conf['instance_hostname'], edge_conf['keyfile_name'], json.dumps(additional_config),
                 edge_conf['datalab_ssh_user'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('configure_nftables', params), shell=True, check=True)
+                datalab.runner.run_script('configure_nftables', params)
             except:
                 traceback.print_exc()
                 raise Exception
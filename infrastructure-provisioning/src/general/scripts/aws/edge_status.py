@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import os
 import sys
 import traceback
 from fabric import *
 from datalab.logger import logging
-import subprocess
 
 if __name__ == "__main__":
     datalab.actions_lib.create_aws_config_files()
@@ -39,7 +39,7 @@ if __name__ == "__main__":
         logging.info('[COLLECT DATA]')
         params = '--list_resources "{}"'.format(os.environ['edge_list_resources'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_collect_data', params), shell=True, check=True)
+            datalab.runner.run_script('common_collect_data', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -25,11 +25,11 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 import uuid
@@ -113,7 +113,7 @@ if __name__ == "__main__":
             notebook_config['initial_user'], notebook_config['datalab_ssh_user'], notebook_config['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -130,7 +130,7 @@ if __name__ == "__main__":
             instance_hostname, notebook_config['instance_name'], keyfile_name, json.dumps(additional_config),
             notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -146,7 +146,7 @@ if __name__ == "__main__":
             instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'], os.environ['aws_region'],
             edge_instance_private_ip)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -179,7 +179,7 @@ if __name__ == "__main__":
                    notebook_config['exploratory_name'],
                    edge_ip)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_jupyter_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_jupyter_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -195,7 +195,7 @@ if __name__ == "__main__":
         params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
             instance_hostname, keyfile_name, json.dumps(additional_config), notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             datalab.fab.append_result("Failed installing users key")
             raise Exception
@@ -209,8 +209,8 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(notebook_config['datalab_ssh_user'], instance_hostname, keyfile_name)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_download_git_certfile', params), shell=True, check=True)
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            datalab.runner.run_script('common_download_git_certfile', params)
+            datalab.runner.run_script('manage_git_creds', params)
         except:
             datalab.fab.append_result("Failed setup git credentials")
             raise Exception
@@ -226,7 +226,7 @@ if __name__ == "__main__":
                 .format(instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'],
                         notebook_config['tag_name'], notebook_config['instance_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_remove_remote_kernels', params), shell=True, check=True)
+                datalab.runner.run_script('common_remove_remote_kernels', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -254,7 +254,7 @@ if __name__ == "__main__":
                     notebook_config['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
@@ -313,7 +313,7 @@ if __name__ == "__main__":
                         notebook_config['project_name'], notebook_config['endpoint_name'],
                         notebook_config['exploratory_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+                datalab.runner.run_script('configure_keycloak', keycloak_params)
             except:
                 datalab.fab.append_result("Failed setup keycloak client")
                 raise Exception
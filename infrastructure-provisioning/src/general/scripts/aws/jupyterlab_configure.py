@@ -25,11 +25,11 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -112,7 +112,7 @@ if __name__ == "__main__":
              notebook_config['initial_user'], notebook_config['datalab_ssh_user'], notebook_config['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -129,7 +129,7 @@ if __name__ == "__main__":
             .format(instance_hostname, notebook_config['instance_name'], keyfile_name, json.dumps(additional_config),
                     notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -144,7 +144,7 @@ if __name__ == "__main__":
         params = "--hostname {} --keyfile {} --user {} --region {}". \
             format(instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'], os.environ['aws_region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -177,7 +177,7 @@ if __name__ == "__main__":
                    notebook_config['ip_address'],
                    notebook_config['exploratory_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_jupyterlab_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_jupyterlab_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -193,7 +193,7 @@ if __name__ == "__main__":
         params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
             instance_hostname, keyfile_name, json.dumps(additional_config), notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             datalab.fab.append_result("Failed installing users key")
             raise Exception
@@ -207,8 +207,8 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(notebook_config['datalab_ssh_user'], instance_hostname, keyfile_name)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_download_git_certfile', params), shell=True, check=True)
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            datalab.runner.run_script('common_download_git_certfile', params)
+            datalab.runner.run_script('manage_git_creds', params)
         except:
             datalab.fab.append_result("Failed setup git credentials")
             raise Exception
@@ -224,7 +224,7 @@ if __name__ == "__main__":
                 .format(instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'],
                         notebook_config['tag_name'], notebook_config['instance_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_remove_remote_kernels', params), shell=True, check=True)
+                datalab.runner.run_script('common_remove_remote_kernels', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -252,7 +252,7 @@ if __name__ == "__main__":
                     notebook_config['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
@@ -286,7 +286,7 @@ if __name__ == "__main__":
                    keyfile_name,
                    notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/configure_proxy_for_docker.py {}".format(params), shell=True, check=True)
+            datalab.runner.run_script('configure_proxy_for_docker', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -304,7 +304,7 @@ if __name__ == "__main__":
                    keyfile_name,
                    notebook_config['datalab_ssh_user'])
         try:
-           subprocess.run("~/scripts/jupyterlab_container_start.py {}".format(params), shell=True, check=True)
+           datalab.runner.run_script('jupyterlab_container_start', params)
         except:
             traceback.print_exc()
             raise Exception
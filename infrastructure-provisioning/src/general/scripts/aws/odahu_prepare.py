@@ -24,12 +24,12 @@
 import json
 import sys
 import requests
-import subprocess
 from datalab.fab import *
 from datalab.meta_lib import *
 from datalab.actions_lib import *
 from datalab.logger import logging
 import os
+import datalab.runner
 
 if __name__ == "__main__":
     logging.info('Generating infrastructure names and tags')
@@ -75,7 +75,7 @@ if __name__ == "__main__":
         params = "--bucket_name {0} --bucket_tags {1} --region {2} --bucket_name_tag {0}". \
             format(odahu_conf['bucket_name'], odahu_conf['bucket_tags'], odahu_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_bucket', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_bucket', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -25,6 +25,7 @@ import boto3
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
@@ -190,7 +191,7 @@ if __name__ == "__main__":
                   project_conf['private_subnet_name'],
                   project_conf['zone'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_subnet', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -218,7 +219,7 @@ if __name__ == "__main__":
         if 'aws_permissions_boundary_arn' in os.environ:
             params = '{} --permissions_boundary_arn {}'.format(params, os.environ['aws_permissions_boundary_arn'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_role_policy', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_role_policy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -239,7 +240,7 @@ if __name__ == "__main__":
         if 'aws_permissions_boundary_arn' in os.environ:
             params = '{} --permissions_boundary_arn {}'.format(params, os.environ['aws_permissions_boundary_arn'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_role_policy', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_role_policy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -413,7 +414,7 @@ if __name__ == "__main__":
                        project_conf['service_base_name'], project_conf['edge_instance_name'], json.dumps(edge_sg_egress),
                        True, project_conf['notebook_instance_name'], 'edge')
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_security_group', params)
             except Exception as err:
                 traceback.print_exc()
                 datalab.fab.append_result("Failed creating security group for edge node.", str(err))
@@ -493,7 +494,7 @@ if __name__ == "__main__":
                                                           project_conf['service_base_name'],
                                                           project_conf['notebook_instance_name'], True)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -517,7 +518,7 @@ if __name__ == "__main__":
                                                           project_conf['service_base_name'],
                                                           project_conf['dataengine_instances_name'], True)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -538,7 +539,7 @@ if __name__ == "__main__":
                                                           project_conf['service_base_name'],
                                                           project_conf['dataengine_instances_name'], True)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -561,7 +562,7 @@ if __name__ == "__main__":
             .format(project_conf['shared_bucket_name'], project_conf['shared_bucket_tags'], project_conf['region'],
                     project_conf['shared_bucket_name_tag'], project_conf['bucket_versioning_enabled'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_bucket', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_bucket', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -573,7 +574,7 @@ if __name__ == "__main__":
             .format(project_conf['bucket_name'], project_conf['bucket_tags'], project_conf['region'],
                     project_conf['bucket_name_tag'], project_conf['bucket_versioning_enabled'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_bucket', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_bucket', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -596,7 +597,7 @@ if __name__ == "__main__":
                   project_conf['service_base_name'], project_conf['region'],
                   os.environ['aws_user_predefined_s3_policies'], project_conf['endpoint_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_policy', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_policy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -623,7 +624,7 @@ if __name__ == "__main__":
                     project_conf['edge_role_profile_name'], project_conf['tag_name'],
                     project_conf['edge_instance_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
             edge_instance = datalab.meta_lib.get_instance_by_name(project_conf['tag_name'],
                                                                   project_conf['edge_instance_name'])
             if os.environ['edge_is_nat']:
@@ -658,7 +659,7 @@ if __name__ == "__main__":
                 project_conf['elastic_ip'], project_conf['edge_id'], project_conf['tag_name'],
                 project_conf['elastic_ip_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('edge_associate_elastic_ip', params), shell=True, check=True)
+                datalab.runner.run_script('edge_associate_elastic_ip', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -689,7 +690,7 @@ if __name__ == "__main__":
             params = "--vpc_id {} --infra_tag_value {} --edge_instance_id {} --private_subnet_id {} --sbn {}".format(
                 project_conf['vpc2_id'], project_conf['nat_rt_name'], edge_instance, subnet_id, project_conf['service_base_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('edge_configure_route_table', params), shell=True, check=True)
+                datalab.runner.run_script('edge_configure_route_table', params)
             except:
                 traceback.print_exc()
                 raise Exception
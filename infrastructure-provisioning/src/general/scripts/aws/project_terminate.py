@@ -21,8 +21,9 @@
 #
 # ******************************************************************************
 
-import boto3
 import datalab.actions_lib
+import datalab.clients_lib
+import datalab.executor
 import datalab.fab
 import datalab.meta_lib
 import json
@@ -35,12 +36,21 @@ from datalab.logger import logging
 
 def terminate_edge_node(tag_name, project_name, tag_value, nb_sg, edge_sg, de_sg, emr_sg, endpoint_name,
                         service_base_name):
-    logging.info('Terminating EMR cluster')
-    try:
+    def step(func, error_message):
+        def run():
+            try:
+                func()
+            except (Exception, SystemExit) as err:
+                datalab.fab.append_result(error_message, str(err))
+                raise
+        return run
+
+    def terminate_emr_clusters():
+        logging.info('Terminating EMR cluster')
         clusters_list = datalab.meta_lib.get_emr_list(tag_name)
         if clusters_list:
             for cluster_id in clusters_list:
-                client = boto3.client('emr')
+                client = datalab.clients_lib.client('emr')
                 cluster = client.describe_cluster(ClusterId=cluster_id)
                 cluster = cluster.get("Cluster")
                 emr_name = cluster.get('Name')
@@ -49,63 +59,59 @@ def terminate_edge_node(tag_name, project_name, tag_value, nb_sg, edge_sg, de_sg
                     logging.info("The EMR cluster {} has been terminated successfully".format(emr_name))
         else:
             logging.info("There are no EMR clusters to terminate.")
-    except Exception as err:
-        datalab.fab.append_result("Failed to terminate EMR cluster.", str(err))
-        sys.exit(1)
 
-    logging.info("Terminating EDGE and notebook instances")
-    try:
+    def remove_instances():
+        logging.info("Terminating EDGE and notebook instances")
         datalab.actions_lib.remove_ec2(tag_name, tag_value)
-    except Exception as err:
-        datalab.fab.append_result("Failed to terminate instances.", str(err))
-        sys.exit(1)
 
-    logging.info("Removing s3 bucket")
-    try:
+    def remove_buckets():
+        logging.info("Removing s3 bucket")
         datalab.actions_lib.remove_s3('edge', project_name)
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove buckets.", str(err))
-        sys.exit(1)
 
-    logging.info("Removing IAM roles and profiles")
-    try:
+    def remove_iam_resources():
+        logging.info("Removing IAM roles and profiles")
         datalab.actions_lib.remove_all_iam_resources('notebook', project_name, endpoint_name)
         datalab.actions_lib.remove_all_iam_resources('edge', project_name, endpoint_name)
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove IAM roles and profiles.", str(err))
-        sys.exit(1)
 
-    logging.info("Deregistering project specific notebook's AMI")
-    try:
+    def remove_images():
+        logging.info("Deregistering project specific notebook's AMI")
         datalab.actions_lib.deregister_image('{}-{}-{}-*'.format(service_base_name, project_name, endpoint_name))
-    except Exception as err:
-        datalab.fab.append_result("Failed to deregister images.", str(err))
-        sys.exit(1)
 
-    logging.info("Removing security groups")
-    try:
-        datalab.actions_lib.remove_sgroups(emr_sg)
-        datalab.actions_lib.remove_sgroups(de_sg)
-        datalab.actions_lib.remove_sgroups(nb_sg)
-        datalab.actions_lib.remove_sgroups(edge_sg)
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove Security Groups.", str(err))
-        sys.exit(1)
+    def remove_security_groups():
+        logging.info("Removing security groups")
+        datalab.actions_lib.remove_sgroups([emr_sg, de_sg, nb_sg, edge_sg])
 
-    logging.info("Removing private subnet")
-    try:
+    def remove_private_subnets():
+        logging.info("Removing private subnet")
         datalab.actions_lib.remove_subnets(tag_value)
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove subnets.", str(err))
-        sys.exit(1)
 
-    logging.info("Removing project route tables")
+    def remove_nat_route_tables():
+        logging.info("Removing project route tables")
+        datalab.actions_lib.remove_route_tables("Name", False, '{}-{}-{}-nat-rt'.format(service_base_name,
+                                                                                         project_name, endpoint_name))
+
+    # Instances and clusters have to be gone before the network resources and roles they use are deleted,
+    # everything else is independent and runs concurrently
+    tasks = {'emr': step(terminate_emr_clusters, "Failed to terminate EMR cluster."),
+             'instances': step(remove_instances, "Failed to terminate instances."),
+             'buckets': step(remove_buckets, "Failed to remove buckets."),
+             'iam': step(remove_iam_resources, "Failed to remove IAM roles and profiles."),
+             'images': step(remove_images, "Failed to deregister images."),
+             'security_groups': step(remove_security_groups, "Failed to remove Security Groups."),
+             'subnets': step(remove_private_subnets, "Failed to remove subnets."),
+             'route_tables': step(remove_nat_route_tables, "Failed to remove project route table.")}
+    dependencies = {'buckets': ['emr'],
+                    'iam': ['emr', 'instances'],
+                    'security_groups': ['emr', 'instances'],
+                    'subnets': ['emr', 'instances'],
+                    'route_tables': ['subnets']}
     try:
-        datalab.actions_lib.remove_route_tables("Name", False, '{}-{}-{}-nat-rt'.format(service_base_name, project_name, endpoint_name))
+        datalab.executor.run_dag(tasks, dependencies)
     except Exception as err:
-        datalab.fab.append_result("Failed to remove project route table.", str(err))
+        logging.error('Error: {0}'.format(err))
         sys.exit(1)
 
+
 if __name__ == "__main__":
     local_log_filename = "{}_{}_{}.log".format(os.environ['conf_resource'], os.environ['project_name'],
                                                os.environ['request_id'])
@@ -157,7 +163,7 @@ if __name__ == "__main__":
         endpoint_id = datalab.meta_lib.get_instance_by_name(project_conf['tag_name'],
                                                             project_conf['endpoint_instance_name'])
         logging.info("Endpoint id: " + endpoint_id)
-        ec2 = boto3.client('ec2')
+        ec2 = datalab.clients_lib.client('ec2')
         ec2.delete_tags(Resources=[endpoint_id], Tags=[{'Key': 'project_tag'}, {'Key': 'endpoint_tag'}])
     except Exception as err:
         logging.error("Failed to remove Project tag from Enpoint", str(err))
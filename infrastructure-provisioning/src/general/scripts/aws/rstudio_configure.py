@@ -25,11 +25,11 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 from datalab.logger import logging
 
@@ -120,7 +120,7 @@ if __name__ == "__main__":
             notebook_config['initial_user'], notebook_config['datalab_ssh_user'], notebook_config['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -137,7 +137,7 @@ if __name__ == "__main__":
             .format(instance_hostname, notebook_config['instance_name'], keyfile_name, json.dumps(additional_config),
                     notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -153,7 +153,7 @@ if __name__ == "__main__":
             format(instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'], os.environ['aws_region'],
                    edge_instance_private_ip)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -172,7 +172,7 @@ if __name__ == "__main__":
                     os.environ['notebook_rstudio_version'], notebook_config['datalab_ssh_user'],
                     notebook_config['ip_address'], notebook_config['exploratory_name'], edge_ip)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_rstudio_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_rstudio_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -188,7 +188,7 @@ if __name__ == "__main__":
         params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
             instance_hostname, keyfile_name, json.dumps(additional_config), notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -202,7 +202,7 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(notebook_config['datalab_ssh_user'], instance_hostname, keyfile_name)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            datalab.runner.run_script('manage_git_creds', params)
         except:
             datalab.fab.append_result("Failed setup git credentials")
             raise Exception
@@ -218,7 +218,7 @@ if __name__ == "__main__":
                 .format(instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'],
                         notebook_config['tag_name'], notebook_config['instance_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_remove_remote_kernels', params), shell=True, check=True)
+                datalab.runner.run_script('common_remove_remote_kernels', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -237,7 +237,7 @@ if __name__ == "__main__":
             .format(edge_instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'], 'rstudio',
                     notebook_config['exploratory_name'], json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
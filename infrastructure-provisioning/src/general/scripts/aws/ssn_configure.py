@@ -25,19 +25,19 @@ import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
 import datalab.ssn_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 import uuid
 from fabric import *
 
 def cleanup_aws_resources(tag_name, service_base_name):
     try:
         params = "--tag_name {} --service_base_name {}".format(tag_name, service_base_name)
-        subprocess.run("~/scripts/{}.py {}".format('ssn_terminate_aws_resources', params), shell=True, check=True)
+        datalab.runner.run_script('ssn_terminate_aws_resources', params)
     except:
         traceback.print_exc()
         raise Exception
@@ -135,7 +135,7 @@ if __name__ == "__main__":
             ssn_conf['instance_hostname'], os.environ['conf_key_dir'] + os.environ['conf_key_name'] + ".pem",
             ssn_conf['initial_user'], ssn_conf['datalab_ssh_user'], ssn_conf['sudo_group'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -158,7 +158,7 @@ if __name__ == "__main__":
             ssn_conf['instance_hostname'], "{}{}.pem".format(os.environ['conf_key_dir'], os.environ['conf_key_name']),
             pip_packages, ssn_conf['datalab_ssh_user'], ssn_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -182,7 +182,7 @@ if __name__ == "__main__":
             json.dumps(additional_config), ssn_conf['datalab_ssh_user'], ssn_conf['ssn_datalab_path'],
             ssn_conf['conf_tag_resource_id'], ssn_conf['step_cert_sans'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_ssn_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_ssn_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -217,7 +217,7 @@ if __name__ == "__main__":
                                                           os.environ['conf_cloud_provider'], os.environ['aws_region'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_docker', params), shell=True, check=True)
+            datalab.runner.run_script('configure_docker', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -556,7 +556,7 @@ if __name__ == "__main__":
                    os.environ['keycloak_auth_server_url'],
                    os.environ['keycloak_realm_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_ui', params), shell=True, check=True)
+            datalab.runner.run_script('configure_ui', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -574,7 +574,7 @@ if __name__ == "__main__":
                 os.environ['keycloak_user_password'], datalab.meta_lib.get_instance_hostname(
             ssn_conf['tag_name'], ssn_conf['instance_name']), os.environ['keycloak_client_secret'])
     try:
-        subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+        datalab.runner.run_script('configure_keycloak', keycloak_params)
     except Exception as err:
         datalab.fab.append_result("Failed to create ssn keycloak client: " + str(err))
         #clear_resources()
@@ -624,13 +624,13 @@ if __name__ == "__main__":
         params = "--instance_name {} --local_log_filepath {} --os_user {} --instance_hostname {}". \
             format(ssn_conf['instance_name'], local_log_filepath, ssn_conf['datalab_ssh_user'],
                    ssn_conf['instance_hostname'])
-        subprocess.run("~/scripts/{}.py {}".format('upload_response_file', params), shell=True, check=True)
+        datalab.runner.run_script('upload_response_file', params)
 
         logging.info('[FINALIZE]')
         params = ""
         if os.environ['conf_lifecycle_stage'] == 'prod':
             params += "--key_id {}".format(os.environ['aws_access_key'])
-            subprocess.run("~/scripts/{}.py {}".format('ssn_finalize', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_finalize', params)
     except Exception as err:
         logging.error('Error: {0}'.format(err))
         datalab.fab.append_result("Error with writing results.", str(err))
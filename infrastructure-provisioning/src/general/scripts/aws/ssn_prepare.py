@@ -24,18 +24,18 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 from datalab.logger import logging
 import json
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 def cleanup_aws_resources(tag_name, service_base_name):
     try:
         params = "--tag_name {} --service_base_name {}".format(tag_name, service_base_name)
-        subprocess.run("~/scripts/{}.py {}".format('ssn_terminate_aws_resources', params), shell=True, check=True)
+        datalab.runner.run_script('ssn_terminate_aws_resources', params)
     except:
         traceback.print_exc()
         raise Exception
@@ -112,7 +112,7 @@ if __name__ == "__main__":
                 ssn_conf['vpc_cidr'], ssn_conf['region'], ssn_conf['tag_name'], ssn_conf['service_base_name'],
                 ssn_conf['vpc_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('ssn_create_vpc', params), shell=True, check=True)
+                datalab.runner.run_script('ssn_create_vpc', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -136,7 +136,7 @@ if __name__ == "__main__":
                      " --vpc_name {}".format(ssn_conf['vpc2_cidr'], ssn_conf['region'], ssn_conf['tag2_name'],
                                             ssn_conf['service_base_name'], ssn_conf['vpc2_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('ssn_create_vpc', params), shell=True, check=True)
+                datalab.runner.run_script('ssn_create_vpc', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -161,7 +161,7 @@ if __name__ == "__main__":
                                                                      '20', True,
                                                                      ssn_conf['zone_full'], ssn_conf['subnet_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_subnet', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -244,7 +244,7 @@ if __name__ == "__main__":
                        json.dumps(ssn_conf['ingress_sg_rules_template']), json.dumps(egress_sg_rules_template),
                        ssn_conf['service_base_name'], ssn_conf['tag_name'], False, True)
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_security_group', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -271,7 +271,7 @@ if __name__ == "__main__":
             if 'aws_permissions_boundary_arn' in os.environ:
                 params = '{} --permissions_boundary_arn {}'.format(params, os.environ['aws_permissions_boundary_arn'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_role_policy', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_role_policy', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -287,7 +287,7 @@ if __name__ == "__main__":
         params = "--vpc_id {} --region {} --infra_tag_name {} --infra_tag_value {}".format(
             ssn_conf['aws_vpc_id'], ssn_conf['region'], ssn_conf['tag_name'], ssn_conf['service_base_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('ssn_create_endpoint', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_create_endpoint', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -305,7 +305,7 @@ if __name__ == "__main__":
                 ssn_conf['aws_vpc2_id'], ssn_conf['aws_region'], ssn_conf['tag2_name'],
                 ssn_conf['service_base_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('ssn_create_endpoint', params), shell=True, check=True)
+                datalab.runner.run_script('ssn_create_endpoint', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -326,7 +326,7 @@ if __name__ == "__main__":
                    ssn_conf['role_profile_name'], ssn_conf['tag_name'], ssn_conf['instance_name'], 'ssn', '20')
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -348,7 +348,7 @@ if __name__ == "__main__":
             params = "--elastic_ip {} --ssn_id {} --infra_tag_name {} --infra_tag_value {}".format(
                 ssn_conf['elastic_ip'], ssn_conf['ssn_id'], ssn_conf['tag_name'], ssn_conf['elastic_ip_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('ssn_associate_elastic_ip', params), shell=True, check=True)
+                datalab.runner.run_script('ssn_associate_elastic_ip', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -22,11 +22,11 @@
 # ******************************************************************************
 
 import datalab.ssn_lib
+import datalab.runner
 import json
 import os
 import sys
 import traceback
-import subprocess
 import requests
 from fabric import *
 from datalab.logger import logging
@@ -53,7 +53,7 @@ if __name__ == "__main__":
                  format(ssn_conf['tag_name'], ssn_conf['edge_sg'], ssn_conf['nb_sg'], ssn_conf['de_sg'],
                         ssn_conf['service_base_name'], ssn_conf['de-service_sg'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('ssn_terminate_aws_resources', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_terminate_aws_resources', params)
         except:
             traceback.print_exc()
             raise Exception
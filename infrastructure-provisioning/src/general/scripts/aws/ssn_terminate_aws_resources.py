@@ -22,7 +22,8 @@
 # ******************************************************************************
 
 import argparse
-import boto3
+import datalab.clients_lib
+import datalab.executor
 import datalab.ssn_lib
 from datalab.logger import logging
 import os
@@ -38,139 +39,155 @@ parser.add_argument('--de_se_sg', type=str)
 args = parser.parse_args()
 tag2 = args.service_base_name + '-secondary-tag'
 
-##############
-# Run script #
-##############
 
-if __name__ == "__main__":
-    logging.info('Terminating EMR cluster')
-    try:
-        clusters_list = datalab.meta_lib.get_emr_list(args.tag_name)
-        if clusters_list:
-            for cluster_id in clusters_list:
-                client = boto3.client('emr')
-                cluster = client.describe_cluster(ClusterId=cluster_id)
-                cluster = cluster.get("Cluster")
-                emr_name = cluster.get('Name')
-                datalab.actions_lib.terminate_emr(cluster_id)
-                logging.info("The EMR cluster {} has been terminated successfully".format(emr_name))
-        else:
-            logging.info("There are no EMR clusters to terminate.")
-    except Exception as err:
-        datalab.fab.append_result("Failed to terminate EMR cluster.", str(err))
-        sys.exit(1)
+def step(func, error_message):
+    def run():
+        try:
+            func()
+        except (Exception, SystemExit) as err:
+            datalab.fab.append_result(error_message, str(err))
+            raise
+    return run
 
+
+def terminate_emr_clusters():
+    logging.info('Terminating EMR cluster')
+    clusters_list = datalab.meta_lib.get_emr_list(args.tag_name)
+    if clusters_list:
+        for cluster_id in clusters_list:
+            client = datalab.clients_lib.client('emr')
+            cluster = client.describe_cluster(ClusterId=cluster_id)
+            cluster = cluster.get("Cluster")
+            emr_name = cluster.get('Name')
+            datalab.actions_lib.terminate_emr(cluster_id)
+            logging.info("The EMR cluster {} has been terminated successfully".format(emr_name))
+    else:
+        logging.info("There are no EMR clusters to terminate.")
+
+
+def remove_images():
     logging.info("Deregistering notebook's AMI")
-    try:
-        datalab.actions_lib.deregister_image()
-    except Exception as err:
-        datalab.fab.append_result("Failed to deregister images.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.deregister_image()
 
+
+def remove_instances():
     logging.info("Terminating EC2 instances")
-    try:
-        datalab.actions_lib.remove_ec2(args.tag_name, '*')
-    except Exception as err:
-        datalab.fab.append_result("Failed to terminate instances.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_ec2(args.tag_name, '*')
 
+
+def remove_route53_records():
     if 'ssn_hosted_zone_id' in os.environ and 'ssn_hosted_zone_name' in os.environ and 'ssn_subdomain' in os.environ:
         logging.info("Removing Route53 records")
         datalab.actions_lib.remove_route_53_record(os.environ['ssn_hosted_zone_id'], os.environ['ssn_hosted_zone_name'],
                                                    os.environ['ssn_subdomain'])
 
+
+def remove_security_groups():
     logging.info("Removing security groups")
     try:
-        try:
-            datalab.actions_lib.remove_sgroups(args.de_se_sg)
-            datalab.actions_lib.remove_sgroups(args.de_sg)
-            datalab.actions_lib.remove_sgroups(args.nb_sg)
-            datalab.actions_lib.remove_sgroups(args.edge_sg)
-        except:
-            logging.info("There are no SG for compute resources")
-        try:
-            datalab.actions_lib.remove_sgroups(args.tag_name)
-        except:
-            logging.info("There is SSN SG")
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove security groups.", str(err))
-        sys.exit(1)
+        datalab.actions_lib.remove_sgroups([args.de_se_sg, args.de_sg, args.nb_sg, args.edge_sg])
+    except:
+        logging.info("There are no SG for compute resources")
+    try:
+        datalab.actions_lib.remove_sgroups(args.tag_name)
+    except:
+        logging.info("There is SSN SG")
 
+
+def remove_private_subnets():
     logging.info("Removing private subnet")
-    try:
-        datalab.actions_lib.remove_subnets('*')
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove subnets.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_subnets('*')
 
+
+def remove_peering_connections():
     logging.info("Removing peering connection")
-    try:
-        datalab.actions_lib.remove_peering('*')
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove peering connections.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_peering('*')
 
+
+def remove_buckets():
     logging.info("Removing s3 buckets")
-    try:
-        datalab.actions_lib.remove_s3()
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove buckets.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_s3()
+
 
+def remove_iam_resources():
     logging.info("Removing IAM roles, profiles and policies")
-    try:
-        datalab.actions_lib.remove_all_iam_resources('all')
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove IAM roles, profiles and policies.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_all_iam_resources('all')
+
 
+def remove_route_tables():
     logging.info("Removing route tables")
-    try:
-        datalab.actions_lib.remove_route_tables(args.tag_name)
-        datalab.actions_lib.remove_route_tables(tag2)
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove route tables.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_route_tables(args.tag_name)
+    datalab.actions_lib.remove_route_tables(tag2)
+
 
+def remove_ssn_subnet():
     logging.info("Removing SSN subnet")
-    try:
-        datalab.actions_lib.remove_subnets(args.service_base_name + '-subnet')
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove SSN subnet.", str(err))
-        sys.exit(1)
+    datalab.actions_lib.remove_subnets(args.service_base_name + '-subnet')
+
 
+def remove_ssn_vpc():
     logging.info("Removing SSN VPC")
-    try:
-        vpc_id = datalab.meta_lib.get_vpc_by_tag(args.tag_name, args.service_base_name)
-        if vpc_id != '':
-            try:
-                datalab.actions_lib.remove_vpc_endpoints(vpc_id)
-            except:
-                logging.info("There is no such VPC Endpoint")
-            try:
-                datalab.actions_lib.remove_internet_gateways(vpc_id, args.tag_name, args.service_base_name)
-            except:
-                logging.info("There is no such Internet gateway")
-            datalab.actions_lib.remove_route_tables(args.tag_name, True)
-            datalab.actions_lib.remove_vpc(vpc_id)
-        else:
-            logging.info("There is no pre-defined SSN VPC")
-    except Exception as err:
-        datalab.fab.append_result("Failed to remove SSN VPC.", str(err))
-        sys.exit(1)
+    vpc_id = datalab.meta_lib.get_vpc_by_tag(args.tag_name, args.service_base_name)
+    if vpc_id != '':
+        try:
+            datalab.actions_lib.remove_vpc_endpoints(vpc_id)
+        except:
+            logging.info("There is no such VPC Endpoint")
+        try:
+            datalab.actions_lib.remove_internet_gateways(vpc_id, args.tag_name, args.service_base_name)
+        except:
+            logging.info("There is no such Internet gateway")
+        datalab.actions_lib.remove_route_tables(args.tag_name, True)
+        datalab.actions_lib.remove_vpc(vpc_id)
+    else:
+        logging.info("There is no pre-defined SSN VPC")
 
+
+def remove_notebook_vpc():
     logging.info("Removing notebook VPC")
+    vpc_id = datalab.meta_lib.get_vpc_by_tag(tag2, args.service_base_name)
+    if vpc_id != '':
+        try:
+            datalab.actions_lib.remove_vpc_endpoints(vpc_id)
+        except:
+            logging.info("There is no such VPC Endpoint")
+        datalab.actions_lib.remove_route_tables(tag2, True)
+        datalab.actions_lib.remove_vpc(vpc_id)
+    else:
+        logging.info("There is no pre-defined notebook VPC")
+
+
+##############
+# Run script #
+##############
+
+if __name__ == "__main__":
+    # Resources are removed as a dependency graph: a resource is deleted once everything that uses it
+    # is gone, independent branches (images, buckets, IAM, network) are processed concurrently
+    tasks = {'emr': step(terminate_emr_clusters, "Failed to terminate EMR cluster."),
+             'images': step(remove_images, "Failed to deregister images."),
+             'instances': step(remove_instances, "Failed to terminate instances."),
+             'route53': step(remove_route53_records, "Failed to remove Route53 records."),
+             'security_groups': step(remove_security_groups, "Failed to remove security groups."),
+             'subnets': step(remove_private_subnets, "Failed to remove subnets."),
+             'peering': step(remove_peering_connections, "Failed to remove peering connections."),
+             'buckets': step(remove_buckets, "Failed to remove buckets."),
+             'iam': step(remove_iam_resources, "Failed to remove IAM roles, profiles and policies."),
+             'route_tables': step(remove_route_tables, "Failed to remove route tables."),
+             'ssn_subnet': step(remove_ssn_subnet, "Failed to remove SSN subnet."),
+             'ssn_vpc': step(remove_ssn_vpc, "Failed to remove SSN VPC."),
+             'notebook_vpc': step(remove_notebook_vpc, "Failed to remove wecondary VPC.")}
+    dependencies = {'security_groups': ['emr', 'instances'],
+                    'subnets': ['emr', 'instances'],
+                    'peering': ['emr', 'instances'],
+                    'buckets': ['emr'],
+                    'iam': ['emr', 'instances'],
+                    'route_tables': ['subnets', 'peering'],
+                    'ssn_subnet': ['route_tables'],
+                    'ssn_vpc': ['ssn_subnet', 'security_groups', 'peering'],
+                    'notebook_vpc': ['ssn_subnet', 'security_groups', 'peering']}
     try:
-        vpc_id = datalab.meta_lib.get_vpc_by_tag(tag2, args.service_base_name)
-        if vpc_id != '':
-            try:
-                datalab.actions_lib.remove_vpc_endpoints(vpc_id)
-            except:
-                logging.info("There is no such VPC Endpoint")
-            datalab.actions_lib.remove_route_tables(tag2, True)
-            datalab.actions_lib.remove_vpc(vpc_id)
-        else:
-            logging.info("There is no pre-defined notebook VPC")
+        datalab.executor.run_dag(tasks, dependencies)
     except Exception as err:
-        datalab.fab.append_result("Failed to remove wecondary VPC.", str(err))
+        logging.error('Error: {0}'.format(err))
         sys.exit(1)
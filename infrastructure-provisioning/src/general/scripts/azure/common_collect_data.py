@@ -23,6 +23,7 @@
 
 import argparse
 import ast
+import datalab.executor
 import json
 import sys
 import traceback
@@ -41,21 +42,20 @@ if __name__ == "__main__":
     data = ast.literal_eval(args.list_resources.replace('\'', '"'))
     statuses = {}
     try:
-        try:
-            data_instances = AzureMeta().get_list_instance_statuses(args.resource_group_name, data.get('host'))
-            statuses['host'] = data_instances
-        except:
-            logging.error("Hosts JSON wasn't been provided")
-        try:
-            data_images = AzureMeta().get_image_statuses(args.resource_group_name, data.get('image'))
-            statuses['image'] = data_images
-        except:
-            logging.error("Images JSON wasn't been provided")
-        try:
-            data_clusters = AzureMeta().list_hdinsight_statuses(args.resource_group_name, data.get('cluster'))
-            statuses['cluster'] = data_clusters
-        except:
-            logging.error("Clusters JSON wasn't been provided")
+        # Hosts, clusters and images are independent lookups, so they run side by side
+        tasks = dict()
+        if data.get('host') is not None:
+            tasks['host'] = lambda: AzureMeta().get_list_instance_statuses(args.resource_group_name,
+                                                                           data.get('host'))
+        if data.get('image') is not None:
+            tasks['image'] = lambda: AzureMeta().get_image_statuses(args.resource_group_name, data.get('image'))
+        if data.get('cluster') is not None:
+            tasks['cluster'] = lambda: AzureMeta().list_hdinsight_statuses(args.resource_group_name,
+                                                                           data.get('cluster'))
+        statuses = datalab.executor.run_concurrently(tasks)
+        for resource_type in ('host', 'cluster', 'image'):
+            if resource_type not in statuses:
+                logging.info("{} statuses weren't collected".format(resource_type.capitalize()))
         with open('/root/result.json', 'w') as outfile:
             json.dump(statuses, outfile)
     except Exception as err:
@@ -24,11 +24,11 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 from datalab.logger import logging
 import json
 import os
 import sys
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -87,7 +87,7 @@ if __name__ == "__main__":
                                                     json.dumps(image_conf['tags']))
             logging.info("Image was successfully created.")
             try:
-                subprocess.run("~/scripts/{}.py".format('common_prepare_notebook'), shell=True, check=True)
+                datalab.runner.run_script('common_prepare_notebook')
                 instance_running = False
                 while not instance_running:
                     if AzureMeta.get_instance_status(image_conf['resource_group_name'],
@@ -105,7 +105,7 @@ if __name__ == "__main__":
                 params = "--hostname {} --instance_name {} --keyfile {} --additional_config '{}' --os_user {}" \
                     .format(instance_hostname, image_conf['instance_name'], keyfile_name,
                             json.dumps(additional_config), image_conf['datalab_ssh_user'])
-                subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+                datalab.runner.run_script('common_configure_proxy', params)
                 logging.info("Image was successfully created. It's name is {}".format(image_conf['full_image_name']))
             except Exception as err:
                 AzureActions.remove_instance(image_conf['resource_group_name'], image_conf['instance_name'])
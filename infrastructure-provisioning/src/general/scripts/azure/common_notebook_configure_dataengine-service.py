@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 
@@ -98,8 +98,7 @@ if __name__ == "__main__":
                     edge_instance_hostname, '3128', os.environ['notebook_scala_version'], os.environ['application'],
                     notebook_config['headnode_ip'])
         try:
-            subprocess.run("~/scripts/{}_{}.py {}".format(application, 'install_dataengine-service_kernels', params), 
-                           shell=True, check=True)
+            datalab.runner.run_script('{}_install_dataengine-service_kernels'.format(application), params)
         except:
             traceback.print_exc()
             raise Exception
@@ -117,7 +116,7 @@ if __name__ == "__main__":
                     notebook_config['key_path'],
                     os.environ['conf_os_user'])
         try:
-            subprocess.run("~/scripts/{0}.py {1}".format('common_configure_spark', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_spark', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 
@@ -98,7 +98,7 @@ if __name__ == "__main__":
                    notebook_config['spark_master_url'], notebook_config['key_path'], notebook_config['notebook_ip'],
                    os.environ['azure_datalake_enable'], notebook_config['spark_master_ip'])
         try:
-            subprocess.run("~/scripts/{}_{}.py {}".format(os.environ['application'], 'install_dataengine_kernels', params), shell=True, check=True)
+            datalab.runner.run_script('{}_install_dataengine_kernels'.format(os.environ['application']), params)
         except:
             traceback.print_exc()
             raise Exception
@@ -118,7 +118,7 @@ if __name__ == "__main__":
                     notebook_config['datalab_ssh_user'],
                     notebook_config['cluster_name'])
         try:
-            subprocess.run("~/scripts/{0}.py {1}".format('common_configure_spark', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_spark', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from Crypto.PublicKey import RSA
 from fabric import *
 
@@ -177,7 +177,7 @@ if __name__ == "__main__":
                    notebook_config['instance_storage_account_type'], notebook_config['image_name'],
                    notebook_config['image_type'], json.dumps(notebook_config['tags']))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
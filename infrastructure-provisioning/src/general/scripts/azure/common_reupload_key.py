@@ -23,12 +23,12 @@
 
 
 import argparse
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from datalab.logger import logging
 from fabric import *
+import datalab.runner
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--conf_resource', type=str, default='')
@@ -46,7 +46,7 @@ if __name__ == "__main__":
         params = "--user {} --hostname {} --keyfile '{}' --additional_config '{}'".format(
             args.os_user, ip, args.keyfile, args.additional_config)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except Exception as err:
             logging.error('Error: {0}'.format(err))
             sys.exit(1)
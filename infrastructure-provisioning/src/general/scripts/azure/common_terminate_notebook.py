@@ -24,6 +24,7 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 import requests
 from datalab.logger import logging
@@ -136,6 +137,23 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(os.environ['conf_service_base_name'], os.environ['project_name'],
+                                                    os.environ['endpoint_name'])
+        if os.environ['conf_network_type'] == 'private':
+            edge_instance_hostname = AzureMeta.get_private_ip_address(notebook_config['resource_group_name'],
+                                                                      edge_instance_name)
+        else:
+            edge_instance_hostname = 'host-{}.{}.cloudapp.azure.com'.format(edge_instance_name,
+                                                                            os.environ['azure_region'])
+        datalab.proxy_routes.remove_terminated_routes(
+            edge_instance_hostname, os.environ['conf_os_user'],
+            '{}{}.pem'.format(os.environ['conf_key_dir'], os.environ['conf_key_name']),
+            notebook_config['exploratory_name'], clusters=True)
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"notebook_name": notebook_config['notebook_name'],
@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.meta_lib
 import datalab.actions_lib
+import datalab.runner
 import json
 import multiprocessing
 import os
 import sys
 import traceback
-import subprocess
 from Crypto.PublicKey import RSA
 from datalab.logger import logging
 from fabric import *
@@ -143,7 +143,7 @@ if __name__ == "__main__":
             format(hdinsight_conf['cluster_container_name'], json.dumps(hdinsight_conf['cluster_storage_account_tags']),
                    hdinsight_conf['resource_group_name'], hdinsight_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_storage_account', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_storage_account', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -189,7 +189,7 @@ if __name__ == "__main__":
                     hdinsight_conf['shared_storage_account_key'], hdinsight_conf['shared_container_name'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('dataengine-service_create', params), shell=True, check=True)
+            datalab.runner.run_script('dataengine-service_create', params)
         except:
             traceback.print_exc()
             raise Exception
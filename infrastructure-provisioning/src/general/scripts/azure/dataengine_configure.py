@@ -24,119 +24,15 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
-import multiprocessing
 import os
 import sys
-import traceback
-import subprocess
 from Crypto.PublicKey import RSA
 from fabric import *
 
 
-def configure_slave(slave_number, data_engine):
-    slave_name = data_engine['slave_node_name'] + '{}'.format(slave_number + 1)
-    slave_hostname = AzureMeta.get_private_ip_address(data_engine['resource_group_name'], slave_name)
-    try:
-        logging.info('[CREATING DATALAB SSH USER ON SLAVE NODE]')
-        params = "--hostname {} --keyfile {} --initial_user {} --os_user {} --sudo_group {}".format \
-            (slave_hostname, os.environ['conf_key_dir'] + data_engine['key_name'] + ".pem", initial_user,
-             data_engine['datalab_ssh_user'], sudo_group)
-
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to create ssh user on slave.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[INSTALLING USERs KEY ON SLAVE]')
-        additional_config = {"user_keyname": data_engine['project_name'],
-                             "user_keydir": os.environ['conf_key_dir']}
-        params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
-            slave_hostname, os.environ['conf_key_dir'] + data_engine['key_name'] + ".pem",
-            json.dumps(additional_config), data_engine['datalab_ssh_user'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to install user ssh key on slave.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[CLEANING INSTANCE FOR SLAVE NODE]')
-        params = '--hostname {} --keyfile {} --os_user {} --application {}' \
-            .format(slave_hostname, keyfile_name, data_engine['datalab_ssh_user'], os.environ['application'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('common_clean_instance', params), shell=True, check=True)
-            datalab.actions_lib.ensure_right_mount_paths(True, data_engine['datalab_ssh_user'], slave_hostname,
-                                                         keyfile_name)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to clean slave instance..", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[CONFIGURE PROXY ON SLAVE NODE]')
-        additional_config = {"proxy_host": edge_instance_private_hostname, "proxy_port": "3128"}
-        params = "--hostname {} --instance_name {} --keyfile {} --additional_config '{}' --os_user {}"\
-            .format(slave_hostname, slave_name, keyfile_name, json.dumps(additional_config),
-                    data_engine['datalab_ssh_user'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to configure proxy on slave.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[INSTALLING PREREQUISITES ON SLAVE NODE]')
-        params = "--hostname {} --keyfile {} --user {} --region {} --edge_private_ip {}". \
-            format(slave_hostname, keyfile_name, data_engine['datalab_ssh_user'], data_engine['region'],
-                   edge_instance_private_hostname)
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to install prerequisites on slave.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[CONFIGURE SLAVE NODE {}]'.format(slave + 1))
-        params = "--hostname {} --keyfile {} --region {} --spark_version {} --hadoop_version {} --os_user {} " \
-                 "--scala_version {} --master_ip {} --node_type {}". \
-            format(slave_hostname, keyfile_name, data_engine['region'], os.environ['notebook_spark_version'],
-                   os.environ['notebook_hadoop_version'], data_engine['datalab_ssh_user'],
-                   os.environ['notebook_scala_version'], master_node_hostname,
-                   'slave')
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_dataengine', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to configure slave node.", str(err))
-        sys.exit(1)
-
-
 def clear_resources():
     for i in range(data_engine['instance_count'] - 1):
         slave_name = data_engine['slave_node_name'] + '{}'.format(i + 1)
@@ -219,117 +115,52 @@ if __name__ == "__main__":
         sys.exit(1)
 
     try:
-        logging.info('[CREATING DATALAB SSH USER ON MASTER NODE]')
-        params = "--hostname {} --keyfile {} --initial_user {} --os_user {} --sudo_group {}".format \
-            (master_node_hostname, os.environ['conf_key_dir'] + data_engine['key_name'] + ".pem", initial_user,
-             data_engine['datalab_ssh_user'], sudo_group)
-
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to create ssh user on master.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[INSTALLING USERs KEY ON MASTER]')
-        additional_config = {"user_keyname": data_engine['project_name'],
-                             "user_keydir": os.environ['conf_key_dir']}
-        params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
-            master_node_hostname, os.environ['conf_key_dir'] + data_engine['key_name'] + ".pem", json.dumps(
-                additional_config), data_engine['datalab_ssh_user'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to install ssh user key on master.", str(err))
-        sys.exit(1)
-
-
-    try:
-        logging.info('[CLEANING INSTANCE FOR MASTER NODE]')
-        params = '--hostname {} --keyfile {} --os_user {} --application {}' \
-            .format(master_node_hostname, keyfile_name, data_engine['datalab_ssh_user'], os.environ['application'])
-        try:
-            datalab.actions_lib.ensure_right_mount_paths(True, data_engine['datalab_ssh_user'], master_node_hostname,
-                                                         keyfile_name)
-            subprocess.run("~/scripts/{}.py {}".format('common_clean_instance', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to clean master instance.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[CONFIGURE PROXY ON MASTER NODE]')
-        additional_config = {"proxy_host": edge_instance_private_hostname, "proxy_port": "3128"}
-        params = "--hostname {} --instance_name {} --keyfile {} --additional_config '{}' --os_user {}"\
-            .format(master_node_hostname, data_engine['master_node_name'], keyfile_name, json.dumps(additional_config),
-                    data_engine['datalab_ssh_user'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to configure proxy on master.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[INSTALLING PREREQUISITES ON MASTER NODE]')
-        params = "--hostname {} --keyfile {} --user {} --region {} --edge_private_ip {}". \
-            format(master_node_hostname, keyfile_name, data_engine['datalab_ssh_user'], data_engine['region'],
-                   edge_instance_private_hostname)
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        clear_resources()
-        datalab.fab.append_result("Failed to install prerequisites on master.", str(err))
-        sys.exit(1)
-
-    try:
-        logging.info('[CONFIGURE MASTER NODE]')
-        params = "--hostname {} --keyfile {} --region {} --spark_version {} --hadoop_version {} --os_user {} " \
-                 "--scala_version {} --master_ip {} --node_type {}".\
-            format(master_node_hostname, keyfile_name, data_engine['region'], os.environ['notebook_spark_version'],
-                   os.environ['notebook_hadoop_version'], data_engine['datalab_ssh_user'],
-                   os.environ['notebook_scala_version'], master_node_hostname,
-                   'master')
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_dataengine', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        datalab.fab.append_result("Failed to configure master node", str(err))
-        clear_resources()
-        sys.exit(1)
-
-    try:
-        jobs = []
-        for slave in range(data_engine['instance_count'] - 1):
-            p = multiprocessing.Process(target=configure_slave, args=(slave, data_engine))
-            jobs.append(p)
-            p.start()
-        for job in jobs:
-            job.join()
-        for job in jobs:
-            if job.exitcode != 0:
-                raise Exception
-    except Exception as err:
-        datalab.fab.append_result("Failed to configure slave nodes", str(err))
+        logging.info('[CONFIGURE DATA ENGINE NODES]')
+        # Every node runs its own chain of steps; the slaves only wait for the master before starting Spark
+        additional_config = {"user_keyname": data_engine['project_name'], "user_keydir": os.environ['conf_key_dir']}
+        proxy_config = {"proxy_host": edge_instance_private_hostname, "proxy_port": "3128"}
+        cluster_nodes = [('master', master_node_hostname, data_engine['master_node_name'])]
+        for i in range(data_engine['instance_count'] - 1):
+            slave_name = data_engine['slave_node_name'] + '{}'.format(i + 1)
+            cluster_nodes.append(('slave{}'.format(i + 1),
+                                  AzureMeta.get_private_ip_address(data_engine['resource_group_name'], slave_name),
+                                  slave_name))
+        nodes = dict()
+        steps = dict()
+        for node, hostname, instance_name in cluster_nodes:
+            node_type = 'master' if node == 'master' else 'slave'
+            nodes[node] = (hostname, data_engine['datalab_ssh_user'], keyfile_name)
+            steps.update(datalab.runner.chain_steps(node, [
+                ('create_ssh_user', "--hostname {} --keyfile {} --initial_user {} --os_user {} --sudo_group {}".format(
+                    hostname, os.environ['conf_key_dir'] + data_engine['key_name'] + ".pem", initial_user,
+                    data_engine['datalab_ssh_user'], sudo_group), None),
+                ('install_user_key', "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
+                    hostname, os.environ['conf_key_dir'] + data_engine['key_name'] + ".pem",
+                    json.dumps(additional_config), data_engine['datalab_ssh_user']), None),
+                (datalab.actions_lib.ensure_right_mount_paths,
+                 (True, data_engine['datalab_ssh_user'], hostname, keyfile_name), None),
+                ('common_clean_instance', '--hostname {} --keyfile {} --os_user {} --application {}'.format(
+                    hostname, keyfile_name, data_engine['datalab_ssh_user'], os.environ['application']),
+                 'dataengine_clean_instance_ensured'),
+                ('common_configure_proxy',
+                 "--hostname {} --instance_name {} --keyfile {} --additional_config '{}' --os_user {}".format(
+                     hostname, instance_name, keyfile_name, json.dumps(proxy_config),
+                     data_engine['datalab_ssh_user']), 'dataengine_proxy_ensured'),
+                ('install_prerequisites', "--hostname {} --keyfile {} --user {} --region {} --edge_private_ip {}".format(
+                    hostname, keyfile_name, data_engine['datalab_ssh_user'], data_engine['region'],
+                    edge_instance_private_hostname), 'dataengine_prerequisites_ensured'),
+                ('configure_dataengine', "--hostname {} --keyfile {} --region {} --spark_version {} "
+                                         "--hadoop_version {} --os_user {} --scala_version {} --master_ip {} "
+                                         "--node_type {}".format(
+                    hostname, keyfile_name, data_engine['region'], os.environ['notebook_spark_version'],
+                    os.environ['notebook_hadoop_version'], data_engine['datalab_ssh_user'],
+                    os.environ['notebook_scala_version'], master_node_hostname, node_type),
+                 'dataengine_{}_ensured'.format(node_type))]))
+            if node_type == 'slave':
+                steps['{}:configure_dataengine'.format(node)]['requires'].append('master:configure_dataengine')
+        datalab.runner.run_node_pipelines(nodes, steps)
+    except Exception as err:
+        datalab.fab.append_result("Failed to configure Data Engine nodes.", str(err))
         clear_resources()
         sys.exit(1)
 
@@ -359,7 +190,7 @@ if __name__ == "__main__":
                     data_engine['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
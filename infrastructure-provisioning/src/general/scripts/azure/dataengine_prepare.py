@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from Crypto.PublicKey import RSA
 from fabric import *
 
@@ -163,61 +163,37 @@ if __name__ == "__main__":
         sudo_group = 'wheel'
 
     try:
-        logging.info('[CREATE MASTER NODE]')
-
-        if 'NC' in data_engine['master_size']:
-            data_engine['instance_storage_account_type'] = 'Standard_LRS'
-
-        params = "--instance_name {} --instance_size {} --region {} --vpc_name {} --network_interface_name {} \
-            --security_group_name {} --subnet_name {} --service_base_name {} --resource_group_name {} \
-            --datalab_ssh_user_name {} --public_ip_name {} --public_key '''{}''' --primary_disk_size {} \
-            --instance_type {} --project_name {} --instance_storage_account_type {} --image_name {} \
-            --image_type {} --tags '{}'". \
-            format(data_engine['master_node_name'], data_engine['master_size'], data_engine['region'],
-                   data_engine['vpc_name'], data_engine['master_network_interface_name'],
-                   data_engine['master_security_group_name'], data_engine['private_subnet_name'],
-                   data_engine['service_base_name'], data_engine['resource_group_name'], initial_user, 'None',
-                   data_engine['public_ssh_key'], data_engine['primary_disk_size'], 'dataengine',
-                   data_engine['project_name'], data_engine['instance_storage_account_type'],
-                   data_engine['image_name'], data_engine['image_type'], json.dumps(data_engine['master_tags']))
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        try:
-            AzureActions.remove_instance(data_engine['resource_group_name'], data_engine['master_node_name'])
-        except:
-            logging.info("The instance hasn't been created.")
-        datalab.fab.append_result("Failed to create master instance.", str(err))
-        sys.exit(1)
-
-    try:
+        logging.info('[CREATE MASTER AND SLAVE NODES]')
+        # Master and slaves are created in parallel, so the cluster is ready in about the time of a single node
+        nodes = [(data_engine['master_node_name'], data_engine['master_size'],
+                  data_engine['master_network_interface_name'], data_engine['master_security_group_name'],
+                  data_engine['master_tags'])]
         for i in range(data_engine['instance_count'] - 1):
-            logging.info('[CREATE SLAVE NODE {}]'.format(i + 1))
-
             slave_name = data_engine['slave_node_name'] + '{}'.format(i + 1)
-            slave_nif_name = slave_name + '-nif'
-            if 'NC' in data_engine['slave_size']:
-                data_engine['instance_storage_account_type'] = 'Standard_LRS'
-
+            nodes.append((slave_name, data_engine['slave_size'], slave_name + '-nif',
+                          data_engine['slave_security_group_name'], data_engine['slave_tags']))
+        steps = list()
+        for node_name, node_size, network_interface_name, security_group_name, tags in nodes:
+            instance_storage_account_type = data_engine['instance_storage_account_type']
+            if 'NC' in node_size:
+                instance_storage_account_type = 'Standard_LRS'
             params = "--instance_name {} --instance_size {} --region {} --vpc_name {} --network_interface_name {} \
                 --security_group_name {} --subnet_name {} --service_base_name {} --resource_group_name {} \
                 --datalab_ssh_user_name {} --public_ip_name {} --public_key '''{}''' --primary_disk_size {} \
                 --instance_type {} --project_name {} --instance_storage_account_type {} --image_name {} \
                 --image_type {} --tags '{}'". \
-                format(slave_name, data_engine['slave_size'], data_engine['region'], data_engine['vpc_name'],
-                       slave_nif_name, data_engine['slave_security_group_name'], data_engine['private_subnet_name'],
+                format(node_name, node_size, data_engine['region'], data_engine['vpc_name'],
+                       network_interface_name, security_group_name, data_engine['private_subnet_name'],
                        data_engine['service_base_name'], data_engine['resource_group_name'], initial_user, 'None',
                        data_engine['public_ssh_key'], data_engine['primary_disk_size'], 'dataengine',
-                       data_engine['project_name'], data_engine['instance_storage_account_type'],
-                       data_engine['image_name'], data_engine['image_type'], json.dumps(data_engine['slave_tags']))
-            try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
-            except:
-                traceback.print_exc()
-                raise Exception
+                       data_engine['project_name'], instance_storage_account_type,
+                       data_engine['image_name'], data_engine['image_type'], json.dumps(tags))
+            steps.append(('common_create_instance', params))
+        try:
+            datalab.runner.run_scripts_concurrently(steps)
+        except:
+            traceback.print_exc()
+            raise Exception
     except Exception as err:
         for i in range(data_engine['instance_count'] - 1):
             slave_name = data_engine['slave_node_name'] + '{}'.format(i+1)
@@ -225,6 +201,9 @@ if __name__ == "__main__":
                 AzureActions.remove_instance(data_engine['resource_group_name'], slave_name)
             except:
                 logging.info("The slave instance {} hasn't been created.".format(slave_name))
-        AzureActions.remove_instance(data_engine['resource_group_name'], data_engine['master_node_name'])
-        datalab.fab.append_result("Failed to create slave instances.", str(err))
+        try:
+            AzureActions.remove_instance(data_engine['resource_group_name'], data_engine['master_node_name'])
+        except:
+            logging.info("The instance hasn't been created.")
+        datalab.fab.append_result("Failed to create cluster instances.", str(err))
         sys.exit(1)
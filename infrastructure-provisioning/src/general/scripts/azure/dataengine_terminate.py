@@ -24,6 +24,7 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 from datalab.logger import logging
 import os
@@ -90,6 +91,22 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(data_engine['service_base_name'], data_engine['project_name'],
+                                                    data_engine['endpoint_name'])
+        if os.environ['conf_network_type'] == 'private':
+            edge_instance_hostname = AzureMeta.get_private_ip_address(data_engine['resource_group_name'],
+                                                                      edge_instance_name)
+        else:
+            edge_instance_hostname = 'host-{}.{}.cloudapp.azure.com'.format(edge_instance_name,
+                                                                            os.environ['azure_region'])
+        datalab.proxy_routes.remove_terminated_routes(
+            edge_instance_hostname, os.environ['conf_os_user'], data_engine['key_path'],
+            '{}_{}'.format(data_engine['exploratory_name'], data_engine['computational_name']))
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"service_base_name": data_engine['service_base_name'],
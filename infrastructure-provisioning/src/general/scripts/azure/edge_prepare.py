@@ -25,12 +25,12 @@ import json
 import os
 import sys
 import traceback
-import subprocess
 from Crypto.PublicKey import RSA
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from datalab.logger import logging
+import datalab.runner
 
 if __name__ == "__main__":
     try:
@@ -105,7 +105,7 @@ if __name__ == "__main__":
             format(edge_conf['resource_group_name'], edge_conf['vpc_name'], edge_conf['region'], edge_conf['vpc_cidr'],
                    edge_conf['private_subnet_name'], edge_conf['private_subnet_prefix'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_subnet', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -384,7 +384,7 @@ if __name__ == "__main__":
             format(edge_conf['resource_group_name'], edge_conf['edge_security_group_name'], edge_conf['region'],
                    json.dumps(edge_conf['instance_tags']), json.dumps(edge_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except Exception as err:
             AzureActions().remove_subnet(edge_conf['resource_group_name'], edge_conf['vpc_name'],
                                          edge_conf['private_subnet_name'])
@@ -486,7 +486,7 @@ if __name__ == "__main__":
             format(edge_conf['resource_group_name'], edge_conf['notebook_security_group_name'], edge_conf['region'],
                    json.dumps(edge_conf['instance_tags']), json.dumps(notebook_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -591,7 +591,7 @@ if __name__ == "__main__":
             edge_conf['resource_group_name'], edge_conf['master_security_group_name'], edge_conf['region'],
             json.dumps(edge_conf['instance_tags']), json.dumps(cluster_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -616,7 +616,7 @@ if __name__ == "__main__":
             edge_conf['resource_group_name'], edge_conf['slave_security_group_name'], edge_conf['region'],
             json.dumps(edge_conf['instance_tags']), json.dumps(cluster_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -644,7 +644,7 @@ if __name__ == "__main__":
             format(edge_conf['edge_container_name'], json.dumps(edge_conf['storage_account_tags']),
                    edge_conf['resource_group_name'], edge_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_storage_account', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_storage_account', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -672,7 +672,7 @@ if __name__ == "__main__":
                        edge_conf['datalake_user_directory_name'], edge_conf['azure_ad_user_name'],
                        edge_conf['service_base_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_datalake_directory', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_datalake_directory', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -719,7 +719,7 @@ if __name__ == "__main__":
                    edge_conf['primary_disk_size'], 'edge', edge_conf['user_name'], edge_conf['instance_storage_account_type'],
                    edge_conf['image_name'], json.dumps(edge_conf['instance_tags']))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
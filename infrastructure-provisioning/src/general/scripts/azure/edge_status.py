@@ -24,11 +24,11 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -41,7 +41,7 @@ if __name__ == "__main__":
         params = '--resource_group_name {} --list_resources "{}"'.format(edge_conf['resource_group_name'],
                                                                          os.environ['edge_list_resources'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_collect_data', params), shell=True, check=True)
+            datalab.runner.run_script('common_collect_data', params)
         except:
             traceback.print_exc()
             raise Exception
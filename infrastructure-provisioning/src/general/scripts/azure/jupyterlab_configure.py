@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -133,7 +133,7 @@ if __name__ == "__main__":
              notebook_config['datalab_ssh_user'], sudo_group)
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -150,7 +150,7 @@ if __name__ == "__main__":
             .format(instance_hostname, notebook_config['instance_name'], keyfile_name, json.dumps(additional_config),
                     notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -166,7 +166,7 @@ if __name__ == "__main__":
             format(instance_hostname, keyfile_name, notebook_config['datalab_ssh_user'], os.environ['azure_region'],
                    edge_instance_private_hostname)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -189,7 +189,7 @@ if __name__ == "__main__":
                    os.environ['notebook_scala_version'],
                    notebook_config['ip_address'], notebook_config['exploratory_name'], edge_hostname)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_jupyterlab_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_jupyterlab_node', params)
             datalab.actions_lib.remount_azure_disk(True, notebook_config['datalab_ssh_user'], instance_hostname,
                                                    keyfile_name)
             datalab.actions_lib.ensure_right_mount_paths(True, notebook_config['datalab_ssh_user'], instance_hostname,
@@ -208,7 +208,7 @@ if __name__ == "__main__":
         params = "--hostname {} --keyfile {} --additional_config '{}' --user {}".format(
             instance_hostname, keyfile_name, json.dumps(additional_config), notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             datalab.fab.append_result("Failed installing users key")
             raise Exception
@@ -222,8 +222,8 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(notebook_config['datalab_ssh_user'], instance_hostname, keyfile_name)
         try:
-            # subprocess.run("~/scripts/{}.py {}".format('common_download_git_certfile', params), shell=True, check=True)
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            # datalab.runner.run_script('common_download_git_certfile', params)
+            datalab.runner.run_script('manage_git_creds', params)
         except:
             datalab.fab.append_result("Failed setup git credentials")
             raise Exception
@@ -246,7 +246,7 @@ if __name__ == "__main__":
                                                         notebook_config['expected_image_name'],
                                                         json.dumps(notebook_config['image_tags']))
                 logging.info("Image was successfully created.")
-                subprocess.run("~/scripts/{}.py".format('common_prepare_notebook'), shell=True, check=True)
+                datalab.runner.run_script('common_prepare_notebook')
                 instance_running = False
                 while not instance_running:
                     if AzureMeta.get_instance_status(notebook_config['resource_group_name'],
@@ -264,7 +264,7 @@ if __name__ == "__main__":
                 params = "--hostname {} --instance_name {} --keyfile {} --additional_config '{}' --os_user {}" \
                     .format(instance_hostname, notebook_config['instance_name'], keyfile_name,
                             json.dumps(additional_config), notebook_config['datalab_ssh_user'])
-                subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+                datalab.runner.run_script('common_configure_proxy', params)
         except Exception as err:
             datalab.fab.append_result("Failed creating image from notebook.", str(err))
             AzureActions.remove_instance(notebook_config['resource_group_name'], notebook_config['instance_name'])
@@ -289,7 +289,7 @@ if __name__ == "__main__":
                     notebook_config['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
@@ -307,7 +307,7 @@ if __name__ == "__main__":
                    keyfile_name,
                    notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/configure_proxy_for_docker.py {}".format(params), shell=True, check=True)
+            datalab.runner.run_script('configure_proxy_for_docker', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -326,7 +326,7 @@ if __name__ == "__main__":
                    keyfile_name,
                    notebook_config['datalab_ssh_user'])
         try:
-           subprocess.run("~/scripts/jupyterlab_container_start.py {}".format(params), shell=True, check=True)
+           datalab.runner.run_script('jupyterlab_container_start', params)
         except:
              traceback.print_exc()
              raise Exception
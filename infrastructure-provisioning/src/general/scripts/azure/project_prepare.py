@@ -24,6 +24,7 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
@@ -146,7 +147,7 @@ if __name__ == "__main__":
             format(project_conf['resource_group_name'], project_conf['vpc_name'], project_conf['region'],
                    project_conf['vpc_cidr'], project_conf['private_subnet_name'], project_conf['private_subnet_prefix'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_subnet', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -200,7 +201,7 @@ if __name__ == "__main__":
                 format(project_conf['resource_group_name'], os.environ['azure_edge_security_group_name'],
                        project_conf['region'], json.dumps({"product": "datalab"}), json.dumps(edge_list_rules))
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_security_group', params)
             except Exception as err:
                 AzureActions.remove_subnet(project_conf['resource_group_name'], project_conf['vpc_name'],
                                            project_conf['private_subnet_name'])
@@ -477,7 +478,7 @@ if __name__ == "__main__":
                 format(project_conf['resource_group_name'], project_conf['edge_security_group_name'],
                        project_conf['region'], json.dumps(project_conf['instance_tags']), json.dumps(edge_list_rules))
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_security_group', params)
             except Exception as err:
                 AzureActions.remove_subnet(project_conf['resource_group_name'], project_conf['vpc_name'],
                                            project_conf['private_subnet_name'])
@@ -582,7 +583,7 @@ if __name__ == "__main__":
             format(project_conf['resource_group_name'], project_conf['notebook_security_group_name'],
                    project_conf['region'], json.dumps(project_conf['instance_tags']), json.dumps(notebook_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -689,7 +690,7 @@ if __name__ == "__main__":
             project_conf['resource_group_name'], project_conf['master_security_group_name'], project_conf['region'],
             json.dumps(project_conf['instance_tags']), json.dumps(cluster_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -715,7 +716,7 @@ if __name__ == "__main__":
             project_conf['resource_group_name'], project_conf['slave_security_group_name'], project_conf['region'],
             json.dumps(project_conf['instance_tags']), json.dumps(cluster_list_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -742,7 +743,7 @@ if __name__ == "__main__":
         params = "--container_name {} --account_tags '{}' --resource_group_name {} --region {}". \
             format(project_conf['shared_container_name'], json.dumps(project_conf['shared_storage_account_tags']),
                    project_conf['resource_group_name'], project_conf['region'])
-        subprocess.run("~/scripts/{}.py {}".format('common_create_storage_account', params), shell=True, check=True)
+        datalab.runner.run_script('common_create_storage_account', params)
     except Exception as err:
         datalab.fab.append_result("Failed to create storage account.", str(err))
         AzureActions.remove_subnet(project_conf['resource_group_name'], project_conf['vpc_name'],
@@ -768,7 +769,7 @@ if __name__ == "__main__":
             format(project_conf['edge_container_name'], json.dumps(project_conf['storage_account_tags']),
                    project_conf['resource_group_name'], project_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_storage_account', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_storage_account', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -803,7 +804,7 @@ if __name__ == "__main__":
                                                      project_conf['azure_ad_user_name'],
                                                      project_conf['service_base_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_datalake_directory', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_datalake_directory', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -858,7 +859,7 @@ if __name__ == "__main__":
                    project_conf['instance_storage_account_type'],
                    project_conf['image_name'], json.dumps(project_conf['instance_tags']))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
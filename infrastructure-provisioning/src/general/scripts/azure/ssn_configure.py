@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 import uuid
 from fabric import *
 
@@ -137,7 +137,7 @@ if __name__ == "__main__":
             (ssn_conf['instance_host'], ssn_conf['ssh_key_path'], ssn_conf['initial_user'],
              ssn_conf['datalab_ssh_user'],
              ssn_conf['sudo_group'])
-        subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+        datalab.runner.run_script('create_ssh_user', params)
     except Exception as err:
         traceback.print_exc()
         clear_resources()
@@ -151,7 +151,7 @@ if __name__ == "__main__":
                                                                        ssn_conf['ssh_key_path'],
                                                                        ssn_conf['datalab_ssh_user'],
                                                                        ssn_conf['region'])
-        subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+        datalab.runner.run_script('install_prerequisites', params)
     except Exception as err:
         traceback.print_exc()
         clear_resources()
@@ -169,7 +169,7 @@ if __name__ == "__main__":
             format(ssn_conf['instance_host'], ssn_conf['ssh_key_path'], json.dumps(additional_config),
                    ssn_conf['datalab_ssh_user'], os.environ['ssn_datalab_path'], ssn_conf['service_base_name'],
                    ssn_conf['step_cert_sans'])
-        subprocess.run("~/scripts/{}.py {}".format('configure_ssn_node', params), shell=True, check=True)
+        datalab.runner.run_script('configure_ssn_node', params)
     except Exception as err:
         traceback.print_exc()
         clear_resources()
@@ -194,7 +194,7 @@ if __name__ == "__main__":
                                                           json.dumps(additional_config), os.environ['conf_os_family'],
                                                           ssn_conf['datalab_ssh_user'], os.environ['ssn_datalab_path'],
                                                           os.environ['conf_cloud_provider'], ssn_conf['region'])
-        subprocess.run("~/scripts/{}.py {}".format('configure_docker', params), shell=True, check=True)
+        datalab.runner.run_script('configure_docker', params)
     except Exception as err:
         traceback.print_exc()
         clear_resources()
@@ -505,7 +505,7 @@ if __name__ == "__main__":
                    os.environ['keycloak_client_name'], os.environ['keycloak_client_secret'],
                    os.environ['keycloak_auth_server_url'],
                    os.environ['keycloak_realm_name'])
-        subprocess.run("~/scripts/{}.py {}".format('configure_ui', params), shell=True, check=True)
+        datalab.runner.run_script('configure_ui', params)
     except Exception as err:
         traceback.print_exc()
         clear_resources()
@@ -520,7 +520,7 @@ if __name__ == "__main__":
                 os.environ['keycloak_user_password'], ssn_conf['instance_host'],
                 os.environ['keycloak_client_secret'])
     try:
-        subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+        datalab.runner.run_script('configure_keycloak', keycloak_params)
     except Exception as err:
         datalab.fab.append_result("Failed to create ssn keycloak client: " + str(err))
         #clear_resources()
@@ -594,7 +594,7 @@ if __name__ == "__main__":
                                                          os.environ['request_id'])
         params = "--instance_name {} --local_log_filepath {} --os_user {} --instance_hostname {}". \
             format(ssn_conf['instance_name'], local_log_filepath, ssn_conf['datalab_ssh_user'], ssn_conf['instnace_ip'])
-        subprocess.run("~/scripts/{}.py {}".format('upload_response_file', params), shell=True, check=True)
+        datalab.runner.run_script('upload_response_file', params)
     except Exception as err:
         datalab.fab.append_result("Error with writing results.", str(err))
         sys.exit(1)
@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from Crypto.PublicKey import RSA
 from fabric import *
 
@@ -100,7 +100,7 @@ if __name__ == "__main__":
         else:
             logging.info('[CREATING RESOURCE GROUP]')
             params = "--resource_group_name {} --region {}".format(ssn_conf['resource_group_name'], ssn_conf['region'])
-            subprocess.run("~/scripts/{}.py {}".format('ssn_create_resource_group', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_create_resource_group', params)
     except Exception as err:
         traceback.print_exc()
         datalab.fab.append_result("Failed to create Resource Group.", str(err))
@@ -113,7 +113,7 @@ if __name__ == "__main__":
             logging.info('[CREATING VIRTUAL NETWORK]')
             params = "--resource_group_name {} --vpc_name {} --region {} --vpc_cidr {}".format(
                 ssn_conf['resource_group_name'], ssn_conf['vpc_name'], ssn_conf['region'], ssn_conf['vpc_cidr'])
-            subprocess.run("~/scripts/{}.py {}".format('ssn_create_vpc', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_create_vpc', params)
     except Exception as err:
         traceback.print_exc()
         datalab.fab.append_result("Failed to create VPC.", str(err))
@@ -132,7 +132,7 @@ if __name__ == "__main__":
             params = "--resource_group_name {} --vpc_name {} --region {} --vpc_cidr {} --subnet_name {} --prefix {}".\
                 format(ssn_conf['resource_group_name'], ssn_conf['vpc_name'], ssn_conf['region'],
                        ssn_conf['vpc_cidr'], ssn_conf['subnet_name'], ssn_conf['subnet_prefix'])
-            subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_subnet', params)
     except Exception as err:
         traceback.print_exc()
         datalab.fab.append_result("Failed to create Subnet.", str(err))
@@ -153,7 +153,7 @@ if __name__ == "__main__":
                      "--source_virtual_network_name {} --destination_virtual_network_name {}".format(
                       ssn_conf['source_resource_group_name'], ssn_conf['resource_group_name'],
                       os.environ['azure_source_vpc_name'], ssn_conf['vpc_name'])
-            subprocess.run("~/scripts/{}.py {}".format('ssn_create_peering', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_create_peering', params)
     except Exception as err:
         traceback.print_exc()
         try:
@@ -221,7 +221,7 @@ if __name__ == "__main__":
             params = "--resource_group_name {} --security_group_name {} --region {} --tags '{}'  --list_rules '{}'".\
                 format(ssn_conf['resource_group_name'], ssn_conf['security_group_name'], ssn_conf['region'],
                        json.dumps(ssn_conf['instance_tags']), json.dumps(list_rules))
-            subprocess.run("~/scripts/{}.py {}".format('common_create_security_group', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_security_group', params)
     except Exception as err:
         traceback.print_exc()
         datalab.fab.append_result("Error creating Security group", str(err))
@@ -245,7 +245,7 @@ if __name__ == "__main__":
                      format(ssn_conf['datalake_store_name'], json.dumps(ssn_conf['datalake_store_tags']),
                             ssn_conf['resource_group_name'], ssn_conf['region'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('ssn_create_datalake', params), shell=True, check=True)
+                datalab.runner.run_script('ssn_create_datalake', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -256,7 +256,7 @@ if __name__ == "__main__":
                        ssn_conf['datalake_shared_directory_name'], ssn_conf['service_base_name'],
                        os.environ['azure_ad_group_id'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_datalake_directory', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_datalake_directory', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -296,7 +296,7 @@ if __name__ == "__main__":
                    initial_user, ssn_conf['static_public_ip_name'], ssn_conf['public_ssh_key'],
                    ssn_conf['primary_disk_size'], 'ssn', ssn_conf['instance_storage_account_type'],
                    ssn_conf['ssn_image_name'], json.dumps(ssn_conf['instance_tags']))
-        subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+        datalab.runner.run_script('common_create_instance', params)
     except Exception as err:
         traceback.print_exc()
         datalab.fab.append_result("Failed to create instance.", str(err))
@@ -23,6 +23,7 @@
 
 import argparse
 import ast
+import datalab.executor
 import json
 import sys
 import traceback
@@ -50,24 +51,19 @@ if __name__ == "__main__":
     data = ast.literal_eval(args.list_resources.replace('\'', '"'))
     statuses = {}
     try:
-        try:
-            id_hosts = get_id_resourses(data.get('host'))
-            data_instances = GCPMeta().get_list_instance_statuses(id_hosts)
-            statuses['host'] = data_instances
-        except:
-            logging.error("Hosts JSON wasn't been provided")
-        try:
-            id_clusters = get_id_resourses(data.get('cluster'))
-            data_clusters = GCPMeta().get_list_cluster_statuses(id_clusters, full_check=False)
-            statuses['cluster'] = data_clusters
-        except:
-            logging.error("Clusters JSON wasn't been provided")
-        try:
-            id_images = get_id_resourses(data.get('image'))
-            data_images = GCPMeta().get_list_image_statuses(id_images)
-            statuses['image'] = data_images
-        except:
-            logging.error("Images JSON wasn't been provided")
+        # Hosts, clusters and images are independent lookups, so they run side by side
+        tasks = dict()
+        if data.get('host') is not None:
+            tasks['host'] = lambda: GCPMeta().get_list_instance_statuses(get_id_resourses(data.get('host')))
+        if data.get('cluster') is not None:
+            tasks['cluster'] = lambda: GCPMeta().get_list_cluster_statuses(get_id_resourses(data.get('cluster')),
+                                                                          full_check=False)
+        if data.get('image') is not None:
+            tasks['image'] = lambda: GCPMeta().get_list_image_statuses(get_id_resourses(data.get('image')))
+        statuses = datalab.executor.run_concurrently(tasks)
+        for resource_type in ('host', 'cluster', 'image'):
+            if resource_type not in statuses:
+                logging.info("{} statuses weren't collected".format(resource_type.capitalize()))
         with open('/root/result.json', 'w') as outfile:
             json.dump(statuses, outfile)
     except Exception as err:
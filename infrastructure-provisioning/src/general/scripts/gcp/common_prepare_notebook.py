@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -220,7 +220,7 @@ if __name__ == "__main__":
                    notebook_config['gcp_os_login_enabled'], notebook_config['gcp_block_project_ssh_keys'],
                    notebook_config['gcp_wrapped_csek'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -24,6 +24,7 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 import requests
 from datalab.logger import logging
@@ -149,6 +150,17 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(notebook_config['service_base_name'],
+                                                    notebook_config['project_name'], notebook_config['endpoint_name'])
+        datalab.proxy_routes.remove_terminated_routes(
+            GCPMeta.get_instance_public_ip_by_name(edge_instance_name), os.environ['conf_os_user'],
+            '{}{}.pem'.format(os.environ['conf_key_dir'], os.environ['conf_key_name']),
+            notebook_config['exploratory_name'], clusters=True)
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"notebook_name": notebook_config['notebook_name'],
@@ -58,6 +58,7 @@ def send_parser_job(args, cluster_name, cluster_version):
     job_body['job']['pysparkJob']['args'][5] = cluster_name
     job_body['job']['pysparkJob']['args'][7] = cluster_version
     job_body['job']['pysparkJob']['args'][9] = os.environ['conf_os_user']
+    job_body['job']['pysparkJob']['args'] += ['--compression', os.environ.get('conf_artifacts_compression', 'none')]
     datalab.actions_lib.GCPActions().submit_dataproc_job(job_body)
 
 
@@ -26,11 +26,11 @@ import multiprocessing
 import os
 import sys
 import traceback
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from fabric import *
+import datalab.runner
 
 
 def install_libs(instance, data_engine):
@@ -40,7 +40,7 @@ def install_libs(instance, data_engine):
                 data_engine['keyfile'], data_engine['libs'])
     try:
         # Run script to install additional libs
-        subprocess.run("~/scripts/{}.py {}".format('install_additional_libs', params), shell=True, check=True)
+        datalab.runner.run_script('install_additional_libs', params)
     except:
         traceback.print_exc()
         raise Exception
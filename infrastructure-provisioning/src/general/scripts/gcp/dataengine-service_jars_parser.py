@@ -21,9 +21,14 @@
 #
 # ******************************************************************************
 
-import subprocess
-import os
 import argparse
+import glob
+import hashlib
+import json
+import os
+import shutil
+import stat
+import subprocess
 
 
 parser = argparse.ArgumentParser()
@@ -32,8 +37,53 @@ parser.add_argument('--user_name', type=str, default='')
 parser.add_argument('--cluster_name', type=str, default='')
 parser.add_argument('--dataproc_version', type=str, default='')
 parser.add_argument('--nb_user', type=str, default='')
+parser.add_argument('--compression', type=str, default='none')
 args = parser.parse_args()
 
+# Same layout as datalab.artifact_store on the notebooks, this script runs on the cluster without the datalab lib
+ARTIFACTS_DIR = '/tmp/datalab_artifacts/'
+
+
+def get_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def build_manifest(paths, root, manifest_file, compression):
+    # Every file is stored once under its sha256, so files shared by clusters and versions are uploaded once
+    # and notebooks only download the ones they do not have yet
+    manifest = {'compression': compression, 'dirs': [], 'files': []}
+    for path in sorted(set(paths)):
+        if os.path.isdir(path):
+            manifest['dirs'].append(os.path.relpath(path, root))
+            continue
+        if not os.path.isfile(path):
+            continue
+        sha256 = get_sha256(path)
+        manifest['files'].append({'path': os.path.relpath(path, root), 'sha256': sha256,
+                                  'size': os.path.getsize(path), 'mode': stat.S_IMODE(os.stat(path).st_mode)})
+        object_path = '{0}objects/{1}/{2}'.format(ARTIFACTS_DIR, sha256[:2], sha256)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        if compression == 'zstd':
+            if not os.path.exists(object_path + '.zst'):
+                subprocess.check_call('zstd -q -T0 -f {} -o {}.zst'.format(path, object_path), shell=True)
+        elif not os.path.lexists(object_path):
+            # gsutil cp follows symlinks, so the files are not copied for the upload
+            os.symlink(os.path.realpath(path), object_path)
+    with open(manifest_file, 'w') as outfile:
+        json.dump(manifest, outfile)
+
+
+def get_spark_paths(spark_dir):
+    paths = list()
+    for dirpath, dirnames, filenames in os.walk(spark_dir, followlinks=True):
+        paths.append(dirpath)
+        paths.extend(os.path.join(dirpath, name) for name in filenames)
+    return paths
+
 
 if __name__ == "__main__":
     spark_def_path = "/usr/lib/spark/conf/spark-defaults.conf"
@@ -66,27 +116,24 @@ if __name__ == "__main__":
     with open('/tmp/hadoop_version', 'w') as outfile:
         outfile.write(hadoop_ver)
 
-    os.system('/bin/tar -zhcvf /tmp/jars.tar.gz --no-recursion --absolute-names --ignore-failed-read /usr/lib/hadoop/* /usr/lib/hadoop/client/*')
-    os.system('/bin/tar -zhcvf /tmp/spark.tar.gz -C /usr/lib/ spark')
-    md5sum = subprocess.check_output('md5sum /tmp/jars.tar.gz', shell=True).decode('UTF-8')
-    with open('/tmp/jars-checksum.chk', 'w') as outfile:
-        outfile.write(md5sum)
-    md5sum = subprocess.check_output('md5sum /tmp/spark.tar.gz', shell=True).decode('UTF-8')
-    with open('/tmp/spark-checksum.chk', 'w') as outfile:
-        outfile.write(md5sum)
+    if args.compression == 'zstd' and shutil.which('zstd') is None:
+        args.compression = 'none'
+    jars_paths = [path for path in glob.glob('/usr/lib/hadoop/*') + glob.glob('/usr/lib/hadoop/client/*')
+                  if not os.path.isdir(path)]
+    build_manifest(jars_paths, '/', '/tmp/jars-manifest.json', args.compression)
+    build_manifest(get_spark_paths('/usr/lib/spark'), '/usr/lib/', '/tmp/spark-manifest.json', args.compression)
 
     os.system('gsutil -m cp /etc/hive/conf/hive-site.xml gs://{0}/{1}/{2}/config/hive-site.xml'.format(args.bucket, args.user_name, args.cluster_name))
     os.system('gsutil -m cp /etc/hadoop/conf/* gs://{0}/{1}/{2}/config/'.format(args.bucket, args.user_name, args.cluster_name))
     os.system('sudo -u {0} hdfs dfs -mkdir /user/{0}'.format(args.nb_user))
     os.system('sudo -u {0} hdfs dfs -chown -R {0}:{0} /user/{0}'.format(args.nb_user))
-    os.system('gsutil -m cp /tmp/jars.tar.gz gs://{0}/jars/{1}/'.format(args.bucket, args.dataproc_version))
-    os.system('gsutil -m cp /tmp/jars-checksum.chk gs://{0}/jars/{1}/'.format(args.bucket, args.dataproc_version))
+    os.system('gsutil -m cp -n -r {0}objects gs://{1}/artifacts/'.format(ARTIFACTS_DIR, args.bucket))
+    os.system('gsutil -m cp /tmp/jars-manifest.json gs://{0}/jars/{1}/'.format(args.bucket, args.dataproc_version))
     os.system('gsutil -m cp {0} gs://{1}/{2}/{3}/'.format(spark_def_path, args.bucket, args.user_name, args.cluster_name))
     os.system('gsutil -m cp /tmp/python_version gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
     os.system('gsutil -m cp /tmp/spark_version gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
     os.system('gsutil -m cp /tmp/scala_version gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
     os.system('gsutil -m cp /tmp/r_version gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
     os.system('gsutil -m cp /tmp/hadoop_version gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
-    os.system('gsutil -m cp /tmp/spark.tar.gz gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
-    os.system('gsutil -m cp /tmp/spark-checksum.chk gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
+    os.system('gsutil -m cp /tmp/spark-manifest.json gs://{0}/{1}/{2}/'.format(args.bucket, args.user_name, args.cluster_name))
 
@@ -25,12 +25,12 @@ from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from datalab.logger import logging
 from fabric import *
+import datalab.runner
 
 if __name__ == "__main__":
     instance_class = 'notebook'
@@ -54,7 +54,7 @@ if __name__ == "__main__":
             .format(data_engine['os_user'], data_engine['master_ip'], data_engine['keyfile'], data_engine['group_name'])
         try:
             # Run script to get available libs
-            subprocess.run("~/scripts/{}.py {}".format('get_list_available_pkgs', params), shell=True, check=True)
+            datalab.runner.run_script('get_list_available_pkgs', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -24,6 +24,7 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
@@ -186,7 +187,7 @@ if __name__ == "__main__":
                                                                    json.dumps(dataproc_cluster))
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('dataengine-service_create', params), shell=True, check=True)
+            datalab.runner.run_script('dataengine-service_create', params)
         except:
             traceback.print_exc()
             raise Exception
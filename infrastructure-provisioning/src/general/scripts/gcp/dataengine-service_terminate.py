@@ -24,6 +24,7 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 from datalab.logger import logging
 import os
@@ -83,6 +84,19 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(dataproc_conf['service_base_name'],
+                                                    dataproc_conf['project_name'], dataproc_conf['endpoint_name'])
+        if os.environ.get('exploratory_name') and os.environ.get('computational_name'):
+            datalab.proxy_routes.remove_terminated_routes(
+                GCPMeta.get_instance_public_ip_by_name(edge_instance_name), os.environ['conf_os_user'],
+                dataproc_conf['key_path'], '{}_{}'.format(
+                    os.environ['exploratory_name'].replace('_', '-').lower(),
+                    os.environ['computational_name'].replace('_', '-').lower()))
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"dataengine-service_name": dataproc_conf['dataproc_name'],
@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -191,57 +191,38 @@ if __name__ == "__main__":
         sys.exit(1)
 
     try:
-        logging.info('[CREATE MASTER NODE]')
-        params = "--instance_name {0} --region {1} --zone {2} --vpc_name {3} --subnet_name {4} --instance_size {5} " \
-                 "--ssh_key_path {6} --initial_user {7} --service_account_name {8} --image_name {9} " \
-                 "--secondary_image_name {10} --instance_class {11} --primary_disk_size {12} " \
-                 "--secondary_disk_size {13} --gpu_accelerator_type {14} --gpu_accelerator_count {15} " \
-                 "--network_tag {16} --cluster_name {17} --labels '{18}' --service_base_name {19} " \
-                 "--os_login_enabled FALSE --block_project_ssh_keys {21} --rsa_encrypted_csek '{22}'". \
-            format(data_engine['master_node_name'], data_engine['region'], data_engine['zone'], data_engine['vpc_name'],
-                   data_engine['subnet_name'], data_engine['master_size'], data_engine['ssh_key_path'], initial_user,
-                   data_engine['dataengine_service_account_name'], data_engine['primary_image_name'],
-                   data_engine['secondary_image_name'], 'dataengine', data_engine['primary_disk_size'],
-                   data_engine['secondary_disk_size'], data_engine['gpu_master_accelerator_type'],
-                   data_engine['gpu_master_accelerator_count'], data_engine['network_tag'], data_engine['cluster_name'],
-                   json.dumps(data_engine['master_labels']), data_engine['service_base_name'],
-                   data_engine['gcp_os_login_enabled'], data_engine['gcp_block_project_ssh_keys'],
-                   data_engine['gcp_wrapped_csek'])
-        try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
-        except:
-            traceback.print_exc()
-            raise Exception
-    except Exception as err:
-        datalab.fab.append_result("Failed to create instance.", str(err))
-        GCPActions.remove_instance(data_engine['master_node_name'], data_engine['zone'])
-        sys.exit(1)
-
-    try:
+        logging.info('[CREATE MASTER AND SLAVE NODES]')
+        # Master and slaves are created in parallel, so the cluster is ready in about the time of a single node
+        nodes = [(data_engine['master_node_name'], data_engine['master_size'],
+                  data_engine['gpu_master_accelerator_type'], data_engine['gpu_master_accelerator_count'],
+                  data_engine['master_labels'])]
         for i in range(data_engine['instance_count'] - 1):
-            logging.info('[CREATE SLAVE NODE {}]'.format(i + 1))
-            slave_name = data_engine['slave_node_name'] + '{}'.format(i + 1)
+            nodes.append((data_engine['slave_node_name'] + '{}'.format(i + 1), data_engine['slave_size'],
+                          data_engine['gpu_slave_accelerator_type'], data_engine['gpu_slave_accelerator_count'],
+                          data_engine['slave_labels']))
+        steps = list()
+        for node_name, node_size, gpu_accelerator_type, gpu_accelerator_count, labels in nodes:
             params = "--instance_name {0} --region {1} --zone {2} --vpc_name {3} --subnet_name {4} " \
                      "--instance_size {5} --ssh_key_path {6} --initial_user {7} --service_account_name {8} " \
                      "--image_name {9} --secondary_image_name {10} --instance_class {11} --primary_disk_size {12} " \
                      "--secondary_disk_size {13} --gpu_accelerator_type {14} --gpu_accelerator_count {15} " \
                      "--network_tag {16} --cluster_name {17} --labels '{18}' --service_base_name {19} " \
                      "--os_login_enabled FALSE --block_project_ssh_keys {21} --rsa_encrypted_csek '{22}'". \
-                format(slave_name, data_engine['region'], data_engine['zone'],
-                       data_engine['vpc_name'], data_engine['subnet_name'], data_engine['slave_size'],
+                format(node_name, data_engine['region'], data_engine['zone'],
+                       data_engine['vpc_name'], data_engine['subnet_name'], node_size,
                        data_engine['ssh_key_path'], initial_user, data_engine['dataengine_service_account_name'],
                        data_engine['primary_image_name'], data_engine['secondary_image_name'], 'dataengine',
                        data_engine['primary_disk_size'],
-                       data_engine['secondary_disk_size'], data_engine['gpu_slave_accelerator_type'],
-                       data_engine['gpu_slave_accelerator_count'], data_engine['network_tag'],
-                       data_engine['cluster_name'], json.dumps(data_engine['slave_labels']),
+                       data_engine['secondary_disk_size'], gpu_accelerator_type, gpu_accelerator_count,
+                       data_engine['network_tag'], data_engine['cluster_name'], json.dumps(labels),
                        data_engine['service_base_name'], data_engine['gcp_os_login_enabled'],
                        data_engine['gcp_block_project_ssh_keys'], data_engine['gcp_wrapped_csek'])
-            try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
-            except:
-                traceback.print_exc()
-                raise Exception
+            steps.append(('common_create_instance', params))
+        try:
+            datalab.runner.run_scripts_concurrently(steps)
+        except:
+            traceback.print_exc()
+            raise Exception
     except Exception as err:
         for i in range(data_engine['instance_count'] - 1):
             slave_name = data_engine['slave_node_name'] + '{}'.format(i+1)
@@ -250,5 +231,5 @@ if __name__ == "__main__":
             except:
                 logging.error("The slave instance {} hasn't been created.".format(slave_name))
         GCPActions.remove_instance(data_engine['master_node_name'], data_engine['zone'])
-        datalab.fab.append_result("Failed to create slave instances.", str(err))
+        datalab.fab.append_result("Failed to create cluster instances.", str(err))
         sys.exit(1)
@@ -24,6 +24,7 @@
 import datalab.actions_lib
 import datalab.fab
 import datalab.meta_lib
+import datalab.proxy_routes
 import json
 from datalab.logger import logging
 import os
@@ -89,6 +90,16 @@ if __name__ == "__main__":
     except:
         sys.exit(1)
 
+    try:
+        logging.info('[REMOVE REVERSE PROXY ROUTES]')
+        edge_instance_name = '{}-{}-{}-edge'.format(data_engine['service_base_name'],
+                                                    data_engine['project_name'], data_engine['endpoint_name'])
+        datalab.proxy_routes.remove_terminated_routes(
+            GCPMeta.get_instance_public_ip_by_name(edge_instance_name), os.environ['conf_os_user'],
+            data_engine['key_path'], '{}_{}'.format(data_engine['exploratory_name'], data_engine['computational_name']))
+    except Exception as err:
+        logging.warning('Unable to remove reverse proxy routes: {}'.format(str(err)))
+
     try:
         with open("/root/result.json", 'w') as result:
             res = {"service_base_name": data_engine['service_base_name'],
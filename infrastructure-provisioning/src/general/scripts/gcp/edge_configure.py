@@ -24,13 +24,13 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
 import uuid
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -153,7 +153,7 @@ if __name__ == "__main__":
             edge_conf['initial_user'], edge_conf['datalab_ssh_user'], edge_conf['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -168,7 +168,7 @@ if __name__ == "__main__":
             edge_conf['instance_hostname'], edge_conf['ssh_key_path'], edge_conf['datalab_ssh_user'],
             os.environ['gcp_region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -192,7 +192,7 @@ if __name__ == "__main__":
                  .format(edge_conf['instance_hostname'], edge_conf['ssh_key_path'], json.dumps(additional_config),
                          edge_conf['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_http_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('configure_http_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -210,7 +210,7 @@ if __name__ == "__main__":
             edge_conf['instance_hostname'], edge_conf['ssh_key_path'], json.dumps(additional_config),
             edge_conf['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -231,7 +231,7 @@ if __name__ == "__main__":
                                                 edge_conf['keycloak_client_secret'], edge_conf['step_cert_sans'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_nginx_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('configure_nginx_reverse_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -249,7 +249,7 @@ if __name__ == "__main__":
                     edge_conf['keycloak_client_secret'], edge_conf['instance_hostname'], edge_conf['project_name'],
                     edge_conf['endpoint_name'], edge_conf['edge_hostname'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+            datalab.runner.run_script('configure_keycloak', keycloak_params)
         except:
             traceback.print_exc()
             raise Exception
@@ -268,7 +268,7 @@ if __name__ == "__main__":
                 edge_conf['instance_hostname'], edge_conf['ssh_key_path'], json.dumps(additional_config),
                 edge_conf['datalab_ssh_user'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('configure_nftables', params), shell=True, check=True)
+                datalab.runner.run_script('configure_nftables', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -24,11 +24,11 @@
 
 import os
 import sys
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from datalab.logger import logging
+import datalab.runner
 
 if __name__ == "__main__":
     logging.info('Getting statuses of DataLab resources')
@@ -37,7 +37,7 @@ if __name__ == "__main__":
         logging.info('[COLLECTING DATA]')
         params = '--list_resources "{}"'.format(os.environ['edge_list_resources'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_collect_data', params), shell=True, check=True)
+            datalab.runner.run_script('common_collect_data', params)
         except:
             traceback.print_exc()
             raise Exception
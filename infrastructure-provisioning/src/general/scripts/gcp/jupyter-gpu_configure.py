@@ -24,12 +24,12 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 import uuid
 
@@ -109,7 +109,7 @@ if __name__ == "__main__":
             notebook_config['datalab_ssh_user'], notebook_config['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -126,7 +126,7 @@ if __name__ == "__main__":
             .format(instance_hostname, notebook_config['instance_name'], notebook_config['ssh_key_path'],
                     json.dumps(additional_config), notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -142,7 +142,7 @@ if __name__ == "__main__":
             format(instance_hostname, notebook_config['ssh_key_path'], notebook_config['datalab_ssh_user'],
                    os.environ['gcp_region'], edge_instance_private_ip)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -166,7 +166,7 @@ if __name__ == "__main__":
                    os.environ['notebook_scala_version'],
                    notebook_config['exploratory_name'], edge_instance_private_ip)
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_jupyter-gpu_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_jupyter-gpu_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -183,7 +183,7 @@ if __name__ == "__main__":
             instance_hostname, notebook_config['ssh_key_path'], json.dumps(additional_config),
             notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             datalab.fab.append_result("Failed installing users key")
             raise Exception
@@ -197,8 +197,8 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(notebook_config['datalab_ssh_user'], instance_hostname, notebook_config['ssh_key_path'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_download_git_certfile', params), shell=True, check=True)
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            datalab.runner.run_script('common_download_git_certfile', params)
+            datalab.runner.run_script('manage_git_creds', params)
         except:
             datalab.fab.append_result("Failed setup git credentials")
             raise Exception
@@ -213,7 +213,7 @@ if __name__ == "__main__":
         params = "--hostname {} --keyfile {} --os_user {}".format(
             instance_hostname, notebook_config['ssh_key_path'], notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_install_gpu', params), shell=True, check=True)
+            datalab.runner.run_script('common_install_gpu', params)
         except:
             datalab.fab.append_result("Failed installing gpu drivers")
             raise Exception
@@ -239,7 +239,7 @@ if __name__ == "__main__":
                         notebook_config['project_name'], notebook_config['endpoint_name'],
                         notebook_config['exploratory_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+                datalab.runner.run_script('configure_keycloak', keycloak_params)
             except:
                 datalab.fab.append_result("Failed setup keycloak client")
                 raise Exception
@@ -307,7 +307,7 @@ if __name__ == "__main__":
                     notebook_config['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
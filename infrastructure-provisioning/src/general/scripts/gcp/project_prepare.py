@@ -24,6 +24,7 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
@@ -158,7 +159,7 @@ if __name__ == "__main__":
                          project_conf['private_subnet_prefix'], project_conf['vpc_cidr'],
                          project_conf['user_subnets_range'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_subnet', params)
             project_conf['private_subnet_cidr'] = GCPMeta.get_subnet(project_conf['private_subnet_name'],
                                                                      project_conf['region'])['ipCidrRange']
         except:
@@ -181,7 +182,7 @@ if __name__ == "__main__":
             project_conf['edge_unique_index'], project_conf['service_base_name'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_service_account', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_service_account', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -204,7 +205,7 @@ if __name__ == "__main__":
                   project_conf['ps_roles_path'], project_conf['ps_unique_index'], project_conf['service_base_name'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_service_account', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_service_account', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -307,7 +308,7 @@ if __name__ == "__main__":
 
         params = "--firewall '{}'".format(json.dumps(firewall_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_firewall', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_firewall', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -384,7 +385,7 @@ if __name__ == "__main__":
 
         params = "--firewall '{}'".format(json.dumps(firewall_rules))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_firewall', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_firewall', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -418,7 +419,7 @@ if __name__ == "__main__":
             params = '{} --cmek_resource_name {}'.format(params, project_conf['gcp_cmek_resource_name'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_bucket', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_bucket', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -438,7 +439,7 @@ if __name__ == "__main__":
             params = '{} --cmek_resource_name {}'.format(params, project_conf['gcp_cmek_resource_name'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_bucket', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_bucket', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -487,7 +488,7 @@ if __name__ == "__main__":
         logging.info('[CREATING STATIC IP ADDRESS]')
         params = "--address_name {} --region {}".format(project_conf['static_address_name'], project_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('edge_create_static_ip', params), shell=True, check=True)
+            datalab.runner.run_script('edge_create_static_ip', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -543,7 +544,7 @@ if __name__ == "__main__":
                   project_conf['gcp_os_login_enabled'], project_conf['gcp_block_project_ssh_keys'],
                   project_conf['gcp_wrapped_csek'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -578,7 +579,7 @@ if __name__ == "__main__":
                                                                                                        project_conf['ps_firewall_target'],
                                                                                                        edge_instance)
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_nat_route', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_nat_route', params)
             except:
                 traceback.print_exc()
                 raise Exception
@@ -25,12 +25,12 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 import uuid
 from fabric import *
 
@@ -147,7 +147,7 @@ if __name__ == "__main__":
             ssn_conf['datalab_ssh_user'], ssn_conf['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -165,7 +165,7 @@ if __name__ == "__main__":
                    ssn_conf['datalab_ssh_user'], ssn_conf['region'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_prerequisites', params), shell=True, check=True)
+            datalab.runner.run_script('install_prerequisites', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -187,7 +187,7 @@ if __name__ == "__main__":
                    ssn_conf['step_cert_sans'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_ssn_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_ssn_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -219,7 +219,7 @@ if __name__ == "__main__":
                    os.environ['conf_cloud_provider'], ssn_conf['region'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_docker', params), shell=True, check=True)
+            datalab.runner.run_script('configure_docker', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -512,7 +512,7 @@ if __name__ == "__main__":
                    json.dumps(cloud_params), os.environ['keycloak_client_name'], os.environ['keycloak_client_secret'],
                    os.environ['keycloak_auth_server_url'], os.environ['keycloak_realm_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_ui', params), shell=True, check=True)
+            datalab.runner.run_script('configure_ui', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -529,7 +529,7 @@ if __name__ == "__main__":
                 os.environ['keycloak_user_password'], ssn_conf['instance_hostname'],
                 os.environ['keycloak_client_secret'])
     try:
-        subprocess.run("~/scripts/{}.py {}".format('configure_keycloak', keycloak_params), shell=True, check=True)
+        datalab.runner.run_script('configure_keycloak', keycloak_params)
     except Exception as err:
         datalab.fab.append_result("Failed to create ssn keycloak client: " + str(err))
         #clear_resources()
@@ -580,7 +580,7 @@ if __name__ == "__main__":
         params = "--instance_name {} --local_log_filepath {} --os_user {} --instance_hostname {}". \
             format(ssn_conf['instance_name'], local_log_filepath, ssn_conf['datalab_ssh_user'],
                    ssn_conf['instance_hostname'])
-        subprocess.run("~/scripts/{}.py {}".format('upload_response_file', params), shell=True, check=True)
+        datalab.runner.run_script('upload_response_file', params)
     except Exception as err:
         datalab.fab.append_result("Error with writing results.", str(err))
         clear_resources()
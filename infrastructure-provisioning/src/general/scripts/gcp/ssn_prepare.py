@@ -25,12 +25,12 @@ import argparse
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 from fabric import *
 
 parser = argparse.ArgumentParser()
@@ -99,7 +99,7 @@ if __name__ == "__main__":
             logging.info('[CREATE VPC]')
             params = "--vpc_name {}".format(ssn_conf['vpc_name'])
             try:
-                subprocess.run("~/scripts/{}.py {}".format('ssn_create_vpc', params), shell=True, check=True)
+                datalab.runner.run_script('ssn_create_vpc', params)
                 os.environ['gcp_vpc_name'] = ssn_conf['vpc_name']
             except:
                 traceback.print_exc()
@@ -127,7 +127,7 @@ if __name__ == "__main__":
                 format(ssn_conf['subnet_name'], ssn_conf['region'], ssn_conf['vpc_selflink'], ssn_conf['subnet_prefix'],
                        ssn_conf['vpc_cidr'], True)
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_subnet', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_subnet', params)
                 os.environ['gcp_subnet_name'] = ssn_conf['subnet_name']
             except:
                 traceback.print_exc()
@@ -192,7 +192,7 @@ if __name__ == "__main__":
 
             params = "--firewall '{}'".format(json.dumps(firewall_rules))
             try:
-                subprocess.run("~/scripts/{}.py {}".format('common_create_firewall', params), shell=True, check=True)
+                datalab.runner.run_script('common_create_firewall', params)
                 os.environ['gcp_firewall_name'] = ssn_conf['firewall_name']
             except:
                 traceback.print_exc()
@@ -212,7 +212,7 @@ if __name__ == "__main__":
                                                   ssn_conf['ssn_policy_path'], ssn_conf['ssn_roles_path'],
                                                   ssn_conf['ssn_unique_index'], ssn_conf['service_base_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_service_account', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_service_account', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -236,7 +236,7 @@ if __name__ == "__main__":
         logging.info('[CREATING STATIC IP ADDRESS]')
         params = "--address_name {} --region {}".format(ssn_conf['static_address_name'], ssn_conf['region'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('ssn_create_static_ip', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_create_static_ip', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -282,7 +282,7 @@ if __name__ == "__main__":
                    ssn_conf['service_base_name'], ssn_conf['gcp_os_login_enabled'],
                    ssn_conf['gcp_block_project_ssh_keys'], ssn_conf['gcp_wrapped_csek'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_create_instance', params), shell=True, check=True)
+            datalab.runner.run_script('common_create_instance', params)
         except:
             traceback.print_exc()
             raise Exception
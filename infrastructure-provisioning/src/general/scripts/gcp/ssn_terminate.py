@@ -22,12 +22,12 @@
 # ******************************************************************************
 
 import datalab.ssn_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
 import sys
 import traceback
-import subprocess
 import requests
 from fabric import *
 
@@ -54,7 +54,7 @@ if __name__ == "__main__":
         params = "--service_base_name {} --region {} --zone {} --pre_defined_vpc {} --vpc_name {}".format(
             ssn_conf['service_base_name'], ssn_conf['region'], ssn_conf['zone'], pre_defined_vpc, ssn_conf['vpc_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('ssn_terminate_gcp_resources', params), shell=True, check=True)
+            datalab.runner.run_script('ssn_terminate_gcp_resources', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -24,6 +24,7 @@
 import datalab.fab
 import datalab.actions_lib
 import datalab.meta_lib
+import datalab.runner
 import json
 from datalab.logger import logging
 import os
@@ -31,7 +32,6 @@ import requests
 import sys
 import traceback
 import uuid
-import subprocess
 from fabric import *
 
 if __name__ == "__main__":
@@ -110,7 +110,7 @@ if __name__ == "__main__":
             notebook_config['datalab_ssh_user'], notebook_config['sudo_group'])
 
         try:
-            subprocess.run("~/scripts/{}.py {}".format('create_ssh_user', params), shell=True, check=True)
+            datalab.runner.run_script('create_ssh_user', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -127,7 +127,7 @@ if __name__ == "__main__":
             .format(instance_hostname, notebook_config['instance_name'], notebook_config['ssh_key_path'],
                     json.dumps(additional_config), notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_proxy', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -209,7 +209,7 @@ if __name__ == "__main__":
                    keycloak_client_secret, edge_instance_private_ip,
                    edge_instance_hostname, notebook_config['exploratory_name'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('configure_superset_node', params), shell=True, check=True)
+            datalab.runner.run_script('configure_superset_node', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -226,7 +226,7 @@ if __name__ == "__main__":
             instance_hostname, notebook_config['ssh_key_path'], json.dumps(additional_config),
             notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('install_user_key', params), shell=True, check=True)
+            datalab.runner.run_script('install_user_key', params)
         except:
             datalab.fab.append_result("Failed installing users key")
             raise Exception
@@ -240,8 +240,8 @@ if __name__ == "__main__":
         params = '--os_user {} --notebook_ip {} --keyfile "{}"' \
             .format(notebook_config['datalab_ssh_user'], instance_hostname, notebook_config['ssh_key_path'])
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_download_git_certfile', params), shell=True, check=True)
-            subprocess.run("~/scripts/{}.py {}".format('manage_git_creds', params), shell=True, check=True)
+            datalab.runner.run_script('common_download_git_certfile', params)
+            datalab.runner.run_script('manage_git_creds', params)
         except:
             datalab.fab.append_result("Failed setup git credentials")
             raise Exception
@@ -293,7 +293,7 @@ if __name__ == "__main__":
                     notebook_config['exploratory_name'],
                     json.dumps(additional_info))
         try:
-            subprocess.run("~/scripts/{}.py {}".format('common_configure_reverse_proxy', params), shell=True, check=True)
+            datalab.runner.run_script('common_configure_reverse_proxy', params)
         except:
             datalab.fab.append_result("Failed edge reverse proxy template")
             raise Exception
@@ -311,7 +311,7 @@ if __name__ == "__main__":
                    notebook_config['ssh_key_path'],
                    notebook_config['datalab_ssh_user'])
         try:
-            subprocess.run("~/scripts/configure_proxy_for_docker.py {}".format(params), shell=True, check=True)
+            datalab.runner.run_script('configure_proxy_for_docker', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -329,7 +329,7 @@ if __name__ == "__main__":
                    notebook_config['ssh_key_path'],
                    notebook_config['datalab_ssh_user'])
         try:
-           subprocess.run("~/scripts/superset_start.py {}".format(params), shell=True, check=True)
+           datalab.runner.run_script('superset_start', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -41,17 +41,12 @@ if __name__ == "__main__":
     global conn
     conn = datalab.fab.init_datalab_connection(args.instance_ip, args.os_user, args.keyfile)
 
-    inactivity_dir = '/opt/inactivity/'
     if args.resource_type == 'dataengine':
-        reworked_ip=args.dataengine_ip.replace('.','-')
-        inactivity_file = '{}_inactivity'.format(reworked_ip)
+        inactivity_key = args.dataengine_ip.replace('.','-')
     else:
-        inactivity_file = 'local_inactivity'
+        inactivity_key = 'local'
 
-    if exists(conn, '{}{}'.format(inactivity_dir, inactivity_file)):
-        timestamp = conn.sudo('cat {}{}'.format(inactivity_dir, inactivity_file)).stdout.replace('\n','')
-    else:
-        timestamp = '0000000000'
+    timestamp = str(get_inactivity_timestamps(conn).get(inactivity_key, '0000000000'))
 
 
     with open('/root/result.json', 'w') as outfile:
@@ -38,7 +38,7 @@ args = parser.parse_args()
 def general_clean():
     try:
         conn.sudo('systemctl stop ungit')
-        conn.sudo('systemctl stop inactive.timer')
+        conn.sudo('systemctl disable --now inactive.service inactive.timer 2>/dev/null; true')
         conn.sudo('rm -f /etc/systemd/system/inactive.service')
         conn.sudo('rm -f /etc/systemd/system/inactive.timer')
         conn.sudo('rm -rf /opt/inactivity')
@@ -141,7 +141,7 @@ def clean_tensor_jupyterlab():
 def clean_deeplearning():
     try:
         conn.sudo('systemctl stop ungit')
-        conn.sudo('systemctl stop inactive.timer')
+        conn.sudo('systemctl disable --now inactive.service inactive.timer 2>/dev/null; true')
         conn.sudo('rm -f /etc/systemd/system/inactive.service')
         conn.sudo('rm -f /etc/systemd/system/inactive.timer')
         conn.sudo('rm -rf /opt/inactivity')
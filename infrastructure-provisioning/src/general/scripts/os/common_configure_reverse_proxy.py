@@ -22,13 +22,12 @@
 # ******************************************************************************
 
 import argparse
+import datalab.fab
+import datalab.proxy_routes
 import json
 import sys
-from datalab.fab import *
-from datalab.meta_lib import get_instance_private_ip_address
-from fabric import *
+from datalab.meta_lib import get_instance_private_ip_addresses
 from jinja2 import Environment, FileSystemLoader
-from datalab.fab import *
 
 parser = argparse.ArgumentParser()
 parser.add_argument('--edge_hostname', type=str, default='')
@@ -39,15 +38,24 @@ parser.add_argument('--exploratory_name', type=str, default='')
 parser.add_argument('--additional_info', type=str, default='')
 args = parser.parse_args()
 
+# Port and path handling of the notebook applications, the same as in /root/locations
+NOTEBOOK_ROUTES = {
+    'jupyter': {'port': 8888, 'strip': False, 'host': True},
+    'jupyter-gpu': {'port': 8888, 'strip': False, 'host': True},
+    'rstudio': {'port': 8787, 'strip': True},
+    'zeppelin': {'port': 8080, 'strip': True},
+    'superset': {'port': 8088, 'strip': True,
+                 'paths': ['static', 'superset', 'chart', 'dashboard', 'sqllab', 'tablemodelview',
+                           'csvtodatabaseview', 'druid', 'druidclustermodelview', 'druiddatasourcemodelview',
+                           'databaseview', 'dashboardasync', 'users', 'userstatschartview', 'registeruser',
+                           'permissions', 'viewmenus', 'permissionviews', 'roles', 'csstemplatemodelview',
+                           'queryview', 'annotationlayermodelview', 'annotationmodelview', 'lang', 'logout',
+                           'logmodelview']}
+}
 
-def make_template():
-    conf_file_name = args.exploratory_name
+
+def get_config():
     additional_info = json.loads(args.additional_info)
-    environment = Environment(loader=FileSystemLoader('/root/locations'), trim_blocks=True,
-                              lstrip_blocks=True)
-    template = environment.get_template('{}.conf'.format(args.type))
-    ungit_template = environment.get_template('{}.conf'.format('ungit'))
-    tf_template = environment.get_template('{}.conf'.format('tensor'))
     config = {}
     if args.type != 'dataengine-service' and args.type != 'spark':
         config['NAME'] = args.exploratory_name
@@ -55,26 +63,103 @@ def make_template():
     elif args.type == 'spark':
         config['CLUSTER_NAME'] = '{}_{}'.format(
             args.exploratory_name, additional_info['computational_name'])
-        config['MASTER_IP'] = get_instance_private_ip_address('Name', additional_info['master_node_name'])
+        # One lookup for the master and all slaves
+        slave_names = [additional_info['slave_node_name'] + '{}'.format(i + 1)
+                       for i in range(additional_info['instance_count'] - 1)]
+        ips = get_instance_private_ip_addresses('Name', [additional_info['master_node_name']] + slave_names)
+        config['MASTER_IP'] = ips.get(additional_info['master_node_name'])
         config['MASTER_DNS'] = additional_info['master_node_hostname']
         config['NOTEBOOK_IP'] = additional_info['notebook_instance_ip']
-        slaves = []
-        for i in range(additional_info['instance_count'] - 1):
-            slave_name = additional_info['slave_node_name'] + '{}'.format(i + 1)
-            slave_hostname = get_instance_private_ip_address('Name', slave_name)
-            slave = {
-                'name': 'datanode{}'.format(i + 1),
-                'ip': slave_hostname
-            }
-            slaves.append(slave)
-        config['slaves'] = slaves
-        conf_file_name = config['CLUSTER_NAME']
+        config['slaves'] = [{'name': 'datanode{}'.format(i + 1), 'ip': ips.get(slave_name)}
+                            for i, slave_name in enumerate(slave_names)]
+        if not config['MASTER_IP'] or not all(slave['ip'] for slave in config['slaves']):
+            raise Exception('Unable to get private IP addresses of {}'.format(config['CLUSTER_NAME']))
     elif args.type == 'dataengine-service':
         config['CLUSTER_NAME'] = '{}_{}'.format(
             args.exploratory_name, additional_info['computational_name'])
         config['MASTER_IP'] = additional_info['master_ip']
         config['MASTER_DNS'] = additional_info['master_dns']
         config['slaves'] = additional_info['slaves']
+    config['tensor'] = additional_info['tensor']
+    return config
+
+
+def get_route(ip, port, strip=True, host=False, filters=None):
+    route = {'upstream': '{}:{}'.format(ip, port), 'strip': strip, 'host': host}
+    if filters:
+        route['filters'] = filters
+    return route
+
+
+def make_routes(config):
+    # Routes of the registry with the same behaviour as the location templates
+    routes = dict()
+    if args.type == 'spark':
+        name = config['CLUSTER_NAME']
+        master_filters = [['<a href="/"', '<a href="/{}/"'.format(name)],
+                          ['//{}:7077'.format(config['MASTER_DNS']), '//$host/{}-client-master'.format(name)],
+                          ['//{}:8080'.format(config['MASTER_DNS']), '//$host/{}'.format(name)]]
+        routes[name] = get_route(config['MASTER_IP'], 8080, filters=[
+            ['/static/', '/{}/static/'.format(name)],
+            ['/app/', '/{}/app/'.format(name)],
+            ['<a href="/"', '<a href="/{}/"'.format(name)],
+            ['//{}:7077'.format(config['MASTER_DNS']), '//$host/{}-client-master'.format(name)],
+            ['//{}:6066'.format(config['MASTER_DNS']), '//$host/{}-cluster-master'.format(name)],
+            ['//{}:4040'.format(config['NOTEBOOK_IP']), '//$host/{}-driver'.format(name)],
+            ['//{}:8081'.format(config['MASTER_IP']), '//$host/{}-master-datanode'.format(name)]] + [
+            ['//{}:8081'.format(slave['ip']), '//$host/{}-{}'.format(name, slave['name'])]
+            for slave in config['slaves']])
+        routes[name + '-client-master'] = get_route(config['MASTER_IP'], 7077, host=True, filters=[
+            ['<a href="/"', '<a href="/{}/"'.format(name)]])
+        routes[name + '-cluster-master'] = get_route(config['MASTER_IP'], 6066, host=True)
+        routes[name + '-driver'] = get_route(config['NOTEBOOK_IP'], 4040, filters=[
+            ['<a href="/"', '<a href="/{}/"'.format(name)]] + [
+            ['/{}/'.format(path), '/{}-driver/{}/'.format(name, path)]
+            for path in ('jobs', 'static', 'stages', 'storage', 'environment', 'executors', 'SQL')])
+        routes[name + '-master-datanode'] = get_route(config['MASTER_IP'], 8081, filters=[
+            ['/static/', '/{}-master-datanode/static/'.format(name)]] + master_filters)
+        for slave in config['slaves']:
+            routes['{}-{}'.format(name, slave['name'])] = get_route(slave['ip'], 8081, filters=[
+                ['/static/', '/{}-{}/static/'.format(name, slave['name'])]] + master_filters)
+    elif args.type == 'dataengine-service':
+        name = config['CLUSTER_NAME']
+        routes[name] = get_route(config['MASTER_IP'], 8088, filters=[
+            ['/{}/'.format(path), '/{}/{}/'.format(name, path)] for path in ('static', 'cluster')] + [
+            ['/{}'.format(path), '/{}/{}'.format(name, path)] for path in ('conf', 'logs', 'stacks', 'jmx')] + [
+            ['//{}:20888'.format(config['MASTER_DNS']), '//$host/{}-application'.format(name)],
+            ['//{}:8088'.format(config['MASTER_DNS']), '//$host/{}'.format(name)]] + [
+            ['//{}:8042'.format(slave['dns']), '//$host/{}-{}'.format(name, slave['name'])]
+            for slave in config['slaves']])
+        routes[name + '-application'] = get_route(config['MASTER_IP'], 20888, filters=[
+            ['/proxy/', '/{}-application/proxy/'.format(name)]])
+        for slave in config['slaves']:
+            slave_name = '{}-{}'.format(name, slave['name'])
+            routes[slave_name] = get_route(slave['ip'], 8042, filters=[
+                ['/{}/'.format(path), '/{}/{}/'.format(slave_name, path)] for path in ('static', 'node')] + [
+                ['/{}'.format(path), '/{}/{}'.format(slave_name, path)] for path in ('conf', 'logs', 'stacks', 'jmx')] + [
+                ['//{}:8088'.format(config['MASTER_DNS']), '//$host/{}/'.format(name)]])
+    else:
+        if args.type not in NOTEBOOK_ROUTES:
+            raise Exception('Unknown reverse proxy type {}'.format(args.type))
+        name = config['NAME']
+        application = NOTEBOOK_ROUTES[args.type]
+        filters = [['/{}/'.format(path), '/{}/{}/'.format(name, path)] for path in application.get('paths', [])]
+        routes[name] = get_route(config['IP'], application['port'], application['strip'],
+                                 application.get('host', False), filters)
+        routes[name + '-ungit'] = get_route(config['IP'], 8085, strip=False, host=True)
+    if config['tensor']:
+        routes[config['NAME'] + '-tensor'] = get_route(config['IP'], 6006, host=True)
+    return routes
+
+
+def make_template(config):
+    conf_file_name = args.exploratory_name
+    environment = Environment(loader=FileSystemLoader('/root/locations'), trim_blocks=True,
+                              lstrip_blocks=True)
+    template = environment.get_template('{}.conf'.format(args.type))
+    ungit_template = environment.get_template('{}.conf'.format('ungit'))
+    tf_template = environment.get_template('{}.conf'.format('tensor'))
+    if args.type == 'dataengine-service' or args.type == 'spark':
         conf_file_name = config['CLUSTER_NAME']
 
     # Render the template with data and print the output
@@ -85,7 +170,7 @@ def make_template():
         f = open('/tmp/{}.conf'.format(conf_file_name), 'a')
         f.write(ungit_template.render(config))
         f.close()
-    if additional_info['tensor']:
+    if config['tensor']:
         f = open('/tmp/{}.conf'.format(conf_file_name), 'a')
         f.write(tf_template.render(config))
         f.close()
@@ -96,10 +181,12 @@ def make_template():
 # Run script #
 ##############
 if __name__ == "__main__":
-    print("Make template")
+    print("Make routes")
 
     try:
-        conf_file_name = make_template()
+        config = get_config()
+        group = config.get('CLUSTER_NAME', args.exploratory_name)
+        routes = make_routes(config)
     except Exception as err:
         print('Error: {0}'.format(err))
         sys.exit(1)
@@ -107,9 +194,17 @@ if __name__ == "__main__":
     print("Configure connections")
     global conn
     conn = datalab.fab.init_datalab_connection(args.edge_hostname, args.os_user, args.keyfile)
-    conn.put('/tmp/{}.conf'.format(conf_file_name), '/tmp/{}.conf'.format(conf_file_name))
-    conn.sudo('cp -f /tmp/{}.conf /usr/local/openresty/nginx/conf/locations'.format(conf_file_name))
-    conn.sudo('service openresty reload')
+    routes_dir = datalab.proxy_routes.get_routes_dir(conn)
+    if routes_dir:
+        datalab.proxy_routes.put_routes(conn, routes_dir, group, routes)
+        # A location file of the same name would shadow the registry, it is dropped with one last reload
+        if conn.sudo('rm -v /usr/local/openresty/nginx/conf/locations/{}.conf 2>/dev/null; true'.format(group),
+                     hide=True).stdout.strip():
+            conn.sudo('service openresty reload')
+    else:
+        conf_file_name = make_template(config)
+        conn.put('/tmp/{}.conf'.format(conf_file_name), '/tmp/{}.conf'.format(conf_file_name))
+        conn.sudo('cp -f /tmp/{}.conf /usr/local/openresty/nginx/conf/locations'.format(conf_file_name))
+        conn.sudo('service openresty reload')
 
     conn.close()
-
@@ -26,6 +26,7 @@ import ast
 import os
 import sys
 import time
+import datalab.spark_conf
 from datalab.fab import *
 from datalab.notebook_lib import *
 from fabric import *
@@ -54,27 +55,9 @@ def update_spark_defaults_conf(spark_conf):
 def add_custom_spark_properties(cluster_name):
     try:
         if os.path.exists('/opt/{0}'.format(cluster_name)):
-            datalab_header = conn.sudo('cat /tmp/{0}/notebook_spark-defaults_local.conf | grep "^#"'.format(cluster_name)).stdout
             spark_configurations = ast.literal_eval(os.environ['spark_configurations'])
-            new_spark_defaults = list()
-            spark_defaults = conn.sudo('cat /opt/{0}/spark/conf/spark-defaults.conf'.format(cluster_name)).stdout
-            current_spark_properties = spark_defaults.split('\n')
-            for param in current_spark_properties:
-                if param.split(' ')[0] != '#':
-                    for config in spark_configurations:
-                        if config['Classification'] == 'spark-defaults':
-                            for property in config['Properties']:
-                                if property == param.split(' ')[0]:
-                                    param = property + ' ' + config['Properties'][property]
-                                else:
-                                    new_spark_defaults.append(property + ' ' + config['Properties'][property])
-                    new_spark_defaults.append(param)
-            new_spark_defaults = set(new_spark_defaults)
-            conn.sudo("echo '{0}' > /opt/{1}/spark/conf/spark-defaults.conf".format(datalab_header, cluster_name))
-            for prop in new_spark_defaults:
-                prop = prop.rstrip()
-                conn.sudo('echo "{0}" >> /opt/{1}/spark/conf/spark-defaults.conf'.format(prop, cluster_name))
-            conn.sudo('sed -i "/^\s*$/d" /opt/{0}/spark/conf/spark-defaults.conf'.format(cluster_name))
+            datalab.spark_conf.merge_remote(conn, '/opt/{0}/spark/conf/spark-defaults.conf'.format(cluster_name),
+                                            spark_configurations)
     except Exception as err:
         print('Error: {0}'.format(err))
         sys.exit(1)
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+import argparse
+import datalab.fab
+import datalab.proxy_routes
+import json
+import sys
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--edge_hostname', type=str, default='')
+parser.add_argument('--keyfile', type=str, default='')
+parser.add_argument('--os_user', type=str, default='')
+parser.add_argument('--action', type=str, default='sync', help='sync, list, remove or benchmark')
+parser.add_argument('--group', type=str, default='', help='notebook or cluster name of the routes to remove')
+parser.add_argument('--count', type=int, default=100, help='number of route updates of the benchmark')
+args = parser.parse_args()
+
+
+##############
+# Run script #
+##############
+if __name__ == "__main__":
+    print("Configure connections")
+    global conn
+    conn = datalab.fab.init_datalab_connection(args.edge_hostname, args.os_user, args.keyfile)
+    try:
+        routes_dir = datalab.proxy_routes.get_routes_dir(conn)
+        if not routes_dir:
+            raise Exception('Route registry is not installed on {}'.format(args.edge_hostname))
+        if args.action == 'sync':
+            result = datalab.proxy_routes.sync_routes(conn)
+        elif args.action == 'list':
+            result = datalab.proxy_routes.list_routes(conn)
+        elif args.action == 'remove' and args.group:
+            result = datalab.proxy_routes.remove_routes(conn, routes_dir, args.group)
+        elif args.action == 'benchmark':
+            result = datalab.proxy_routes.benchmark(conn, args.count)
+        else:
+            raise Exception('Unknown action {}'.format(args.action))
+        print(json.dumps(result))
+    except Exception as err:
+        print('Error: {0}'.format(err))
+        sys.exit(1)
+    finally:
+        conn.close()
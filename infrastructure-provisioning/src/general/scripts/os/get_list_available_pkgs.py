@@ -27,6 +27,7 @@ import sys
 import time
 import xmlrpc.client
 import os
+import datalab.libs_catalog
 from datalab.fab import *
 from datalab.notebook_lib import *
 from fabric import *
@@ -75,12 +76,9 @@ def get_uncategorised_pip_pkgs(all_pkgs_pip2, all_pkgs_pip3):
             try:
                 client = xmlrpc.client.ServerProxy('https://pypi.python.org/pypi')
                 raw_pkgs = client.list_packages()
-                all_pkgs_other = []
                 for pkg in raw_pkgs:
                     if pkg not in all_pkgs_pip2 and pkg not in all_pkgs_pip3:
-                        all_pkgs_other.append(pkg)
-                for pkg in all_pkgs_other:
-                    pip_pkgs[pkg] = "N/A"
+                        pip_pkgs[pkg] = "N/A"
                 return pip_pkgs
             except:
                 attempts += 1
@@ -93,24 +91,51 @@ def get_uncategorised_pip_pkgs(all_pkgs_pip2, all_pkgs_pip3):
         sys.exit(1)
 
 
-if __name__ == "__main__":
+def get_catalog_key(group, variant=''):
+    # libCacheKey identifies the template the request comes from, lists of the same template are shared
+    return ':'.join(filter(None, [os.environ.get('libCacheKey', ''), os.environ.get('application', ''), group, variant]))
+
+
+def connect():
+    # The notebook is only contacted when its catalog has to be refreshed
     global conn
-    conn = datalab.fab.init_datalab_connection(args.instance_ip, args.os_user, args.keyfile)
+    if conn is None:
+        conn = datalab.fab.init_datalab_connection(args.instance_ip, args.os_user, args.keyfile)
+
+
+def get_os_pkgs():
+    connect()
+    return get_available_os_pkgs()
+
+
+def get_r_pkgs():
+    connect()
+    return get_available_r_pkgs()
+
+
+if __name__ == "__main__":
+    conn = None
+    python_version = os.environ['notebook_python_venv_version'][:3]
     all_pkgs = dict()
     if args.group == 'os_pkg':
-        all_pkgs['os_pkg'] = get_available_os_pkgs()
+        all_pkgs['os_pkg'] = datalab.libs_catalog.get_catalog(
+            get_catalog_key('os_pkg', os.environ.get('conf_os_family', '')), get_os_pkgs)
     elif args.group == 'java':
         all_pkgs['java'] = {}
     #elif args.group == 'pip2':
         #all_pkgs['pip2'] = get_available_pip_pkgs("2.7")
     elif args.group == 'pip3':
-        all_pkgs['pip3'] = get_available_pip_pkgs(os.environ['notebook_python_venv_version'][:3])
+        all_pkgs['pip3'] = datalab.libs_catalog.get_catalog(
+            'pypi:{}'.format(python_version), lambda: get_available_pip_pkgs(python_version))
     elif args.group == 'others':
-        all_pkgs['pip2'] = get_available_pip_pkgs("2.7")
-        all_pkgs['pip3'] = get_available_pip_pkgs(os.environ['notebook_python_venv_version'][:3])
-        all_pkgs['others'] = get_uncategorised_pip_pkgs(all_pkgs['pip2'], all_pkgs['pip3'])
+        all_pkgs['pip2'] = datalab.libs_catalog.get_catalog('pypi:2.7', lambda: get_available_pip_pkgs("2.7"))
+        all_pkgs['pip3'] = datalab.libs_catalog.get_catalog(
+            'pypi:{}'.format(python_version), lambda: get_available_pip_pkgs(python_version))
+        all_pkgs['others'] = datalab.libs_catalog.get_catalog(
+            'pypi:others:{}'.format(python_version),
+            lambda: get_uncategorised_pip_pkgs(all_pkgs['pip2'], all_pkgs['pip3']))
     elif args.group == 'r_pkg':
-        all_pkgs['r_pkg'] = get_available_r_pkgs()
+        all_pkgs['r_pkg'] = datalab.libs_catalog.get_catalog(get_catalog_key('r_pkg'), get_r_pkgs)
 
     # Writing response file & json file with all pkgs
     with open("/root/result.json", 'w') as result:
@@ -120,4 +145,5 @@ if __name__ == "__main__":
     with open("/root/all_pkgs.json", 'w') as result:
         result.write(json.dumps(all_pkgs))
 
-    conn.close()
+    if conn is not None:
+        conn.close()
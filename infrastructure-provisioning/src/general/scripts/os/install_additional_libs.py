@@ -93,9 +93,8 @@ if __name__ == "__main__":
 
     try:
         print('Installing other packages (only tries pip3): {}'.format(pkgs['libraries']['others']))
-        for pkg in pkgs['libraries']['others']:
-            status_pip3 = install_pip_pkg([pkg], 'pip3', 'others', args.dataengine_service)
-            general_status = general_status + status_pip3
+        status_pip3 = install_pip_pkg(pkgs['libraries']['others'], 'pip3', 'others', args.dataengine_service)
+        general_status = general_status + status_pip3
     except KeyError:
         pass
 
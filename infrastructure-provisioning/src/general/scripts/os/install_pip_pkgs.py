@@ -0,0 +1,134 @@
+#!/usr/bin/python3
+
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Runs on the notebook/cluster host, so it must only rely on the standard library
+
+import argparse
+import base64
+import json
+import re
+import subprocess
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--install_command', type=str, default='pip3')
+parser.add_argument('--pkgs', type=str, default='')
+parser.add_argument('--lib_group', type=str, default='pip3')
+args = parser.parse_args()
+
+ERROR_PARSER = "Could not|No matching|ImportError:|failed|EnvironmentError:|requires|FileNotFoundError:|" \
+               "RuntimeError:|error:"
+ANSI_ESCAPE = re.compile(r'\x1b[^m]*m')
+
+
+def run_pip(params):
+    command = "bash -l -c '{} {} 2>&1'".format(args.install_command, params)
+    result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, universal_newlines=True)
+    return ANSI_ESCAPE.sub('', result.stdout)
+
+
+def grep_lines(output, pattern):
+    # Same semantics as the former 'grep -w -i -E' calls
+    regex = re.compile(r'(?<!\w)(?:{})(?!\w)'.format(pattern), re.IGNORECASE)
+    return [line for line in output.splitlines() if regex.search(line)]
+
+
+def normalize(name):
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def get_freeze():
+    packages = dict()
+    for line in run_pip('freeze --all').splitlines():
+        if '==' in line:
+            name, version = line.strip().split('==', 1)
+            packages[normalize(name)] = version
+    return packages
+
+
+def find_version(freeze, name):
+    if normalize(name) in freeze:
+        return freeze[normalize(name)]
+    # Some packages are published under a different name than the one requested
+    changed_name = normalize(name).split('-')[0]
+    for pkg_name, version in freeze.items():
+        if pkg_name == changed_name or pkg_name.startswith(changed_name + '-'):
+            return version
+    return ''
+
+
+def get_dependencies(output, name):
+    lines = grep_lines(output, 'Installing collected packages:')
+    if not lines:
+        return []
+    deps = lines[-1].strip()[31:].split(', ')
+    return [dep.strip() for dep in deps if dep.strip() and normalize(dep.strip()) != normalize(name)]
+
+
+def install(pkg):
+    name, version = pkg
+    if version in ('', 'N/A'):
+        version = 'N/A'
+        pip_pkg = name
+    else:
+        pip_pkg = '{}=={}'.format(name, version)
+    output = run_pip('install -U {} --use-deprecated=legacy-resolver --no-cache-dir'.format(pip_pkg))
+    return {'name': name, 'version': version, 'output': output,
+            'err': ' '.join(grep_lines(output, ERROR_PARSER)).replace('"', "'"),
+            'installed': ' '.join(grep_lines(output, 'Successfully installed|up-to-date'))}
+
+
+def build_status(result, freeze):
+    name = result['name']
+    err = result['err']
+    version = result['version']
+    status_msg = 'installation_error'
+    if err and name not in result['installed']:
+        if 'ERROR: No matching distribution found for {}'.format(name) in err:
+            status_msg = 'invalid_name'
+    else:
+        installed_version = find_version(freeze, name)
+        if installed_version:
+            version = installed_version
+            status_msg = 'installed'
+    versions = []
+    if 'Could not find a version that satisfies the requirement' in err \
+            and 'ERROR: No matching distribution found for {}=='.format(name) in err:
+        versions = err[err.find("(from versions: ") + 16: err.find(") ")]
+        if versions != '' and versions != 'none':
+            versions = versions.split(', ')
+            version = result['version']
+            status_msg = 'invalid_version'
+        else:
+            versions = []
+    dep = ['{} v.{}'.format(i, freeze[normalize(i)]) for i in get_dependencies(result['output'], name)
+           if normalize(i) in freeze]
+    return {"group": args.lib_group, "name": name, "version": version, "status": status_msg,
+            "error_message": err, "available_versions": versions, "add_pkgs": dep}
+
+
+if __name__ == "__main__":
+    pkgs = json.loads(base64.b64decode(args.pkgs).decode())
+    results = [install(pkg) for pkg in pkgs]
+    # A single freeze after all installs gives the versions of packages and their dependencies
+    freeze = get_freeze()
+    print(json.dumps([build_status(result, freeze) for result in results]))
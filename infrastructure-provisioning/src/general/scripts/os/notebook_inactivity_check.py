@@ -24,10 +24,10 @@
 
 import os
 import sys
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
+import datalab.runner
 
 if __name__ == "__main__":
     local_log_filename = "{}_{}_{}.log".format(os.environ['conf_resource'], os.environ['project_name'],
@@ -64,7 +64,7 @@ if __name__ == "__main__":
             .format(notebook_config['os_user'], notebook_config['notebook_ip'], notebook_config['keyfile'], notebook_config['resource_type'], notebook_config['dataengine_ip'])
         try:
             # Run script to get available libs
-            subprocess.run("~/scripts/{}.py {}".format('check_inactivity', params), shell=True, check=True)
+            datalab.runner.run_script('check_inactivity', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -25,11 +25,11 @@ import logging
 import os
 import sys
 import traceback
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from fabric import *
+import datalab.runner
 
 if __name__ == "__main__":
     instance_class = 'notebook'
@@ -62,7 +62,7 @@ if __name__ == "__main__":
                     notebook_config['keyfile'], notebook_config['libs'])
         try:
             # Run script to install additional libs
-            subprocess.run("~/scripts/{}.py {}".format('install_additional_libs', params), shell=True, check=True)
+            datalab.runner.run_script('install_additional_libs', params)
         except:
             traceback.print_exc()
             raise Exception
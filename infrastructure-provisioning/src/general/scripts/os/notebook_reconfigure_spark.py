@@ -26,11 +26,11 @@ import logging
 import os
 import sys
 import traceback
-import subprocess
 from datalab.actions_lib import *
 from datalab.fab import *
 from datalab.meta_lib import *
 from fabric import *
+import datalab.runner
 
 if __name__ == "__main__":
     instance_class = 'notebook'
@@ -61,7 +61,7 @@ if __name__ == "__main__":
             .format(notebook_config['os_user'], notebook_config['notebook_ip'], notebook_config['keyfile'])
         try:
             # Run script to get available libs
-            subprocess.run("~/scripts/{}.py {}".format('reconfigure_spark', params), shell=True, check=True)
+            datalab.runner.run_script('reconfigure_spark', params)
         except:
             traceback.print_exc()
             raise Exception
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+
+import datalab.executor
+import datalab.ssh_pool
+import json
+import os
+import sys
+from datalab.actions_lib import *
+from datalab.fab import *
+from datalab.meta_lib import *
+
+
+def get_notebook_timestamps(notebook_ip):
+    # One pooled connection and one command per notebook, whatever the number of its Data Engines
+    try:
+        conn = datalab.ssh_pool.get_connection(notebook_ip, notebook_config['os_user'],
+                                               notebook_config['keyfile'], run_echo=False, max_tries=3)
+        return get_inactivity_timestamps(conn)
+    except Exception as err:
+        logging.error('Unable to ask inactivity status of {}: {}'.format(notebook_ip, str(err)))
+        return None
+
+
+if __name__ == "__main__":
+    local_log_filename = "{}_{}_{}.log".format(os.environ['conf_resource'], os.environ['project_name'],
+                                               os.environ['request_id'])
+    local_log_filepath = "/logs/project/" + local_log_filename
+    logging.basicConfig(format='%(levelname)-8s [%(asctime)s]  %(message)s',
+                        level=logging.DEBUG,
+                        filename=local_log_filepath)
+
+    try:
+        logging.info('[ASK INACTIVITY STATUS OF PROJECT RESOURCES]')
+        print('[ASK INACTIVITY STATUS OF PROJECT RESOURCES]')
+        notebook_config = dict()
+        try:
+            # [{"notebook_instance_name": ..., "computational_id": ...}], computational_id is set for Data Engines
+            notebook_config['resources'] = json.loads(os.environ['inactivity_resources'])
+            notebook_config['os_user'] = os.environ['conf_os_user']
+            notebook_config['service_base_name'] = os.environ['conf_service_base_name'].lower()
+            notebook_config['tag_name'] = notebook_config['service_base_name'] + '-tag'
+            notebook_config['keyfile'] = '{}{}.pem'.format(os.environ['conf_key_dir'], os.environ['conf_key_name'])
+            instance_names = set()
+            for resource in notebook_config['resources']:
+                instance_names.add(resource['notebook_instance_name'])
+                if resource.get('computational_id'):
+                    instance_names.add('{}-m'.format(resource['computational_id']))
+            instance_ips = get_instance_private_ip_addresses(notebook_config['tag_name'], sorted(instance_names))
+        except Exception as err:
+            print('Error: {0}'.format(err))
+            append_result("Failed to get parameter.", str(err))
+            sys.exit(1)
+
+        notebook_ips = sorted({instance_ips[resource['notebook_instance_name']]
+                               for resource in notebook_config['resources']
+                               if instance_ips.get(resource['notebook_instance_name'])})
+        notebook_timestamps = dict(zip(notebook_ips, datalab.executor.map_concurrently(get_notebook_timestamps,
+                                                                                        notebook_ips)))
+        result = {"inactivity": dict(), "failed": list()}
+        for resource in notebook_config['resources']:
+            if resource.get('computational_id'):
+                name = resource['computational_id']
+                master_ip = instance_ips.get('{}-m'.format(name))
+                key = master_ip.replace('.', '-') if master_ip else None
+            else:
+                name = resource['notebook_instance_name']
+                key = 'local'
+            timestamps = notebook_timestamps.get(instance_ips.get(resource['notebook_instance_name']))
+            if timestamps is None or key is None:
+                result['failed'].append(name)
+            else:
+                result['inactivity'][name] = str(timestamps.get(key, '0000000000'))
+        logging.info('Inactivity of {} resources on {} notebooks, {} failed'.format(
+            len(result['inactivity']), len(notebook_ips), len(result['failed'])))
+
+        with open("/root/result.json", 'w') as f:
+            json.dump(result, f)
+    except Exception as err:
+        print('Error: {0}'.format(err))
+        append_result("Failed to ask inactivity status.", str(err))
+        sys.exit(1)
@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+
+# *****************************************************************************
+#
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+#
+# ******************************************************************************
+
+# Resident inactivity agent of a notebook. Spark drivers are discovered through /proc, their UIs are polled
+# over keep-alive connections and Jupyter kernels through the notebook server API, so a tick costs no forks.
+# The last activity of the notebook ("local") and of every Data Engine is published in one JSON document.
+
+import argparse
+import datetime
+import glob
+import http.client
+import json
+import os
+import re
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--ip_address', type=str, default='127.0.0.1')
+parser.add_argument('--inactivity_dir', type=str, default='/opt/inactivity')
+parser.add_argument('--interval', type=int, default=10)
+args = parser.parse_args()
+
+SPARK_SUBMIT_CLASS = 'org.apache.spark.deploy.SparkSubmit'
+SPARK_UI_PORTS = range(4040, 4100)
+STATE_FILE = 'inactivity.json'
+
+connections = dict()
+drivers = dict()
+activity = dict()
+
+
+def get_json(host, port, path, headers=None):
+    # One connection per UI is kept open between ticks and reopened once if the server closed it
+    for attempt in range(2):
+        conn = connections.get((host, port))
+        if conn is None:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            connections[(host, port)] = conn
+        try:
+            conn.request('GET', path, headers=headers or {})
+            response = conn.getresponse()
+            body = response.read()
+            if response.status != 200:
+                return None
+            return json.loads(body.decode())
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            connections.pop((host, port), None)
+        except ValueError:
+            return None
+    return None
+
+
+def get_cmdline(pid):
+    try:
+        with open('/proc/{}/cmdline'.format(pid), 'rb') as f:
+            return f.read().decode(errors='replace').split('\0')
+    except OSError:
+        return []
+
+
+def get_listening_ports():
+    # Socket inode -> port of every listening TCP socket
+    ports = dict()
+    for path in ('/proc/net/tcp', '/proc/net/tcp6'):
+        try:
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if fields[3] == '0A':
+                        ports[fields[9]] = int(fields[1].rsplit(':', 1)[1], 16)
+        except (OSError, StopIteration):
+            pass
+    return ports
+
+
+def get_socket_inodes(pid):
+    inodes = set()
+    try:
+        fds = os.listdir('/proc/{}/fd'.format(pid))
+    except OSError:
+        return inodes
+    for fd in fds:
+        try:
+            link = os.readlink('/proc/{}/fd/{}'.format(pid, fd))
+        except OSError:
+            continue
+        if link.startswith('socket:['):
+            inodes.add(link[8:-1])
+    return inodes
+
+
+def parse_master(cmdline):
+    for index, arg in enumerate(cmdline):
+        if arg == '--master' and index + 1 < len(cmdline):
+            return cmdline[index + 1]
+        if arg.startswith('spark.master=') or arg.startswith('-Dspark.master='):
+            return arg.split('=', 1)[1]
+    return None
+
+
+def get_master_name(master):
+    # Same names as the *_inactivity files: dashed IP of a standalone master, "local" for anything else
+    match = re.match(r'spark://([0-9.]+):7077', master or '')
+    if match:
+        return match.group(1).replace('.', '-')
+    return 'local'
+
+
+def discover_drivers():
+    # The UI port of a driver never changes, so /proc/<pid>/fd is only scanned for drivers seen the first time
+    pids = [pid for pid in os.listdir('/proc') if pid.isdigit()]
+    for pid in list(drivers):
+        if pid not in pids:
+            drivers.pop(pid)
+    listening = None
+    for pid in pids:
+        if pid in drivers:
+            continue
+        cmdline = get_cmdline(pid)
+        if SPARK_SUBMIT_CLASS not in cmdline:
+            continue
+        if listening is None:
+            listening = get_listening_ports()
+        ports = [listening[inode] for inode in get_socket_inodes(pid)
+                 if inode in listening and listening[inode] in SPARK_UI_PORTS]
+        if ports:
+            drivers[pid] = {'port': min(ports), 'master': parse_master(cmdline)}
+
+
+def get_active_drivers():
+    active = set()
+    for driver in drivers.values():
+        applications = get_json(args.ip_address, driver['port'], '/api/v1/applications') or []
+        for application in applications:
+            if driver['master'] is None:
+                # sparklyr does not pass --master on the command line, the driver environment has it
+                environment = get_json(args.ip_address, driver['port'],
+                                       '/api/v1/applications/{}/environment'.format(application['id'])) or {}
+                driver['master'] = dict(environment.get('sparkProperties', [])).get('spark.master', 'local')
+            jobs = get_json(args.ip_address, driver['port'],
+                            '/api/v1/applications/{}/jobs?status=running'.format(application['id']))
+            if jobs:
+                active.add(get_master_name(driver['master']))
+    return active
+
+
+def parse_jupyter_time(value):
+    return int(datetime.datetime.strptime(value[:19], '%Y-%m-%dT%H:%M:%S').replace(
+        tzinfo=datetime.timezone.utc).timestamp())
+
+
+def get_kernels_activity():
+    # Notebook servers describe themselves in runtime files, including port, base url and token
+    last_activity = 0
+    for path in glob.glob('/home/*/.local/share/jupyter/runtime/*server-*.json'):
+        try:
+            with open(path) as f:
+                server = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if server.get('pid') and not os.path.exists('/proc/{}'.format(server['pid'])):
+            continue
+        headers = {'Authorization': 'token {}'.format(server['token'])} if server.get('token') else None
+        kernels = get_json('127.0.0.1', server['port'], '{}api/kernels'.format(server.get('base_url', '/')),
+                           headers) or []
+        for kernel in kernels:
+            if kernel.get('execution_state') == 'busy':
+                last_activity = int(time.time())
+            elif kernel.get('last_activity'):
+                last_activity = max(last_activity, parse_jupyter_time(kernel['last_activity']))
+    return last_activity
+
+
+def load_timestamps():
+    # Files written by the provisioning scripts (kernels installation, start) are taken into account as well
+    timestamps = dict()
+    for path in glob.glob(os.path.join(args.inactivity_dir, '*_inactivity')):
+        try:
+            with open(path) as f:
+                timestamps[os.path.basename(path)[:-len('_inactivity')]] = int(f.read().strip())
+        except (OSError, ValueError):
+            continue
+    return timestamps
+
+
+def write_file(path, content):
+    tmp_path = '{}.tmp'.format(path)
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def tick():
+    now = int(time.time())
+    discover_drivers()
+    for name in get_active_drivers():
+        activity[name] = now
+    kernels_activity = get_kernels_activity()
+    if kernels_activity > activity.get('local', 0):
+        activity['local'] = kernels_activity
+    timestamps = load_timestamps()
+    for name, timestamp in activity.items():
+        if timestamp > timestamps.get(name, 0):
+            write_file(os.path.join(args.inactivity_dir, '{}_inactivity'.format(name)), '{}\n'.format(timestamp))
+            timestamps[name] = timestamp
+    write_file(os.path.join(args.inactivity_dir, STATE_FILE),
+               json.dumps({'updated': now, 'drivers': len(drivers), 'last_activity': timestamps}))
+
+
+if __name__ == "__main__":
+    os.makedirs(args.inactivity_dir, exist_ok=True)
+    while True:
+        try:
+            tick()
+        except Exception as err:
+            print('Inactivity check failed: {}'.format(str(err)), flush=True)
+        time.sleep(args.interval)
@@ -27,7 +27,7 @@ import sys
 import traceback
 from datalab.fab import *
 from fabric import *
-import subprocess
+import datalab.runner
 
 @task
 def run(ctx):
@@ -39,14 +39,14 @@ def run(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('project_prepare'), shell=True, check=True)
+        datalab.runner.run_script('project_prepare')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed preparing Project.", str(err))
         sys.exit(1)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('edge_configure'), shell=True, check=True)
+        datalab.runner.run_script('edge_configure')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring Edge node.", str(err))
@@ -62,7 +62,7 @@ def terminate(ctx):
                         level=logging.DEBUG,
                         filename=local_log_filepath)
     try:
-        subprocess.run("~/scripts/{}.py".format('project_terminate'), shell=True, check=True)
+        datalab.runner.run_script('project_terminate')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed terminating Edge node.", str(err))
@@ -78,15 +78,32 @@ def recreate(ctx):
                         filename=local_log_filepath)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('project_prepare'), shell=True, check=True)
+        datalab.runner.run_script('project_prepare')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed preparing Edge node.", str(err))
         sys.exit(1)
 
     try:
-        subprocess.run("~/scripts/{}.py".format('edge_configure'), shell=True, check=True)
+        datalab.runner.run_script('edge_configure')
     except Exception as err:
         traceback.print_exc()
         append_result("Failed configuring Edge node.", str(err))
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+
+
+# Main function for checking inactivity status of all notebooks and Data Engines of the project at once
+@task
+def check_inactivity(ctx):
+    local_log_filename = "{}_{}_{}.log".format(os.environ['conf_resource'], os.environ['project_name'],
+                                               os.environ['request_id'])
+    local_log_filepath = "/logs/project/" + local_log_filename
+    logging.basicConfig(format='%(levelname)-8s [%(asctime)s]  %(message)s',
+                        level=logging.DEBUG,
+                        filename=local_log_filepath)
+    try:
+        datalab.runner.run_script('project_inactivity_check')
+    except Exception as err:
+        traceback.print_exc()
+        append_result("Failed to check inactivity status.", str(err))
+        sys.exit(1)
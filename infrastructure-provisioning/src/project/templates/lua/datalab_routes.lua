@@ -0,0 +1,304 @@
+-- *****************************************************************************
+--
+-- Licensed to the Apache Software Foundation (ASF) under one
+-- or more contributor license agreements.  See the NOTICE file
+-- distributed with this work for additional information
+-- regarding copyright ownership.  The ASF licenses this file
+-- to you under the Apache License, Version 2.0 (the
+-- "License"); you may not use this file except in compliance
+-- with the License.  You may obtain a copy of the License at
+--
+--   http://www.apache.org/licenses/LICENSE-2.0
+--
+-- Unless required by applicable law or agreed to in writing,
+-- software distributed under the License is distributed on an
+-- "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+-- KIND, either express or implied.  See the License for the
+-- specific language governing permissions and limitations
+-- under the License.
+--
+-- ******************************************************************************
+
+-- Route registry of the edge reverse proxy. Routes live in the datalab_routes shared dictionary, so notebooks
+-- and clusters are added or removed with a call to the local admin API instead of a reload, which would
+-- respawn the workers and drop open websocket connections of the kernels.
+--
+-- Routes are managed in groups, one per notebook or cluster. Every group is persisted as
+-- conf/routes/<group>.json and all groups are loaded again when nginx starts. A group is a JSON object of
+-- route name -> {"upstream": "ip:port", "strip": bool, "host": bool, "filters": [[from, to], ...]}, where the
+-- route name is the first segment of the request path, "strip" removes it before proxying, "host" passes the
+-- Host header of the client and "filters" are substitutions applied to the response body.
+
+local cjson = require "cjson.safe"
+
+local _M = {}
+
+local ROUTES_DIR = ngx.config.prefix() .. "conf/routes"
+local ROUTE_PREFIX = "route:"
+local GROUP_PREFIX = "group:"
+local routes = ngx.shared.datalab_routes
+
+
+local function read_file(path)
+    local f = io.open(path, "r")
+    if not f then
+        return nil
+    end
+    local data = f:read("*a")
+    f:close()
+    return data
+end
+
+
+local function get_group_names(group)
+    local names = cjson.decode(routes:get(GROUP_PREFIX .. group) or "[]")
+    return type(names) == "table" and names or {}
+end
+
+
+local function set_group(group, group_routes)
+    for name, route in pairs(group_routes) do
+        if type(name) ~= "string" or name:find("/", 1, true) or type(route) ~= "table"
+                or type(route.upstream) ~= "string" then
+            return nil, "invalid route " .. tostring(name)
+        end
+    end
+    local names = {}
+    for name, route in pairs(group_routes) do
+        local ok, err = routes:safe_set(ROUTE_PREFIX .. name, cjson.encode(route))
+        if not ok then
+            return nil, err
+        end
+        names[#names + 1] = name
+    end
+    for _, name in ipairs(get_group_names(group)) do
+        if group_routes[name] == nil then
+            routes:delete(ROUTE_PREFIX .. name)
+        end
+    end
+    local ok, err = routes:safe_set(GROUP_PREFIX .. group, cjson.encode(names))
+    if not ok then
+        return nil, err
+    end
+    return #names
+end
+
+
+local function delete_group(group)
+    local names = get_group_names(group)
+    for _, name in ipairs(names) do
+        routes:delete(ROUTE_PREFIX .. name)
+    end
+    routes:delete(GROUP_PREFIX .. group)
+    return #names
+end
+
+
+local function list_groups()
+    local groups = {}
+    for _, key in ipairs(routes:get_keys(0)) do
+        if key:sub(1, #GROUP_PREFIX) == GROUP_PREFIX then
+            local group = {}
+            for _, name in ipairs(get_group_names(key:sub(#GROUP_PREFIX + 1))) do
+                group[name] = cjson.decode(routes:get(ROUTE_PREFIX .. name) or "null")
+            end
+            groups[key:sub(#GROUP_PREFIX + 1)] = group
+        end
+    end
+    return groups
+end
+
+
+function _M.load()
+    -- Replaces the registry with the groups persisted in ROUTES_DIR; new routes are set before stale ones
+    -- are removed, so routes which did not change are served during the whole sync
+    local loaded = {}
+    local group_count, route_count = 0, 0
+    local files = io.popen("ls " .. ROUTES_DIR .. " 2>/dev/null")
+    for file in files:lines() do
+        local group = file:match("^([%w._-]+)%.json$")
+        local group_routes = group and cjson.decode(read_file(ROUTES_DIR .. "/" .. file) or "")
+        if type(group_routes) == "table" then
+            local count, err = set_group(group, group_routes)
+            if count then
+                loaded[group] = true
+                group_count = group_count + 1
+                route_count = route_count + count
+            else
+                ngx.log(ngx.ERR, "unable to load routes of ", group, ": ", err)
+            end
+        end
+    end
+    files:close()
+    for group in pairs(list_groups()) do
+        if not loaded[group] then
+            delete_group(group)
+        end
+    end
+    return group_count, route_count
+end
+
+
+function _M.route()
+    local name, rest = ngx.var.uri:match("^/([^/]+)(.*)$")
+    local value = name and routes:get(ROUTE_PREFIX .. name)
+    if not value then
+        return ngx.exit(ngx.HTTP_NOT_FOUND)
+    end
+    local route = cjson.decode(value)
+    ngx.var.datalab_upstream = route.upstream
+    ngx.var.datalab_host = route.host and ngx.var.http_host or route.upstream
+    if route.strip then
+        -- YARN pages of dataengine-service link to /<name>/<name>/..., which is stripped as well
+        while rest:sub(1, #name + 2) == "/" .. name .. "/" do
+            rest = rest:sub(#name + 2)
+        end
+        ngx.req.set_uri(rest == "" and "/" or rest)
+        ngx.var.datalab_redirect = ngx.var.scheme .. "://" .. ngx.var.host .. "/" .. name .. "/"
+    else
+        ngx.var.datalab_redirect = ngx.var.scheme .. "://" .. ngx.var.host .. "/"
+    end
+    if route.filters then
+        ngx.req.clear_header("Accept-Encoding")
+        ngx.ctx.datalab_filters = route.filters
+    end
+end
+
+
+local function replace_all(body, from, to)
+    local parts = {}
+    local position = 1
+    while true do
+        local first, last = body:find(from, position, true)
+        if not first then
+            break
+        end
+        parts[#parts + 1] = body:sub(position, first - 1)
+        parts[#parts + 1] = to
+        position = last + 1
+    end
+    if position == 1 then
+        return body
+    end
+    parts[#parts + 1] = body:sub(position)
+    return table.concat(parts)
+end
+
+
+local function prepare_filters(filters)
+    local host = ngx.var.host
+    local prepared = {}
+    local longest = 0
+    for _, filter in ipairs(filters) do
+        local from = replace_all(filter[1], "$host", host)
+        if from ~= "" then
+            prepared[#prepared + 1] = {from, replace_all(filter[2], "$host", host)}
+            longest = math.max(longest, #from)
+        end
+    end
+    return prepared, longest
+end
+
+
+local function substitute(data, filters, longest, eof)
+    -- One pass from left to right like sub_filter: the earliest match wins, the longest one of those starting
+    -- at the same position. Unless it is the last chunk, matches are not taken from the last longest - 1 bytes,
+    -- which may be the beginning of a longer match continued in the next chunk; they are returned to be
+    -- prepended to it.
+    local parts = {}
+    local position = 1
+    local next_first, next_last = {}, {}
+    local keep = math.max(1, #data - longest + 2)
+    while true do
+        local first, last, to
+        for i, filter in ipairs(filters) do
+            if next_first[i] ~= false and (next_first[i] == nil or next_first[i] < position) then
+                next_first[i], next_last[i] = data:find(filter[1], position, true)
+                if not next_first[i] then
+                    next_first[i] = false
+                end
+            end
+            local found = next_first[i]
+            if found and (not first or found < first or (found == first and next_last[i] > last)) then
+                first, last, to = found, next_last[i], filter[2]
+            end
+        end
+        if not first or (not eof and first >= keep) then
+            break
+        end
+        parts[#parts + 1] = data:sub(position, first - 1)
+        parts[#parts + 1] = to
+        position = last + 1
+    end
+    local carry = ""
+    if eof then
+        parts[#parts + 1] = data:sub(position)
+    else
+        keep = math.max(position, keep)
+        parts[#parts + 1] = data:sub(position, keep - 1)
+        carry = data:sub(keep)
+    end
+    return table.concat(parts), carry
+end
+
+
+function _M.header_filter()
+    if ngx.ctx.datalab_filters then
+        ngx.header.content_length = nil
+    end
+end
+
+
+function _M.body_filter()
+    local ctx = ngx.ctx
+    if not ctx.datalab_filters then
+        return
+    end
+    -- Chunks are passed on as they arrive, so logs and downloads of the Spark and YARN UIs are streamed;
+    -- only a tail shorter than the longest pattern is held back
+    if not ctx.datalab_prepared then
+        ctx.datalab_prepared, ctx.datalab_longest = prepare_filters(ctx.datalab_filters)
+        ctx.datalab_carry = ""
+    end
+    ngx.arg[1], ctx.datalab_carry = substitute(ctx.datalab_carry .. (ngx.arg[1] or ""), ctx.datalab_prepared,
+                                               ctx.datalab_longest, ngx.arg[2])
+end
+
+
+local function respond(status, data)
+    ngx.status = status
+    ngx.header.content_type = "application/json"
+    ngx.say(cjson.encode(data))
+    return ngx.exit(status)
+end
+
+
+function _M.admin()
+    -- GET /routes lists the groups, POST /routes loads them again from ROUTES_DIR,
+    -- PUT /routes/<group> replaces the routes of a group and DELETE /routes/<group> removes them
+    local method = ngx.req.get_method()
+    local group = ngx.var.uri:match("^/routes/([%w._-]+)$")
+    if ngx.var.uri == "/routes" and method == "GET" then
+        return respond(ngx.HTTP_OK, list_groups())
+    elseif ngx.var.uri == "/routes" and method == "POST" then
+        local group_count, route_count = _M.load()
+        return respond(ngx.HTTP_OK, {groups = group_count, routes = route_count})
+    elseif group and method == "PUT" then
+        ngx.req.read_body()
+        local group_routes = cjson.decode(ngx.req.get_body_data() or "")
+        if type(group_routes) ~= "table" then
+            return respond(ngx.HTTP_BAD_REQUEST, {error = "routes of " .. group .. " are not a JSON object"})
+        end
+        local count, err = set_group(group, group_routes)
+        if not count then
+            return respond(ngx.HTTP_BAD_REQUEST, {error = err})
+        end
+        return respond(ngx.HTTP_OK, {group = group, routes = count})
+    elseif group and method == "DELETE" then
+        return respond(ngx.HTTP_OK, {group = group, routes = delete_group(group)})
+    end
+    return respond(ngx.HTTP_NOT_FOUND, {error = "unknown request"})
+end
+
+
+return _M
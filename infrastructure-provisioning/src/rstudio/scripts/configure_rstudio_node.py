@@ -115,7 +115,7 @@ if __name__ == "__main__":
 
     # INSTALL INACTIVITY CHECKER
     print("Install inactivity checker")
-    install_inactivity_checker(args.os_user, args.ip_address, True)
+    install_inactivity_checker(args.os_user, args.ip_address)
 
     #POST INSTALLATION PROCESS
     print("Updating pyOpenSSL library")
@@ -24,11 +24,13 @@
 import argparse
 import json
 import os
+import shutil
+import subprocess
 import sys
+import time
 import yaml
-from fabric import *
+from pymongo import MongoClient
 from time import gmtime, strftime
-import subprocess
 
 parser = argparse.ArgumentParser(description="Backup script for DataLab configs, keys, certs, jars, database & logs")
 parser.add_argument('--user', type=str, default='datalab-user', help='System username')
@@ -45,146 +47,213 @@ parser.add_argument('--db', action='store_true', default=False,
                     help='Mongo DB. Key without arguments. Default: disable')
 parser.add_argument('--logs', action='store_true', default=False,
                     help='All logs (include docker). Key without arguments. Default: disable')
+parser.add_argument('--incremental', action='store_true', default=False,
+                    help='Only files changed since the previous backup and the Mongo oplog delta. Key without '
+                         'arguments. Default: disable')
+parser.add_argument('--compression', type=str, default='gzip', choices=['gzip', 'zstd'],
+                    help='Archive compression, pigz is used for gzip when it is installed. Default: gzip')
+parser.add_argument('--threads', type=int, default=0, help='Compression threads. Default: number of CPUs')
 parser.add_argument('--request_id', type=str, default='', help='Uniq request ID for response and backup')
 parser.add_argument('--result_path', type=str, default='/opt/datalab/tmp/result',
                     help='Path to store backup and response files')
 args = parser.parse_args()
 
 
-def backup_prepare():
-    try:
-        subprocess.run('mkdir {}'.format(temp_folder), shell=True, check=True)
-        if args.configs != 'skip':
-            subprocess.run('mkdir -p {0}conf'.format(temp_folder), shell=True, check=True)
-        if args.keys != 'skip':
-            subprocess.run('mkdir -p {}keys'.format(temp_folder), shell=True, check=True)
-        if args.certs != 'skip':
-            subprocess.run('mkdir -p {}certs'.format(temp_folder), shell=True, check=True)
-        if args.jars != 'skip':
-            subprocess.run('mkdir -p {}jars'.format(temp_folder), shell=True, check=True)
-        if args.logs:
-            subprocess.run('mkdir -p {}logs'.format(temp_folder), shell=True, check=True)
-            subprocess.run('mkdir -p {}logs/docker'.format(temp_folder), shell=True, check=True)
-    except Exception as err:
-        append_result(error='Failed to create temp folder. {}'.format(str(err)))
-        sys.exit(1)
+def list_files(paths, pattern='', maxdepth=0):
+    # Metadata of regular files and symlinks, one sudo find covers the folders which are readable by root only
+    result = subprocess.run("sudo find {0}{1} \\( -type f -o -type l \\){2} -printf '%y\\t%s\\t%T@\\t%l\\t%p\\n'"
+                            .format(' '.join(paths), ' -maxdepth {}'.format(maxdepth) if maxdepth else '',
+                                    " -name '{}'".format(pattern) if pattern else ''),
+                            capture_output=True, shell=True, check=True)
+    files = list()
+    for line in result.stdout.decode('UTF-8').splitlines():
+        file_type, size, mtime, link, path = line.split('\t', 4)
+        files.append({'path': path, 'size': int(size), 'mtime': float(mtime), 'link': link if file_type == 'l' else ''})
+    return files
 
 
-def backup_configs():
-    try:
-        print('Backup configs: {}'.format(args.configs))
-        if args.configs == 'skip':
-            print('Skipped config backup.')
-        elif args.configs == 'all':
-            subprocess.run("find {0}{2} -name '*yml' -exec cp {3} {1}{2} \;".format(args.datalab_path, temp_folder, conf_folder,
-                                                                           "{}"), shell=True, check=True)
-        else:
-            for conf_file in args.configs.split(','):
-                subprocess.run('cp {0}{2}{3} {1}{2}'.format(args.datalab_path, temp_folder, conf_folder, conf_file), shell=True, check=True)
-    except:
-        append_result(error='Backup configs failed.')
-        sys.exit(1)
+def add_source(root, prefix, paths=None, pattern='', maxdepth=0, flatten=False):
+    # Files under root are stored as prefix/<path relative to root>, or prefix/<name> when flattened
+    for item in list_files(paths or [root], pattern, maxdepth):
+        relative = os.path.basename(item['path']) if flatten else os.path.relpath(item['path'], root)
+        item['name'] = os.path.join(prefix, relative)
+        files[item['name']] = item
+    # tar gets the same mapping of the paths, which are listed without the leading slash
+    sources.append("--transform='s|^{}/{}|{}/|S'".format(root.strip('/').replace('.', '\\.'),
+                                                        '[^/]*/' if flatten else '', prefix))
 
 
-def backup_keys():
+def collect_files():
     try:
+        if args.configs == 'all':
+            add_source(args.datalab_path + conf_folder, 'conf', pattern='*yml')
+        elif args.configs != 'skip':
+            add_source(args.datalab_path + conf_folder, 'conf',
+                       [args.datalab_path + conf_folder + conf_file for conf_file in args.configs.split(',')])
+        print('Backup configs: {}'.format(args.configs))
+        if args.keys == 'all':
+            add_source(keys_folder, 'keys', maxdepth=1)
+        elif args.keys != 'skip':
+            add_source(keys_folder, 'keys', [keys_folder + key_file for key_file in args.keys.split(',')])
         print('Backup keys: {}'.format(args.keys))
-        if args.keys == 'skip':
-            print('Skipped keys backup.')
-        elif args.keys == 'all':
-            subprocess.run('cp {0}* {1}keys'.format(keys_folder, temp_folder), shell=True, check=True)
-        else:
-            for key_file in args.keys.split(','):
-                subprocess.run('cp {0}{1} {2}keys'.format(keys_folder, key_file, temp_folder), shell=True, check=True)
-    except:
-        append_result(error='Backup keys failed.')
+        if args.certs != 'skip':
+            certs = all_certs if args.certs == 'all' else args.certs.split(',')
+            add_source(certs_folder, 'certs', [certs_folder + cert for cert in certs])
+        print('Backup certs: {}'.format(args.certs))
+        if args.jars == 'all':
+            add_source(args.datalab_path + jars_folder, 'jars')
+        elif args.jars != 'skip':
+            add_source(args.datalab_path + jars_folder, 'jars',
+                       [args.datalab_path + jars_folder + service for service in args.jars.split(',')])
+        print('Backup jars: {}'.format(args.jars))
+        if args.logs:
+            add_source(datalab_logs_folder, 'logs')
+            add_source(docker_logs_folder, 'logs/docker', pattern='*log', flatten=True)
+        print('Backup logs: {}'.format(args.logs))
+    except Exception as err:
+        append_result(error='Failed to collect files. {}'.format(str(err)))
         sys.exit(1)
 
 
-def backup_certs():
-    try:
-        print('Backup certs: {}'.format(args.certs))
-        if args.certs == 'skip':
-            print('Skipped certs backup.')
-        elif args.certs == 'all':
-            for cert in all_certs:
-                subprocess.run('sudo cp {0}{1} {2}certs'.format(certs_folder, cert, temp_folder), shell=True, check=True)
-                subprocess.run('sudo chown {0}:{0} {1}certs/{2} '.format(os_user, temp_folder, cert), shell=True, check=True)
-        else:
-            for cert in args.certs.split(','):
-                subprocess.run('cp {0}{1} {2}certs'.format(certs_folder, cert, temp_folder), shell=True, check=True)
-                subprocess.run('sudo chown {0}:{0} {1}certs/{2} '.format(os_user, temp_folder, cert), shell=True, check=True)
-    except:
-        append_result(error='Backup certs failed.')
-        sys.exit(1)
+def get_sha256(paths):
+    result = subprocess.run('sudo sha256sum -- {}'.format(' '.join("'{}'".format(path) for path in paths)),
+                            capture_output=True, shell=True, check=True)
+    return {line.split('  ', 1)[1]: line.split('  ', 1)[0] for line in result.stdout.decode('UTF-8').splitlines()}
 
 
-def backup_jars():
+def build_manifest(previous):
+    # A file goes into the archive unless its size and mtime, or its content, match the previous backup. The
+    # manifest keeps the state of every file with the archive holding its latest version.
     try:
-        print('Backup jars: {}'.format(args.jars))
-        if args.jars == 'skip':
-            print('Skipped jars backup.')
-        elif args.jars == 'all':
-            for root, dirs, files in os.walk('{0}{1}'.format(args.datalab_path, jars_folder)):
-                for service in dirs:
-                    subprocess.run('cp -RP {0}{1}{2}* {3}jars'.format(args.datalab_path, jars_folder, service, temp_folder), shell=True, check=True)
-        else:
-            for service in args.jars.split(','):
-                subprocess.run('cp -RP {0}{1}{2}* {3}jars'.format(args.datalab_path, jars_folder, service, temp_folder), shell=True, check=True)
-    except:
-        append_result(error='Backup jars failed.')
+        previous_files = previous.get('files', {}) if args.incremental else dict()
+        # Files of categories backed up as a whole which are gone since the previous backup are dropped
+        whole = {'conf': args.configs == 'all', 'keys': args.keys == 'all', 'certs': args.certs == 'all',
+                 'jars': args.jars == 'all', 'logs': args.logs}
+        state = {name: entry for name, entry in previous_files.items() if not whole[name.split('/')[0]]}
+        changed = {name for name, item in files.items() if name not in previous_files or
+                   (previous_files[name]['size'], previous_files[name]['mtime']) != (item['size'], item['mtime'])}
+        paths = [files[name]['path'] for name in changed if name in previous_files and not files[name]['link']]
+        hashes = dict()
+        for i in range(0, len(paths), 500):
+            hashes.update(get_sha256(paths[i:i + 500]))
+        for name, item in files.items():
+            entry = {'size': item['size'], 'mtime': item['mtime'], 'sha256': hashes.get(item['path']),
+                     'link': item['link'], 'backup': backup_name}
+            old = previous_files.get(name)
+            if name not in changed or (old and item['link'] and item['link'] == old['link']):
+                entry.update({'sha256': old['sha256'], 'backup': old['backup']})
+            elif old and entry['sha256'] and entry['sha256'] == old['sha256']:
+                entry['backup'] = old['backup']
+            else:
+                included.append(item)
+            state[name] = entry
+        return {'backup': backup_name, 'created': backup_time, 'incremental': args.incremental,
+                'parent': previous.get('backup') if args.incremental else None, 'files': state,
+                'db': previous.get('db') if args.incremental else None}
+    except Exception as err:
+        append_result(error='Failed to build backup manifest. {}'.format(str(err)))
         sys.exit(1)
 
 
-def backup_database():
+def backup_database(manifest):
+    # Incremental backups dump the oplog entries after the previous backup when the oplog still covers them,
+    # otherwise and for standalone servers the whole database is dumped
     try:
         print('Backup db: {}'.format(args.db))
-        if args.db:
-            ssn_conf = open('{0}{1}ssn.yml'.format(args.datalab_path, conf_folder)).read()
-            data = yaml.safe_load('mongo{}'.format(ssn_conf.split('mongo')[-1]))
-            with settings(hide('running')):
-                subprocess.run("mongodump --host {0} --port {1} --username {2} --password '{3}' --db={4} --archive={5}mongo.db" \
-                    .format(data['mongo']['host'], data['mongo']['port'], data['mongo']['username'],
-                            data['mongo']['password'], data['mongo']['database'], temp_folder), shell=True, check=True)
-    except:
-        append_result(error='Backup db failed.')
+        if not args.db:
+            return list()
+        ssn_conf = open('{0}{1}ssn.yml'.format(args.datalab_path, conf_folder)).read()
+        data = yaml.safe_load('mongo{}'.format(ssn_conf.split('mongo')[-1]))['mongo']
+        client = MongoClient(data['host'], int(data['port']), username=data['username'], password=data['password'],
+                             authSource=data['database'])
+        oplog_ts = None
+        oplog_first = None
+        if client.admin.command('isMaster').get('setName'):
+            oplog = client.local['oplog.rs']
+            last = list(oplog.find({}, {'ts': 1}).sort('$natural', -1).limit(1))
+            first = list(oplog.find({}, {'ts': 1}).sort('$natural', 1).limit(1))
+            if last and first:
+                oplog_ts = [last[0]['ts'].time, last[0]['ts'].inc]
+                oplog_first = [first[0]['ts'].time, first[0]['ts'].inc]
+        db = manifest.get('db') or dict()
+        mongo_args = "--host {0} --port {1} --username {2} --password '{3}'".format(
+            data['host'], data['port'], data['username'], data['password'])
+        if args.incremental and db.get('oplog_ts') and oplog_ts and oplog_first <= db['oplog_ts']:
+            print('Dumping oplog since {}'.format(db['oplog_ts']))
+            query = '{{"ts": {{"$gt": {{"$timestamp": {{"t": {}, "i": {}}}}}}}}}'.format(*db['oplog_ts'])
+            subprocess.run("mongodump {0} --authenticationDatabase={1} --db=local --collection=oplog.rs "
+                           "--query='{2}' --out={3}oplog".format(mongo_args, data['database'], query, staging_folder),
+                           shell=True, check=True)
+            os.rename('{}oplog/local/oplog.rs.bson'.format(staging_folder), staging_folder + 'mongo.oplog.bson')
+            manifest['db'] = {'backup': db['backup'], 'oplog': db.get('oplog', []) + [backup_name],
+                              'oplog_ts': oplog_ts}
+            return ['mongo.oplog.bson']
+        subprocess.run("mongodump {0} --db={1} --archive={2}mongo.db".format(mongo_args, data['database'],
+                                                                          staging_folder), shell=True, check=True)
+        manifest['db'] = {'backup': backup_name, 'oplog': [], 'oplog_ts': oplog_ts}
+        return ['mongo.db']
+    except Exception as err:
+        append_result(error='Backup db failed. {}'.format(str(err)))
         sys.exit(1)
 
 
-def backup_logs():
-    try:
-        print('Backup logs: {}'.format(args.logs))
-        if args.logs:
-            print('Backup DataLab logs')
-            subprocess.run('cp -R {0}* {1}logs'.format(datalab_logs_folder, temp_folder), shell=True, check=True)
-            print('Backup docker logs')
-            subprocess.run("sudo find {0} -name '*log' -exec cp {2} {1}logs/docker \;".format(docker_logs_folder, temp_folder,
-                                                                                     "{}"), shell=True, check=True)
-            subprocess.run('sudo chown -R {0}:{0} {1}logs/docker'.format(os_user, temp_folder), shell=True, check=True)
-    except:
-        append_result(error='Backup logs failed.')
-        print('Backup logs failed.')
-        sys.exit(1)
+def get_compress_program():
+    threads = args.threads or os.cpu_count()
+    if args.compression == 'zstd':
+        if shutil.which('zstd'):
+            return 'zstd -q -T{}'.format(threads), '.tar.zst'
+        print('zstd is not installed, using gzip')
+    if shutil.which('pigz'):
+        return 'pigz -p {}'.format(threads), '.tar.gz'
+    return 'gzip', '.tar.gz'
 
 
-def backup_finalize():
+def backup_archive(manifest, staged):
+    # Files are streamed from their locations into tar and the compressor, only the manifest and database dumps
+    # are staged. tar runs with sudo, as certs and docker logs are readable by root only.
     try:
-        print('Compressing all files to archive...')
-        subprocess.run('cd {0} && tar -zcf {1} .'.format(temp_folder, dest_file), shell=True, check=True)
+        print('Compressing {} files to archive...'.format(len(included) + len(staged)))
+        with open(staging_folder + 'manifest.json', 'w') as f:
+            json.dump(manifest, f)
+        with open(staging_folder + 'files.list', 'wb') as f:
+            for item in included:
+                f.write(item['path'].lstrip('/').encode() + b'\0')
+        started = time.time()
+        with open(dest_file, 'wb') as archive:
+            tar = subprocess.Popen("sudo tar -cf - -C {0} manifest.json {1} -C / --no-recursion --null "
+                                   "-T {0}files.list {2}".format(staging_folder, ' '.join(staged), ' '.join(sources)),
+                                   shell=True, stdout=subprocess.PIPE)
+            compressor = subprocess.run(compress_program, shell=True, stdin=tar.stdout, stdout=archive)
+            tar.stdout.close()
+            # tar returns 1 when a file (usually a log) changed while it was read
+            if tar.wait() not in (0, 1) or compressor.returncode != 0:
+                raise Exception('tar exited with {}, compressor with {}'.format(tar.returncode,
+                                                                                compressor.returncode))
+        duration = time.time() - started
+        size = sum(item['size'] for item in included) + sum(os.path.getsize(staging_folder + name) for name in staged)
+        metrics = {'files': len(included), 'bytes': size, 'archive_bytes': os.path.getsize(dest_file),
+                   'seconds': round(duration, 1), 'mb_per_second': round(size / 1024 / 1024 / max(duration, 0.001), 1)}
+        print('Archived {files} files, {bytes} bytes into {archive_bytes} bytes in {seconds} sec '
+              '({mb_per_second} MB/s)'.format(**metrics))
+        return metrics
     except Exception as err:
         append_result(error='Compressing backup failed. {}'.format(str(err)))
         sys.exit(1)
 
+
+def backup_finalize(manifest):
     try:
-        print('Clear temp folder...')
-        if temp_folder != '/':
-            subprocess.run('rm -rf {}'.format(temp_folder), shell=True, check=True)
+        with open(manifest_file + '.tmp', 'w') as f:
+            json.dump(manifest, f)
+        os.replace(manifest_file + '.tmp', manifest_file)
+        print('Clear staging folder...')
+        shutil.rmtree(staging_folder)
     except Exception as err:
-        append_result(error='Clear temp folder failed. {}'.format(str(err)))
+        append_result(error='Clear staging folder failed. {}'.format(str(err)))
         sys.exit(1)
 
 
-def append_result(status='failed', error='', backup_file=''):
+def append_result(status='failed', error='', backup_file='', metrics=None):
     with open(dest_result, 'w') as result:
         res = {"status": status,
                "request_id": args.request_id}
@@ -194,6 +263,7 @@ def append_result(status='failed', error='', backup_file=''):
         elif status == 'created':
             print('Successfully created backup file: {}'.format(backup_file))
             res['backup_file'] = backup_file
+            res['metrics'] = metrics
         print(json.dumps(res))
         result.write(json.dumps(res))
 
@@ -201,7 +271,6 @@ def append_result(status='failed', error='', backup_file=''):
 if __name__ == "__main__":
     backup_time = strftime('%d_%b_%Y_%H-%M-%S', gmtime())
     os_user = args.user
-    temp_folder = '/tmp/datalab_backup-{}/'.format(backup_time)
     conf_folder = 'conf/'
     keys_folder = '/home/{}/keys/'.format(os_user)
     certs_folder = '/etc/ssl/certs/'
@@ -210,20 +279,32 @@ if __name__ == "__main__":
     datalab_logs_folder = '/var/log/datalab/'
     docker_logs_folder = '/var/lib/docker/containers/'
     dest_result = '{0}/backup_{1}.json'.format(args.result_path, args.request_id)
-    dest_file = '{0}/backup_{1}.tar.gz'.format(args.result_path, args.request_id)
+    compress_program, extension = get_compress_program()
+    dest_file = '{0}/backup_{1}{2}'.format(args.result_path, args.request_id, extension)
+    backup_name = os.path.basename(dest_file)
+    manifest_file = '{}/backup_manifest.json'.format(args.result_path)
+    staging_folder = '{0}/.backup_{1}/'.format(args.result_path, args.request_id)
+    files = dict()
+    sources = list()
+    included = list()
 
-    # Backup file section
-    backup_prepare()
+    previous = dict()
+    if args.incremental:
+        if os.path.isfile(manifest_file):
+            with open(manifest_file) as f:
+                previous = json.load(f)
+        else:
+            print('There is no previous backup, creating a full one')
+            args.incremental = False
+    os.makedirs(staging_folder, exist_ok=True)
 
     # Backup section
-    backup_configs()
-    backup_keys()
-    backup_certs()
-    backup_jars()
-    backup_database()
-    backup_logs()
+    collect_files()
+    manifest = build_manifest(previous)
+    staged = backup_database(manifest)
 
-    # Compressing & cleaning tmp folder
-    backup_finalize()
+    # Streaming files to the archive & cleaning staging folder
+    metrics = backup_archive(manifest, staged)
+    backup_finalize(manifest)
 
-    append_result(status='created', error='Backup keys failed.', backup_file=dest_file)
\ No newline at end of file
+    append_result(status='created', backup_file=dest_file, metrics=metrics)
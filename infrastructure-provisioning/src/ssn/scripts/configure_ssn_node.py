@@ -76,6 +76,8 @@ def cp_backup_scripts(datalab_path):
         conn.put('/root/scripts/backup.py', datalab_path + "tmp/backup.py")
         conn.put('/root/scripts/restore.py', datalab_path + "tmp/restore.py")
         conn.run('chmod +x {0}tmp/backup.py {0}tmp/restore.py'.format(datalab_path))
+        # Multithreaded compressors of the backup archives
+        manage_pkg('-y install', 'remote', 'pigz zstd')
     except Exception as err:
         traceback.print_exc()
         print('Failed to copy backup scripts: ', str(err))
@@ -21,29 +21,146 @@
 #
 # ******************************************************************************
 
+# Builds the DataLab images: the base image first, then the images which are based on it in parallel. Builds
+# go through BuildKit with an inline cache, so every image can be passed to --cache-from later, and an image
+# is skipped when the hash of its Dockerfile, build args, COPY/ADD sources and base image matches the one in
+# its label.
 
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shlex
+import subprocess
 import sys
+import threading
+import time
 import traceback
-import subprocess
-from fabric import *
-from os.path import exists
-from os import path
+from concurrent.futures import ThreadPoolExecutor
 
 src_path = '/opt/datalab/sources/infrastructure-provisioning/src/'
-if sys.argv[1] == 'all':
-    node = [
-        'edge',
-        'project',
-        'jupyter',
-        'jupyterlab',
-        'rstudio',
-        'zeppelin',
-        'tensor',
-        'deeplearning',
-        'dataengine',
-        'dataengine-service']
-else:
-    node = sys.argv[1:]
+HASH_LABEL = 'datalab.inputs_hash'
+report_lock = threading.Lock()
+
+
+def get_dockerfile_sources(context_dir, dockerfile, build_args):
+    # Sources of the COPY and ADD instructions with the build args substituted, relative to the context
+    with open(os.path.join(context_dir, dockerfile)) as f:
+        content = re.sub(r'\\\n', ' ', f.read())
+    sources = list()
+    for line in content.splitlines():
+        if line.split(' ', 1)[0].strip().upper() not in ('COPY', 'ADD'):
+            continue
+        tokens = shlex.split(line.strip())
+        if len(tokens) < 3:
+            continue
+        if any(token.startswith('--from') for token in tokens):
+            continue
+        for source in [token for token in tokens[1:-1] if not token.startswith('--')]:
+            for key, value in build_args.items():
+                source = source.replace('${{{}}}'.format(key), value).replace('${}'.format(key), value)
+            sources.append(source)
+    return sources
+
+
+def get_inputs_hash(context_dir, dockerfile, build_args, parent_id=''):
+    inputs = hashlib.sha256()
+    inputs.update(json.dumps([dockerfile, sorted(build_args.items()), parent_id]).encode())
+    with open(os.path.join(context_dir, dockerfile), 'rb') as f:
+        inputs.update(f.read())
+    files = set()
+    for source in get_dockerfile_sources(context_dir, dockerfile, build_args):
+        for path in glob.glob(os.path.join(context_dir, source)):
+            if os.path.isdir(path):
+                for root, _, names in os.walk(path):
+                    files.update(os.path.join(root, name) for name in names)
+            else:
+                files.add(path)
+    for path in sorted(files):
+        inputs.update(os.path.relpath(path, context_dir).encode())
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                inputs.update(chunk)
+    return inputs.hexdigest()
+
+
+def inspect_image(image, template, docker='docker'):
+    result = subprocess.run('{} image inspect --format {} {}'.format(docker, shlex.quote(template), image),
+                            capture_output=True, shell=True)
+    return result.stdout.decode('UTF-8').strip() if result.returncode == 0 else ''
+
+
+def build_image(image, context_dir, log_dir, report, parent='', force=False, cache_from=(), docker='docker'):
+    # image is {'name', 'tag', 'dockerfile', 'build_args'}; the output of every build goes to its own log,
+    # as the output of parallel builds would be interleaved
+    started = time.time()
+    status = 'failed'
+    log_file = os.path.join(log_dir, '{}.log'.format(image['name']))
+    try:
+        parent_id = inspect_image(parent, '{{.Id}}', docker) if parent else ''
+        inputs_hash = get_inputs_hash(context_dir, image['dockerfile'], image['build_args'], parent_id)
+        if not force and inspect_image(image['tag'], '{{ index .Config.Labels "' + HASH_LABEL + '" }}',
+                                       docker) == inputs_hash:
+            status = 'skipped'
+            return True
+        # sudo resets the environment, so the variable is passed to the docker binary itself
+        prefix, binary = docker.rsplit(' ', 1) if ' ' in docker else ('', docker)
+        command = ['{}DOCKER_BUILDKIT=1 {} build'.format(prefix + ' ' if prefix else '', binary),
+                   '--file {}'.format(image['dockerfile']),
+                   '--tag {}'.format(image['tag']), '--label {}={}'.format(HASH_LABEL, inputs_hash),
+                   '--build-arg BUILDKIT_INLINE_CACHE=1']
+        for key, value in sorted(image['build_args'].items()):
+            command.append('--build-arg {}={}'.format(key, shlex.quote(value)))
+        for ref in [image['tag']] + [ref.format(image['name']) for ref in cache_from]:
+            command.append('--cache-from {}'.format(ref))
+        print('Building {}, log: {}'.format(image['tag'], log_file))
+        with open(log_file, 'w') as log:
+            result = subprocess.run('cd {}; {} .'.format(context_dir, ' '.join(command)),
+                                    shell=True, stdout=log, stderr=subprocess.STDOUT)
+        if result.returncode != 0:
+            with open(log_file) as log:
+                print('Failed to build {} image:\n{}'.format(image['tag'], ''.join(log.readlines()[-30:])))
+            return False
+        status = 'built'
+        return True
+    except Exception:
+        traceback.print_exc()
+        return False
+    finally:
+        with report_lock:
+            report.append({'image': image['tag'], 'status': status, 'duration': round(time.time() - started, 1)})
+        print('{} {} in {:.1f} sec'.format(image['tag'], status, time.time() - started))
+
+
+def build_images(base, images, context_dir, max_workers=4, force=False, cache_from=(), log_dir='/tmp/docker_build',
+                 docker='docker'):
+    # Returns the report and whether every image was built or skipped. The dependent images are not built
+    # when the base image fails.
+    os.makedirs(log_dir, exist_ok=True)
+    report = list()
+    started = time.time()
+    succeeded = build_image(base, context_dir, log_dir, report, force=force, cache_from=cache_from, docker=docker)
+    if succeeded and images:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            results = list(pool.map(lambda image: build_image(image, context_dir, log_dir, report, base['tag'],
+                                                              force, cache_from, docker), images))
+        succeeded = all(results)
+    print_report(report, time.time() - started)
+    with open(os.path.join(log_dir, 'report.json'), 'w') as f:
+        json.dump(report, f, indent=2)
+    return report, succeeded
+
+
+def print_report(report, duration):
+    print('{:<40} {:<8} {:>10}'.format('Image', 'Status', 'Duration'))
+    for item in sorted(report, key=lambda item: -item['duration']):
+        print('{:<40} {:<8} {:>6.1f} sec'.format(item['image'], item['status'], item['duration']))
+    print('{} images in {:.1f} sec: {} built, {} skipped, {} failed'.format(
+        len(report), duration, *[sum(item['status'] == status for item in report)
+                                 for status in ('built', 'skipped', 'failed')]))
+
 
 def image_build(src_path, node):
     try:
@@ -56,26 +173,52 @@ def image_build(src_path, node):
             node.extend(['tensor-rstudio', 'tensor-jupyterlab'])
         elif subprocess.run("uname -r | awk -F '-' '{print $3}'", capture_output=True, shell=True, check=True).stdout.decode('UTF-8').rstrip("\n\r") == 'azure':
             cloud_provider = 'azure'
-            if not path.exists('{}base/azure_auth.json'.format(src_path)):
+            if not os.path.exists('{}base/azure_auth.json'.format(src_path)):
                 subprocess.run('cp /home/datalab-user/keys/azure_auth.json {}base/azure_auth.json'.format(src_path), shell=True, check=True)
         else:
             cloud_provider = 'gcp'
             node.extend(['tensor-rstudio', 'jupyter-gpu', 'superset'])
-        subprocess.run('cd {2}; docker build --build-arg OS={0} --build-arg SRC_PATH= --file general/files/{1}/base_Dockerfile -t docker.datalab-base:latest .'.format(
-                    os_family, cloud_provider, src_path), shell=True, check=True)
-        try:
-            for i in range(len(node)):
-                subprocess.run('cp {0}general/files/{1}/{2}_description.json '
-                          '{0}{2}/description.json'.format(src_path, cloud_provider, node[i]), shell=True, check=True)
-                subprocess.run('cd {3}; docker build --build-arg OS={0} --file general/files/{1}/{2}_Dockerfile -t docker.datalab-{2} .'.format(
-                            os_family, cloud_provider, node[i], src_path), shell=True, check=True)
-        except Exception as err:
-            print("Failed to build {} image".format(node[i]), str(err))
-            raise Exception
+        base = {'name': 'base', 'tag': 'docker.datalab-base:latest',
+                'dockerfile': 'general/files/{}/base_Dockerfile'.format(cloud_provider),
+                'build_args': {'OS': os_family, 'SRC_PATH': ''}}
+        images = list()
+        for name in node:
+            subprocess.run('cp {0}general/files/{1}/{2}_description.json '
+                           '{0}{2}/description.json'.format(src_path, cloud_provider, name), shell=True, check=True)
+            images.append({'name': name, 'tag': 'docker.datalab-{}'.format(name),
+                           'dockerfile': 'general/files/{}/{}_Dockerfile'.format(cloud_provider, name),
+                           'build_args': {'OS': os_family}})
+        report, succeeded = build_images(base, images, src_path, args.max_workers, args.force, args.cache_from,
+                                         args.log_dir)
+        if not succeeded:
+            raise Exception('Failed to build images: {}'.format(
+                ', '.join(item['image'] for item in report if item['status'] == 'failed')))
     except Exception as err:
         traceback.print_exc()
         sys.exit(1)
 
 
 if __name__ == "__main__":
-    image_build(src_path, node)
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('node', nargs='+', type=str, help='Images to build after the base image or "all"')
+    parser.add_argument('--max_workers', type=int, default=4, help='Images built at the same time')
+    parser.add_argument('--force', action='store_true', help='Build images even when their inputs are unchanged')
+    parser.add_argument('--cache_from', type=str, action='append', default=[],
+                        help='Additional cache image, "{}" is replaced by the image name')
+    parser.add_argument('--log_dir', type=str, default='/tmp/docker_build', help='Directory of the build logs')
+    args = parser.parse_args()
+    if args.node == ['all']:
+        node = [
+            'edge',
+            'project',
+            'jupyter',
+            'jupyterlab',
+            'rstudio',
+            'zeppelin',
+            'tensor',
+            'deeplearning',
+            'dataengine',
+            'dataengine-service']
+    else:
+        node = args.node
+    image_build(src_path, node)
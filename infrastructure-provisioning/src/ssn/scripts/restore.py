@@ -23,7 +23,9 @@
 
 import argparse
 import filecmp
+import json
 import os
+import shutil
 import sys
 import yaml
 import subprocess
@@ -45,6 +47,9 @@ parser.add_argument('--file', type=str, default='', required=True,
                     help='Full or relative path to backup file or folder. Required field')
 parser.add_argument('--force', action='store_true', default=False,
                     help='Force mode. Without any questions. Key without arguments. Default: disable')
+parser.add_argument('--list', action='store_true', default=False,
+                    help='Print the files of the backup and the archives holding them. Key without arguments. '
+                         'Default: disable')
 args = parser.parse_args()
 
 
@@ -64,6 +69,54 @@ def ask(question):
             continue
 
 
+def get_compress_option(archive):
+    if archive.endswith('.zst'):
+        return '-I zstd'
+    return '-I pigz' if shutil.which('pigz') else '-z'
+
+
+def read_manifest(archive):
+    # The manifest is the first member, so tar stops right after it; backups without one return None
+    result = subprocess.run("tar {0} --occurrence=1 -xOf {1} manifest.json".format(get_compress_option(archive), archive),
+                            capture_output=True, shell=True)
+    return json.loads(result.stdout.decode('UTF-8')) if result.returncode == 0 else None
+
+
+def get_members(manifest):
+    # Names of the selected files grouped by the archive of the backup chain which holds their latest version
+    selection = {'conf': args.configs, 'keys': args.keys, 'certs': args.certs, 'jars': args.jars}
+    members = dict()
+    for name, entry in sorted(manifest['files'].items()):
+        category, path = name.split('/', 1)
+        selected = selection.get(category, 'skip')
+        if selected == 'skip' or (selected != 'all' and path.split('/')[0] not in selected.split(',')
+                                  and path not in selected.split(',')):
+            continue
+        members.setdefault(entry['backup'], list()).append(name)
+    if args.db and manifest.get('db'):
+        members.setdefault(manifest['db']['backup'], list()).append('mongo.db')
+    return members
+
+
+def extract_members(manifest, temp_folder):
+    # Only the selected files are extracted, each archive is streamed once
+    backup_dir = os.path.dirname(backup_file)
+    for archive, names in get_members(manifest).items():
+        print("Extracting {} files from {}".format(len(names), archive))
+        with open("{}members.list".format(temp_folder), "w") as f:
+            f.write("\n".join(names) + "\n")
+        subprocess.run("tar {0} -xf {1} -C {2} -T {2}members.list".format(
+            get_compress_option(archive), os.path.join(backup_dir, archive), temp_folder), shell=True, check=True)
+        os.remove("{}members.list".format(temp_folder))
+    if args.db and manifest.get('db'):
+        for i, archive in enumerate(manifest['db']['oplog']):
+            oplog_folder = "{0}oplog/{1:04d}/".format(temp_folder, i)
+            # mongorestore needs a dump folder to replay an oplog file, an empty one restores nothing else
+            os.makedirs(oplog_folder + "dump")
+            subprocess.run("tar {0} --occurrence=1 -xf {1} -C {2} mongo.oplog.bson".format(
+                get_compress_option(archive), os.path.join(backup_dir, archive), oplog_folder), shell=True, check=True)
+
+
 def restore_prepare():
     try:
         if os.path.isfile(backup_file):
@@ -73,9 +126,22 @@ def restore_prepare():
                 print("Temporary folder with this backup already exist.")
                 print("Use folder path '{}' in --file key".format(temp_folder))
                 raise Exception
+            manifest = read_manifest(backup_file)
+            if args.list:
+                if not manifest:
+                    print("Backup {} has no manifest.".format(backup_file))
+                    sys.exit(1)
+                for name, entry in sorted(manifest['files'].items()):
+                    print("{0:<60} {1:>12} {2}".format(name, entry['size'], entry['backup']))
+                if manifest.get('db'):
+                    print("Database: {} with oplog of {}".format(manifest['db']['backup'], manifest['db']['oplog']))
+                sys.exit(0)
             print("Backup acrhive will be unpacked to: {}".format(temp_folder))
             subprocess.run("mkdir {}".format(temp_folder), shell=True, check=True)
-            subprocess.run("tar -xf {0} -C {1}".format(backup_file, temp_folder), shell=True, check=True)
+            if manifest:
+                extract_members(manifest, temp_folder)
+            else:
+                subprocess.run("tar -xf {0} -C {1}".format(backup_file, temp_folder), shell=True, check=True)
         elif os.path.isdir(backup_file):
             temp_folder = backup_file
         else:
@@ -267,6 +333,15 @@ def restore_database():
                     subprocess.run("mongorestore --drop --host {0} --port {1} --archive={2}/mongo.db --username {3} --password '{4}' --authenticationDatabase={5}" \
                             .format(data['mongo']['host'], data['mongo']['port'], temp_folder,
                                     data['mongo']['username'], data['mongo']['password'], data['mongo']['database']), shell=True, check=True)
+                    # Incremental backups hold the oplog entries since the previous one, they are replayed in order
+                    if os.path.isdir("{}oplog".format(temp_folder)):
+                        for oplog_folder in sorted(os.listdir("{}oplog".format(temp_folder))):
+                            print("Replaying oplog {}".format(oplog_folder))
+                            subprocess.run("mongorestore --host {0} --port {1} --username {2} --password '{3}' --authenticationDatabase={4} "
+                                           "--oplogReplay --oplogFile={5}oplog/{6}/mongo.oplog.bson {5}oplog/{6}/dump" \
+                                    .format(data['mongo']['host'], data['mongo']['port'], data['mongo']['username'],
+                                            data['mongo']['password'], data['mongo']['database'], temp_folder,
+                                            oplog_folder), shell=True, check=True)
         else:
             print("Restore database was skipped.")
     except:
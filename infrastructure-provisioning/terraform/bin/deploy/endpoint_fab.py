@@ -653,13 +653,19 @@ def pull_docker_images():
                               args.repository_address,
                               args.repository_port)).stdout:
                 sys.exit(1)
-            for image in list_images[args.cloud_provider]:
-                conn.sudo('docker pull {0}:{1}/docker.datalab-{3}-{2}'
-                          .format(args.repository_address, args.repository_port, args.cloud_provider, image))
-                conn.sudo('docker tag {0}:{1}/docker.datalab-{3}-{2} docker.datalab-{3}'
-                          .format(args.repository_address, args.repository_port, args.cloud_provider, image))
-                conn.sudo('docker rmi {0}:{1}/docker.datalab-{3}-{2}'
-                          .format(args.repository_address, args.repository_port, args.cloud_provider, image))
+            # Images are pulled, tagged and removed from the repository name in parallel on the endpoint,
+            # xargs fails when any of the images fails
+            started = time.time()
+            conn.run('echo {} > /tmp/docker_images.list'.format(' '.join(list_images[args.cloud_provider])))
+            conn.sudo("xargs -a /tmp/docker_images.list -n 1 -P {3} bash -c 'start=$(date +%s); "
+                      "docker pull {0}:{1}/docker.datalab-$0-{2} && "
+                      "docker tag {0}:{1}/docker.datalab-$0-{2} docker.datalab-$0 && "
+                      "docker rmi {0}:{1}/docker.datalab-$0-{2} && "
+                      "echo \"Pulled docker.datalab-$0 in $(($(date +%s) - start)) sec\"'"
+                      .format(args.repository_address, args.repository_port, args.cloud_provider,
+                              args.docker_pull_workers))
+            logging.info('Pulled {} Docker images in {:.1f} sec'.format(len(list_images[args.cloud_provider]),
+                                                                        time.time() - started))
             #conn.sudo('chown -R {0}:docker /home/{0}/.docker/'.format(args.os_user))
             conn.sudo('touch {}'.format(ensure_file))
     except Exception as err:
@@ -989,6 +995,7 @@ def init_args():
     parser.add_argument('--repository_port', type=str, default='')
     parser.add_argument('--repository_user', type=str, default='')
     parser.add_argument('--repository_pass', type=str, default='')
+    parser.add_argument('--docker_pull_workers', type=int, default=4, help='Docker images pulled at the same time')
     parser.add_argument('--release_tag', type=str,
                         default='2.6.0')
     parser.add_argument('--docker_version', type=str,